@@ -0,0 +1,57 @@
+"""
+Import time of g4f and its entry points, each in a new interpreter.
+
+The provider registry imports the module of a provider on first use.
+The last statement imports all of them, like every ``import g4f`` did
+before it. Run with ``-X importtime`` for the details of one statement:
+
+    python -X importtime -c "import g4f" 2> import.log
+"""
+from __future__ import annotations
+
+import sys
+import json
+import subprocess
+from pathlib import Path
+from statistics import median
+
+ROOT = Path(__file__).parent.parent.parent
+RUNS = 7
+STATEMENTS = (
+    "import g4f",
+    "import g4f.api",
+    "from g4f.cli import get_api_parser; get_api_parser().parse_args(['--provider', 'DDG'])",
+    "from g4f.Provider import OpenaiChat",
+    "import g4f.Provider; list(g4f.Provider.__providers__)",
+)
+SCRIPT = """
+import sys, time, json, warnings
+warnings.simplefilter("ignore")
+start = time.perf_counter()
+{statement}
+seconds = time.perf_counter() - start
+modules = [name for name in sys.modules if name.startswith("g4f.Provider.")]
+print(json.dumps({{"seconds": seconds, "modules": len(modules)}}))
+"""
+
+def measure(statement: str) -> tuple[float, int]:
+    """Return the median seconds of a statement and the number of provider modules it loads."""
+    times = []
+    for _ in range(RUNS):
+        result = subprocess.run(
+            [sys.executable, "-c", SCRIPT.format(statement=statement)],
+            cwd=ROOT, capture_output=True, text=True, check=True
+        )
+        data = json.loads(result.stdout.strip().splitlines()[-1])
+        times.append(data["seconds"])
+    return median(times), data["modules"]
+
+def main():
+    print(f"Median of {RUNS} runs, each in a new interpreter")
+    print(f"{'statement':<90} {'ms':>8} {'modules':>8}")
+    for statement in STATEMENTS:
+        seconds, modules = measure(statement)
+        print(f"{statement:<90} {seconds * 1000:>8.1f} {modules:>8}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+A local mock of provider APIs for the offline benchmarks.
+
+Replays a recorded stream of tokens after a latency before the first token
+and at a rate of tokens per second. The same tokens are served as
+server-sent events of the OpenAI API, as newline delimited json and over
+a websocket:
+
+    POST /v1/chat/completions   OpenAI chat completions, with "stream" as SSE
+    POST /ndjson                {"response": token} lines, then {"done": true}
+    GET  /ws                    {"response": token} messages, then {"done": true}
+
+Run it alone with:
+
+    python etc/benchmark/mock_upstream.py --port 8080 --tokens 200 --rate 50
+"""
+from __future__ import annotations
+
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import multiprocessing
+from pathlib import Path
+
+from aiohttp import web, WSMsgType
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from g4f.requests.sse import SSEParser, LineSplitter, loads
+
+WORDS = ("the", "a", "model", "token", "stream", "of", "and", "benchmark", "provider", "response", "\n")
+
+def generate_tokens(count: int) -> list[str]:
+    random.seed(0)
+    return [random.choice(WORDS) + " " for _ in range(count)]
+
+def load_tokens(path: str) -> list[str]:
+    """
+    Read the tokens of a recorded stream: the SSE of an OpenAI compatible
+    API, or newline delimited json with a "response", "message" or "token" field.
+    """
+    data = Path(path).read_bytes()
+    if path.endswith(".ndjson") or path.endswith(".jsonl"):
+        lines = LineSplitter()
+        items = [loads(line) for line in lines.feed(data) + lines.flush() if line.strip()]
+    else:
+        parser = SSEParser()
+        items = [loads(event.data) for event in parser.feed(data) + parser.flush() if event.data != b"[DONE]"]
+    tokens = []
+    for item in items:
+        if "choices" in item:
+            token = item["choices"][0].get("delta", {}).get("content")
+        else:
+            token = item.get("response", item.get("message", item.get("token")))
+        if token:
+            tokens.append(token)
+    return tokens
+
+class MockUpstream:
+    def __init__(self, tokens: list[str], latency: float = 0, rate: float = 0) -> None:
+        self.tokens = tokens
+        self.latency = latency
+        self.rate = rate
+
+    async def replay(self):
+        """Yield the tokens at the rate, after the latency."""
+        await asyncio.sleep(self.latency)
+        start = time.monotonic()
+        for index, token in enumerate(self.tokens):
+            if self.rate:
+                delay = start + index / self.rate - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            yield token
+
+    async def chat_completions(self, request: web.Request) -> web.StreamResponse:
+        data = await request.json()
+        if not data.get("stream"):
+            content = "".join([token async for token in self.replay()])
+            return web.json_response({
+                "id": "chatcmpl-mock", "object": "chat.completion", "created": int(time.time()), "model": "mock",
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            })
+        response = web.StreamResponse(headers={"content-type": "text/event-stream"})
+        await response.prepare(request)
+        prefix = f'data: {{"id":"chatcmpl-mock","object":"chat.completion.chunk","created":{int(time.time())},"model":"mock","choices":[{{"index":0,"delta":'
+        async for token in self.replay():
+            await response.write(f'{prefix}{{"content":{json.dumps(token)}}},"finish_reason":null}}]}}\n\n'.encode())
+        await response.write(f'{prefix}{{}},"finish_reason":"stop"}}]}}\n\ndata: [DONE]\n\n'.encode())
+        await response.write_eof()
+        return response
+
+    async def ndjson(self, request: web.Request) -> web.StreamResponse:
+        await request.read()
+        response = web.StreamResponse(headers={"content-type": "application/x-ndjson"})
+        await response.prepare(request)
+        async for token in self.replay():
+            await response.write(f'{{"response":{json.dumps(token)}}}\n'.encode())
+        await response.write(b'{"done":true}\n')
+        await response.write_eof()
+        return response
+
+    async def websocket(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        async for message in ws:
+            if message.type != WSMsgType.TEXT:
+                break
+            async for token in self.replay():
+                await ws.send_str(json.dumps({"response": token}))
+            await ws.send_str('{"done":true}')
+        return ws
+
+    def create_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self.chat_completions)
+        app.router.add_post("/ndjson", self.ndjson)
+        app.router.add_get("/ws", self.websocket)
+        return app
+
+async def serve(upstream: MockUpstream, port: int = 0, started=None) -> None:
+    runner = web.AppRunner(upstream.create_app(), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", port, backlog=1024)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    if started is not None:
+        started.send(port)
+    else:
+        print(f"Mock upstream on http://127.0.0.1:{port}")
+    await asyncio.Event().wait()
+
+def run(tokens: list[str], latency: float, rate: float, port: int = 0, started=None) -> None:
+    asyncio.run(serve(MockUpstream(tokens, latency, rate), port, started))
+
+def start(tokens: list[str], latency: float = 0, rate: float = 0) -> tuple[multiprocessing.Process, str]:
+    """Run the mock in its own process, so its CPU isn't counted. Returns the process and its url."""
+    context = multiprocessing.get_context("spawn")
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=run, args=(tokens, latency, rate, 0, sender), daemon=True)
+    process.start()
+    port = receiver.recv()
+    return process, f"http://127.0.0.1:{port}"
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a mock provider stream")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--tokens", type=int, default=200, help="Tokens of a generated response")
+    parser.add_argument("--recording", help="Replay the tokens of a recorded .sse or .ndjson stream")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds before the first token")
+    parser.add_argument("--rate", type=float, default=0, help="Tokens per second of a stream, 0 for no limit")
+    args = parser.parse_args()
+    tokens = load_tokens(args.recording) if args.recording else generate_tokens(args.tokens)
+    run(tokens, args.latency, args.rate, args.port)
+
+if __name__ == "__main__":
+    main()
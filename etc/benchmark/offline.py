@@ -0,0 +1,341 @@
+"""
+Offline benchmark of the client, the providers and the API against a local mock upstream.
+
+The mock (etc/benchmark/mock_upstream.py) runs in its own process and
+replays a stream with a set latency and token rate, so the numbers show
+the overhead of g4f apart from the latency of real providers. Every
+scenario runs ``--requests`` streamed completions, ``--concurrency`` at a
+time, and reports:
+
+    req/s, tok/s    Finished requests and tokens per second
+    ttft            Time to the first token, p50 and p95
+    itl             Time between two chunks, p50, p95 and p99
+    cpu/tok         CPU time of this process per token
+    rss             Resident memory after the scenario
+
+The results are compared with a stored baseline, ``--save`` writes it:
+
+    python etc/benchmark/offline.py --requests 64 --concurrency 8 --rate 0
+    python etc/benchmark/offline.py --targets api --protocols sse --rate 50 --latency 0.2
+"""
+from __future__ import annotations
+
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import resource
+    has_resource = True
+except ImportError:
+    has_resource = False
+
+from aiohttp import ClientSession
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+import mock_upstream
+from g4f.client import Client, AsyncClient
+from g4f.providers.base_provider import AsyncGeneratorProvider
+from g4f.providers.retry_provider import IterListProvider
+from g4f.Provider import ProviderUtils
+from g4f.Provider.needs_auth.OpenaiAPI import OpenaiAPI
+from g4f.requests import get_session, raise_for_status
+from g4f.requests.sse import iter_sse_json, iter_ndjson
+
+BASELINE_FILE = Path(__file__).parent / "offline_baseline.json"
+TARGETS = ("client", "async_client", "iter_list", "api")
+PROTOCOLS = ("sse", "ndjson", "ws")
+# Metrics that are compared with the baseline, True if higher is better
+METRICS = {
+    "tokens_per_s": True,
+    "ttft_p50_ms": False,
+    "ttft_p95_ms": False,
+    "itl_p50_ms": False,
+    "itl_p95_ms": False,
+    "itl_p99_ms": False,
+    "cpu_us_per_token": False,
+    "rss_mb": False,
+}
+MESSAGES = [{"role": "user", "content": "Hello, write me a long story"}]
+
+class MockOpenai(OpenaiAPI):
+    label = "Mock OpenAI API"
+    url = None
+    api_base = None
+    needs_auth = False
+    supports_stream = True
+    default_model = "mock"
+    models = [default_model]
+
+class MockNdjson(AsyncGeneratorProvider):
+    url = None
+    api_base = None
+    working = True
+    supports_stream = True
+
+    @classmethod
+    async def create_async_generator(cls, model: str, messages: list, proxy: str = None, **kwargs):
+        async with get_session(cls.api_base, proxy=proxy) as session:
+            async with session.post(f"{cls.api_base}/ndjson", json={"messages": messages}) as response:
+                await raise_for_status(response)
+                async for data in iter_ndjson(response):
+                    if data.get("done"):
+                        break
+                    yield data["response"]
+
+class MockWebsocket(AsyncGeneratorProvider):
+    url = None
+    api_base = None
+    working = True
+    supports_stream = True
+
+    @classmethod
+    async def create_async_generator(cls, model: str, messages: list, proxy: str = None, **kwargs):
+        async with ClientSession() as session:
+            async with session.ws_connect(f"{cls.api_base}/ws", proxy=proxy) as ws:
+                await ws.send_str(json.dumps({"messages": messages}))
+                async for message in ws:
+                    data = json.loads(message.data)
+                    if data.get("done"):
+                        break
+                    yield data["response"]
+
+PROVIDERS = {"sse": MockOpenai, "ndjson": MockNdjson, "ws": MockWebsocket}
+
+class Sample:
+    """The times of the chunks of one request."""
+    __slots__ = ("start", "times", "error")
+
+    def __init__(self, start: float, times: list[float], error: Exception = None) -> None:
+        self.start = start
+        self.times = times
+        self.error = error
+
+def run_client(provider, requests: int, concurrency: int) -> list[Sample]:
+    client = Client(provider=provider)
+    def create(_) -> Sample:
+        start = time.perf_counter()
+        times = []
+        try:
+            for chunk in client.chat.completions.create(MESSAGES, "", stream=True):
+                if chunk.choices[0].delta.content:
+                    times.append(time.perf_counter())
+        except Exception as e:
+            return Sample(start, times, e)
+        return Sample(start, times)
+    with ThreadPoolExecutor(concurrency) as executor:
+        return list(executor.map(create, range(requests)))
+
+async def run_async_client(provider, requests: int, concurrency: int) -> list[Sample]:
+    client = AsyncClient(provider=provider)
+    semaphore = asyncio.Semaphore(concurrency)
+    async def create() -> Sample:
+        async with semaphore:
+            start = time.perf_counter()
+            times = []
+            try:
+                async for chunk in client.chat.completions.create(MESSAGES, "", stream=True):
+                    if chunk.choices[0].delta.content:
+                        times.append(time.perf_counter())
+            except Exception as e:
+                return Sample(start, times, e)
+            return Sample(start, times)
+    return await asyncio.gather(*[create() for _ in range(requests)])
+
+async def run_api(url: str, provider: str, requests: int, concurrency: int) -> list[Sample]:
+    semaphore = asyncio.Semaphore(concurrency)
+    async with ClientSession() as session:
+        async def create() -> Sample:
+            async with semaphore:
+                start = time.perf_counter()
+                times = []
+                try:
+                    async with session.post(f"{url}/v1/chat/completions", json={
+                        "model": "", "provider": provider, "messages": MESSAGES, "stream": True
+                    }) as response:
+                        response.raise_for_status()
+                        async for data in iter_sse_json(response):
+                            if "error" in data:
+                                raise RuntimeError(data["error"].get("message"))
+                            if data["choices"][0]["delta"].get("content"):
+                                times.append(time.perf_counter())
+                except Exception as e:
+                    return Sample(start, times, e)
+                return Sample(start, times)
+        return await asyncio.gather(*[create() for _ in range(requests)])
+
+class ApiServer:
+    """The FastAPI app of g4f, served by uvicorn in a thread of this process."""
+
+    def __init__(self) -> None:
+        import uvicorn
+        from g4f.api import create_app, AppConfig
+        AppConfig.ignore_cookie_files = True
+        self.socket = socket.socket()
+        self.socket.bind(("127.0.0.1", 0))
+        self.url = f"http://127.0.0.1:{self.socket.getsockname()[1]}"
+        self.server = uvicorn.Server(uvicorn.Config(create_app(), log_level="warning"))
+        self.thread = threading.Thread(target=self.server.run, kwargs={"sockets": [self.socket]}, daemon=True)
+
+    def __enter__(self) -> "ApiServer":
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.server.should_exit = True
+        self.thread.join()
+
+def get_rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * resource.getpagesize() / 1024 / 1024
+    except (OSError, NameError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 if has_resource else 0
+
+def percentile(values: list[float], percent: float) -> float:
+    if not values:
+        return 0
+    return values[min(int(len(values) * percent / 100), len(values) - 1)]
+
+def summarize(samples: list[Sample], seconds: float, cpu: float, tokens: int) -> dict:
+    finished = [sample for sample in samples if sample.error is None and sample.times]
+    ttft = sorted(sample.times[0] - sample.start for sample in finished)
+    itl = sorted(later - earlier for sample in finished for earlier, later in zip(sample.times, sample.times[1:]))
+    total_tokens = len(finished) * tokens
+    return {
+        "requests_per_s": len(finished) / seconds,
+        "tokens_per_s": total_tokens / seconds,
+        "ttft_p50_ms": percentile(ttft, 50) * 1000,
+        "ttft_p95_ms": percentile(ttft, 95) * 1000,
+        "itl_p50_ms": percentile(itl, 50) * 1000,
+        "itl_p95_ms": percentile(itl, 95) * 1000,
+        "itl_p99_ms": percentile(itl, 99) * 1000,
+        "cpu_us_per_token": cpu / total_tokens * 1e6 if total_tokens else 0,
+        "rss_mb": get_rss_mb(),
+        "errors": len(samples) - len(finished),
+    }
+
+def measure(run, requests: int, concurrency: int, tokens: int) -> dict:
+    # The first requests import modules and open connections
+    run(min(requests, concurrency))
+    start, cpu = time.perf_counter(), time.process_time()
+    samples = run(requests)
+    return summarize(samples, time.perf_counter() - start, time.process_time() - cpu, tokens)
+
+def get_scenarios(args, api: ApiServer = None) -> dict:
+    scenarios = {}
+    for target in args.targets:
+        if target == "iter_list":
+            provider = IterListProvider([MockNdjson, MockOpenai, MockWebsocket])
+            scenarios[target] = lambda n, provider=provider: asyncio.run(run_async_client(provider, n, args.concurrency))
+            continue
+        for protocol in args.protocols:
+            provider = PROVIDERS[protocol]
+            if target == "client":
+                run = lambda n, provider=provider: run_client(provider, n, args.concurrency)
+            elif target == "async_client":
+                run = lambda n, provider=provider: asyncio.run(run_async_client(provider, n, args.concurrency))
+            else:
+                run = lambda n, provider=provider: asyncio.run(run_api(api.url, provider.__name__, n, args.concurrency))
+            scenarios[f"{target}-{protocol}"] = run
+    return scenarios
+
+def print_results(results: dict) -> None:
+    print(f"{'scenario':<20} {'req/s':>8} {'tok/s':>10} {'ttft p50':>9} {'p95':>8} {'itl p50':>8} {'p95':>7} {'p99':>7} {'cpu/tok':>8} {'rss':>7} {'errors':>6}")
+    for name, result in results.items():
+        print(
+            f"{name:<20} {result['requests_per_s']:>8.1f} {result['tokens_per_s']:>10,.0f}"
+            f" {result['ttft_p50_ms']:>7.1f}ms {result['ttft_p95_ms']:>6.1f}ms"
+            f" {result['itl_p50_ms']:>6.2f}ms {result['itl_p95_ms']:>5.2f}ms {result['itl_p99_ms']:>5.2f}ms"
+            f" {result['cpu_us_per_token']:>6.0f}us {result['rss_mb']:>5.0f}MB {result['errors']:>6}"
+        )
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Print the changes against the baseline, return the regressions."""
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline["results"]:
+            continue
+        changes = []
+        for metric, higher_is_better in METRICS.items():
+            before, after = baseline["results"][name].get(metric), result[metric]
+            if not before:
+                continue
+            change = (after - before) / before
+            worse = -change if higher_is_better else change
+            flag = ""
+            if worse > tolerance:
+                flag = " !"
+                regressions.append(f"{name} {metric}: {before:.2f} -> {after:.2f}")
+            changes.append(f"{metric} {change:+.0%}{flag}")
+        print(f"{name:<20} {', '.join(changes)}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark g4f against a local mock upstream")
+    parser.add_argument("--targets", nargs="+", choices=TARGETS, default=list(TARGETS))
+    parser.add_argument("--protocols", nargs="+", choices=PROTOCOLS, default=list(PROTOCOLS))
+    parser.add_argument("--requests", type=int, default=64, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=8, help="Requests at the same time")
+    parser.add_argument("--tokens", type=int, default=200, help="Tokens of a generated response")
+    parser.add_argument("--recording", help="Replay the tokens of a recorded .sse or .ndjson stream")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds before the first token")
+    parser.add_argument("--rate", type=float, default=0, help="Tokens per second of a stream, 0 for no limit")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_FILE)
+    parser.add_argument("--save", action="store_true", help="Store the results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed change against the baseline")
+    parser.add_argument("--check", action="store_true", help="Exit with an error on regressions")
+    args = parser.parse_args()
+
+    tokens = mock_upstream.load_tokens(args.recording) if args.recording else mock_upstream.generate_tokens(args.tokens)
+    config = {
+        "requests": args.requests, "concurrency": args.concurrency, "tokens": len(tokens),
+        "recording": args.recording, "latency": args.latency, "rate": args.rate,
+    }
+    process, url = mock_upstream.start(tokens, args.latency, args.rate)
+    for provider in PROVIDERS.values():
+        provider.api_base = url
+        ProviderUtils.convert[provider.__name__] = provider
+    MockOpenai.api_base = f"{url}/v1"
+    print(f"Mock upstream: {url}, {json.dumps(config)}")
+    results = {}
+    try:
+        api = ApiServer() if "api" in args.targets else None
+        if api is not None:
+            api.__enter__()
+        try:
+            for name, run in get_scenarios(args, api).items():
+                results[name] = measure(run, args.requests, args.concurrency, len(tokens))
+        finally:
+            if api is not None:
+                api.__exit__()
+    finally:
+        process.terminate()
+    print_results(results)
+
+    regressions = []
+    if args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text())
+        if baseline["config"] != config:
+            print(f"\nThe baseline was made with another config: {json.dumps(baseline['config'])}")
+        else:
+            print(f"\nAgainst {args.baseline.name}, tolerance {args.tolerance:.0%}:")
+            regressions = compare(results, baseline, args.tolerance)
+    if args.save:
+        args.baseline.write_text(json.dumps({"config": config, "results": results}, indent=2) + "\n")
+        print(f"\nSaved baseline: {args.baseline}")
+    if args.check and regressions:
+        print("\nRegressions:\n" + "\n".join(regressions))
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
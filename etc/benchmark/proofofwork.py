@@ -0,0 +1,55 @@
+import sys
+import json
+import time
+import base64
+import asyncio
+import hashlib
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from g4f.Provider.openai.new import get_config, get_answer_template
+from g4f.Provider.openai.solver import solve_range, solve_async
+
+ATTEMPTS = 200000
+# Unreachable target, every attempt is a miss
+TARGET = bytes(3)
+
+def legacy_generate_answer(seed, diff, config, max_attempts):
+    diff_len = len(diff)
+    seed_encoded = seed.encode()
+    p1 = (json.dumps(config[:3], separators=(',', ':'), ensure_ascii=False)[:-1] + ',').encode()
+    p2 = (',' + json.dumps(config[4:9], separators=(',', ':'), ensure_ascii=False)[1:-1] + ',').encode()
+    p3 = (',' + json.dumps(config[10:], separators=(',', ':'), ensure_ascii=False)[1:]).encode()
+    target_diff = bytes.fromhex(diff)
+    for i in range(max_attempts):
+        string = p1 + str(i).encode() + p2 + str(i >> 1).encode() + p3
+        base_encode = base64.b64encode(string)
+        hash_value = hashlib.new("sha3_512", seed_encoded + base_encode).digest()
+        if hash_value[:diff_len] <= target_diff:
+            return base_encode.decode(), True
+
+def report(name: str, seconds: float):
+    print(f"{name:<24} {ATTEMPTS / seconds:>12,.0f} attempts/sec ({seconds:.2f} secs)")
+
+async def main():
+    config = get_config("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36")
+    template = get_answer_template(config)
+    seed = "0.123456789"
+
+    start = time.perf_counter()
+    legacy_generate_answer(seed, TARGET.hex(), config, ATTEMPTS)
+    report("legacy", time.perf_counter() - start)
+
+    start = time.perf_counter()
+    solve_range(seed, template, TARGET, len(TARGET), 0, ATTEMPTS)
+    report("solve_range", time.perf_counter() - start)
+
+    # Warm up the process pool before timing it
+    await solve_async(seed, template, TARGET, len(TARGET), 1)
+    start = time.perf_counter()
+    await solve_async(seed, template, TARGET, len(TARGET), ATTEMPTS)
+    report("solve_async (pool)", time.perf_counter() - start)
+
+if __name__ == "__main__":
+    asyncio.run(main())
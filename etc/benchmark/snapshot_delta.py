@@ -0,0 +1,59 @@
+import re
+import sys
+import time
+import random
+import string
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from g4f.providers.helper import SnapshotDelta
+from g4f.Provider.needs_auth.Gemini import IMAGE_PROMPT_MARKER, IMAGE_URL_MARKER
+
+RESPONSE_LENGTH = 50000
+UPDATE_SIZES = (20, 100)
+
+def legacy(snapshots):
+    """The loop of Gemini before SnapshotDelta."""
+    content = []
+    last_content = ""
+    for snapshot in snapshots:
+        match = re.search(r'\[Imagen of (.*?)\]', snapshot)
+        if match:
+            snapshot = snapshot.replace(match.group(0), '')
+        snapshot = re.sub(r"http://googleusercontent.com/image_generation_content/\d+", "", snapshot)
+        if last_content and snapshot.startswith(last_content):
+            content.append(snapshot[len(last_content):])
+        else:
+            content.append(snapshot)
+        last_content = snapshot
+    return "".join(content)
+
+def delta(snapshots):
+    """The loop of Gemini with SnapshotDelta."""
+    content = []
+    deltas = SnapshotDelta()
+    has_markers = False
+    for snapshot in snapshots:
+        if not has_markers:
+            tail = snapshot[max(deltas.offset - len(IMAGE_URL_MARKER), 0):]
+            has_markers = IMAGE_PROMPT_MARKER in tail or IMAGE_URL_MARKER in tail
+        content.append(str(deltas.feed(snapshot)))
+    return "".join(content)
+
+def main():
+    random.seed(0)
+    text = "".join(random.choice(string.ascii_lowercase + "      \n") for _ in range(RESPONSE_LENGTH))
+    for size in UPDATE_SIZES:
+        print(f"{size} new chars per snapshot")
+        for length in (RESPONSE_LENGTH // 5, RESPONSE_LENGTH):
+            snapshots = [text[:end] for end in range(size, length + size, size)]
+            for name, func in (("legacy startswith", legacy), ("SnapshotDelta", delta)):
+                start = time.perf_counter()
+                result = func(snapshots)
+                seconds = time.perf_counter() - start
+                assert result == text[:length]
+                print(f"{name:<18} {length:>8,} chars {len(snapshots):>8,} snapshots {seconds * 1000:>10.1f} ms")
+
+if __name__ == "__main__":
+    main()
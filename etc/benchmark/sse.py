@@ -0,0 +1,59 @@
+import sys
+import time
+import asyncio
+import warnings
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from g4f.client.stubs import ChatCompletionChunk
+from g4f.client.sse import ChunkEncoder, iter_sse, has_orjson
+
+TOKENS = 100000
+TOKEN = "token "
+
+def create_chunks():
+    chunks = []
+    for _ in range(TOKENS):
+        chunk = ChatCompletionChunk.model_construct(TOKEN, None, "benchmark", int(time.time()))
+        chunk.model = "gpt-4o"
+        chunk.provider = "Provider"
+        chunks.append(chunk)
+    return chunks
+
+def legacy(chunks):
+    return [f"data: {chunk.json()}\n\n" for chunk in chunks]
+
+def encoder(chunks):
+    chunk_encoder = ChunkEncoder(0)
+    return [chunk_encoder.encode(chunk) for chunk in chunks]
+
+def stream(chunks, flush_interval: float):
+    async def iter_chunks():
+        for index, chunk in enumerate(chunks):
+            # A fast provider: one pause per 100 tokens
+            if index % 100 == 0:
+                await asyncio.sleep(0)
+            yield chunk
+    async def run():
+        return [event async for event in iter_sse(iter_chunks(), flush_interval)]
+    return asyncio.run(run())
+
+def main():
+    warnings.simplefilter("ignore")
+    start = time.perf_counter()
+    chunks = create_chunks()
+    print(f"{TOKENS:,} tokens, orjson: {has_orjson}, model_construct: {(time.perf_counter() - start) * 1000:.1f} ms")
+    for name, func in (
+        ("chunk.json()", legacy),
+        ("ChunkEncoder", encoder),
+        ("iter_sse", lambda chunks: stream(chunks, 0)),
+        ("iter_sse coalesce 20 ms", lambda chunks: stream(chunks, 0.02)),
+    ):
+        start = time.perf_counter()
+        events = func(chunks)
+        seconds = time.perf_counter() - start
+        print(f"{name:<24} {seconds * 1000:>8.1f} ms {TOKENS / seconds:>12,.0f} tokens/s {len(events):>8,} events")
+
+if __name__ == "__main__":
+    main()
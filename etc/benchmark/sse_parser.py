@@ -0,0 +1,84 @@
+import sys
+import json
+import time
+import random
+import asyncio
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from g4f.requests import sse
+from g4f.requests.sse import iter_sse_json
+
+EVENTS = 20000
+CHUNK_SIZES = (64, 1024, 16384)
+
+def record_stream() -> bytes:
+    """A chat completion stream like the ones of OpenAI compatible APIs."""
+    random.seed(0)
+    lines = []
+    for index in range(EVENTS):
+        data = {
+            "id": "chatcmpl-AbCdEfGhIjKlMnOpQrStUvWxYz", "object": "chat.completion.chunk",
+            "created": 1730000000, "model": "gpt-4o-mini", "system_fingerprint": "fp_0ba0d124f1",
+            "choices": [{"index": 0, "delta": {"content": random.choice(("Hello", " world", ",", " the", " tokens", "\n"))},
+                         "logprobs": None, "finish_reason": None}],
+        }
+        lines.append(f"data: {json.dumps(data)}\n\n".encode())
+    lines.append(b"data: [DONE]\n\n")
+    return b"".join(lines)
+
+async def iter_chunks(stream: bytes, size: int):
+    for index in range(0, len(stream), size):
+        yield stream[index:index + size]
+
+async def aiter_lines(chunks):
+    """The line iterator of curl_cffi that most providers read from."""
+    pending = None
+    async for chunk in chunks:
+        if pending is not None:
+            chunk = pending + chunk
+        lines = chunk.splitlines()
+        pending = lines.pop() if lines and lines[-1] and chunk and lines[-1][-1] == chunk[-1] else None
+        for line in lines:
+            yield line
+    if pending is not None:
+        yield pending
+
+async def legacy(chunks) -> list:
+    result = []
+    async for line in aiter_lines(chunks):
+        if line.startswith(b"data: "):
+            chunk = line[6:]
+            if chunk == b"[DONE]":
+                break
+            result.append(json.loads(chunk)["choices"][0]["delta"]["content"])
+    return result
+
+async def parser(chunks) -> list:
+    return [data["choices"][0]["delta"]["content"] async for data in iter_sse_json(chunks)]
+
+def main():
+    stream = record_stream()
+    has_orjson = sse.has_orjson
+    print(f"{EVENTS:,} events, {len(stream) / 1024 / 1024:.1f} MB, orjson: {has_orjson}")
+    for size in CHUNK_SIZES:
+        expected = None
+        for name, func, use_orjson in (
+            ("iter_lines + json.loads", legacy, False),
+            ("iter_sse_json", parser, False),
+            ("iter_sse_json orjson", parser, True),
+        ):
+            if use_orjson and not has_orjson:
+                continue
+            sse.has_orjson = use_orjson
+            start = time.perf_counter()
+            result = asyncio.run(func(iter_chunks(stream, size)))
+            seconds = time.perf_counter() - start
+            expected = result if expected is None else expected
+            assert result == expected
+            print(f"{name:<24} {size:>6} byte chunks {seconds * 1000:>8.1f} ms {EVENTS / seconds:>12,.0f} events/s")
+    sse.has_orjson = has_orjson
+
+if __name__ == "__main__":
+    main()
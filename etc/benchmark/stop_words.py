@@ -0,0 +1,70 @@
+import sys
+import time
+import random
+import string
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from g4f.client.helper import StopMatcher
+
+CHUNK_SIZE = 4
+RESPONSE_LENGTH = 50000
+STOP_WORDS = 50
+
+def legacy_find_stop(stop, content, chunk=None):
+    first = -1
+    word = None
+    if stop is not None:
+        for word in list(stop):
+            first = content.find(word)
+            if first != -1:
+                content = content[:first]
+                break
+        if chunk is not None and first != -1:
+            first = chunk.find(word)
+            if first != -1:
+                chunk = chunk[:first]
+            else:
+                first = 0
+    return first, content, chunk
+
+def legacy(chunks, stop):
+    content = ""
+    for chunk in chunks:
+        content += chunk
+        first, content, chunk = legacy_find_stop(stop, content, chunk)
+        if first != -1:
+            break
+    return content
+
+def matcher(chunks, stop):
+    stop_matcher = StopMatcher(stop)
+    content = []
+    for chunk in chunks:
+        chunk, found = stop_matcher.feed(chunk)
+        content.append(chunk)
+        if found:
+            break
+    else:
+        content.append(stop_matcher.flush())
+    return "".join(content)
+
+def main():
+    random.seed(0)
+    text = "".join(random.choice(string.ascii_lowercase + "      \n") for _ in range(RESPONSE_LENGTH))
+    # Words with a rare first char are skipped over, words starting with a space run the automaton
+    for prefix in ("<|", " "):
+        stop = [prefix + "".join(random.choices(string.ascii_lowercase, k=6)) for _ in range(STOP_WORDS)]
+        print(f"{STOP_WORDS} stop words starting with {prefix!r}, {CHUNK_SIZE} char chunks, no match")
+        for length in (RESPONSE_LENGTH // 5, RESPONSE_LENGTH):
+            chunks = [text[i:i + CHUNK_SIZE] for i in range(0, length, CHUNK_SIZE)]
+            for name, func in (("legacy find_stop", legacy), ("StopMatcher", matcher)):
+                start = time.perf_counter()
+                result = func(chunks, stop)
+                seconds = time.perf_counter() - start
+                assert result == text[:length]
+                print(f"{name:<18} {length:>8,} chars {seconds * 1000:>10.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -9,5 +9,24 @@ from .image_client import *
 from .include import *
 from .retry_provider import *
 from .models import *
+from .proofofwork import *
+from .session_pool import *
+from .model_registry import *
+from .local_cache import *
+from .har_index import *
+from .sync_pool import *
+from .conversation_store import *
+from .sse import *
+from .tokenizer import *
+from .trimming import *
+from .image_pipeline import *
+from .image_store import *
+from .job_poller import *
+from .response_cache import *
+from .batch import *
+from .credential_pool import *
+from .snapshot_delta import *
+from .sse_parser import *
+from .provider_registry import *
 
 unittest.main()
\ No newline at end of file
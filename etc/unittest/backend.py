@@ -2,13 +2,22 @@ from __future__ import annotations
 
 import unittest
 import asyncio
+import json
 from unittest.mock import MagicMock
 from g4f.errors import MissingRequirementsError
+from .mocks import YieldProviderMock
 try:
     from g4f.gui.server.backend import Backend_Api
     has_requirements = True
 except:
     has_requirements = False
+try:
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from g4f.gui.server.async_backend import AsyncBackend_Api
+    has_fastapi = True
+except:
+    has_fastapi = False
 try:
     from duckduckgo_search.exceptions import DuckDuckGoSearchException
 except ImportError:
@@ -47,3 +56,29 @@ class TestBackendApi(unittest.TestCase):
         except MissingRequirementsError:
             self.skipTest("search is not installed")
         self.assertTrue(len(result) >= 4)
+
+    def test_create_response_stream(self):
+        kwargs = {"provider": YieldProviderMock, "messages": [{"role": "user", "content": "Hello"}], "stream": True}
+        response = [json.loads(line) for line in self.api._create_response_stream(kwargs, None, None)]
+        self.assertEqual("provider", response[0]["type"])
+        self.assertEqual({"type": "content", "content": "Hello"}, response[1])
+
+class TestAsyncBackendApi(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        if not has_requirements or not has_fastapi:
+            self.skipTest("gui or api is not installed")
+        self.app = FastAPI()
+        self.api = AsyncBackend_Api(self.app)
+        self.api.register_routes()
+
+    async def test_create_response_stream_async(self):
+        kwargs = {"provider": YieldProviderMock, "messages": [{"role": "user", "content": "Hello"}], "stream": True}
+        response = [json.loads(line) async for line in self.api._create_response_stream_async(kwargs, None, None)]
+        self.assertEqual("provider", response[0]["type"])
+        self.assertEqual({"type": "content", "content": "Hello"}, response[1])
+
+    def test_get_providers(self):
+        response = TestClient(self.app).get("/backend-api/v2/providers")
+        self.assertEqual(200, response.status_code)
+        self.assertTrue(len(response.json()) > 0)
@@ -0,0 +1,237 @@
+from __future__ import annotations
+
+import os
+import json
+import asyncio
+import tempfile
+import unittest
+
+from g4f.client import Client, AsyncClient, ProviderLimiter
+from g4f.providers.base_provider import AsyncGeneratorProvider
+from g4f.providers.retry_provider import IterListProvider
+from g4f.providers.scoreboard import Scoreboard
+try:
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from g4f.api import Api
+    from g4f.api.batches import BatchManager, BatchStore
+    has_fastapi = True
+except ImportError:
+    has_fastapi = False
+
+class EchoProvider(AsyncGeneratorProvider):
+    working = True
+    running = 0
+    max_running = 0
+
+    @classmethod
+    async def create_async_generator(cls, model, messages, stream, **kwargs):
+        cls.running += 1
+        cls.max_running = max(cls.running, cls.max_running)
+        try:
+            await asyncio.sleep(0.01)
+        finally:
+            cls.running -= 1
+        if messages[-1]["content"] == "fail":
+            raise RuntimeError("fail")
+        yield messages[-1]["content"]
+
+class OtherEchoProvider(EchoProvider):
+    running = 0
+    max_running = 0
+
+class FailingProvider(AsyncGeneratorProvider):
+    working = True
+    calls = 0
+
+    @classmethod
+    async def create_async_generator(cls, model, messages, stream, **kwargs):
+        cls.calls += 1
+        raise RuntimeError("unavailable")
+        yield
+
+def get_messages(content: str) -> list[dict]:
+    return [{"role": "user", "content": content}]
+
+class TestCreateMany(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        EchoProvider.max_running = OtherEchoProvider.max_running = 0
+        FailingProvider.calls = 0
+
+    async def test_results(self):
+        client = AsyncClient(provider=EchoProvider)
+        results = [result async for result in client.chat.completions.create_many(
+            [get_messages(str(index)) for index in range(20)], limiter=ProviderLimiter(3)
+        )]
+        self.assertEqual(list(range(20)), sorted(result.index for result in results))
+        for result in results:
+            self.assertIsNone(result.error)
+            self.assertEqual(str(result.index), result.response.choices[0].message.content)
+            self.assertEqual("EchoProvider", result.response.provider)
+        self.assertEqual(3, EchoProvider.max_running)
+
+    async def test_spread_over_providers(self):
+        client = AsyncClient()
+        provider = IterListProvider([EchoProvider, OtherEchoProvider])
+        results = [result async for result in client.chat.completions.create_many(
+            [get_messages(str(index)) for index in range(20)], provider=provider, limiter=ProviderLimiter(2)
+        )]
+        self.assertEqual(20, len([result for result in results if result.error is None]))
+        self.assertEqual({"EchoProvider", "OtherEchoProvider"}, {result.response.provider for result in results})
+        self.assertEqual(2, EchoProvider.max_running)
+        self.assertEqual(2, OtherEchoProvider.max_running)
+
+    async def test_retry(self):
+        client = AsyncClient()
+        provider = IterListProvider([FailingProvider, EchoProvider])
+        results = [result async for result in client.chat.completions.create_many(
+            [get_messages("hello"), get_messages("fail")], provider=provider
+        )]
+        results.sort(key=lambda result: result.index)
+        self.assertEqual("hello", results[0].response.choices[0].message.content)
+        self.assertEqual("EchoProvider", results[0].response.provider)
+        self.assertIsNone(results[1].response)
+        self.assertIn("fail", str(results[1].error))
+        self.assertGreaterEqual(FailingProvider.calls, 1)
+
+    async def test_lazy(self):
+        client = AsyncClient(provider=EchoProvider)
+        read = 0
+        def iter_requests():
+            nonlocal read
+            for index in range(10):
+                read += 1
+                yield {"messages": get_messages(str(index))}
+        results = client.chat.completions.create_many(iter_requests(), max_concurrency=2)
+        await results.__anext__()
+        self.assertLessEqual(read, 3)
+        await results.aclose()
+
+class TestSyncCreateMany(unittest.TestCase):
+
+    def test_create_many(self):
+        client = Client(provider=EchoProvider)
+        results = list(client.chat.completions.create_many([get_messages("a"), {"messages": get_messages("b")}]))
+        self.assertEqual(["a", "b"], sorted(result.response.choices[0].message.content for result in results))
+
+def write_requests(path: str, requests: list) -> None:
+    with open(path, "w") as file:
+        for request in requests:
+            file.write(request if isinstance(request, str) else json.dumps(request))
+            file.write("\n")
+
+def read_lines(path: str) -> list[dict]:
+    with open(path) as file:
+        return [json.loads(line) for line in file]
+
+class TestBatchManager(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        if not has_fastapi:
+            self.skipTest("api is not installed")
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.store = BatchStore(self.temp_dir.name)
+        self.manager = BatchManager(AsyncClient(), self.store, {"provider": EchoProvider})
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def create_batch(self, requests: list) -> dict:
+        file = self.store.create_file("input.jsonl", "batch")
+        write_requests(self.store.get_path(file["id"], "jsonl"), requests)
+        return self.store.create_batch(file["id"], "/v1/chat/completions")
+
+    async def test_run(self):
+        batch = self.create_batch([
+            {"custom_id": "1", "method": "POST", "url": "/v1/chat/completions", "body": {"messages": get_messages("one")}},
+            {"custom_id": "2", "body": {"messages": get_messages("fail")}},
+            "no json",
+            {"custom_id": "3", "body": {"model": "gpt-4o"}},
+        ])
+        await self.manager.run(batch["id"])
+        batch = self.store.get_batch(batch["id"])
+        self.assertEqual("completed", batch["status"])
+        self.assertEqual({"total": 4, "completed": 1, "failed": 3}, batch["request_counts"])
+        output = read_lines(self.store.get_path(batch["output_file_id"], "jsonl"))
+        self.assertEqual("1", output[0]["custom_id"])
+        self.assertEqual("one", output[0]["response"]["body"]["choices"][0]["message"]["content"])
+        errors = read_lines(self.store.get_path(batch["error_file_id"], "jsonl"))
+        self.assertEqual({None, "2", "3"}, {line["custom_id"] for line in errors})
+
+    async def test_resume(self):
+        batch = self.create_batch([
+            {"custom_id": str(index), "body": {"messages": get_messages(str(index))}} for index in range(3)
+        ])
+        batch["output_file_id"] = self.store.create_file("output.jsonl", "batch_output")["id"]
+        batch["error_file_id"] = self.store.create_file("error.jsonl", "batch_output")["id"]
+        batch["status"] = "in_progress"
+        self.store.save(batch)
+        write_requests(self.store.get_path(batch["output_file_id"], "jsonl"), [{"custom_id": "0"}])
+        await self.manager.resume()
+        await self.manager.tasks[batch["id"]]
+        output = read_lines(self.store.get_path(batch["output_file_id"], "jsonl"))
+        self.assertEqual(["0", "1", "2"], sorted(line["custom_id"] for line in output))
+        self.assertEqual(3, self.store.get_batch(batch["id"])["request_counts"]["completed"])
+
+    async def test_iter_results(self):
+        batch = self.create_batch([
+            {"custom_id": str(index), "body": {"messages": get_messages(str(index))}} for index in range(10)
+        ])
+        self.manager.max_concurrency = 1
+        self.manager.start(batch["id"])
+        async def read_results() -> list[str]:
+            lines = []
+            async for line in self.manager.iter_results(batch["id"]):
+                lines.append(line)
+                # Results are written while the reader is busy
+                await asyncio.sleep(0.02)
+            return lines
+        lines = await asyncio.wait_for(read_results(), 5)
+        self.assertEqual([str(index) for index in range(10)], sorted(json.loads(line)["custom_id"] for line in lines))
+
+    async def test_cancel(self):
+        batch = self.create_batch([
+            {"custom_id": str(index), "body": {"messages": get_messages(str(index))}} for index in range(100)
+        ])
+        self.manager.max_concurrency = 1
+        self.manager.start(batch["id"])
+        await asyncio.sleep(0.05)
+        await self.manager.cancel(batch["id"])
+        with self.assertRaises(asyncio.CancelledError):
+            await self.manager.tasks[batch["id"]]
+        batch = self.store.get_batch(batch["id"])
+        self.assertEqual("cancelled", batch["status"])
+        self.assertLess(batch["request_counts"]["completed"], 100)
+
+class TestBatchApi(unittest.TestCase):
+
+    def test_batch(self):
+        if not has_fastapi:
+            self.skipTest("api is not installed")
+        with tempfile.TemporaryDirectory() as temp_dir:
+            app = FastAPI()
+            api = Api(app)
+            api.batches.store = BatchStore(temp_dir)
+            api.batches.defaults = {"provider": EchoProvider}
+            api.register_routes()
+            lines = "\n".join(json.dumps({
+                "custom_id": str(index), "url": "/v1/chat/completions", "body": {"messages": get_messages(str(index))}
+            }) for index in range(5))
+            with TestClient(app) as client:
+                response = client.post("/v1/files", files={"file": ("input.jsonl", lines)}, data={"purpose": "batch"})
+                file = response.json()
+                self.assertEqual(len(lines), file["bytes"])
+                response = client.post("/v1/batches", json={"input_file_id": file["id"], "endpoint": "/v1/chat/completions"})
+                batch = response.json()
+                self.assertEqual("validating", batch["status"])
+                results = [json.loads(line) for line in client.get(f"/v1/batches/{batch['id']}/results").iter_lines() if line]
+                self.assertEqual([str(index) for index in range(5)], sorted(result["custom_id"] for result in results))
+                batch = client.get(f"/v1/batches/{batch['id']}").json()
+                self.assertEqual("completed", batch["status"])
+                self.assertEqual(5, batch["request_counts"]["completed"])
+                content = client.get(f"/v1/files/{batch['output_file_id']}/content").text
+                self.assertEqual(5, len(content.splitlines()))
+                self.assertEqual(batch["id"], client.get("/v1/batches").json()["data"][0]["id"])
+                self.assertEqual(404, client.get("/v1/batches/batch_unknown").status_code)
+                self.assertEqual(404, client.post("/v1/batches", json={"input_file_id": "file-../secret"}).status_code)
@@ -1,11 +1,13 @@
 from __future__ import annotations
 
+import asyncio
 import unittest
 
 from g4f.errors import ModelNotFoundError
 from g4f.client import Client, AsyncClient, ChatCompletion, ChatCompletionChunk, get_model_and_provider
 from g4f.Provider.Copilot import Copilot
 from g4f.models import gpt_4o
+from g4f.providers.retry_provider import IterListProvider
 from .mocks import AsyncGeneratorProviderMock, ModelProviderMock, YieldProviderMock
 
 DEFAULT_MESSAGES = [{'role': 'user', 'content': 'Hello'}]
@@ -29,10 +31,10 @@ class AsyncTestPassModel(unittest.IsolatedAsyncioTestCase):
         messages = [{'role': 'user', 'content': chunk} for chunk in ["How ", "are ", "you", "?"]]
         response = await client.chat.completions.create(messages, "Hello", max_tokens=1)
         self.assertIsInstance(response, ChatCompletion)
-        self.assertEqual("How ", response.choices[0].message.content)
+        self.assertEqual("How", response.choices[0].message.content)
         response = await client.chat.completions.create(messages, "Hello", max_tokens=2)
         self.assertIsInstance(response, ChatCompletion)
-        self.assertEqual("How are ", response.choices[0].message.content)
+        self.assertEqual("How are", response.choices[0].message.content)
 
     async def test_max_stream(self):
         client = AsyncClient(provider=YieldProviderMock)
@@ -49,9 +51,9 @@ class AsyncTestPassModel(unittest.IsolatedAsyncioTestCase):
         async for chunk in response:
             response_list.append(chunk)
         self.assertEqual(len(response_list), 3)
-        for chunk in response_list:
-            if chunk.choices[0].delta.content is not None:
-                self.assertEqual(chunk.choices[0].delta.content, "You ")
+        self.assertEqual(["You ", "You", None], [chunk.choices[0].delta.content for chunk in response_list])
+        self.assertEqual("length", response_list[-1].choices[0].finish_reason)
+        self.assertEqual(2, response_list[-1].usage["completion_tokens"])
 
     async def test_stop(self):
         client = AsyncClient(provider=YieldProviderMock)
@@ -60,6 +62,17 @@ class AsyncTestPassModel(unittest.IsolatedAsyncioTestCase):
         self.assertIsInstance(response, ChatCompletion)
         self.assertEqual("How are you?", response.choices[0].message.content)
 
+    async def test_concurrent_provider(self):
+        client = AsyncClient()
+        first = client.chat.completions.create(DEFAULT_MESSAGES, "", IterListProvider([AsyncGeneratorProviderMock], False), stream=True)
+        second = client.chat.completions.create(DEFAULT_MESSAGES, "", IterListProvider([YieldProviderMock], False), stream=True)
+        async def get_providers(response):
+            return {chunk.provider async for chunk in response}
+        self.assertEqual(
+            [{"AsyncGeneratorProviderMock"}, {"YieldProviderMock"}],
+            await asyncio.gather(get_providers(first), get_providers(second))
+        )
+
 class TestPassModel(unittest.TestCase):
 
     def test_response(self):
@@ -79,10 +92,10 @@ class TestPassModel(unittest.TestCase):
         messages = [{'role': 'user', 'content': chunk} for chunk in ["How ", "are ", "you", "?"]]
         response = client.chat.completions.create(messages, "Hello", max_tokens=1)
         self.assertIsInstance(response, ChatCompletion)
-        self.assertEqual("How ", response.choices[0].message.content)
+        self.assertEqual("How", response.choices[0].message.content)
         response = client.chat.completions.create(messages, "Hello", max_tokens=2)
         self.assertIsInstance(response, ChatCompletion)
-        self.assertEqual("How are ", response.choices[0].message.content)
+        self.assertEqual("How are", response.choices[0].message.content)
 
     def test_max_stream(self):
         client = Client(provider=YieldProviderMock)
@@ -96,9 +109,9 @@ class TestPassModel(unittest.TestCase):
         response = client.chat.completions.create(messages, "Hello", stream=True, max_tokens=2)
         response_list = list(response)
         self.assertEqual(len(response_list), 3)
-        for chunk in response_list:
-            if chunk.choices[0].delta.content is not None:
-                self.assertEqual(chunk.choices[0].delta.content, "You ")
+        self.assertEqual(["You ", "You", None], [chunk.choices[0].delta.content for chunk in response_list])
+        self.assertEqual("length", response_list[-1].choices[0].finish_reason)
+        self.assertEqual(2, response_list[-1].usage["completion_tokens"])
 
     def test_stop(self):
         client = Client(provider=YieldProviderMock)
@@ -107,6 +120,23 @@ class TestPassModel(unittest.TestCase):
         self.assertIsInstance(response, ChatCompletion)
         self.assertEqual("How are you?", response.choices[0].message.content)
 
+    def test_stop_across_chunks(self):
+        client = Client(provider=YieldProviderMock)
+        messages = [{'role': 'user', 'content': chunk} for chunk in ["How ", "are ", "y", "ou", "?"]]
+        response = client.chat.completions.create(messages, "Hello", stop=["you", "xyz"])
+        self.assertEqual("How are ", response.choices[0].message.content)
+        self.assertEqual("stop", response.choices[0].finish_reason)
+        response = client.chat.completions.create(messages, "Hello", stream=True, stop=["e y", "?"])
+        content = [chunk.choices[0].delta.content for chunk in response if chunk.choices[0].delta.content]
+        self.assertEqual(["How ", "ar"], content)
+
+    def test_stop_held_back_text(self):
+        client = Client(provider=YieldProviderMock)
+        messages = [{'role': 'user', 'content': chunk} for chunk in ["How ", "are ", "yo"]]
+        response = client.chat.completions.create(messages, "Hello", stream=True, stop=["you"])
+        content = [chunk.choices[0].delta.content for chunk in response if chunk.choices[0].delta.content]
+        self.assertEqual(["How ", "are ", "yo"], content)
+
     def test_model_not_found(self):
         def run_exception():
             client = Client()
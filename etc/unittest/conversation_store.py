@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import os
+import time
+import tempfile
+import unittest
+
+from g4f.providers.response import BaseConversation
+from g4f.providers.conversation_store import ConversationStore
+
+class Conversation(BaseConversation):
+    def __init__(self, conversation_id: str, data: str = "") -> None:
+        self.conversation_id = conversation_id
+        self.data = data
+
+class TestConversationStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.spill_file = os.path.join(self.tempdir.name, "conversations.sqlite")
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_get_set(self):
+        store = ConversationStore(spill_file=None)
+        conversation = Conversation("1")
+        store.set("Provider", "1", conversation)
+        self.assertIs(conversation, store.get("Provider", "1"))
+        self.assertIsNone(store.get("Other", "1"))
+        metrics = store.get_metrics()
+        self.assertEqual(1, metrics["hits"])
+        self.assertEqual(1, metrics["misses"])
+        self.assertEqual(0.5, metrics["hit_rate"])
+        self.assertGreater(metrics["bytes"], 0)
+
+    def test_lru_eviction(self):
+        store = ConversationStore(max_entries=2, spill_file=None)
+        store.set("Provider", "1", Conversation("1"))
+        store.set("Provider", "2", Conversation("2"))
+        store.get("Provider", "1")
+        store.set("Provider", "3", Conversation("3"))
+        self.assertIsNotNone(store.get("Provider", "1"))
+        self.assertIsNone(store.get("Provider", "2"))
+        self.assertEqual(1, store.get_metrics()["evicted"])
+
+    def test_memory_limit(self):
+        store = ConversationStore(max_bytes=3000, spill_file=None)
+        for conversation_id in range(5):
+            store.set("Provider", conversation_id, Conversation(conversation_id, "x" * 1000))
+        self.assertLessEqual(store.size, 3000)
+        self.assertIsNotNone(store.get("Provider", 4))
+        self.assertIsNone(store.get("Provider", 0))
+
+    def test_ttl(self):
+        store = ConversationStore(ttl=0.05, spill_file=None)
+        store.set("Provider", "1", Conversation("1"))
+        time.sleep(0.1)
+        self.assertIsNone(store.get("Provider", "1"))
+        self.assertEqual(1, store.get_metrics()["expired"])
+        self.assertEqual(0, store.size)
+
+    def test_spill_and_restore(self):
+        store = ConversationStore(max_entries=1, spill_file=self.spill_file)
+        store.set("Provider", "1", Conversation("1", "data"))
+        store.set("Provider", "2", Conversation("2"))
+        self.assertEqual(1, store.get_metrics()["spilled"])
+        conversation = store.get("Provider", "1")
+        self.assertIsInstance(conversation, Conversation)
+        self.assertEqual("data", conversation.data)
+        self.assertEqual(1, store.get_metrics()["restored"])
+        store.spill.close()
+        # Restored after a restart
+        store = ConversationStore(max_entries=1, spill_file=self.spill_file)
+        self.assertEqual("2", store.get("Provider", "2").conversation_id)
+        store.spill.close()
+
+    def test_delete(self):
+        store = ConversationStore(spill_file=None)
+        store.set("Provider", "1", Conversation("1"))
+        store.delete("Provider", "1")
+        self.assertIsNone(store.get("Provider", "1"))
+        self.assertEqual(0, store.size)
@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import sys
+import json
+import base64
+import asyncio
+import unittest
+from unittest.mock import patch
+
+from g4f.client import AsyncClient
+from g4f.errors import MissingAuthError, RateLimitError
+from g4f.providers.base_provider import AsyncGeneratorProvider
+from g4f.providers.credential_pool import CredentialPool, Credential, get_jwt_expires
+from g4f.Provider.openai.har_file import RequestConfig
+from g4f.Provider.needs_auth.OpenaiChat import load_accounts
+
+DEFAULT_MESSAGES = [{"role": "user", "content": "Hello"}]
+
+class AccountProvider(AsyncGeneratorProvider):
+    working = True
+    needs_auth = True
+    _token: str = None
+
+    @classmethod
+    async def create_async_generator(cls, model, messages, stream, **kwargs):
+        if cls.account is None and cls.credential_pool is not None:
+            async with cls.credential_pool.lease(cls) as provider:
+                async for chunk in provider.create_async_generator(model, messages, stream, **kwargs):
+                    yield chunk
+            return
+        await asyncio.sleep(0.01)
+        yield cls._token
+
+def get_credentials(*names: str, version: int = 1) -> list[Credential]:
+    return [Credential(name, {"_token": name}, version=version) for name in names]
+
+class TestCredentialPool(unittest.TestCase):
+
+    def test_least_loaded(self):
+        pool = CredentialPool("test", lambda: get_credentials("a", "b"))
+        pool.reload()
+        first = pool.acquire()
+        second = pool.acquire()
+        self.assertNotEqual(first.name, second.name)
+        pool.release(first)
+        self.assertEqual(first.name, pool.acquire().name)
+
+    def test_lru(self):
+        pool = CredentialPool("test", lambda: get_credentials("a", "b", "c"), selection="lru")
+        pool.reload()
+        names = []
+        for _ in range(6):
+            credential = pool.acquire()
+            pool.release(credential)
+            names.append(credential.name)
+        self.assertEqual(names[:3], names[3:])
+        self.assertEqual({"a", "b", "c"}, set(names[:3]))
+
+    def test_cooldown(self):
+        pool = CredentialPool("test", lambda: get_credentials("a", "b"), cooldown=60)
+        pool.reload()
+        with self.assertRaises(RateLimitError):
+            with pool.lease_sync(AccountProvider) as provider:
+                limited = provider.account
+                raise RateLimitError()
+        self.assertEqual(1, limited.rate_limits)
+        self.assertEqual(120, limited.cooldown)
+        for _ in range(3):
+            with pool.lease_sync(AccountProvider) as provider:
+                self.assertNotEqual(limited.name, provider.account.name)
+        with self.assertRaises(RateLimitError):
+            with pool.lease_sync(AccountProvider):
+                raise RateLimitError()
+        with self.assertRaises(RateLimitError):
+            pool.acquire()
+        self.assertEqual(0, sum(credential.active for credential in pool.credentials.values()))
+
+    def test_invalid(self):
+        pool = CredentialPool("test", lambda: get_credentials("a"))
+        pool.reload()
+        with self.assertRaises(MissingAuthError):
+            with pool.lease_sync(AccountProvider):
+                raise MissingAuthError()
+        with self.assertRaises(MissingAuthError):
+            pool.acquire()
+
+    def test_reload(self):
+        version = 1
+        pool = CredentialPool("test", lambda: get_credentials("a", "b", version=version), reload_interval=0)
+        pool.reload()
+        credential = pool.acquire()
+        pool.reload()
+        self.assertIs(credential, pool.credentials[credential.name])
+        version = 2
+        pool.reload()
+        self.assertIsNot(credential, pool.credentials[credential.name])
+        pool.load = lambda: get_credentials("a", version=version)
+        pool.reload()
+        self.assertEqual(["a"], list(pool.credentials))
+
+    def test_named(self):
+        pool = CredentialPool("test", lambda: get_credentials("a", "b"))
+        pool.reload()
+        for _ in range(3):
+            with pool.lease_sync(AccountProvider, "b") as provider:
+                self.assertEqual("b", provider._token)
+        with self.assertRaises(MissingAuthError):
+            pool.acquire("c")
+
+    def test_provider(self):
+        credential = get_credentials("a")[0]
+        provider = credential.get_provider(AccountProvider)
+        self.assertTrue(issubclass(provider, AccountProvider))
+        self.assertEqual(AccountProvider.__name__, provider.__name__)
+        self.assertIs(provider, credential.get_provider(AccountProvider))
+        self.assertIsNone(AccountProvider._token)
+        credential.update({"_token": "new"})
+        self.assertEqual("new", provider._token)
+
+    def test_jwt_expires(self):
+        payload = base64.urlsafe_b64encode(json.dumps({"exp": 1700000000}).encode()).decode().rstrip("=")
+        self.assertEqual(1700000000, get_jwt_expires(f"header.{payload}.signature"))
+        self.assertIsNone(get_jwt_expires("no token"))
+        self.assertIsNone(get_jwt_expires(None))
+
+    def test_openai_accounts(self):
+        def get_har_file(name: str, token: str = None) -> dict:
+            headers = [] if token is None else [{"name": "Authorization", "value": f"Bearer {token}"}]
+            entry = {"request": {"url": "https://chatgpt.com/", "headers": headers, "cookies": []}, "response": {"content": {"text": ""}}}
+            return {"path": name, "mtime": 0, "data": [entry]}
+        har_files = [get_har_file("a.har", "a"), get_har_file("empty.har")]
+        with patch.object(RequestConfig, "access_token", "shared"):
+            with patch.object(sys.modules[load_accounts.__module__], "get_har_files", return_value=har_files):
+                credentials = load_accounts()
+        self.assertEqual(["a.har"], [credential.name for credential in credentials])
+        self.assertEqual("a", credentials[0].attributes["_api_key"])
+
+class TestAsyncCredentialPool(unittest.IsolatedAsyncioTestCase):
+
+    def tearDown(self):
+        AccountProvider.credential_pool = None
+
+    async def test_rotation(self):
+        AccountProvider.credential_pool = CredentialPool("test", lambda: get_credentials("a", "b"))
+        AccountProvider.credential_pool.reload()
+        client = AsyncClient(provider=AccountProvider)
+        responses = await asyncio.gather(*[client.chat.completions.create(DEFAULT_MESSAGES, "") for _ in range(4)])
+        self.assertEqual(["a", "a", "b", "b"], sorted(response.choices[0].message.content for response in responses))
+        self.assertEqual("AccountProvider", responses[0].provider)
+        metrics = AccountProvider.credential_pool.get_metrics()
+        self.assertEqual({"a": 2, "b": 2}, {name: account["requests"] for name, account in metrics.items()})
+        self.assertEqual(0, metrics["a"]["active"])
+
+    async def test_close(self):
+        pool = AccountProvider.credential_pool = CredentialPool("test", lambda: get_credentials("a"))
+        pool.reload()
+        response = AccountProvider.create_async_generator("", DEFAULT_MESSAGES, True)
+        await response.__anext__()
+        await response.aclose()
+        self.assertEqual(0, pool.credentials["a"].active)
+
+    async def test_refresh(self):
+        refreshed = asyncio.Event()
+        async def refresh(credential: Credential):
+            await refreshed.wait()
+            return {"_token": f"{credential.name}-new"}, None
+        pool = CredentialPool("test", lambda: get_credentials("a", "b"), refresh)
+        pool.reload()
+        with self.assertRaises(MissingAuthError):
+            async with pool.lease(AccountProvider) as provider:
+                invalid = provider.account
+                raise MissingAuthError()
+        self.assertEqual(1, len(pool.refreshes))
+        # The request doesn't wait for the refresh, it uses the other account
+        async with pool.lease(AccountProvider) as provider:
+            self.assertNotEqual(invalid.name, provider.account.name)
+        refreshed.set()
+        await asyncio.gather(*pool.refreshes)
+        self.assertFalse(invalid.invalid)
+        self.assertEqual(f"{invalid.name}-new", invalid.get_provider(AccountProvider)._token)
+
+    async def test_refresh_failed(self):
+        async def refresh(credential: Credential):
+            raise MissingAuthError()
+        pool = CredentialPool("test", lambda: [Credential("a", {}, expires=0)], refresh, cooldown=60)
+        pool.reload()
+        pool.release(pool.acquire())
+        await asyncio.gather(*pool.refreshes)
+        credential = pool.credentials["a"]
+        self.assertTrue(credential.invalid)
+        self.assertFalse(credential.refreshing)
+        with self.assertRaises(RateLimitError):
+            pool.acquire()
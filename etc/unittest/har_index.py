@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import os
+import sys
+import json
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from g4f.har_index import HarIndex
+from g4f.cookies import read_cookie_files, CookiesConfig
+from g4f.Provider.needs_auth.MicrosoftDesigner import readHAR as read_designer_har
+
+def get_entry(url: str, host: str, cookies: dict, text: str = "") -> dict:
+    return {
+        "request": {
+            "url": url,
+            "headers": [{"name": "Host", "value": host}, {"name": "Authorization", "value": "Bearer key"}],
+            "cookies": [{"name": name, "value": value} for name, value in cookies.items()],
+        },
+        "response": {"content": {"text": text}},
+        "timings": {"wait": 1},
+    }
+
+class TestHarIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.dir = self.tempdir.name
+        self.cache_file = os.path.join(self.dir, "cache", "index.json")
+        self.index = HarIndex(self.cache_file, scan_interval=0)
+        # read_cookie_files uses the global index and cookies
+        self.cookies = CookiesConfig.cookies
+        CookiesConfig.cookies = {}
+        self.patch = patch("g4f.har_index.har_index", self.index)
+        self.patch.start()
+
+    def tearDown(self):
+        self.patch.stop()
+        CookiesConfig.cookies = self.cookies
+        self.tempdir.cleanup()
+
+    def write_har(self, name: str, *entries) -> str:
+        path = os.path.join(self.dir, name)
+        with open(path, "w") as file:
+            json.dump({"log": {"entries": list(entries)}}, file)
+        return path
+
+    def test_compact_entries(self):
+        text = "x" * 10000 + '"accessToken":"token"' + "x" * 10000
+        self.write_har("a.har", get_entry("https://chatgpt.com/", "chatgpt.com", {"a": "1"}, text))
+        entries = list(self.index.iter_har_entries(self.dir))
+        self.assertEqual(len(entries), 1)
+        self.assertEqual(entries[0]["response"]["content"]["text"], '"accessToken":"token"')
+        self.assertEqual(entries[0]["request"]["cookies"], [{"name": "a", "value": "1"}])
+        self.assertNotIn("timings", entries[0])
+
+    def test_reindex_changed_files(self):
+        first = self.write_har("a.har", get_entry("https://a.com/", "a.com", {"a": "1"}))
+        self.write_har("b.har", get_entry("https://b.com/", "b.com", {"b": "1"}))
+        self.index.scan(self.dir)
+        indexed = dict(self.index.files)
+        self.write_har("b.har", get_entry("https://b.com/", "b.com", {"b": "2"}), get_entry("https://b.com/", "b.com", {}))
+        os.remove(first)
+        files = self.index.get_har_files(self.dir)
+        self.assertEqual([os.path.basename(indexed["path"]) for indexed in files], ["b.har"])
+        self.assertEqual(len(files[0]["data"]), 2)
+        self.assertNotIn(first, self.index.files)
+        self.assertIsNot(indexed[files[0]["path"]], files[0])
+
+    def test_unchanged_files_not_parsed(self):
+        self.write_har("a.har", get_entry("https://a.com/", "a.com", {"a": "1"}))
+        first = self.index.get_har_files(self.dir)[0]
+        self.assertIs(self.index.get_har_files(self.dir)[0], first)
+
+    def test_persistence(self):
+        self.write_har("a.har", get_entry("https://a.com/", "a.com", {"a": "1"}))
+        with open(os.path.join(self.dir, "invalid.har"), "w") as file:
+            file.write("{")
+        self.index.scan(self.dir)
+        index = HarIndex(self.cache_file, scan_interval=0)
+        index.load()
+        self.assertEqual(set(index.files), set(self.index.files))
+        self.assertEqual(len(index.get_har_files(self.dir)), 1)
+
+    @unittest.skipIf(os.name == "nt", "No file modes on Windows")
+    def test_private_cache_file(self):
+        self.write_har("a.har", get_entry("https://a.com/", "a.com", {"a": "1"}))
+        self.index.scan(self.dir)
+        self.assertEqual(os.stat(self.cache_file).st_mode & 0o777, 0o600)
+
+    def test_read_cookie_files(self):
+        self.write_har("a.har", get_entry("https://chatgpt.com/", "chatgpt.com", {"a": "1"}))
+        with open(os.path.join(self.dir, "cookies.json"), "w") as file:
+            json.dump([{"domain": ".google.com", "name": "b", "value": "2"}], file)
+        read_cookie_files(self.dir)
+        self.assertEqual(CookiesConfig.cookies["chatgpt.com"], {"a": "1"})
+        self.assertEqual(CookiesConfig.cookies[".google.com"], {"b": "2"})
+        self.assertTrue(os.path.isfile(self.cache_file))
+
+    def test_designer_har(self):
+        entry = get_entry("https://designerapp.officeapps.live.com/", "designerapp.officeapps.live.com", {})
+        har_files = [{"path": "a.har", "data": [entry]}]
+        with patch.object(sys.modules[read_designer_har.__module__], "get_har_files", return_value=har_files):
+            api_key, _ = read_designer_har("https://designerapp.officeapps.live.com")
+        self.assertEqual("key", api_key)
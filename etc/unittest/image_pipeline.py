@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import os
+import base64
+import asyncio
+import hashlib
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from aiohttp import web
+
+from g4f.image import has_requirements
+from g4f.image_store import ImageStore
+from g4f.image_pipeline import ImagePipeline, UrlCache, read_image_base64, resize_image_file
+from g4f import image as image_module
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 100
+GIF = b"GIF89a" + b"\x01" * 100
+
+class TestImagePipeline(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.store = ImageStore(os.path.join(self.temp_dir.name, "images"))
+        self.cache_file = os.path.join(self.temp_dir.name, "image_urls.json")
+        self.pipeline = ImagePipeline(host_limit=2, processes=0, cache_file=self.cache_file, store=self.store)
+        self.requests = 0
+        self.running = 0
+        self.max_running = 0
+
+        async def handler(request: web.Request):
+            self.requests += 1
+            self.running += 1
+            self.max_running = max(self.running, self.max_running)
+            try:
+                await asyncio.sleep(0.05)
+                response = web.StreamResponse()
+                await response.prepare(request)
+                # The format is sniffed from the first bytes only
+                body = GIF if request.match_info["name"] == "gif" else PNG
+                for index in range(0, len(body), 5):
+                    await response.write(body[index:index + 5])
+                await response.write_eof()
+                return response
+            finally:
+                self.running -= 1
+
+        app = web.Application()
+        app.router.add_get("/{name}", handler)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        self.base_url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+
+    async def asyncTearDown(self):
+        await self.runner.cleanup()
+        self.store.close()
+        self.temp_dir.cleanup()
+
+    def count_images(self) -> int:
+        return self.store.get_metrics()["images"]
+
+    async def test_download(self):
+        images = await self.pipeline.copy_images([f"{self.base_url}/png", f"{self.base_url}/gif"])
+        self.assertEqual([
+            f"/images/{hashlib.sha256(PNG).hexdigest()}.png",
+            f"/images/{hashlib.sha256(GIF).hexdigest()}.gif",
+        ], images)
+        self.assertEqual(GIF, base64.b64decode(await read_image_base64(images[1], self.store)))
+
+    async def test_dedupe_by_content(self):
+        images = await self.pipeline.copy_images([f"{self.base_url}/a", f"{self.base_url}/b"])
+        self.assertEqual(images[0], images[1])
+        self.assertEqual(2, self.requests)
+        self.assertEqual(1, self.count_images())
+
+    async def test_url_cache(self):
+        url = f"{self.base_url}/png"
+        # Concurrent copies wait for the same download
+        images = await self.pipeline.copy_images([url, url, url])
+        self.assertEqual(1, self.requests)
+        self.assertEqual(1, len(set(images)))
+        # A new pipeline reads the urls from the cache file
+        pipeline = ImagePipeline(processes=0, cache_file=self.cache_file, store=self.store)
+        self.assertEqual(images[:1], await pipeline.copy_images([url]))
+        self.assertEqual(1, self.requests)
+        # The url is fetched again if its file is gone
+        os.remove(self.store.get_path(os.path.basename(images[0])))
+        self.assertEqual(images[:1], await pipeline.copy_images([url]))
+        self.assertEqual(2, self.requests)
+
+    async def test_host_limit(self):
+        await self.pipeline.copy_images([f"{self.base_url}/{index}" for index in range(6)])
+        self.assertEqual(6, self.requests)
+        self.assertEqual(2, self.max_running)
+
+    async def test_failed_download(self):
+        url = "http://127.0.0.1:1/png"
+        self.assertEqual([url], await self.pipeline.copy_images([url]))
+        self.assertEqual(0, self.count_images())
+
+    async def test_data_uri(self):
+        data_uri = f"data:image/png;base64,{base64.b64encode(PNG).decode()}"
+        images = await self.pipeline.copy_images([data_uri, data_uri])
+        self.assertEqual([f"/images/{hashlib.sha256(PNG).hexdigest()}.png"] * 2, images)
+        self.assertEqual(1, self.count_images())
+
+    async def test_resize(self):
+        if not has_requirements:
+            self.skipTest("pillow is not installed")
+        from PIL.Image import new as new_image
+        from io import BytesIO
+        buffer = BytesIO()
+        new_image("RGB", (200, 100)).save(buffer, format="PNG")
+        data_uri = f"data:image/png;base64,{base64.b64encode(buffer.getvalue()).decode()}"
+        images = await self.pipeline.copy_images([data_uri], max_size=(50, 50))
+        self.assertTrue(images[0].endswith("_50x50.png"))
+        self.assertEqual(2, self.count_images())
+
+class ImageMock:
+    format = "PNG"
+
+    def save(self, path, format):
+        with open(path, "wb") as file:
+            file.write(PNG)
+
+class TestResizeImageFile(unittest.TestCase):
+
+    def test_close_file(self):
+        files = []
+        def to_image(file):
+            files.append(file)
+            return ImageMock()
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "image.png")
+            with open(path, "wb") as file:
+                file.write(PNG)
+            with patch.object(image_module, "to_image", to_image), patch.object(image_module, "process_image", lambda image, *size: image):
+                target = resize_image_file(path, (50, 50))
+            self.assertEqual(os.path.join(temp_dir, "image_50x50.png"), target)
+            self.assertTrue(os.path.exists(target))
+            self.assertTrue(files[0].closed)
+
+class TestUrlCache(unittest.TestCase):
+
+    def test_max_urls(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cache = UrlCache(os.path.join(temp_dir, "urls.json"), max_urls=2)
+            for index in range(3):
+                cache.set(str(index), f"{index}.png")
+            cache.save()
+            self.assertEqual(["1", "2"], list(UrlCache(cache.cache_file).load()))
@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import os
+import time
+import tempfile
+import unittest
+
+import g4f.image
+from g4f.image_store import ImageStore, image_store, parse_range
+try:
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from g4f.api import Api
+    has_fastapi = True
+except ImportError:
+    has_fastapi = False
+try:
+    from flask import Flask
+    from g4f.gui.server.api import Api as GuiApi
+    has_flask = True
+except ImportError:
+    has_flask = False
+
+PNG = b"\x89PNG\r\n\x1a\n" + bytes(range(100))
+
+class TestImageStore(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.store = ImageStore(self.temp_dir.name, max_bytes=1000, max_age=0)
+
+    def tearDown(self):
+        self.store.close()
+        self.temp_dir.cleanup()
+
+    def test_add(self):
+        name = self.store.add_bytes(PNG, "png")
+        self.assertEqual(name, self.store.add_bytes(PNG, "png"))
+        entry = self.store.get(name)
+        self.assertEqual(os.path.join(self.temp_dir.name, name[:2], name), entry.path)
+        self.assertEqual("image/png", entry.mime_type)
+        self.assertEqual(len(PNG), entry.size)
+        self.assertEqual(f'"{name[:-4]}"', entry.etag)
+        self.assertEqual(len(PNG), self.store.get_metrics()["bytes"])
+        self.assertIsNone(self.store.get("unknown.png"))
+        self.assertIsNone(self.store.get("index.db"))
+
+    def test_evict_least_recently_used(self):
+        names = [self.store.add_bytes(PNG + bytes([index]) * 200, "png") for index in range(4)]
+        self.assertEqual(3, self.store.get_metrics()["images"])
+        self.assertIsNone(self.store.get(names[0]))
+        self.assertFalse(os.path.exists(self.store.get_path(names[0])))
+        # An access moves an image to the end of the eviction order
+        self.store.connection.execute("UPDATE images SET last_access = last_access - 100")
+        self.store.get(names[1])
+        self.store.add_bytes(PNG + b"\xff" * 200, "png")
+        self.assertIsNotNone(self.store.get(names[1]))
+        self.assertIsNone(self.store.get(names[2]))
+        self.assertEqual(2, self.store.get_metrics()["evicted"])
+
+    def test_keep_added(self):
+        # An image larger than the store is kept until the next one is added
+        name = self.store.add_bytes(PNG * 20, "png")
+        self.assertIsNotNone(self.store.get(name))
+        self.store.add_bytes(PNG, "png")
+        self.assertIsNone(self.store.get(name))
+
+    def test_evict_expired(self):
+        self.store.max_age = 60
+        name = self.store.add_bytes(PNG, "png")
+        self.store.connection.execute("UPDATE images SET last_access = ?", (time.time() - 120,))
+        self.store.evict()
+        self.assertIsNone(self.store.get(name))
+        self.assertEqual(0, self.store.get_metrics()["bytes"])
+
+    def test_scan(self):
+        legacy = "1700000000_0b9fd3c2-8f6b-4bd7-9d39-6b4ee0ad9c7b.png"
+        with open(os.path.join(self.temp_dir.name, legacy), "wb") as file:
+            file.write(PNG)
+        name = self.store.add_bytes(PNG + b"1", "png")
+        self.store.close()
+        os.remove(os.path.join(self.temp_dir.name, "index.db"))
+        self.assertEqual(os.path.join(self.temp_dir.name, legacy), self.store.get(legacy).path)
+        self.assertIsNotNone(self.store.get(name))
+        self.assertEqual(2 * len(PNG) + 1, self.store.get_metrics()["bytes"])
+
+    def test_parse_range(self):
+        self.assertEqual((0, 9), parse_range("bytes=0-9", 100))
+        self.assertEqual((90, 99), parse_range("bytes=90-", 100))
+        self.assertEqual((90, 99), parse_range("bytes=-10", 100))
+        self.assertEqual((50, 99), parse_range("bytes=50-200", 100))
+        self.assertIsNone(parse_range("bytes=0-1,5-6", 100))
+        with self.assertRaises(ValueError):
+            parse_range("bytes=100-", 100)
+
+class TestServeImages(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.images_dir = g4f.image.images_dir
+        g4f.image.images_dir = self.temp_dir.name
+        self.name = image_store.add_bytes(PNG, "png")
+
+    def tearDown(self):
+        image_store.close()
+        g4f.image.images_dir = self.images_dir
+        self.temp_dir.cleanup()
+
+    def test_api(self):
+        if not has_fastapi:
+            self.skipTest("api is not installed")
+        app = FastAPI()
+        Api(app).register_routes()
+        client = TestClient(app)
+        response = client.get(f"/images/{self.name}")
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(PNG, response.content)
+        self.assertEqual("image/png", response.headers["content-type"])
+        etag = response.headers["etag"]
+        self.assertEqual(304, client.get(f"/images/{self.name}", headers={"If-None-Match": etag}).status_code)
+        response = client.get(f"/images/{self.name}", headers={"Range": "bytes=8-11"})
+        self.assertEqual(206, response.status_code)
+        self.assertEqual(PNG[8:12], response.content)
+        self.assertEqual(f"bytes 8-11/{len(PNG)}", response.headers["content-range"])
+        self.assertEqual(416, client.get(f"/images/{self.name}", headers={"Range": "bytes=1000-"}).status_code)
+        self.assertEqual(404, client.get("/images/missing.png").status_code)
+
+    def test_gui(self):
+        if not has_flask:
+            self.skipTest("gui is not installed")
+        app = Flask(__name__)
+        with app.test_request_context(headers={"Range": "bytes=0-7"}):
+            response = GuiApi().serve_images(self.name)
+            response.direct_passthrough = False
+            self.assertEqual(206, response.status_code)
+            self.assertEqual(PNG[:8], response.get_data())
+            self.assertEqual(f'"{self.name[:-4]}"', response.headers["ETag"])
+            response.close()
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import asyncio
+import unittest
+
+from g4f.errors import RateLimitError
+from g4f.providers.job_poller import JobPoller
+
+class Job:
+    """A job that is done after ``polls`` status checks."""
+
+    def __init__(self, polls: int, result="done", error: Exception = None) -> None:
+        self.polls = polls
+        self.result = result
+        self.error = error
+        self.checked = 0
+
+    async def check(self):
+        self.checked += 1
+        await asyncio.sleep(0)
+        if self.error is not None and self.checked == 1:
+            raise self.error
+        return self.result if self.checked >= self.polls else None
+
+class TestJobPoller(unittest.IsolatedAsyncioTestCase):
+
+    async def test_result(self):
+        poller = JobPoller(jitter=0)
+        job = Job(3)
+        self.assertEqual("done", await poller.wait("upstream", job.check, delay=0.01, max_delay=0.02))
+        self.assertEqual(3, job.checked)
+        metrics = poller.get_metrics()["upstream"]
+        self.assertEqual(1, metrics["completed"])
+        self.assertEqual(3, metrics["polls"])
+        self.assertEqual(0, metrics["queued"])
+        self.assertGreater(metrics["latency_avg"], 0.02)
+
+    async def test_many_jobs(self):
+        poller = JobPoller(max_concurrent=2)
+        running = 0
+        max_running = 0
+
+        def create_check(index: int):
+            checked = 0
+            async def check():
+                nonlocal running, max_running, checked
+                running += 1
+                max_running = max(running, max_running)
+                await asyncio.sleep(0.01)
+                running -= 1
+                checked += 1
+                return index if checked >= 2 else None
+            return check
+
+        results = await asyncio.gather(*[
+            poller.wait("upstream", create_check(index), delay=0.01) for index in range(10)
+        ])
+        self.assertEqual(list(range(10)), results)
+        self.assertEqual(2, max_running)
+        self.assertEqual(20, poller.get_metrics()["upstream"]["polls"])
+
+    async def test_backoff(self):
+        poller = JobPoller(jitter=0)
+        job = Job(4)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await poller.wait("upstream", job.check, delay=0.02, max_delay=0.04, backoff=2)
+        # 0.02 + 0.04 + 0.04 + 0.04, the delay stops at max_delay
+        self.assertGreaterEqual(loop.time() - start, 0.14)
+        self.assertLess(loop.time() - start, 0.3)
+
+    async def test_error(self):
+        poller = JobPoller()
+        with self.assertRaises(ValueError):
+            await poller.wait("upstream", Job(2, error=ValueError()).check, delay=0.01)
+        self.assertEqual(1, poller.get_metrics()["upstream"]["failed"])
+
+    async def test_rate_limit(self):
+        poller = JobPoller(jitter=0)
+        job = Job(2, error=RateLimitError())
+        self.assertEqual("done", await poller.wait("upstream", job.check, delay=0.01))
+        self.assertEqual(2, job.checked)
+        # The slowdown is reduced again by the successful check
+        self.assertEqual(1, poller.get_metrics()["upstream"]["slowdown"])
+
+    async def test_timeout(self):
+        poller = JobPoller()
+        with self.assertRaises(TimeoutError):
+            await poller.wait("upstream", Job(100).check, timeout=0.05, delay=0.01)
+        self.assertEqual(1, poller.get_metrics()["upstream"]["timeouts"])
+
+    async def test_cancel(self):
+        poller = JobPoller()
+        job = Job(100)
+        task = asyncio.create_task(poller.wait("upstream", job.check, delay=0.01, max_delay=0.01))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+        checked = job.checked
+        await asyncio.sleep(0.05)
+        # The job is not checked after the request is gone
+        self.assertLessEqual(job.checked, checked + 1)
+        self.assertEqual(0, poller.get_metrics()["upstream"]["queued"])
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import time
+import threading
+import unittest
+
+from g4f.locals.cache import ModelCache
+
+class ModelMock:
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.closed = False
+
+    def close(self) -> None:
+        self.closed = True
+
+class TestModelCache(unittest.TestCase):
+
+    def test_reuse(self):
+        cache = ModelCache(max_ram=16)
+        loads = []
+        def load():
+            loads.append(1)
+            return ModelMock("a")
+        with cache.lease("a", 8, load) as first:
+            pass
+        with cache.lease("a", 8, load) as second:
+            pass
+        self.assertIs(first, second)
+        self.assertEqual(len(loads), 1)
+
+    def test_evict_least_recently_used(self):
+        cache = ModelCache(max_ram=16)
+        with cache.lease("a", 8, lambda: ModelMock("a")) as a:
+            pass
+        with cache.lease("b", 8, lambda: ModelMock("b")) as b:
+            pass
+        with cache.lease("a", 8, lambda: ModelMock("a")):
+            pass
+        with cache.lease("c", 8, lambda: ModelMock("c")):
+            pass
+        self.assertTrue(b.closed)
+        self.assertFalse(a.closed)
+        self.assertEqual(list(cache.entries), ["a", "c"])
+        self.assertEqual(cache.used_ram, 16)
+
+    def test_oversized_model(self):
+        cache = ModelCache(max_ram=4)
+        with cache.lease("a", 8, lambda: ModelMock("a")) as model:
+            self.assertEqual(model.name, "a")
+
+    def test_worker_pool(self):
+        cache = ModelCache(max_ram=16, workers=2)
+        active = []
+        max_active = 0
+        lock = threading.Lock()
+        def run():
+            nonlocal max_active
+            with cache.lease("a", 4, lambda: ModelMock("a")) as model:
+                with lock:
+                    active.append(model)
+                    max_active = max(max_active, len(active))
+                time.sleep(0.05)
+                with lock:
+                    active.remove(model)
+        threads = [threading.Thread(target=run) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(max_active, 2)
+        self.assertEqual(len(cache.entries["a"].idle), 2)
+
+    def test_failed_load(self):
+        cache = ModelCache(max_ram=16)
+        def load():
+            raise RuntimeError()
+        with self.assertRaises(RuntimeError):
+            with cache.lease("a", 8, load):
+                pass
+        self.assertEqual(cache.used_ram, 0)
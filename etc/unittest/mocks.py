@@ -1,3 +1,5 @@
+import asyncio
+
 from g4f.providers.base_provider import AbstractProvider, AsyncProvider, AsyncGeneratorProvider
 from g4f.image import ImageResponse
 from g4f.errors import MissingAuthError
@@ -88,4 +90,13 @@ class YieldNoneProviderMock(AsyncGeneratorProvider):
     async def create_async_generator(
         model, messages, stream, **kwargs
     ):
-        yield None
\ No newline at end of file
+        yield None
+class SlowYieldProviderMock(AsyncGeneratorProvider):
+    working = True
+
+    @classmethod
+    async def create_async_generator(
+        cls, model, messages, stream, **kwargs
+    ):
+        await asyncio.sleep(0.2)
+        yield cls.__name__
@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import os
+import asyncio
+import tempfile
+import unittest
+
+from g4f.providers.base_provider import AsyncGeneratorProvider, ProviderModelMixin
+from g4f.providers.model_registry import ModelRegistry
+
+class DiscoveryProviderMock(AsyncGeneratorProvider, ProviderModelMixin):
+    working = True
+    default_model = "default"
+    calls = 0
+
+    @classmethod
+    async def fetch_models(cls, **kwargs) -> list[str]:
+        cls.calls += 1
+        await asyncio.sleep(0.05)
+        return ["default", f"model-{cls.calls}"]
+
+    @classmethod
+    async def create_async_generator(cls, model, messages, **kwargs):
+        yield model
+
+class TestModelRegistry(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.cache_file = os.path.join(self.tempdir.name, "models.json")
+        self.registry = ModelRegistry(ttl=60, cache_file=self.cache_file)
+        DiscoveryProviderMock.calls = 0
+        DiscoveryProviderMock.models = []
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    async def test_single_flight(self):
+        results = await asyncio.gather(*[self.registry.get_models(DiscoveryProviderMock) for _ in range(5)])
+        self.assertEqual(DiscoveryProviderMock.calls, 1)
+        self.assertEqual(results, [["default", "model-1"]] * 5)
+        self.assertEqual(DiscoveryProviderMock.models, ["default", "model-1"])
+
+    async def test_nowait(self):
+        self.assertEqual(self.registry.get_models_nowait(DiscoveryProviderMock), [])
+        await asyncio.wrap_future(self.registry.refresh(DiscoveryProviderMock))
+        self.assertEqual(self.registry.get_models_nowait(DiscoveryProviderMock), ["default", "model-1"])
+        self.assertEqual(DiscoveryProviderMock.calls, 1)
+
+    async def test_refresh_expired(self):
+        await self.registry.get_models(DiscoveryProviderMock)
+        self.registry.ttl = 0
+        await asyncio.sleep(0.01)
+        # Expired entries are returned while the refresh runs
+        self.assertEqual(await self.registry.get_models(DiscoveryProviderMock), ["default", "model-1"])
+        await asyncio.sleep(0.1)
+        self.assertEqual(DiscoveryProviderMock.calls, 2)
+        self.assertEqual(DiscoveryProviderMock.models, ["default", "model-2"])
+
+    async def test_persistence(self):
+        await self.registry.get_models(DiscoveryProviderMock)
+        registry = ModelRegistry(ttl=60, cache_file=self.cache_file)
+        self.assertEqual(registry.get_models_nowait(DiscoveryProviderMock), ["default", "model-1"])
+        self.assertEqual(DiscoveryProviderMock.calls, 1)
+
+    async def test_arguments_not_persisted(self):
+        await self.registry.get_models(DiscoveryProviderMock, api_key="secret")
+        self.assertEqual(DiscoveryProviderMock.models, [])
+        self.assertFalse(os.path.exists(self.cache_file))
@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import json
+import base64
+import hashlib
+import unittest
+
+from g4f.Provider.openai.new import get_config, generate_answer, generate_answer_async
+from g4f.Provider.openai.proofofwork import generate_proof_token, generate_proof_token_async
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36"
+
+class TestProofOfWork(unittest.IsolatedAsyncioTestCase):
+
+    def test_generate_answer(self):
+        config = get_config(USER_AGENT)
+        answer, solved = generate_answer("0.42", "0fffff", config)
+        self.assertTrue(solved)
+        data = json.loads(base64.b64decode(answer))
+        self.assertEqual(data[:3], config[:3])
+        self.assertEqual(data[4:9], config[4:9])
+        self.assertEqual(data[9], data[3] >> 1)
+        hash_value = hashlib.sha3_512(("0.42" + answer).encode()).digest()
+        self.assertLessEqual(hash_value[:6], bytes.fromhex("0fffff"))
+
+    def test_generate_proof_token(self):
+        token = generate_proof_token(True, "0.42", "0fff", USER_AGENT)
+        self.assertTrue(token.startswith("gAAAAAB"))
+        answer = token[7:]
+        self.assertEqual(json.loads(base64.b64decode(answer))[4], USER_AGENT)
+        hash_value = hashlib.sha3_512(("0.42" + answer).encode()).hexdigest()
+        self.assertLessEqual(hash_value[:4], "0fff")
+
+    def test_not_required(self):
+        self.assertIsNone(generate_proof_token(False))
+
+    async def test_generate_answer_async(self):
+        config = get_config(USER_AGENT)
+        answer, solved = await generate_answer_async("0.42", "0fffff", config)
+        self.assertTrue(solved)
+        hash_value = hashlib.sha3_512(("0.42" + answer).encode()).digest()
+        self.assertLessEqual(hash_value[:6], bytes.fromhex("0fffff"))
+
+    async def test_generate_proof_token_async(self):
+        token = await generate_proof_token_async(True, "0.42", "0fff", USER_AGENT)
+        hash_value = hashlib.sha3_512(("0.42" + token[7:]).encode()).hexdigest()
+        self.assertLessEqual(hash_value[:4], "0fff")
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import sys
+import unittest
+import subprocess
+
+import g4f.Provider
+from g4f.Provider import ProviderUtils, __providers__, __map__
+from g4f.providers.registry import ProviderRegistry, ProviderList
+from g4f.providers.base_provider import AbstractProvider
+
+class ProviderMock(AbstractProvider):
+    working = True
+
+class TestProviderRegistry(unittest.TestCase):
+
+    def test_lazy(self):
+        registry = ProviderRegistry("g4f.Provider", {"Missing": ".does_not_exist"})
+        self.assertIn("Missing", registry)
+        self.assertEqual(["Missing"], list(registry))
+        self.assertFalse(registry.is_loaded("Missing"))
+        self.assertRaises(ModuleNotFoundError, lambda: registry["Missing"])
+        self.assertRaises(KeyError, lambda: registry["Unknown"])
+
+    def test_setitem(self):
+        registry = ProviderRegistry("g4f.Provider", {"Pi": ".Pi"})
+        registry["ProviderMock"] = ProviderMock
+        self.assertEqual(["Pi", "ProviderMock"], list(registry))
+        self.assertIs(ProviderMock, registry["ProviderMock"])
+        providers = ProviderList(registry)
+        self.assertIn(ProviderMock, providers)
+        self.assertIs(g4f.Provider.Pi, providers[0])
+        del registry["Pi"]
+        self.assertEqual([ProviderMock], list(providers))
+
+    def test_package(self):
+        self.assertIs(ProviderUtils.convert, __map__)
+        self.assertEqual(g4f.Provider.__all__, [provider.__name__ for provider in __providers__])
+        self.assertIs(g4f.Provider.selenium.Phind, g4f.Provider.Phind)
+        self.assertIs(g4f.Provider.needs_auth.GigaChat, __map__["GigaChat"])
+        self.assertIn("OpenaiChat", dir(g4f.Provider))
+        with self.assertRaises(AttributeError):
+            g4f.Provider.Missing
+
+    def test_submodule(self):
+        from g4f.Provider.needs_auth.Reka import Reka
+        self.assertIs(Reka, g4f.Provider.needs_auth.Reka)
+        self.assertIs(Reka, g4f.Provider.Reka)
+
+    def test_import(self):
+        code = (
+            "import sys, g4f.Provider\n"
+            "print(any(name.startswith('g4f.Provider.deprecated.') for name in sys.modules))\n"
+            "g4f.Provider.AiService\n"
+            "print(any(name.startswith('g4f.Provider.deprecated.') for name in sys.modules))"
+        )
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+        self.assertEqual(["False", "True"], result.stdout.split())
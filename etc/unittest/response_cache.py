@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import os
+import asyncio
+import tempfile
+import threading
+import unittest
+
+from g4f.client import Client, AsyncClient
+from g4f.client.response_cache import ResponseCache, MemoryBackend, SQLiteBackend, CachedResponse
+from g4f.providers.base_provider import AsyncGeneratorProvider
+
+DEFAULT_MESSAGES = [{"role": "user", "content": "Hello world, how are you?"}]
+
+class CountingProvider(AsyncGeneratorProvider):
+    working = True
+    calls = 0
+
+    @classmethod
+    async def create_async_generator(cls, model, messages, stream, delay: float = 0, **kwargs):
+        cls.calls += 1
+        if delay:
+            await asyncio.sleep(delay)
+        for word in messages[-1]["content"].split(" "):
+            yield f"{word} "
+
+class TestResponseCache(unittest.TestCase):
+
+    def setUp(self):
+        CountingProvider.calls = 0
+
+    def test_hit(self):
+        client = Client(provider=CountingProvider, response_cache=ResponseCache())
+        response = client.chat.completions.create(DEFAULT_MESSAGES, "")
+        cached = client.chat.completions.create(DEFAULT_MESSAGES, "")
+        self.assertEqual(1, CountingProvider.calls)
+        self.assertEqual(response.choices[0].message.content, cached.choices[0].message.content)
+        self.assertEqual(response.usage, cached.usage)
+        self.assertNotEqual(response.id, cached.id)
+        self.assertEqual(1, client.response_cache.get_metrics()["hits"])
+
+    def test_stream_replay(self):
+        client = Client(provider=CountingProvider, response_cache=ResponseCache())
+        chunks = list(client.chat.completions.create(DEFAULT_MESSAGES, "", stream=True))
+        cached = list(client.chat.completions.create(DEFAULT_MESSAGES, "", stream=True))
+        self.assertEqual(1, CountingProvider.calls)
+        content = "".join(chunk.choices[0].delta.content or "" for chunk in chunks)
+        self.assertEqual(content, "".join(chunk.choices[0].delta.content or "" for chunk in cached))
+        # The cached text is sent in chunks, the last one has the finish reason and usage
+        self.assertGreater(len(cached), 2)
+        self.assertEqual("stop", cached[-1].choices[0].finish_reason)
+        self.assertEqual(chunks[-1].usage, cached[-1].usage)
+        # A stream fills the cache for a completion
+        response = client.chat.completions.create(DEFAULT_MESSAGES, "")
+        self.assertEqual(content, response.choices[0].message.content)
+        self.assertEqual(1, CountingProvider.calls)
+
+    def test_not_cached(self):
+        client = Client(provider=CountingProvider, response_cache=ResponseCache())
+        client.chat.completions.create(DEFAULT_MESSAGES, "", temperature=0.7)
+        client.chat.completions.create(DEFAULT_MESSAGES, "", temperature=0.7)
+        self.assertEqual(2, CountingProvider.calls)
+        # Other arguments are other keys
+        client.chat.completions.create(DEFAULT_MESSAGES, "", temperature=0)
+        client.chat.completions.create(DEFAULT_MESSAGES, "", max_tokens=3)
+        self.assertEqual(4, CountingProvider.calls)
+
+    def test_incomplete_stream(self):
+        client = Client(provider=CountingProvider, response_cache=ResponseCache())
+        for chunk in client.chat.completions.create(DEFAULT_MESSAGES, "", stream=True):
+            break
+        client.chat.completions.create(DEFAULT_MESSAGES, "")
+        self.assertEqual(2, CountingProvider.calls)
+
+    def test_key(self):
+        key = ResponseCache.get_key("model", DEFAULT_MESSAGES, stop=["a"])
+        self.assertEqual(key, ResponseCache.get_key("model", [dict(reversed(DEFAULT_MESSAGES[0].items()))], stop=["a"], proxy="proxy"))
+        self.assertNotEqual(key, ResponseCache.get_key("model", DEFAULT_MESSAGES, stop=["b"]))
+        self.assertIsNone(ResponseCache.get_key("model", DEFAULT_MESSAGES, unknown=object()))
+
+    def test_threads(self):
+        client = Client(provider=CountingProvider, response_cache=ResponseCache())
+        results = []
+        def create():
+            response = client.chat.completions.create(DEFAULT_MESSAGES, "", delay=0.1)
+            results.append(response.choices[0].message.content)
+        threads = [threading.Thread(target=create) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(1, CountingProvider.calls)
+        self.assertEqual(1, len(set(results)))
+        self.assertEqual(4, client.response_cache.get_metrics()["coalesced"])
+
+class TestAsyncResponseCache(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        CountingProvider.calls = 0
+
+    async def test_coalesce(self):
+        client = AsyncClient(provider=CountingProvider, response_cache=ResponseCache())
+        responses = await asyncio.gather(*[
+            client.chat.completions.create(DEFAULT_MESSAGES, "", delay=0.05) for _ in range(5)
+        ])
+        self.assertEqual(1, CountingProvider.calls)
+        self.assertEqual(1, len({response.choices[0].message.content for response in responses}))
+        chunks = [chunk async for chunk in client.chat.completions.create(DEFAULT_MESSAGES, "", stream=True, delay=0.05)]
+        self.assertEqual("stop", chunks[-1].choices[0].finish_reason)
+        self.assertEqual(1, CountingProvider.calls)
+
+    async def test_error(self):
+        class FailingProvider(AsyncGeneratorProvider):
+            working = True
+            @classmethod
+            async def create_async_generator(cls, model, messages, stream, **kwargs):
+                raise RuntimeError()
+                yield
+        client = AsyncClient(provider=FailingProvider, response_cache=ResponseCache())
+        with self.assertRaises(RuntimeError):
+            await client.chat.completions.create(DEFAULT_MESSAGES, "")
+        self.assertEqual({}, client.response_cache.flights)
+
+    async def test_sqlite(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            backend = SQLiteBackend(os.path.join(temp_dir, "responses.sqlite"))
+            threads = set()
+            get, set_response = backend.get, backend.set
+            def get_in_thread(key):
+                threads.add(threading.get_ident())
+                return get(key)
+            def set_in_thread(key, response):
+                threads.add(threading.get_ident())
+                set_response(key, response)
+            backend.get, backend.set = get_in_thread, set_in_thread
+            client = AsyncClient(provider=CountingProvider, response_cache=ResponseCache(backend))
+            responses = await asyncio.gather(*[
+                client.chat.completions.create(DEFAULT_MESSAGES, "", delay=0.05) for _ in range(3)
+            ])
+            await client.chat.completions.create(DEFAULT_MESSAGES, "", delay=0.05)
+            backend.close()
+        self.assertEqual(1, CountingProvider.calls)
+        self.assertEqual(1, len({response.choices[0].message.content for response in responses}))
+        self.assertTrue(threads)
+        self.assertNotIn(threading.get_ident(), threads)
+
+class TestBackends(unittest.TestCase):
+
+    def test_memory(self):
+        backend = MemoryBackend(max_entries=2, ttl=60)
+        for key in "abc":
+            backend.set(key, CachedResponse(key, "stop"))
+        self.assertIsNone(backend.get("a"))
+        self.assertEqual("c", backend.get("c").content)
+        backend.ttl = -1
+        self.assertIsNone(backend.get("c"))
+
+    def test_sqlite(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "responses.db")
+            backend = SQLiteBackend(path, max_entries=2, ttl=60)
+            for key in "abc":
+                backend.set(key, CachedResponse(key, "stop", {"total_tokens": 1}, "model", "Provider"))
+            self.assertEqual(2, len(backend))
+            self.assertIsNone(backend.get("a"))
+            backend.close()
+            response = SQLiteBackend(path).get("c")
+            self.assertEqual(("c", {"total_tokens": 1}, "Provider"), (response.content, response.usage, response.provider))
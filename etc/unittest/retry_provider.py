@@ -3,8 +3,9 @@ from __future__ import annotations
 import unittest
 
 from g4f.client import AsyncClient, ChatCompletion, ChatCompletionChunk
-from g4f.providers.retry_provider import IterListProvider
-from .mocks import YieldProviderMock, RaiseExceptionProviderMock, AsyncRaiseExceptionProviderMock, YieldNoneProviderMock
+from g4f.providers.retry_provider import IterListProvider, RaceProvider
+from g4f.providers.scoreboard import Scoreboard
+from .mocks import YieldProviderMock, RaiseExceptionProviderMock, AsyncRaiseExceptionProviderMock, YieldNoneProviderMock, SlowYieldProviderMock
 
 DEFAULT_MESSAGES = [{'role': 'user', 'content': 'Hello'}]
 
@@ -40,9 +41,7 @@ class TestIterListProvider(unittest.IsolatedAsyncioTestCase):
         async for chunk in response:
             response_list.append(chunk)
         self.assertEqual(len(response_list), 3)
-        for chunk in response_list:
-            if chunk.choices[0].delta.content is not None:
-                self.assertEqual(chunk.choices[0].delta.content, "You ")
+        self.assertEqual(["You ", "You", None], [chunk.choices[0].delta.content for chunk in response_list])
 
     async def test_skip_none(self):
         client = AsyncClient(provider=IterListProvider([YieldNoneProviderMock, YieldProviderMock], False))
@@ -57,4 +56,56 @@ class TestIterListProvider(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(len(response_list), 2)
         for chunk in response_list:
             if chunk.choices[0].delta.content is not None:
-                self.assertEqual(chunk.choices[0].delta.content, "Hello")
\ No newline at end of file
+                self.assertEqual(chunk.choices[0].delta.content, "Hello")
+
+class TestScoreboard(unittest.IsolatedAsyncioTestCase):
+
+    async def test_record_stats(self):
+        scoreboard = Scoreboard()
+        client = AsyncClient(provider=IterListProvider([RaiseExceptionProviderMock, YieldProviderMock], False, scoreboard))
+        await client.chat.completions.create(DEFAULT_MESSAGES, "")
+        stats = scoreboard.to_dict()
+        self.assertEqual(stats["RaiseExceptionProviderMock"][""]["errors"], {"RuntimeError": 1})
+        self.assertEqual(stats["YieldProviderMock"][""]["success_rate"], 1)
+
+    async def test_open_circuit(self):
+        scoreboard = Scoreboard()
+        provider = IterListProvider([RaiseExceptionProviderMock, YieldProviderMock], False, scoreboard)
+        client = AsyncClient(provider=provider)
+        for _ in range(3):
+            await client.chat.completions.create(DEFAULT_MESSAGES, "")
+        self.assertEqual(scoreboard.to_dict()["RaiseExceptionProviderMock"][""]["state"], "open")
+        self.assertEqual(provider.get_providers(False, []), [YieldProviderMock])
+
+    def test_sort_by_expected_latency(self):
+        scoreboard = Scoreboard()
+        scoreboard.add_success(YieldProviderMock, "", 2)
+        scoreboard.add_success(YieldNoneProviderMock, "", 1)
+        scoreboard.add_failure(RaiseExceptionProviderMock, "", RuntimeError())
+        self.assertEqual(
+            scoreboard.sort([RaiseExceptionProviderMock, YieldProviderMock, YieldNoneProviderMock], ""),
+            [YieldNoneProviderMock, YieldProviderMock, RaiseExceptionProviderMock]
+        )
+
+class TestRaceProvider(unittest.IsolatedAsyncioTestCase):
+
+    async def test_fastest_wins(self):
+        client = AsyncClient(provider=RaceProvider([SlowYieldProviderMock, YieldProviderMock], False, scoreboard=Scoreboard()))
+        response = await client.chat.completions.create(DEFAULT_MESSAGES, "")
+        self.assertEqual("Hello", response.choices[0].message.content)
+
+    async def test_skip_failed(self):
+        provider = RaceProvider([AsyncRaiseExceptionProviderMock, YieldNoneProviderMock, SlowYieldProviderMock], False, scoreboard=Scoreboard())
+        client = AsyncClient(provider=provider)
+        response = client.chat.completions.create(DEFAULT_MESSAGES, "", stream=True)
+        content = "".join([chunk.choices[0].delta.content async for chunk in response if chunk.choices[0].delta.content])
+        self.assertEqual("SlowYieldProviderMock", content)
+        self.assertEqual(provider.last_provider, SlowYieldProviderMock)
+
+    async def test_hedge_delay(self):
+        scoreboard = Scoreboard()
+        provider = RaceProvider([SlowYieldProviderMock, YieldProviderMock], False, hedge_delay=1, scoreboard=scoreboard)
+        client = AsyncClient(provider=provider)
+        response = await client.chat.completions.create(DEFAULT_MESSAGES, "")
+        self.assertEqual("SlowYieldProviderMock", response.choices[0].message.content)
+        self.assertNotIn("YieldProviderMock", scoreboard.to_dict())
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import asyncio
+import unittest
+
+from g4f.requests import has_curl_cffi
+from g4f.requests.session_pool import SessionPool
+
+try:
+    import aiohttp_socks
+    has_aiohttp_socks = True
+except ImportError:
+    has_aiohttp_socks = False
+
+class TestSessionPool(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.pool = SessionPool(max_per_host=2, idle_timeout=60)
+
+    async def asyncTearDown(self):
+        await self.pool.close()
+
+    async def test_reuse_session_per_host(self):
+        async with self.pool.session("https://example.com/a", headers={"x": "1"}) as first:
+            pass
+        async with self.pool.session("https://example.com/b", headers={"x": "2"}) as second:
+            pass
+        async with self.pool.session("https://example.org/", headers={"x": "1"}) as other:
+            pass
+        self.assertIs(first.session, second.session)
+        self.assertIsNot(first.session, other.session)
+        self.assertEqual(second.headers, {"x": "2"})
+
+    @unittest.skipIf(not has_curl_cffi and not has_aiohttp_socks, 'Install "curl_cffi" or "aiohttp_socks" package')
+    async def test_separate_impersonate_and_proxy(self):
+        async with self.pool.session("https://example.com", impersonate="chrome") as first:
+            pass
+        async with self.pool.session("https://example.com", proxy="http://127.0.0.1:8080") as second:
+            pass
+        self.assertIsNot(first.session, second.session)
+
+    async def test_limit_per_host(self):
+        active = 0
+        max_active = 0
+        async def lease():
+            nonlocal active, max_active
+            async with self.pool.session("https://example.com"):
+                active += 1
+                max_active = max(max_active, active)
+                await asyncio.sleep(0.01)
+                active -= 1
+        await asyncio.gather(*[lease() for _ in range(6)])
+        self.assertEqual(max_active, 2)
+
+    async def test_evict_idle(self):
+        self.pool.idle_timeout = 0
+        async with self.pool.session("https://example.com") as first:
+            # Sessions with a lease are never evicted
+            await self.pool.evict_idle()
+            self.assertEqual(len(self.pool.get_loop_pool().entries), 1)
+        await asyncio.sleep(0.01)
+        async with self.pool.session("https://example.com") as second:
+            pass
+        self.assertIsNot(first.session, second.session)
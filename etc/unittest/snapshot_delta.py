@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import unittest
+
+from g4f.client import Client, AsyncClient
+from g4f.providers.base_provider import AsyncGeneratorProvider
+from g4f.providers.helper import SnapshotDelta, get_common_prefix
+from g4f.providers.response import Rewrite
+
+DEFAULT_MESSAGES = [{"role": "user", "content": "Hello"}]
+
+class RewriteProviderMock(AsyncGeneratorProvider):
+    working = True
+
+    @classmethod
+    async def create_async_generator(cls, model, messages, stream, **kwargs):
+        yield "Hello wrld"
+        yield Rewrite(7, "orld")
+        yield "! STOP"
+
+class TestSnapshotDelta(unittest.TestCase):
+
+    def test_append(self):
+        deltas = SnapshotDelta()
+        self.assertEqual(["Hello", " world", "", "!"], [deltas.feed(snapshot) for snapshot in (
+            "Hello", "Hello world", "Hello world", "Hello world!"
+        )])
+        self.assertEqual(12, deltas.offset)
+
+    def test_rewrite(self):
+        deltas = SnapshotDelta()
+        deltas.feed("Hello wrld")
+        rewrite = deltas.feed("Hello world")
+        self.assertIsInstance(rewrite, Rewrite)
+        self.assertEqual((7, "orld"), (rewrite.offset, rewrite.text))
+        self.assertEqual("orld", str(rewrite))
+        self.assertEqual("!", deltas.feed("Hello world!"))
+
+    def test_shorter(self):
+        deltas = SnapshotDelta()
+        deltas.feed("Hello world")
+        rewrite = deltas.feed("Hello")
+        self.assertEqual((5, ""), (rewrite.offset, rewrite.text))
+        self.assertEqual(" you", deltas.feed("Hello you"))
+
+    def test_anchor(self):
+        # Only the end of the sent text is compared
+        deltas = SnapshotDelta(anchor=4)
+        deltas.feed("abcdefgh")
+        self.assertEqual("i", deltas.feed("Xbcdefghi"))
+        self.assertIsInstance(deltas.feed("Xbcdefgzij"), Rewrite)
+
+    def test_common_prefix(self):
+        self.assertEqual(0, get_common_prefix("", "abc"))
+        self.assertEqual(3, get_common_prefix("abc", "abcd"))
+        self.assertEqual(2, get_common_prefix("abx", "aby"))
+        self.assertEqual(0, get_common_prefix("x", "y"))
+
+class TestRewriteResponse(unittest.TestCase):
+
+    def test_content(self):
+        client = Client(provider=RewriteProviderMock)
+        response = client.chat.completions.create(DEFAULT_MESSAGES, "")
+        self.assertEqual("Hello world! STOP", response.choices[0].message.content)
+
+    def test_stream(self):
+        client = Client(provider=RewriteProviderMock)
+        chunks = [chunk.choices[0].delta.content for chunk in client.chat.completions.create(DEFAULT_MESSAGES, "", stream=True)]
+        self.assertEqual(["Hello wrld", "orld", "! STOP"], chunks[:-1])
+
+    def test_held_text(self):
+        # "wrld" could be the start of the stop word, it is held back when the rewrite comes
+        client = Client(provider=RewriteProviderMock)
+        response = client.chat.completions.create(DEFAULT_MESSAGES, "", stop=["wrld!", " STOP"])
+        self.assertEqual("Hello world!", response.choices[0].message.content)
+
+class TestAsyncRewriteResponse(unittest.IsolatedAsyncioTestCase):
+
+    async def test_content(self):
+        client = AsyncClient(provider=RewriteProviderMock)
+        response = await client.chat.completions.create(DEFAULT_MESSAGES, "", stop=["wrld!", " STOP"])
+        self.assertEqual("Hello world!", response.choices[0].message.content)
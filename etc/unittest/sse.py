@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import json
+import asyncio
+import unittest
+
+from g4f.client.stubs import ChatCompletionChunk
+from g4f.client.sse import ChunkEncoder, iter_sse
+from g4f.providers.response import BaseConversation
+
+try:
+    import pydantic
+    has_pydantic = True
+except ImportError:
+    has_pydantic = False
+
+def create_chunk(content, finish_reason=None, usage=None):
+    chunk = ChatCompletionChunk.model_construct(content, finish_reason, "id", 1, usage)
+    chunk.model = "model"
+    chunk.provider = "Provider"
+    return chunk
+
+async def iter_chunks(chunks, delay=0):
+    for chunk in chunks:
+        if delay:
+            await asyncio.sleep(delay)
+        yield chunk
+
+def get_content(events: str) -> str:
+    return "".join(
+        json.loads(event[6:])["choices"][0]["delta"]["content"] or ""
+        for event in events.split("\n\n") if event
+    )
+
+class TestChunkEncoder(unittest.TestCase):
+
+    def test_same_as_json(self):
+        encoder = ChunkEncoder(0)
+        for content in ["Hello", 'Quote " and \\ backslash', "Ünïcode 🌍\n", None]:
+            finish_reason, usage = ("stop", {"total_tokens": 1}) if content is None else (None, None)
+            chunk = create_chunk(content, finish_reason, usage)
+            data = {
+                "id": chunk.id, "object": chunk.object, "created": 1, "model": "model", "provider": "Provider",
+                "choices": [{"index": 0, "delta": {"role": "assistant", "content": content}, "finish_reason": finish_reason}],
+                "usage": usage,
+            }
+            expected = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+            self.assertEqual(f"data: {expected}\n\n", encoder.encode(chunk))
+
+    @unittest.skipIf(not has_pydantic, "pydantic is not installed")
+    def test_same_as_pydantic(self):
+        encoder = ChunkEncoder(0)
+        for content in ["Hello", 'Quote " and \\ backslash', "Ünïcode 🌍\n", None]:
+            chunk = create_chunk(content, *(("stop", {"total_tokens": 1}) if content is None else ()))
+            self.assertEqual(f"data: {chunk.json()}\n\n", encoder.encode(chunk))
+
+    def test_coalesce(self):
+        encoder = ChunkEncoder(60)
+        events = "".join(encoder.add(create_chunk(content)) for content in ["a", "b", "c"])
+        # The first delta is sent at once, the next ones wait for the interval
+        self.assertEqual(1, events.count("data: "))
+        events += encoder.add(create_chunk(None, "stop"))
+        self.assertEqual(3, events.count("data: "))
+        self.assertEqual("abc", get_content(events))
+        self.assertTrue(events.endswith('"finish_reason":"stop"}],"usage":null}\n\n'))
+
+    def test_max_buffer(self):
+        encoder = ChunkEncoder(60, max_buffer=4)
+        events = "".join(encoder.add(create_chunk(content)) for content in ["a", "bc", "de", "f"])
+        self.assertEqual(2, events.count("data: "))
+        self.assertEqual("abcde", get_content(events))
+
+class TestIterSse(unittest.IsolatedAsyncioTestCase):
+
+    async def test_passthrough(self):
+        conversation = BaseConversation()
+        chunks = [create_chunk("Hello"), conversation, create_chunk(None, "stop")]
+        for flush_interval in (0, 60):
+            response = [event async for event in iter_sse(iter_chunks(chunks), flush_interval)]
+            self.assertIn(conversation, response)
+            self.assertEqual("Hello", get_content("".join(event for event in response if isinstance(event, str))))
+
+    async def test_flush_on_interval(self):
+        chunks = [create_chunk(content) for content in "abc"]
+        response = iter_sse(iter_chunks(chunks, 0.05), 0.01)
+        # Every delta is flushed before the next one arrives
+        events = [event async for event in response]
+        self.assertEqual(["a", "b", "c"], [get_content(event) for event in events])
+
+    async def test_flush_on_error(self):
+        async def fail():
+            yield create_chunk("a")
+            yield create_chunk("b")
+            raise RuntimeError()
+        events = []
+        with self.assertRaises(RuntimeError):
+            async for event in iter_sse(fail(), 60):
+                events.append(event)
+        self.assertEqual("ab", get_content("".join(events)))
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import unittest
+
+from g4f.requests.sse import SSEParser, LineSplitter, iter_sse, iter_sse_json, iter_ndjson
+
+STREAM = (
+    b": comment\r\n"
+    b"data: {\"a\": 1}\r\n\r\n"
+    b"event: update\nid: 7\nretry: 100\ndata: first\ndata:second\n\n"
+    b"data: [DONE]\n\n"
+)
+
+def split(data: bytes, size: int) -> list[bytes]:
+    return [data[index:index + size] for index in range(0, len(data), size)]
+
+def parse(chunks: list[bytes]) -> list[tuple]:
+    parser = SSEParser()
+    events = [event for chunk in chunks for event in parser.feed(chunk)] + parser.flush()
+    return [(event.event, event.data, event.id, event.retry) for event in events]
+
+async def iter_bytes(chunks: list[bytes]):
+    for chunk in chunks:
+        yield chunk
+
+class TestSSEParser(unittest.TestCase):
+
+    def test_events(self):
+        self.assertEqual([
+            ("message", b"{\"a\": 1}", None, None),
+            ("update", b"first\nsecond", "7", 100),
+            ("message", b"[DONE]", "7", 100),
+        ], parse([STREAM]))
+
+    def test_chunks(self):
+        expected = parse([STREAM])
+        for size in range(1, len(STREAM)):
+            self.assertEqual(expected, parse(split(STREAM, size)), f"chunk size {size}")
+
+    def test_unclosed(self):
+        self.assertEqual([("message", b"end", None, None)], parse([b"data: end"]))
+        self.assertEqual([], parse([b"event: empty\n\n"]))
+
+    def test_lines(self):
+        lines = LineSplitter()
+        self.assertEqual([], lines.feed(b"a"))
+        self.assertEqual([], lines.feed(b"b\r"))
+        self.assertEqual([b"ab", b"c"], lines.feed(b"\nc\n"))
+        self.assertEqual([], lines.flush())
+        lines.feed(b"d")
+        self.assertEqual([b"d"], lines.flush())
+
+class TestAsyncSSE(unittest.IsolatedAsyncioTestCase):
+
+    async def test_iter_sse(self):
+        events = [event async for event in iter_sse(iter_bytes(split(STREAM, 5)))]
+        self.assertEqual(3, len(events))
+        self.assertEqual({"a": 1}, events[0].json())
+        self.assertEqual("first\nsecond", events[1].text)
+
+    async def test_iter_sse_json(self):
+        stream = b"data: {\"a\": 1}\n\ndata: [DONE]\n\ndata: {\"b\": 2}\n\n"
+        self.assertEqual([{"a": 1}], [data async for data in iter_sse_json(iter_bytes([stream]))])
+
+    async def test_iter_ndjson(self):
+        stream = split(b"{\"a\": 1}\n\n{\"b\": \"\xc3\xa4\"}\r\n{\"c\": 3}", 3)
+        self.assertEqual([{"a": 1}, {"b": "ä"}, {"c": 3}], [data async for data in iter_ndjson(iter_bytes(stream))])
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import time
+import asyncio
+import threading
+import unittest
+
+from g4f.providers.base_provider import AbstractProvider
+from g4f.providers.retry_provider import IterListProvider
+from g4f.providers.sync_pool import SyncProviderPool
+from g4f.providers.context import new_request_context, get_request_context
+from .mocks import ProviderMock
+
+DEFAULT_MESSAGES = [{'role': 'user', 'content': 'Hello'}]
+
+class BlockingProviderMock(AbstractProvider):
+    working = True
+    supports_stream = True
+    closed = threading.Event()
+
+    @classmethod
+    def create_completion(cls, model, messages, stream, **kwargs):
+        try:
+            for chunk in range(100):
+                time.sleep(0.01)
+                yield str(chunk)
+        finally:
+            cls.closed.set()
+
+class ContextProviderMock(AbstractProvider):
+    working = True
+
+    @classmethod
+    def create_completion(cls, model, messages, stream, **kwargs):
+        yield get_request_context().model
+
+class TestSyncProviderPool(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.pool = SyncProviderPool(workers=2, queue_size=2)
+        BlockingProviderMock.closed.clear()
+
+    def tearDown(self):
+        self.pool.shutdown()
+
+    async def test_iter(self):
+        response = [chunk async for chunk in self.pool.iter(ProviderMock, ProviderMock.create_completion, "", DEFAULT_MESSAGES, True)]
+        self.assertEqual(["Mock"], response)
+        # The worker thread reports its end after the last chunk
+        await asyncio.sleep(0.1)
+        self.assertEqual({"workers": 2, "active": 0, "pending": 0, "queued": 0, "max_queued": 1, "streams": 1}, self.pool.get_metrics()["ProviderMock"])
+
+    async def test_loop_not_blocked(self):
+        ticks = 0
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.005)
+                ticks += 1
+        task = asyncio.create_task(tick())
+        response = [chunk async for chunk in self.pool.iter(BlockingProviderMock, BlockingProviderMock.create_completion, "", DEFAULT_MESSAGES, True)]
+        task.cancel()
+        self.assertEqual(100, len(response))
+        self.assertGreater(ticks, 50)
+
+    async def test_backpressure_and_close(self):
+        response = self.pool.iter(BlockingProviderMock, BlockingProviderMock.create_completion, "", DEFAULT_MESSAGES, True)
+        self.assertEqual("0", await response.__anext__())
+        await asyncio.sleep(0.1)
+        self.assertLessEqual(self.pool.get_metrics()["BlockingProviderMock"]["queued"], 2)
+        await response.aclose()
+        self.assertTrue(await asyncio.get_running_loop().run_in_executor(None, BlockingProviderMock.closed.wait, 1))
+        self.assertEqual(0, self.pool.get_metrics()["BlockingProviderMock"]["queued"])
+
+    async def test_exception(self):
+        def create_completion(*args):
+            yield "Hello"
+            raise RuntimeError("Failed")
+        response = self.pool.iter(ProviderMock, create_completion)
+        self.assertEqual("Hello", await response.__anext__())
+        with self.assertRaises(RuntimeError):
+            await response.__anext__()
+
+    async def test_pool_size(self):
+        self.pool.set_workers(BlockingProviderMock, 1)
+        self.pool.get_executor(BlockingProviderMock)
+        self.assertEqual(1, self.pool.get_metrics()["BlockingProviderMock"]["workers"])
+
+    async def test_request_context(self):
+        new_request_context(model="test")
+        response = [chunk async for chunk in self.pool.iter(ContextProviderMock, ContextProviderMock.create_completion, "", DEFAULT_MESSAGES, True)]
+        self.assertEqual(["test"], response)
+
+    async def test_retry_provider(self):
+        provider = IterListProvider([BlockingProviderMock], False)
+        response = [chunk async for chunk in provider.create_async_generator("", DEFAULT_MESSAGES)]
+        self.assertEqual(100, len(response))
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import re
+import random
+import unittest
+import threading
+from unittest.mock import patch
+
+from g4f.client import Client
+from g4f.tokenizer import TokenCounter, count_tokens, count_message_tokens, get_encoding, get_encoding_async, approximate_tokens
+from .mocks import YieldProviderMock
+
+TEXT = "Hello world, this is a longer text.\nIt has  two lines and some numbers 12345 ünïcode."
+
+class WordEncoding:
+    """Encodes every word with its leading whitespace and every punctuation char as one token."""
+
+    def encode(self, text: str) -> list[str]:
+        return re.findall(r"\s*\w+|\s*[^\w\s]|\s+", text)
+
+    def decode(self, tokens: list[str]) -> str:
+        return "".join(tokens)
+
+def split_randomly(text: str, seed: int) -> list[str]:
+    random.seed(seed)
+    chunks = []
+    while text:
+        size = random.randint(1, 8)
+        chunks.append(text[:size])
+        text = text[size:]
+    return chunks
+
+class TestTokenCounter(unittest.TestCase):
+
+    def test_incremental_count(self):
+        # The approximation and an encoding with the same word boundaries as tiktoken
+        for encoding in (None, WordEncoding()):
+            expected = approximate_tokens(TEXT) if encoding is None else len(encoding.encode(TEXT))
+            for seed in range(20):
+                counter = TokenCounter()
+                counter.encoding = encoding
+                for chunk in split_randomly(TEXT, seed):
+                    counter.feed(chunk)
+                self.assertEqual(expected, counter.count)
+
+    def test_max_tokens(self):
+        counter = TokenCounter(encoding=WordEncoding())
+        result = []
+        for chunk in split_randomly(TEXT, 0):
+            chunk, reached = counter.feed(chunk, 5)
+            result.append(chunk)
+            if reached:
+                break
+        self.assertTrue(reached)
+        self.assertEqual("Hello world, this is", "".join(result))
+        self.assertEqual(5, counter.count)
+
+    def test_tiktoken(self):
+        encoding = get_encoding("gpt-4o")
+        if encoding is None:
+            self.skipTest("tiktoken is not installed")
+        for seed in range(20):
+            counter = TokenCounter("gpt-4o")
+            for chunk in split_randomly(TEXT, seed):
+                counter.feed(chunk)
+            self.assertEqual(len(encoding.encode(TEXT)), counter.count)
+
+    def test_message_tokens(self):
+        messages = [{"role": "user", "content": "Hello"}]
+        self.assertGreater(count_message_tokens(messages), count_tokens("Hello"))
+        vision = [{"role": "user", "content": [{"type": "text", "text": "Hello"}, {"type": "image_url"}]}]
+        self.assertEqual(count_message_tokens(messages), count_message_tokens(vision))
+
+class TestUsage(unittest.TestCase):
+
+    def test_usage(self):
+        client = Client(provider=YieldProviderMock)
+        messages = [{'role': 'user', 'content': "Hello world"}]
+        response = client.chat.completions.create(messages, "")
+        usage = response.usage
+        self.assertEqual(count_message_tokens(messages), usage["prompt_tokens"])
+        self.assertEqual(count_tokens("Hello world"), usage["completion_tokens"])
+        self.assertEqual(usage["prompt_tokens"] + usage["completion_tokens"], usage["total_tokens"])
+        response = list(client.chat.completions.create(messages, "", stream=True))
+        self.assertIsNone(response[0].usage)
+        self.assertEqual(usage, response[-1].usage)
+
+class TestAsyncEncoding(unittest.IsolatedAsyncioTestCase):
+
+    async def test_load_in_executor(self):
+        threads = []
+        def load(model):
+            threads.append(threading.get_ident())
+            return WordEncoding()
+        with patch("g4f.tokenizer.has_tiktoken", True), patch("g4f.tokenizer.get_encoding_name", return_value="test"):
+            with patch("g4f.tokenizer.get_encoding", load), patch.dict("g4f.tokenizer.encodings"):
+                self.assertIsInstance(await get_encoding_async("test"), WordEncoding)
+        self.assertEqual(1, len(threads))
+        self.assertNotEqual(threading.get_ident(), threads[0])
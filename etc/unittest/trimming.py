@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import unittest
+
+from g4f.providers.helper import format_prompt, format_prompt_max_length, trim_messages, FragmentCache, fragment_cache
+from g4f.tokenizer import count_tokens
+
+def create_messages(count: int, size: int = 100) -> list[dict]:
+    return [{"role": "system", "content": "S" * 50}] + [
+        {"role": "user" if index % 2 == 0 else "assistant", "content": str(index % 10) * size}
+        for index in range(count)
+    ]
+
+def reference_trim(messages: list[dict], max_length: int) -> list[dict]:
+    for start in range(len(messages)):
+        trimmed = [message for message in messages[:start] if message["role"] == "system"] + messages[start:]
+        if len(format_prompt(trimmed)) <= max_length:
+            return trimmed
+    return messages[-1:]
+
+class TestTrimming(unittest.TestCase):
+
+    def test_no_trim(self):
+        messages = create_messages(4)
+        self.assertEqual(format_prompt(messages), format_prompt_max_length(messages, 10000))
+        self.assertIs(messages, trim_messages(messages))
+
+    def test_longest_suffix(self):
+        messages = create_messages(20)
+        for max_length in range(100, 3000, 37):
+            trimmed = trim_messages(messages, max_length)
+            self.assertEqual(reference_trim(messages, max_length), trimmed)
+            if len(trimmed) > 1:
+                self.assertLessEqual(len(format_prompt(trimmed)), max_length)
+
+    def test_keep_system(self):
+        messages = create_messages(10)
+        prompt = format_prompt_max_length(messages, 400)
+        self.assertTrue(prompt.startswith("System: SSS"))
+        self.assertTrue(prompt.endswith(messages[-1]["content"] + "\nAssistant:"))
+
+    def test_last_message(self):
+        messages = create_messages(10)
+        self.assertEqual(messages[-1]["content"], format_prompt_max_length(messages, 50))
+
+    def test_max_tokens(self):
+        messages = create_messages(20)
+        trimmed = trim_messages(messages, max_tokens=200)
+        self.assertLess(len(trimmed), len(messages))
+        self.assertLessEqual(count_tokens(format_prompt(trimmed)), 200)
+        self.assertGreater(count_tokens(format_prompt([messages[0]] + messages[-len(trimmed):])), 200)
+
+    def test_fragment_cache(self):
+        cache = FragmentCache(max_size=2)
+        message = {"role": "user", "content": "Hello"}
+        fragment = cache.get(message)
+        self.assertEqual("User: Hello", fragment.text)
+        self.assertIs(fragment, cache.get({"role": "user", "content": "Hello"}))
+        cache.get({"role": "user", "content": "1"})
+        cache.get({"role": "user", "content": "2"})
+        self.assertIsNot(fragment, cache.get(message))
+
+    def test_reuse_fragments(self):
+        messages = create_messages(6)
+        format_prompt_max_length(messages, 400)
+        fragment = fragment_cache.get(messages[1])
+        # The next turn of the conversation
+        messages = messages + [{"role": "user", "content": "Next"}]
+        format_prompt_max_length(messages, 400)
+        self.assertIs(fragment, fragment_cache.get(messages[1]))
@@ -1,10 +1,10 @@
+from __future__ import annotations
+
 import json
 import random
 import re
-import requests
 from aiohttp import ClientSession
 from typing import List
-from requests.packages.urllib3.exceptions import InsecureRequestWarning
 
 from ..typing import AsyncResult, Messages
 from ..image import ImageResponse
@@ -12,8 +12,6 @@ from ..requests.raise_for_status import raise_for_status
 from .base_provider import AsyncGeneratorProvider, ProviderModelMixin
 
 from .. import debug
-
-requests.packages.urllib3.disable_warnings(InsecureRequestWarning)
  
 def split_message(message: str, max_length: int = 1000) -> List[str]:
     """Splits the message into parts up to (max_length)."""
@@ -66,29 +64,26 @@ class Airforce(AsyncGeneratorProvider, ProviderModelMixin):
 
     @classmethod
     def get_models(cls):
-        if not cls.image_models:
-            try:
-                url = "https://api.airforce/imagine2/models"
-                response = requests.get(url, verify=False)
-                response.raise_for_status()
-                cls.image_models = response.json()
-                cls.image_models.extend(cls.additional_models_imagine)
-            except Exception as e:
-                debug.log(f"Error fetching image models: {e}")
+        return cls.get_cached_models()
 
-        if not cls.models:
+    @classmethod
+    async def fetch_models(cls, **kwargs) -> list[str]:
+        async with ClientSession() as session:
             try:
-                url = "https://api.airforce/models"
-                response = requests.get(url, verify=False)
-                response.raise_for_status()
-                data = response.json()
-                cls.models = [model['id'] for model in data['data']]
-                cls.models.extend(cls.image_models)
-                cls.models = [model for model in cls.models if model not in cls.hidden_models]
+                async with session.get("https://api.airforce/imagine2/models", ssl=False) as response:
+                    await raise_for_status(response)
+                    image_models = await response.json()
+                    image_models.extend(cls.additional_models_imagine)
+                    cls.image_models = image_models
             except Exception as e:
-                debug.log(f"Error fetching text models: {e}")
+                debug.log(f"Error fetching image models: {e}")
 
-        return cls.models
+            async with session.get("https://api.airforce/models", ssl=False) as response:
+                await raise_for_status(response)
+                data = await response.json()
+        models = [model['id'] for model in data['data']]
+        models.extend(cls.image_models or [])
+        return [model for model in models if model not in cls.hidden_models]
 
     @classmethod
     async def check_api_key(cls, api_key: str) -> bool:
@@ -257,8 +252,9 @@ class Airforce(AsyncGeneratorProvider, ProviderModelMixin):
         if not await cls.check_api_key(api_key):
             pass
 
+        await cls.get_models_async()
         model = cls.get_model(model)
-        if model in cls.image_models:
+        if model in (cls.image_models or []):
             if prompt is None:
                 prompt = messages[-1]['content']
             if seed is None:
@@ -1,11 +1,8 @@
 from __future__ import annotations
 
-import asyncio
-import json
-
 from ..typing import AsyncResult, Messages, Cookies
-from .base_provider import AsyncGeneratorProvider, ProviderModelMixin, get_running_loop
-from ..requests import Session, StreamSession, get_args_from_nodriver, raise_for_status, merge_cookies, DEFAULT_HEADERS, has_nodriver, has_curl_cffi
+from .base_provider import AsyncGeneratorProvider, ProviderModelMixin
+from ..requests import StreamSession, get_args_from_nodriver, raise_for_status, merge_cookies, iter_sse, DEFAULT_HEADERS, has_nodriver
 from ..errors import ResponseStatusError
 
 class Cloudflare(AsyncGeneratorProvider, ProviderModelMixin):
@@ -32,27 +29,22 @@ class Cloudflare(AsyncGeneratorProvider, ProviderModelMixin):
     _args: dict = None
 
     @classmethod
-    def get_models(cls) -> str:
-        if not cls.models:
-            if cls._args is None:
-                if has_nodriver:
-                    get_running_loop(check_nested=True)
-                    args = get_args_from_nodriver(cls.url)
-                    cls._args = asyncio.run(args)
-                elif not has_curl_cffi:
-                    return cls.models
-                else:
-                    cls._args = {"headers": DEFAULT_HEADERS, "cookies": {}}
-            with Session(**cls._args) as session:
-                response = session.get(cls.models_url)
+    def get_models(cls) -> list[str]:
+        return cls.get_cached_models()
+
+    @classmethod
+    async def fetch_models(cls, **kwargs) -> list[str]:
+        if cls._args is None:
+            if has_nodriver:
+                cls._args = await get_args_from_nodriver(cls.url)
+            else:
+                cls._args = {"headers": DEFAULT_HEADERS, "cookies": {}}
+        async with StreamSession(**cls._args) as session:
+            async with session.get(cls.models_url) as response:
                 cls._args["cookies"] = merge_cookies(cls._args["cookies"], response)
-                try:
-                    raise_for_status(response)
-                except ResponseStatusError:
-                    return cls.models
-                json_data = response.json()
-                cls.models = [model.get("name") for model in json_data.get("models")]
-        return cls.models
+                await raise_for_status(response)
+                json_data = await response.json()
+        return [model.get("name") for model in json_data.get("models")]
 
     @classmethod
     async def create_async_generator(
@@ -89,13 +81,12 @@ class Cloudflare(AsyncGeneratorProvider, ProviderModelMixin):
                 except ResponseStatusError:
                     cls._args = None
                     raise
-                async for line in response.iter_lines():
-                    if line.startswith(b'data: '):
-                        if line == b'data: [DONE]':
-                            break
-                        try:
-                            content = json.loads(line[6:].decode())
-                            if content.get("response") and content.get("response") != '</s>':
-                                yield content['response']
-                        except Exception:
-                            continue
\ No newline at end of file
+                async for event in iter_sse(response):
+                    if event.data == b'[DONE]':
+                        break
+                    try:
+                        content = event.json()
+                        if content.get("response") and content.get("response") != '</s>':
+                            yield content['response']
+                    except Exception:
+                        continue
\ No newline at end of file
@@ -21,9 +21,10 @@ except ImportError:
 from .base_provider import AbstractProvider, ProviderModelMixin, BaseConversation
 from .helper import format_prompt_max_length
 from ..typing import CreateResult, Messages, ImagesType
-from ..errors import MissingRequirementsError, NoValidHarFileError
+from ..errors import MissingRequirementsError, MissingAuthError, NoValidHarFileError
 from ..requests.raise_for_status import raise_for_status
 from ..providers.asyncio import get_running_loop
+from ..providers.credential_pool import CredentialPool, Credential
 from .openai.har_file import get_headers, get_har_files
 from ..requests import get_nodriver
 from ..image import ImageResponse, to_bytes, is_accepted_format
@@ -32,8 +33,9 @@ from .. import debug
 class Conversation(BaseConversation):
     conversation_id: str
 
-    def __init__(self, conversation_id: str):
+    def __init__(self, conversation_id: str, account: str = None):
         self.conversation_id = conversation_id
+        self.account = account
 
 class Copilot(AbstractProvider, ProviderModelMixin):
     label = "Microsoft Copilot"
@@ -46,6 +48,7 @@ class Copilot(AbstractProvider, ProviderModelMixin):
         "gpt-4": "Copilot",
     }
 
+    max_prompt_length = 10000
     websocket_url = "wss://copilot.microsoft.com/c/api/chat?api-version=2"
     conversation_url = f"{url}/c/api/conversations"
 
@@ -69,6 +72,17 @@ class Copilot(AbstractProvider, ProviderModelMixin):
         if not has_curl_cffi:
             raise MissingRequirementsError('Install or update "curl_cffi" package | pip install -U curl_cffi')
 
+        if (cls.needs_auth or images is not None) and cls.account is None and cls.credential_pool is not None:
+            cls.credential_pool.reload()
+            if cls.credential_pool:
+                with cls.credential_pool.lease_sync(cls, getattr(conversation, "account", None)) as provider:
+                    yield from provider.create_completion(
+                        model, messages, stream, proxy=proxy, timeout=timeout, images=images,
+                        conversation=conversation, return_conversation=return_conversation,
+                        web_search=web_search, **kwargs
+                    )
+                return
+
         websocket_url = cls.websocket_url
         headers = None
         if cls.needs_auth or images is not None:
@@ -116,6 +130,8 @@ class Copilot(AbstractProvider, ProviderModelMixin):
             raise_for_status(response)
             user = response.json().get('firstName')
             if user is None:
+                if cls.account is not None:
+                    raise MissingAuthError("The access token of the account was rejected")
                 cls._access_token = None
             debug.log(f"Copilot: User: {user or 'null'}")
             if conversation is None:
@@ -123,8 +139,8 @@ class Copilot(AbstractProvider, ProviderModelMixin):
                 raise_for_status(response)
                 conversation_id = response.json().get("id")
                 if return_conversation:
-                    yield Conversation(conversation_id)
-                prompt = format_prompt_max_length(messages, 10000)
+                    yield Conversation(conversation_id, None if cls.account is None else cls.account.name)
+                prompt = format_prompt_max_length(messages, cls.max_prompt_length, cls.max_prompt_tokens, model)
                 debug.log(f"Copilot: Created conversation: {conversation_id}")
             else:
                 conversation_id = conversation.conversation_id
@@ -218,26 +234,43 @@ async def get_access_token_and_cookies(url: str, proxy: str = None, target: str
 def readHAR(url: str):
     api_key = None
     cookies = None
-    for path in get_har_files():
-        with open(path, 'rb') as file:
-            try:
-                harFile = json.loads(file.read())
-            except json.JSONDecodeError:
-                # Error: not a HAR file!
-                continue
-            for v in harFile['log']['entries']:
-                if v['request']['url'].startswith(url):
-                    v_headers = get_headers(v)
-                    if "authorization" in v_headers:
-                        api_key = v_headers["authorization"].split(maxsplit=1).pop()
-                    if v['request']['cookies']:
-                        cookies = {c['name']: c['value'] for c in v['request']['cookies']}
+    for harFile in get_har_files():
+        file_api_key, file_cookies = read_har_entries(harFile["data"], url)
+        api_key = file_api_key or api_key
+        cookies = file_cookies or cookies
     if api_key is None:
         raise NoValidHarFileError("No access token found in .har files")
 
     return api_key, cookies
 
+def read_har_entries(entries: list[dict], url: str):
+    api_key = None
+    cookies = None
+    for v in entries:
+        if v['request']['url'].startswith(url):
+            v_headers = get_headers(v)
+            if "authorization" in v_headers:
+                api_key = v_headers["authorization"].split(maxsplit=1).pop()
+            if v['request']['cookies']:
+                cookies = {c['name']: c['value'] for c in v['request']['cookies']}
+    return api_key, cookies
+
+def load_accounts() -> list[Credential]:
+    """Read an account from every .har file with an access token. They are not refreshed, that needs a browser."""
+    try:
+        har_files = get_har_files()
+    except NoValidHarFileError:
+        return []
+    credentials = []
+    for har_file in har_files:
+        api_key, cookies = read_har_entries(har_file["data"], Copilot.url)
+        if api_key is not None:
+            credentials.append(Credential(har_file["path"], {"_access_token": api_key, "_cookies": cookies}, version=har_file["mtime"]))
+    return credentials
+
 def get_clarity() -> bytes:
      #{"e":["0.7.58",5,7284,4779,"n59ae4ieqq","aln5en","1upufhz",1,0,0],"a":[[7323,12,65,217,324],[7344,12,65,214,329],[7385,12,65,211,334],[7407,12,65,210,337],[7428,12,65,209,338],[7461,12,65,209,339],[7497,12,65,209,339],[7531,12,65,208,340],[7545,12,65,208,342],[11654,13,65,208,342],[11728,14,65,208,342],[11728,9,65,208,342,17535,19455,0,0,0,"Annehmen",null,"52w7wqv1r.8ovjfyrpu",1],[7284,4,1,393,968,393,968,0,0,231,310,939,0],[12063,0,2,147,3,4,4,18,5,1,10,79,25,15],[12063,36,6,[11938,0]]]}
     body = base64.b64decode("H4sIAAAAAAAAA23RwU7DMAwG4HfJ2aqS2E5ibjxH1cMOnQYqYZvUTQPx7vyJRGGAemj01XWcP+9udg+j80MetDhSyrEISc5GrqrtZnmaTydHbrdUnSsWYT2u+8Obo0Ce/IQvaDBmjkwhUlKKIRNHmQgosqEArWPRDQMx90rxeUMPzB1j+UJvwNIxhTvsPcXyX1T+rizE4juK3mEEhpAUg/JvzW1/+U/tB1LATmhqotoiweMea50PLy2vui4LOY3XfD1dwnkor5fn/e18XBFgm6fHjSzZmCyV7d3aRByAEYextaTHEH3i5pgKGVP/s+DScE5PuLKIpW6FnCi1gY3Rbpqmj0/DI/+L7QEAAA==")
-    return body
\ No newline at end of file
+    return body
+
+Copilot.credential_pool = CredentialPool(Copilot.__name__, load_accounts)
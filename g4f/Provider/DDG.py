@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-import json
 import aiohttp
 from aiohttp import ClientSession, BaseConnector
 
@@ -9,6 +8,7 @@ from .base_provider import AsyncGeneratorProvider, ProviderModelMixin, BaseConve
 from .helper import format_prompt
 from ..requests.aiohttp import get_connector
 from ..requests.raise_for_status import raise_for_status
+from ..requests.sse import iter_sse
 from .. import debug
 
 MODELS = [
@@ -118,16 +118,12 @@ class DDG(AsyncGeneratorProvider, ProviderModelMixin):
                 conversation.vqd = response.headers.get("x-vqd-4")
                 await raise_for_status(response)
 
-                async for line in response.content:
-                    if line:
-                        decoded_line = line.decode('utf-8')
-                        if decoded_line.startswith('data: '):
-                            json_str = decoded_line[6:]
-                            if json_str == '[DONE]':
-                                break
-                            try:
-                                json_data = json.loads(json_str)
-                                if 'message' in json_data:
-                                    yield json_data['message']
-                            except json.JSONDecodeError:
-                                pass
+                async for event in iter_sse(response):
+                    if event.data == b'[DONE]':
+                        break
+                    try:
+                        json_data = event.json()
+                        if 'message' in json_data:
+                            yield json_data['message']
+                    except ValueError:
+                        pass
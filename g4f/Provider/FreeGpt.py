@@ -5,7 +5,7 @@ import hashlib
 import random
 from typing import AsyncGenerator, Optional, Dict, Any
 from ..typing import Messages
-from ..requests import StreamSession, raise_for_status
+from ..requests import get_session, raise_for_status
 from .base_provider import AsyncGeneratorProvider, ProviderModelMixin
 from ..errors import RateLimitError
 
@@ -43,7 +43,8 @@ class FreeGpt(AsyncGeneratorProvider, ProviderModelMixin):
 
         domain = random.choice(DOMAINS)
 
-        async with StreamSession(
+        async with get_session(
+            domain,
             impersonate="chrome",
             timeout=timeout,
             proxies={"all": proxy} if proxy else None
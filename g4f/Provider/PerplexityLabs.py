@@ -6,6 +6,7 @@ import json
 from ..typing import AsyncResult, Messages
 from ..requests import StreamSession, raise_for_status
 from .base_provider import AsyncGeneratorProvider, ProviderModelMixin
+from .helper import SnapshotDelta
 
 API_URL = "https://www.perplexity.ai/socket.io/"
 WS_URL = "wss://www.perplexity.ai/socket.io/"
@@ -84,18 +85,17 @@ class PerplexityLabs(AsyncGeneratorProvider, ProviderModelMixin):
                     "messages": messages
                 }
                 await ws.send_str("42" + json.dumps(["perplexity_labs", message_data]))
-                last_message = 0
+                snapshots = SnapshotDelta()
                 while True:
                     message = await ws.receive_str()
                     if message == "2":
-                        if last_message == 0:
+                        if snapshots.offset == 0:
                             raise RuntimeError("Unknown error")
                         await ws.send_str("3")
                         continue
                     try:
                         data = json.loads(message[2:])[1]
-                        yield data["output"][last_message:]
-                        last_message = len(data["output"])
+                        yield snapshots.feed(data["output"])
                         if data["final"]:
                             break
                     except:
@@ -2,7 +2,6 @@ from __future__ import annotations
 
 from urllib.parse import quote
 import random
-import requests
 from aiohttp import ClientSession
 
 from ..typing import AsyncResult, Messages
@@ -19,6 +18,8 @@ class PollinationsAI(OpenaiAPI):
     needs_auth = False
     supports_stream = True
     api_base = "https://text.pollinations.ai/openai"
+    # The prompt is sent in the url of the text api
+    max_prompt_length = 5000
 
     default_model = "openai"
     additional_models_image = ["midjourney", "dall-e-3"]
@@ -39,24 +40,22 @@ class PollinationsAI(OpenaiAPI):
     
     @classmethod
     def get_models(cls, **kwargs):
-        if not hasattr(cls, 'image_models'):
-            cls.image_models = []
-        if not cls.image_models:
-            url = "https://image.pollinations.ai/models"
-            response = requests.get(url, headers=cls.headers)
-            raise_for_status(response)
-            cls.image_models = response.json()
-            cls.image_models.extend(cls.additional_models_image)
-        if not hasattr(cls, 'models'):
-            cls.models = []
-        if not cls.models:
-            url = "https://text.pollinations.ai/models"
-            response = requests.get(url, headers=cls.headers)
-            raise_for_status(response)
-            cls.models = [model.get("name") for model in response.json()]
-            cls.models.extend(cls.image_models)
-            cls.models.extend(cls.additional_models_text)
-        return cls.models
+        return cls.get_cached_models()
+
+    @classmethod
+    async def fetch_models(cls, **kwargs) -> list[str]:
+        async with ClientSession(headers=cls.headers) as session:
+            async with session.get("https://image.pollinations.ai/models") as response:
+                await raise_for_status(response)
+                image_models = await response.json()
+            image_models.extend(cls.additional_models_image)
+            cls.image_models = image_models
+            async with session.get("https://text.pollinations.ai/models") as response:
+                await raise_for_status(response)
+                models = [model.get("name") for model in await response.json()]
+        models.extend(cls.image_models)
+        models.extend(cls.additional_models_text)
+        return models
 
     @classmethod
     async def create_async_generator(
@@ -71,8 +70,9 @@ class PollinationsAI(OpenaiAPI):
         height: int = 1024,
         **kwargs
     ) -> AsyncResult:
+        await cls.get_models_async()
         model = cls.get_model(model)
-        if model in cls.image_models:
+        if model in (cls.image_models or []):
             async for response in cls._generate_image(model, messages, prompt, proxy, seed, width, height):
                 yield response
         elif model in cls.models:
@@ -97,7 +97,7 @@ class PollinationsAI(OpenaiAPI):
     async def _generate_text(cls, model: str, messages: Messages, api_key: str = None, proxy: str = None, **kwargs):
         if api_key is None:
             async with ClientSession(connector=get_connector(proxy=proxy), headers=cls.headers) as session:
-                prompt = format_prompt_max_length(messages, 5000)
+                prompt = format_prompt_max_length(messages, cls.max_prompt_length, cls.max_prompt_tokens, model)
                 async with session.get(f"https://text.pollinations.ai/{quote(prompt)}?model={quote(model)}") as response:
                     await raise_for_status(response)
                     async for line in response.content.iter_any():
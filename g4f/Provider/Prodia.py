@@ -1,11 +1,11 @@
 from __future__ import annotations
 
 from aiohttp import ClientSession
-import asyncio
 
 from ..typing import AsyncResult, Messages
 from .base_provider import AsyncGeneratorProvider, ProviderModelMixin
 from ..image import ImageResponse
+from ..providers.job_poller import job_poller
 
 class Prodia(AsyncGeneratorProvider, ProviderModelMixin):
     url = "https://app.prodia.com"
@@ -139,8 +139,8 @@ class Prodia(AsyncGeneratorProvider, ProviderModelMixin):
                 yield ImageResponse(image_url, alt=prompt)
 
     @classmethod
-    async def _poll_job(cls, session: ClientSession, job_id: str, proxy: str, max_attempts: int = 30, delay: int = 2) -> str:
-        for _ in range(max_attempts):
+    async def _poll_job(cls, session: ClientSession, job_id: str, proxy: str, timeout: int = 60, delay: int = 1) -> str:
+        async def check_job():
             async with session.get(f"https://api.prodia.com/job/{job_id}", proxy=proxy) as response:
                 response.raise_for_status()
                 job_status = await response.json()
@@ -150,6 +150,7 @@ class Prodia(AsyncGeneratorProvider, ProviderModelMixin):
                 elif job_status["status"] == "failed":
                     raise Exception("Image generation failed")
 
-            await asyncio.sleep(delay)
-
-        raise Exception("Timeout waiting for image generation")
+        try:
+            return await job_poller.wait("api.prodia.com", check_job, timeout=timeout, delay=delay, max_delay=4)
+        except TimeoutError:
+            raise Exception("Timeout waiting for image generation")
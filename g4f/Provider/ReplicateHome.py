@@ -1,13 +1,13 @@
 from __future__ import annotations
 
 import json
-import asyncio
 from aiohttp import ClientSession, ContentTypeError
 
 from ..typing import AsyncResult, Messages
 from .base_provider import AsyncGeneratorProvider, ProviderModelMixin
 from ..requests.aiohttp import get_connector
 from ..requests.raise_for_status import raise_for_status
+from ..providers.job_poller import job_poller
 from .helper import format_prompt
 from ..image import ImageResponse
 
@@ -93,9 +93,8 @@ class ReplicateHome(AsyncGeneratorProvider, ProviderModelMixin):
                 prediction_id = result['id']
 
             poll_url = f"https://homepage.replicate.com/api/poll?id={prediction_id}"
-            max_attempts = 30
-            delay = 5
-            for _ in range(max_attempts):
+
+            async def check_prediction():
                 async with session.get(poll_url) as response:
                     await raise_for_status(response)
                     try:
@@ -106,19 +105,17 @@ class ReplicateHome(AsyncGeneratorProvider, ProviderModelMixin):
                             result = json.loads(text)
                         except json.JSONDecodeError:
                             raise ValueError(f"Unexpected response format: {text}")
+                if result['status'] == 'succeeded':
+                    return result
+                elif result['status'] == 'failed':
+                    raise Exception(f"Prediction failed: {result.get('error')}")
 
-                    if result['status'] == 'succeeded':
-                        if model in cls.image_models:
-                            image_url = result['output'][0]
-                            yield ImageResponse(image_url, prompt)
-                            return
-                        else:
-                            for chunk in result['output']:
-                                yield chunk
-                        break
-                    elif result['status'] == 'failed':
-                        raise Exception(f"Prediction failed: {result.get('error')}")
-                await asyncio.sleep(delay)
-
-            if result['status'] != 'succeeded':
+            try:
+                result = await job_poller.wait("homepage.replicate.com", check_prediction, timeout=150, delay=2, max_delay=5)
+            except TimeoutError:
                 raise Exception("Prediction timed out")
+            if model in cls.image_models:
+                yield ImageResponse(result['output'][0], prompt)
+            else:
+                for chunk in result['output']:
+                    yield chunk
@@ -1,60 +1,57 @@
 from __future__ import annotations
 
 from ..providers.types          import BaseProvider, ProviderType
-from ..providers.retry_provider import RetryProvider, IterListProvider
+from ..providers.retry_provider import RetryProvider, IterListProvider, RaceProvider
 from ..providers.base_provider  import AsyncProvider, AsyncGeneratorProvider
 from ..providers.create_images  import CreateImagesProvider
+from ..providers.registry       import ProviderRegistry, ProviderList, make_lazy
 
-from .deprecated       import *
-from .selenium         import *
-from .needs_auth       import *
-from .not_working      import *
-from .local            import *
+from . import deprecated, selenium, needs_auth, not_working, local
 
-from .Airforce         import Airforce
-from .AmigoChat        import AmigoChat
-from .Blackbox         import Blackbox
-from .Blackbox2        import Blackbox2
-from .ChatGpt          import ChatGpt
-from .ChatGptEs        import ChatGptEs
-from .Cloudflare       import Cloudflare
-from .Copilot          import Copilot
-from .DarkAI           import DarkAI
-from .DDG              import DDG
-from .DeepInfraChat    import DeepInfraChat
-from .Flux             import Flux
-from .Free2GPT         import Free2GPT
-from .FreeGpt          import FreeGpt
-from .GizAI            import GizAI
-from .Liaobots         import Liaobots
-from .Mhystical        import Mhystical
-from .PerplexityLabs   import PerplexityLabs
-from .Pi               import Pi
-from .Pizzagpt         import Pizzagpt
-from .PollinationsAI   import PollinationsAI
-from .Prodia           import Prodia
-from .ReplicateHome    import ReplicateHome
-from .RubiksAI         import RubiksAI
-from .TeachAnything    import TeachAnything
-from .You              import You
+# The module of every provider, imported on first use.
+# Later packages override providers with the same name.
+__manifest__: dict[str, str] = {
+    name: f".{package.__name__.rsplit('.', 1)[-1]}{module}"
+    for package in (deprecated, selenium, needs_auth, not_working, local)
+    for name, module in package.__manifest__.items()
+}
+__manifest__.update({
+    "Airforce":       ".Airforce",
+    "AmigoChat":      ".AmigoChat",
+    "Blackbox":       ".Blackbox",
+    "Blackbox2":      ".Blackbox2",
+    "ChatGpt":        ".ChatGpt",
+    "ChatGptEs":      ".ChatGptEs",
+    "Cloudflare":     ".Cloudflare",
+    "Copilot":        ".Copilot",
+    "DarkAI":         ".DarkAI",
+    "DDG":            ".DDG",
+    "DeepInfraChat":  ".DeepInfraChat",
+    "Flux":           ".Flux",
+    "Free2GPT":       ".Free2GPT",
+    "FreeGpt":        ".FreeGpt",
+    "GizAI":          ".GizAI",
+    "Liaobots":       ".Liaobots",
+    "Mhystical":      ".Mhystical",
+    "PerplexityLabs": ".PerplexityLabs",
+    "Pi":             ".Pi",
+    "Pizzagpt":       ".Pizzagpt",
+    "PollinationsAI": ".PollinationsAI",
+    "Prodia":         ".Prodia",
+    "ReplicateHome":  ".ReplicateHome",
+    "RubiksAI":       ".RubiksAI",
+    "TeachAnything":  ".TeachAnything",
+    "You":            ".You",
+})
 
-import sys
-
-__modules__: list = [
-    getattr(sys.modules[__name__], provider) for provider in dir()
-    if not provider.startswith("__")
-]
-__providers__: list[ProviderType] = [
-    provider for provider in __modules__
-    if isinstance(provider, type)
-    and issubclass(provider, BaseProvider)
-]
-__all__: list[str] = [
-    provider.__name__ for provider in __providers__
-]
-__map__: dict[str, ProviderType] = dict([
-    (provider.__name__, provider) for provider in __providers__
-])
+__map__: ProviderRegistry = make_lazy(__name__, __manifest__, {
+    provider.__name__: provider for provider in (
+        BaseProvider, RetryProvider, IterListProvider, RaceProvider,
+        AsyncProvider, AsyncGeneratorProvider, CreateImagesProvider
+    )
+})
+__providers__: ProviderList = ProviderList(__map__)
+__all__: list[str] = list(__map__)
 
 class ProviderUtils:
-    convert: dict[str, ProviderType] = __map__
+    convert: ProviderRegistry = __map__
@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-import asyncio
 import time
 import json
 from aiohttp import ClientSession, BaseConnector
@@ -15,6 +14,7 @@ except ImportError:
 
 from ..helper import get_connector
 from ...errors import MissingRequirementsError, RateLimitError
+from ...providers.job_poller import job_poller
 from ...webdriver import WebDriver, get_driver_cookies, get_browser
 
 BING_URL = "https://www.bing.com"
@@ -137,18 +137,19 @@ async def create_images(session: ClientSession, prompt: str, timeout: int = TIME
         response.raise_for_status()
 
     polling_url = f"{BING_URL}/images/create/async/results/{request_id}?q={url_encoded_prompt}"
-    start_time = time.time()
-    while True:
-        if time.time() - start_time > timeout:
-            raise RuntimeError(f"Timeout error after {timeout} sec")
+
+    async def check_images():
         async with session.get(polling_url) as response:
             if response.status != 200:
                 raise RuntimeError(f"Polling images faild. Code: {response.status}")
             text = await response.text()
-            if not text or "GenerativeImagesStatusPage" in text:
-                await asyncio.sleep(1)
-            else:
-                break
+            if text and "GenerativeImagesStatusPage" not in text:
+                return text
+
+    try:
+        text = await job_poller.wait("www.bing.com", check_images, timeout=timeout, delay=1, max_delay=5)
+    except TimeoutError:
+        raise RuntimeError(f"Timeout error after {timeout} sec")
     error = None
     try:
         error = json.loads(text).get("errorMessage")
@@ -8,7 +8,8 @@ import math
 from aiohttp import ClientSession, FormData
 
 from ...typing import ImageType, Tuple
-from ...image import to_image, process_image, to_base64_jpg, ImageRequest, Image
+from ...image import to_image, to_bytes, process_image, to_base64_jpg, ImageRequest, Image
+from ...image_pipeline import image_pipeline
 from ...requests import raise_for_status
 
 IMAGE_CONFIG = {
@@ -38,10 +39,7 @@ async def upload_image(
     Returns:
         ImageRequest: The response from the image upload.
     """
-    image = to_image(image_data)
-    new_width, new_height = calculate_new_dimensions(image)
-    image = process_image(image, new_width, new_height)
-    img_binary_data = to_base64_jpg(image, IMAGE_CONFIG['imageCompressionRate'])
+    img_binary_data = await image_pipeline.run_in_process(prepare_image, to_bytes(image_data))
 
     data = build_image_upload_payload(img_binary_data, tone)
 
@@ -49,6 +47,21 @@ async def upload_image(
         await raise_for_status(response, "Failed to upload image")
         return parse_image_response(await response.json())
 
+def prepare_image(image_data: bytes) -> str:
+    """
+    Resizes the image and encodes it as base64 jpg, runs in a worker process.
+
+    Args:
+        image_data (bytes): The image data.
+
+    Returns:
+        str: The base64-encoded image.
+    """
+    image = to_image(image_data)
+    new_width, new_height = calculate_new_dimensions(image)
+    image = process_image(image, new_width, new_height)
+    return to_base64_jpg(image, IMAGE_CONFIG['imageCompressionRate'])
+
 def calculate_new_dimensions(image: Image) -> Tuple[int, int]:
     """
     Calculates the new dimensions for the image based on the maximum allowed pixels.
@@ -1,35 +1,44 @@
-from .AiService     import AiService
-from .CodeLinkAva   import CodeLinkAva
-from .DfeHub        import DfeHub
-from .EasyChat      import EasyChat
-from .Forefront     import Forefront
-from .GetGpt        import GetGpt
-from .Lockchat      import Lockchat
-from .Wewordle      import Wewordle
-from .Equing        import Equing
-from .Wuguokai      import Wuguokai
-from .V50           import V50
-from .FastGpt       import FastGpt
-from .Aivvm         import Aivvm
-from .Vitalentum    import Vitalentum
-from .H2o           import H2o
-from .Myshell       import Myshell
-from .Acytoo        import Acytoo
-from .Aibn          import Aibn
-from .Ails          import Ails 
-from .ChatgptDuo    import ChatgptDuo
-from .Cromicle      import Cromicle
-from .Opchatgpts    import Opchatgpts
-from .Yqcloud       import Yqcloud
-from .Aichat        import Aichat
-from .Berlin        import Berlin
-from .Phind         import Phind
-from .AiAsk         import AiAsk
-from .ChatAnywhere  import ChatAnywhere
-from .FakeGpt       import FakeGpt
-from .GeekGpt       import GeekGpt
-from .GPTalk        import GPTalk
-from .Hashnode      import Hashnode
-from .Ylokh         import Ylokh
-from .OpenAssistant import OpenAssistant
-from .Bing          import Bing
\ No newline at end of file
+from __future__ import annotations
+
+from ...providers.registry import make_lazy
+
+# The module of every provider, imported on first use
+__manifest__: dict[str, str] = {
+    "Acytoo":        ".Acytoo",
+    "AiAsk":         ".AiAsk",
+    "Aibn":          ".Aibn",
+    "Aichat":        ".Aichat",
+    "Ails":          ".Ails",
+    "AiService":     ".AiService",
+    "Aivvm":         ".Aivvm",
+    "Berlin":        ".Berlin",
+    "Bing":          ".Bing",
+    "ChatAnywhere":  ".ChatAnywhere",
+    "ChatgptDuo":    ".ChatgptDuo",
+    "CodeLinkAva":   ".CodeLinkAva",
+    "Cromicle":      ".Cromicle",
+    "DfeHub":        ".DfeHub",
+    "EasyChat":      ".EasyChat",
+    "Equing":        ".Equing",
+    "FakeGpt":       ".FakeGpt",
+    "FastGpt":       ".FastGpt",
+    "Forefront":     ".Forefront",
+    "GeekGpt":       ".GeekGpt",
+    "GetGpt":        ".GetGpt",
+    "GPTalk":        ".GPTalk",
+    "H2o":           ".H2o",
+    "Hashnode":      ".Hashnode",
+    "Lockchat":      ".Lockchat",
+    "Myshell":       ".Myshell",
+    "Opchatgpts":    ".Opchatgpts",
+    "OpenAssistant": ".OpenAssistant",
+    "Phind":         ".Phind",
+    "V50":           ".V50",
+    "Vitalentum":    ".Vitalentum",
+    "Wewordle":      ".Wewordle",
+    "Wuguokai":      ".Wuguokai",
+    "Ylokh":         ".Ylokh",
+    "Yqcloud":       ".Yqcloud",
+}
+__all__: list[str] = list(__manifest__)
+__registry__ = make_lazy(__name__, __manifest__)
@@ -1,2 +1,11 @@
-from .Local            import Local
-from .Ollama           import Ollama
+from __future__ import annotations
+
+from ...providers.registry import make_lazy
+
+# The module of every provider, imported on first use
+__manifest__: dict[str, str] = {
+    "Local":  ".Local",
+    "Ollama": ".Ollama",
+}
+__all__: list[str] = list(__manifest__)
+__registry__ = make_lazy(__name__, __manifest__)
@@ -5,6 +5,7 @@ import json
 import random
 import re
 import base64
+import time
 import asyncio
 
 from aiohttp import ClientSession, BaseConnector
@@ -18,11 +19,14 @@ except ImportError:
 from ... import debug
 from ...typing import Messages, Cookies, ImagesType, AsyncResult, AsyncIterator
 from ..base_provider import AsyncGeneratorProvider, ProviderModelMixin, BaseConversation, SynthesizeData
-from ..helper import format_prompt, get_cookies
+from ..helper import format_prompt, get_cookies, SnapshotDelta
 from ...requests.raise_for_status import raise_for_status
 from ...requests.aiohttp import get_connector
 from ...requests import get_nodriver
 from ...errors import MissingAuthError
+from ...cookies import get_cookies_dir
+from ...har_index import har_index
+from ...providers.credential_pool import CredentialPool, Credential
 from ...image import ImageResponse, to_bytes
 from ... import debug
 
@@ -50,6 +54,10 @@ UPLOAD_IMAGE_HEADERS = {
     "x-goog-upload-protocol": "resumable",
     "x-tenant-id": "bard-storage",
 }
+IMAGE_PROMPT_MARKER = "[Imagen of "
+IMAGE_URL_MARKER = "http://googleusercontent.com/image_generation_content/"
+# Seconds an "SNlM0e" token of an account is used before it is fetched again
+TOKEN_LIFETIME = 60 * 60
 
 class Gemini(AsyncGeneratorProvider, ProviderModelMixin):
     label = "Google Gemini"
@@ -104,6 +112,18 @@ class Gemini(AsyncGeneratorProvider, ProviderModelMixin):
         language: str = "en",
         **kwargs
     ) -> AsyncResult:
+        if cls.account is None and cookies is None and cls.credential_pool is not None:
+            cls.credential_pool.reload()
+            if cls.credential_pool:
+                # A conversation stays with its account
+                async with cls.credential_pool.lease(cls, getattr(conversation, "account", None)) as provider:
+                    async for chunk in provider.create_async_generator(
+                        model, messages, proxy=proxy, connector=connector, images=images,
+                        return_conversation=return_conversation, conversation=conversation,
+                        language=language, **kwargs
+                    ):
+                        yield chunk
+                return
         prompt = format_prompt(messages) if conversation is None else messages[-1]["content"]
         cls._cookies = cookies or cls._cookies or get_cookies(".google.com", False, True)
         base_connector = get_connector(connector, proxy)
@@ -114,6 +134,8 @@ class Gemini(AsyncGeneratorProvider, ProviderModelMixin):
         ) as session:
             if not cls._snlm0e:
                 await cls.fetch_snlm0e(session, cls._cookies) if cls._cookies else None
+            if not cls._snlm0e and cls.account is not None:
+                raise MissingAuthError("Invalid cookies of the account. SNlM0e not found")
             if not cls._snlm0e:
                 try:
                     async for chunk in cls.nodriver_login(proxy):
@@ -157,7 +179,9 @@ class Gemini(AsyncGeneratorProvider, ProviderModelMixin):
                 ) as response:
                     await raise_for_status(response)
                     image_prompt = response_part = None
-                    last_content = ""
+                    # Every line has the full text so far, only the new text is sent
+                    snapshots = SnapshotDelta()
+                    has_markers = False
                     async for line in response.content:
                         try:
                             try:
@@ -172,22 +196,28 @@ class Gemini(AsyncGeneratorProvider, ProviderModelMixin):
                             if not response_part[4]:
                                 continue
                             if return_conversation:
-                                yield Conversation(response_part[1][0], response_part[1][1], response_part[4][0][0])
+                                yield Conversation(
+                                    response_part[1][0], response_part[1][1], response_part[4][0][0],
+                                    None if cls.account is None else cls.account.name
+                                )
                             content = response_part[4][0][1][0]
                         except (ValueError, KeyError, TypeError, IndexError) as e:
                             debug.log(f"{cls.__name__}:{e.__class__.__name__}:{e}")
                             continue
-                        match = re.search(r'\[Imagen of (.*?)\]', content)
-                        if match:
-                            image_prompt = match.group(1)
-                            content = content.replace(match.group(0), '')
-                        pattern = r"http://googleusercontent.com/image_generation_content/\d+"
-                        content = re.sub(pattern, "", content)
-                        if last_content and content.startswith(last_content):
-                            yield content[len(last_content):]
-                        else:
-                            yield content
-                        last_content = content
+                        # Only answers with images have markers, the full text is searched for them then
+                        if not has_markers:
+                            tail = content[max(snapshots.offset - len(IMAGE_URL_MARKER), 0):]
+                            has_markers = IMAGE_PROMPT_MARKER in tail or IMAGE_URL_MARKER in tail
+                        if has_markers:
+                            match = re.search(r'\[Imagen of (.*?)\]', content)
+                            if match:
+                                image_prompt = match.group(1)
+                                content = content.replace(match.group(0), '')
+                            pattern = r"http://googleusercontent.com/image_generation_content/\d+"
+                            content = re.sub(pattern, "", content)
+                        delta = snapshots.feed(content)
+                        if delta:
+                            yield delta
                         if image_prompt:
                             try:
                                 images = [image[0][3][3] for image in response_part[4][0][12][7][0]]
@@ -295,25 +325,59 @@ class Gemini(AsyncGeneratorProvider, ProviderModelMixin):
 
     @classmethod
     async def fetch_snlm0e(cls, session: ClientSession, cookies: Cookies):
-        async with session.get(cls.url, cookies=cookies) as response:
-            await raise_for_status(response)
-            response_text = await response.text()
-        match = re.search(r'SNlM0e\":\"(.*?)\"', response_text)
-        if match:
-            cls._snlm0e = match.group(1)
-        sid_match = re.search(r'"FdrFJe":"([\d-]+)"', response_text)
-        if sid_match:
-            cls._sid = sid_match.group(1)
+        snlm0e, sid = await get_snlm0e(session, cookies)
+        if snlm0e:
+            cls._snlm0e = snlm0e
+        if sid:
+            cls._sid = sid
+
+async def get_snlm0e(session: ClientSession, cookies: Cookies) -> tuple[str, str]:
+    """Read the "SNlM0e" token and the session id from the app page."""
+    async with session.get(Gemini.url, cookies=cookies) as response:
+        await raise_for_status(response)
+        response_text = await response.text()
+    match = re.search(r'SNlM0e\":\"(.*?)\"', response_text)
+    sid_match = re.search(r'"FdrFJe":"([\d-]+)"', response_text)
+    return match.group(1) if match else None, sid_match.group(1) if sid_match else None
+
+def load_accounts() -> list[Credential]:
+    """Read an account from every cookie or .har file with a "__Secure-1PSID" cookie."""
+    cookies_dir = get_cookies_dir()
+    if not os.access(cookies_dir, os.R_OK):
+        return []
+    accounts = []
+    for indexed in har_index.get_cookie_files(cookies_dir):
+        accounts.append((indexed, {c["name"]: c["value"] for c in indexed["data"] if c["domain"].endswith("google.com")}))
+    for indexed in har_index.get_har_files(cookies_dir):
+        cookies = {}
+        for v in indexed["data"]:
+            if v["request"]["url"].startswith(Gemini.url):
+                cookies.update({c["name"]: c["value"] for c in v["request"]["cookies"]})
+        accounts.append((indexed, cookies))
+    # The token is fetched by a refresh, before the account is used
+    return [
+        Credential(indexed["path"], {"_cookies": cookies, "_snlm0e": None, "_sid": None}, 0, indexed["mtime"])
+        for indexed, cookies in accounts if "__Secure-1PSID" in cookies
+    ]
+
+async def refresh_account(credential: Credential) -> tuple[dict, float]:
+    async with ClientSession(headers=REQUEST_HEADERS) as session:
+        snlm0e, sid = await get_snlm0e(session, credential.attributes["_cookies"])
+    if not snlm0e:
+        raise MissingAuthError("Invalid cookies of the account. SNlM0e not found")
+    return {"_snlm0e": snlm0e, "_sid": sid}, time.time() + TOKEN_LIFETIME
 
 class Conversation(BaseConversation):
     def __init__(self,
         conversation_id: str = "",
         response_id: str = "",
-        choice_id: str = ""
+        choice_id: str = "",
+        account: str = None
     ) -> None:
         self.conversation_id = conversation_id
         self.response_id = response_id
         self.choice_id = choice_id
+        self.account = account
 
 async def iter_filter_base64(response_iter: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
     search_for = b'[["wrb.fr","XqA3Ic","[\\"'
@@ -341,4 +405,6 @@ async def iter_base64_decode(response_iter: AsyncIterator[bytes]) -> AsyncIterat
         buffer = chunk[-rest:]
         yield base64.b64decode(chunk[:-rest])
     if rest > 0:
-        yield base64.b64decode(buffer+rest*b"=")
\ No newline at end of file
+        yield base64.b64decode(buffer+rest*b"=")
+
+Gemini.credential_pool = CredentialPool(Gemini.__name__, load_accounts, refresh_account)
\ No newline at end of file
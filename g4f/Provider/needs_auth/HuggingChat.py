@@ -151,7 +151,7 @@ class HuggingChat(AbstractProvider, ProviderModelMixin):
         )
         raise_for_status(response)
 
-        full_response = ""
+        full_response = []
         for line in response.iter_lines():
             if not line:
                 continue
@@ -166,7 +166,7 @@ class HuggingChat(AbstractProvider, ProviderModelMixin):
             
             elif line["type"] == "stream":
                 token = line["token"].replace('\u0000', '')
-                full_response += token
+                full_response.append(token)
                 if stream:
                     yield token
             
@@ -176,7 +176,7 @@ class HuggingChat(AbstractProvider, ProviderModelMixin):
                 url = f"https://huggingface.co/chat/conversation/{conversation.conversation_id}/output/{line['sha']}"
                 yield ImageResponse(url, alt=messages[-1]["content"], options={"cookies": cookies})
 
-        full_response = full_response.replace('<|im_end|', '').replace('\u0000', '').strip()
+        full_response = "".join(full_response).replace('<|im_end|', '').strip()
         if not stream:
             yield full_response
 
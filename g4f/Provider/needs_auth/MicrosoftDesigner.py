@@ -4,7 +4,6 @@ import uuid
 import aiohttp
 import random
 import asyncio
-import json
 
 from ...image import ImageResponse
 from ...errors import MissingRequirementsError, NoValidHarFileError
@@ -15,8 +14,11 @@ from ...requests import get_nodriver
 from ..Copilot import get_headers, get_har_files
 from ..base_provider import AsyncGeneratorProvider, ProviderModelMixin
 from ..helper import get_random_hex
+from ...providers.job_poller import job_poller
 from ... import debug
 
+TIMEOUT_IMAGE_CREATION = 300
+
 class MicrosoftDesigner(AsyncGeneratorProvider, ProviderModelMixin):
     label = "Microsoft Designer"
     url = "https://designer.microsoft.com"
@@ -110,32 +112,33 @@ async def create_images(prompt: str, access_token: str, user_agent: str, image_s
         polling_meta_data = response_data.get('polling_response', {}).get('polling_meta_data', {})
         form_data.add_field('dalle-poll-url', polling_meta_data.get('poll_url', ''))
 
-        while True:
-            await asyncio.sleep(polling_meta_data.get('poll_interval', 1000) / 1000)
+        async def check_images():
             async with session.post(url, headers=headers, data=form_data) as response:
                 await raise_for_status(response)
                 response_data = await response.json()
             images = [image["ImageUrl"] for image in response_data.get('image_urls_thumbnail', [])]
-            if images:
-                return images
+            return images or None
+
+        poll_interval = polling_meta_data.get('poll_interval', 1000) / 1000
+        return await job_poller.wait(
+            "designerapp.officeapps.live.com",
+            check_images,
+            timeout=TIMEOUT_IMAGE_CREATION,
+            delay=poll_interval,
+            max_delay=max(poll_interval, 5)
+        )
 
 def readHAR(url: str) -> tuple[str, str]:
     api_key = None
     user_agent = None
-    for path in get_har_files():
-        with open(path, 'rb') as file:
-            try:
-                harFile = json.loads(file.read())
-            except json.JSONDecodeError:
-                # Error: not a HAR file!
-                continue
-            for v in harFile['log']['entries']:
-                if v['request']['url'].startswith(url):
-                    v_headers = get_headers(v)
-                    if "authorization" in v_headers:
-                        api_key = v_headers["authorization"].split(maxsplit=1).pop()
-                    if "user-agent" in v_headers:
-                        user_agent = v_headers["user-agent"]
+    for harFile in get_har_files():
+        for v in harFile["data"]:
+            if v['request']['url'].startswith(url):
+                v_headers = get_headers(v)
+                if "authorization" in v_headers:
+                    api_key = v_headers["authorization"].split(maxsplit=1).pop()
+                if "user-agent" in v_headers:
+                    user_agent = v_headers["user-agent"]
     if api_key is None:
         raise NoValidHarFileError("No access token found in .har files")
 
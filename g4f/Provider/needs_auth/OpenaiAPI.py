@@ -1,12 +1,11 @@
 from __future__ import annotations
 
-import json
 import requests
 
 from ..helper import filter_none
 from ..base_provider import AsyncGeneratorProvider, ProviderModelMixin, FinishReason
 from ...typing import Union, Optional, AsyncResult, Messages, ImagesType
-from ...requests import StreamSession, raise_for_status
+from ...requests import get_session, raise_for_status, iter_sse_json
 from ...errors import MissingAuthError, ResponseError
 from ...image import to_data_uri
 from ... import debug
@@ -78,7 +77,8 @@ class OpenaiAPI(AsyncGeneratorProvider, ProviderModelMixin):
                     "text": messages[-1]["content"]
                 }
             ]
-        async with StreamSession(
+        async with get_session(
+            api_base,
             proxy=proxy,
             headers=cls.get_headers(stream, api_key, headers),
             timeout=timeout,
@@ -107,24 +107,19 @@ class OpenaiAPI(AsyncGeneratorProvider, ProviderModelMixin):
                         yield finish
                 else:
                     first = True
-                    async for line in response.iter_lines():
-                        if line.startswith(b"data: "):
-                            chunk = line[6:]
-                            if chunk == b"[DONE]":
-                                break
-                            data = json.loads(chunk)
-                            cls.raise_error(data)
-                            choice = data["choices"][0]
-                            if "content" in choice["delta"] and choice["delta"]["content"]:
-                                delta = choice["delta"]["content"]
-                                if first:
-                                    delta = delta.lstrip()
-                                if delta:
-                                    first = False
-                                    yield delta
-                            finish = cls.read_finish_reason(choice)
-                            if finish is not None:
-                                yield finish
+                    async for data in iter_sse_json(response):
+                        cls.raise_error(data)
+                        choice = data["choices"][0]
+                        if "content" in choice["delta"] and choice["delta"]["content"]:
+                            delta = choice["delta"]["content"]
+                            if first:
+                                delta = delta.lstrip()
+                            if delta:
+                                first = False
+                                yield delta
+                        finish = cls.read_finish_reason(choice)
+                        if finish is not None:
+                            yield finish
 
     @staticmethod
     def read_finish_reason(choice: dict) -> Optional[FinishReason]:
@@ -27,11 +27,12 @@ from ...requests import get_nodriver
 from ...image import ImageResponse, ImageRequest, to_image, to_bytes, is_accepted_format
 from ...errors import MissingAuthError, NoValidHarFileError
 from ...providers.response import BaseConversation, FinishReason, SynthesizeData
+from ...providers.credential_pool import CredentialPool, Credential, get_jwt_expires
 from ..helper import format_cookies
-from ..openai.har_file import get_request_config
+from ..openai.har_file import get_request_config, get_har_files, read_har_entries, sendRequest, genArkReq
 from ..openai.har_file import RequestConfig, arkReq, arkose_url, start_url, conversation_url, backend_url, backend_anon_url
-from ..openai.proofofwork import generate_proof_token
-from ..openai.new import get_requirements_token, get_config
+from ..openai.proofofwork import generate_proof_token_async
+from ..openai.new import get_requirements_token_async, get_config
 from ... import debug
 
 DEFAULT_HEADERS = {
@@ -315,6 +316,20 @@ class OpenaiChat(AsyncGeneratorProvider, ProviderModelMixin):
         Raises:
             RuntimeError: If an error occurs during processing.
         """
+        if cls.needs_auth and cls.account is None and cookies is None and cls.credential_pool is not None:
+            cls.credential_pool.reload()
+            if cls.credential_pool:
+                # Use one of the accounts of the .har files, a conversation stays with its account
+                async with cls.credential_pool.lease(cls, getattr(conversation, "account", None)) as provider:
+                    async for chunk in provider.create_async_generator(
+                        model, messages, proxy=proxy, timeout=timeout, auto_continue=auto_continue,
+                        history_disabled=history_disabled, action=action, conversation_id=conversation_id,
+                        conversation=conversation, parent_id=parent_id, images=images,
+                        return_conversation=return_conversation, max_retries=max_retries,
+                        web_search=web_search, **kwargs
+                    ):
+                        yield chunk
+                return
         if cls.needs_auth:
             async for message in cls.login(proxy):
                 yield message
@@ -344,18 +359,22 @@ class OpenaiChat(AsyncGeneratorProvider, ProviderModelMixin):
                 conversation = Conversation(conversation_id, str(uuid.uuid4()) if parent_id is None else parent_id)
             else:
                 conversation = copy(conversation)
+            conversation.account = None if cls.account is None else cls.account.name
             if cls._api_key is None:
                 auto_continue = False
             conversation.finish_reason = None
             while conversation.finish_reason is None:
+                requirements_token = await get_requirements_token_async(RequestConfig.proof_token) if RequestConfig.proof_token else None
                 async with session.post(
                     f"{cls.url}/backend-anon/sentinel/chat-requirements"
                     if cls._api_key is None else
                     f"{cls.url}/backend-api/sentinel/chat-requirements",
-                    json={"p": get_requirements_token(RequestConfig.proof_token) if RequestConfig.proof_token else None},
+                    json={"p": requirements_token},
                     headers=cls._headers
                 ) as response:
                     if response.status == 401:
+                        if cls.account is not None:
+                            raise MissingAuthError("The access token of the account was rejected")
                         cls._headers = cls._api_key = None
                     else:
                         cls._update_request_args(session)
@@ -367,15 +386,16 @@ class OpenaiChat(AsyncGeneratorProvider, ProviderModelMixin):
 
                 if need_arkose and RequestConfig.arkose_token is None:
                     await get_request_config(proxy)
-                    cls._create_request_args(RequestConfig,cookies, RequestConfig.headers)
-                    cls._set_api_key(RequestConfig.access_token)
+                    if cls.account is None:
+                        cls._create_request_args(RequestConfig,cookies, RequestConfig.headers)
+                        cls._set_api_key(RequestConfig.access_token)
                     if RequestConfig.arkose_token is None:
                         raise MissingAuthError("No arkose token found in .har file")
 
                 if "proofofwork" in chat_requirements:
                     if RequestConfig.proof_token is None:
                         RequestConfig.proof_token = get_config(cls._headers.get("user-agent"))
-                    proofofwork = generate_proof_token(
+                    proofofwork = await generate_proof_token_async(
                         **chat_requirements["proofofwork"],
                         user_agent=cls._headers.get("user-agent"),
                         proof_token=RequestConfig.proof_token
@@ -524,6 +544,11 @@ class OpenaiChat(AsyncGeneratorProvider, ProviderModelMixin):
 
     @classmethod
     async def login(cls, proxy: str = None) -> AsyncIterator[str]:
+        if cls.account is not None:
+            # The credential pool keeps the token of the account fresh
+            if RequestConfig.arkose_request is not None:
+                RequestConfig.arkose_token = await sendRequest(genArkReq(RequestConfig.arkose_request), proxy)
+            return
         if cls._expires is not None and cls._expires < time.time():
             cls._headers = cls._api_key = None
         try:
@@ -633,7 +658,65 @@ class Conversation(BaseConversation):
         self.message_id = message_id
         self.finish_reason = finish_reason
         self.is_recipient = False
-        
+        self.account = None
+
+def load_accounts() -> list[Credential]:
+    """Read an account from every .har file that has an access token."""
+    try:
+        har_files = get_har_files()
+    except NoValidHarFileError:
+        return []
+    credentials = []
+    for har_file in har_files:
+        # Without its own values, the instance would read the shared ones of the class
+        config = RequestConfig()
+        config.headers = None
+        config.cookies = {}
+        config.access_token = None
+        config.proof_token = None
+        config.turnstile_token = None
+        config.arkose_request = None
+        config.arkose_token = None
+        read_har_entries(har_file["data"], config)
+        if config.access_token is None:
+            continue
+        # The sentinel tokens are not bound to an account
+        if RequestConfig.proof_token is None and config.proof_token is not None:
+            RequestConfig.proof_token = config.proof_token
+            RequestConfig.turnstile_token = config.turnstile_token
+        if RequestConfig.arkose_request is None and config.arkose_request is not None:
+            RequestConfig.arkose_request = config.arkose_request
+        headers = OpenaiChat.get_default_headers() if config.headers is None else dict(config.headers)
+        headers["authorization"] = f"Bearer {config.access_token}"
+        if config.cookies:
+            headers["cookie"] = format_cookies(config.cookies)
+        expires = get_jwt_expires(config.access_token)
+        credentials.append(Credential(har_file["path"], {
+            "_headers": headers,
+            "_cookies": dict(config.cookies),
+            "_api_key": config.access_token,
+            "_expires": int(time.time() + 60 * 60 * 4 if expires is None else expires),
+        }, expires, har_file["mtime"]))
+    return credentials
+
+async def refresh_account(credential: Credential) -> tuple[dict, float]:
+    """Get a new access token for an account with its session cookies."""
+    headers = {key: value for key, value in credential.attributes["_headers"].items() if key not in ("authorization", "cookie")}
+    async with StreamSession(impersonate="chrome", headers=headers, cookies=credential.attributes["_cookies"]) as session:
+        async with session.get(f"{OpenaiChat.url}/api/auth/session") as response:
+            await raise_for_status(response)
+            access_token = (await response.json()).get("accessToken")
+    if not access_token:
+        raise MissingAuthError("The session of the account has ended")
+    expires = get_jwt_expires(access_token)
+    return {
+        "_headers": {**credential.attributes["_headers"], "authorization": f"Bearer {access_token}"},
+        "_api_key": access_token,
+        "_expires": int(time.time() + 60 * 60 * 4 if expires is None else expires),
+    }, expires
+
+OpenaiChat.credential_pool = CredentialPool(OpenaiChat.__name__, load_accounts, refresh_account)
+
 def get_cookies(
         urls: list[str]  = None
     ):
@@ -1,29 +1,37 @@
-from .gigachat          import *
+from __future__ import annotations
 
-from .BingCreateImages  import BingCreateImages
-from .Cerebras          import Cerebras
-from .CopilotAccount    import CopilotAccount
-from .DeepInfra         import DeepInfra
-from .DeepInfraImage    import DeepInfraImage
-from .Gemini            import Gemini
-from .GeminiPro         import GeminiPro
-from .GithubCopilot     import GithubCopilot
-from .Groq              import Groq
-from .HuggingChat       import HuggingChat
-from .HuggingFace       import HuggingFace
-from .HuggingFaceAPI    import HuggingFaceAPI
-from .MetaAI            import MetaAI
-from .MetaAIAccount     import MetaAIAccount
-from .MicrosoftDesigner import MicrosoftDesigner
-from .OpenaiAccount     import OpenaiAccount
-from .OpenaiAPI         import OpenaiAPI
-from .OpenaiChat        import OpenaiChat
-from .PerplexityApi     import PerplexityApi
-from .Poe               import Poe
-from .Raycast           import Raycast
-from .Reka              import Reka
-from .Replicate         import Replicate
-from .Theb              import Theb
-from .ThebApi           import ThebApi
-from .WhiteRabbitNeo    import WhiteRabbitNeo
-from .xAI               import xAI
\ No newline at end of file
+from ...providers.registry import make_lazy
+
+# The module of every provider, imported on first use
+__manifest__: dict[str, str] = {
+    "BingCreateImages":  ".BingCreateImages",
+    "Cerebras":          ".Cerebras",
+    "CopilotAccount":    ".CopilotAccount",
+    "DeepInfra":         ".DeepInfra",
+    "DeepInfraImage":    ".DeepInfraImage",
+    "Gemini":            ".Gemini",
+    "GeminiPro":         ".GeminiPro",
+    "GigaChat":          ".gigachat.GigaChat",
+    "GithubCopilot":     ".GithubCopilot",
+    "Groq":              ".Groq",
+    "HuggingChat":       ".HuggingChat",
+    "HuggingFace":       ".HuggingFace",
+    "HuggingFaceAPI":    ".HuggingFaceAPI",
+    "MetaAI":            ".MetaAI",
+    "MetaAIAccount":     ".MetaAIAccount",
+    "MicrosoftDesigner": ".MicrosoftDesigner",
+    "OpenaiAccount":     ".OpenaiAccount",
+    "OpenaiAPI":         ".OpenaiAPI",
+    "OpenaiChat":        ".OpenaiChat",
+    "PerplexityApi":     ".PerplexityApi",
+    "Poe":               ".Poe",
+    "Raycast":           ".Raycast",
+    "Reka":              ".Reka",
+    "Replicate":         ".Replicate",
+    "Theb":              ".Theb",
+    "ThebApi":           ".ThebApi",
+    "WhiteRabbitNeo":    ".WhiteRabbitNeo",
+    "xAI":               ".xAI",
+}
+__all__: list[str] = list(__manifest__)
+__registry__ = make_lazy(__name__, __manifest__)
@@ -1,17 +1,26 @@
-from .AI365VIP          import AI365VIP
-from .AIChatFree        import AIChatFree
-from .AiChatOnline      import AiChatOnline
-from .AiChats           import AiChats
-from .AIUncensored      import AIUncensored
-from .Aura              import Aura
-from .Chatgpt4o         import Chatgpt4o
-from .Chatgpt4Online    import Chatgpt4Online
-from .ChatgptFree       import ChatgptFree
-from .FlowGpt           import FlowGpt
-from .FreeNetfly        import FreeNetfly
-from .GPROChat          import GPROChat
-from .Koala             import Koala
-from .MagickPen         import MagickPen
-from .MyShell           import MyShell
-from .RobocodersAPI     import RobocodersAPI
-from .Upstage           import Upstage
+from __future__ import annotations
+
+from ...providers.registry import make_lazy
+
+# The module of every provider, imported on first use
+__manifest__: dict[str, str] = {
+    "AI365VIP":       ".AI365VIP",
+    "AIChatFree":     ".AIChatFree",
+    "AiChatOnline":   ".AiChatOnline",
+    "AiChats":        ".AiChats",
+    "AIUncensored":   ".AIUncensored",
+    "Aura":           ".Aura",
+    "Chatgpt4o":      ".Chatgpt4o",
+    "Chatgpt4Online": ".Chatgpt4Online",
+    "ChatgptFree":    ".ChatgptFree",
+    "FlowGpt":        ".FlowGpt",
+    "FreeNetfly":     ".FreeNetfly",
+    "GPROChat":       ".GPROChat",
+    "Koala":          ".Koala",
+    "MagickPen":      ".MagickPen",
+    "MyShell":        ".MyShell",
+    "RobocodersAPI":  ".RobocodersAPI",
+    "Upstage":        ".Upstage",
+}
+__all__: list[str] = list(__manifest__)
+__registry__ = make_lazy(__name__, __manifest__)
@@ -13,6 +13,7 @@ from copy import deepcopy
 from .crypt import decrypt, encrypt
 from ...requests import StreamSession
 from ...cookies import get_cookies_dir
+from ...har_index import har_index
 from ...errors import NoValidHarFileError
 from ... import debug
 
@@ -43,54 +44,47 @@ class arkReq:
         self.arkCookies = arkCookies
         self.userAgent = userAgent
 
-def get_har_files():
+def get_har_files() -> list[dict]:
     if not os.access(get_cookies_dir(), os.R_OK):
         raise NoValidHarFileError("har_and_cookies dir is not readable")
-    harPath = []
-    for root, _, files in os.walk(get_cookies_dir()):
-        for file in files:
-            if file.endswith(".har"):
-                harPath.append(os.path.join(root, file))
-    if not harPath:
+    harFiles = har_index.get_har_files(get_cookies_dir())
+    if not harFiles:
         raise NoValidHarFileError("No .har file found")
-    harPath.sort(key=lambda x: os.path.getmtime(x))
-    return harPath
+    return harFiles
 
 def readHAR():
-    for path in get_har_files():
-        with open(path, 'rb') as file:
-            try:
-                harFile = json.loads(file.read())
-            except json.JSONDecodeError:
-                # Error: not a HAR file!
-                continue
-            for v in harFile['log']['entries']:
-                v_headers = get_headers(v)
-                if arkose_url == v['request']['url']:
-                    RequestConfig.arkose_request = parseHAREntry(v)
-                elif v['request']['url'].startswith(start_url):
-                    try:
-                        match = re.search(r'"accessToken":"(.*?)"', v["response"]["content"]["text"])
-                        if match:
-                            RequestConfig.access_token = match.group(1)
-                    except KeyError:
-                        pass
-                    try:
-                        if "openai-sentinel-proof-token" in v_headers:
-                            RequestConfig.headers = v_headers
-                            RequestConfig.proof_token = json.loads(base64.b64decode(
-                                v_headers["openai-sentinel-proof-token"].split("gAAAAAB", 1)[-1].encode()
-                            ).decode())
-                        if "openai-sentinel-turnstile-token" in v_headers:
-                            RequestConfig.turnstile_token = v_headers["openai-sentinel-turnstile-token"]
-                        if "authorization" in v_headers:
-                            RequestConfig.access_token = v_headers["authorization"].split(" ")[1]
-                        RequestConfig.cookies = {c['name']: c['value'] for c in v['request']['cookies']}
-                    except Exception as e:
-                        debug.log(f"Error on read headers: {e}")
+    for harFile in get_har_files():
+        read_har_entries(harFile["data"], RequestConfig)
     if RequestConfig.proof_token is None:
         raise NoValidHarFileError("No proof_token found in .har files")
 
+def read_har_entries(entries: list[dict], config: RequestConfig) -> None:
+    """Read the tokens, headers and cookies of the entries of one .har file into ``config``."""
+    for v in entries:
+        v_headers = get_headers(v)
+        if arkose_url == v['request']['url']:
+            config.arkose_request = parseHAREntry(v)
+        elif v['request']['url'].startswith(start_url):
+            try:
+                match = re.search(r'"accessToken":"(.*?)"', v["response"]["content"]["text"])
+                if match:
+                    config.access_token = match.group(1)
+            except KeyError:
+                pass
+            try:
+                if "openai-sentinel-proof-token" in v_headers:
+                    config.headers = v_headers
+                    config.proof_token = json.loads(base64.b64decode(
+                        v_headers["openai-sentinel-proof-token"].split("gAAAAAB", 1)[-1].encode()
+                    ).decode())
+                if "openai-sentinel-turnstile-token" in v_headers:
+                    config.turnstile_token = v_headers["openai-sentinel-turnstile-token"]
+                if "authorization" in v_headers:
+                    config.access_token = v_headers["authorization"].split(" ")[1]
+                config.cookies = {c['name']: c['value'] for c in v['request']['cookies']}
+            except Exception as e:
+                debug.log(f"Error on read headers: {e}")
+
 def get_headers(entry) -> dict:
     return {h['name'].lower(): h['value'] for h in entry['request']['headers'] if h['name'].lower() not in ['content-length', 'cookie'] and not h['name'].startswith(':')}
 
@@ -1,4 +1,3 @@
-import hashlib
 import base64
 import random
 import json
@@ -15,6 +14,7 @@ from datetime import (
 )
 
 from .har_file import RequestConfig
+from .solver import ProofTemplate, solve_range, solve_async
 
 cores       = [16, 24, 32]
 screens     = [3000, 4000, 6000]
@@ -413,34 +413,26 @@ def get_answer_token(seed, diff, config):
     else:
         raise Exception("Failed to solve 'gAAAAAB' challenge")
 
-def generate_answer(seed, diff, config):
-    diff_len            = len(diff)
-    seed_encoded        = seed.encode()
+def get_answer_template(config) -> ProofTemplate:
     p1 = (json.dumps(config[:3], separators=(',', ':'), ensure_ascii=False)[:-1] + ',').encode()
     p2 = (',' + json.dumps(config[4:9], separators=(',', ':'), ensure_ascii=False)[1:-1] + ',').encode()
     p3 = (',' + json.dumps(config[10:], separators=(',', ':'), ensure_ascii=False)[1:]).encode()
+    return ProofTemplate([p1, p2, p3], [0, 1])
+
+def get_answer_fallback(seed) -> str:
+    return 'wQ8Lk5FbGpA2NcR9dShT6gYjU7VxZ4D' + base64.b64encode(f'"{seed}"'.encode()).decode()
 
-    target_diff = bytes.fromhex(diff)
-
-    for i in range(maxAttempts):
-        d1   = str(i).encode()
-        d2   = str(i >> 1).encode()
-        
-        string = (
-            p1 
-            + d1 
-            + p2 
-            + d2 
-            + p3
-        )
-        
-        base_encode = base64.b64encode(string)
-        hash_value  = hashlib.new("sha3_512", seed_encoded + base_encode).digest()
-        
-        if hash_value[:diff_len] <= target_diff:
-            return base_encode.decode(), True
-
-    return 'wQ8Lk5FbGpA2NcR9dShT6gYjU7VxZ4D' + base64.b64encode(f'"{seed}"'.encode()).decode(), False
+def generate_answer(seed, diff, config):
+    result = solve_range(seed, get_answer_template(config), bytes.fromhex(diff), len(diff), 0, maxAttempts)
+    if result is not None:
+        return result[1], True
+    return get_answer_fallback(seed), False
+
+async def generate_answer_async(seed, diff, config):
+    result = await solve_async(seed, get_answer_template(config), bytes.fromhex(diff), len(diff), maxAttempts)
+    if result is not None:
+        return result[1], True
+    return get_answer_fallback(seed), False
 
 def get_requirements_token(config):
     require, solved = generate_answer(format(random.random()), "0fffff", config)
@@ -449,6 +441,14 @@ def get_requirements_token(config):
         return 'gAAAAAC' + require
     else:
         raise Exception("Failed to solve 'gAAAAAC' challenge")
+
+async def get_requirements_token_async(config):
+    require, solved = await generate_answer_async(format(random.random()), "0fffff", config)
+
+    if solved:
+        return 'gAAAAAC' + require
+    else:
+        raise Exception("Failed to solve 'gAAAAAC' challenge")
     
     
 ### processing turnstile token
@@ -1,38 +1,76 @@
+from __future__ import annotations
+
 import random
-import hashlib
 import json
 import base64
 from datetime import datetime, timezone
 
+from .solver import ProofTemplate, solve_range, solve_async
+
+MAX_ATTEMPTS = 100000
+
+def get_proof_config(user_agent: str = None) -> list:
+    screen = random.choice([3008, 4010, 6000]) * random.choice([1, 2, 4])
+    # Get current UTC time
+    now_utc = datetime.now(timezone.utc)
+    parse_time = now_utc.strftime('%a, %d %b %Y %H:%M:%S GMT')
+    return [
+        screen, parse_time,
+        None, 0, user_agent,
+        "https://tcr9i.chat.openai.com/v2/35536E1E-65B4-4D96-9D97-6ADB7EFF8147/api.js",
+        "dpl=1440a687921de39ff5ee56b92807faaadce73f13","en","en-US",
+        None,
+        "plugins−[object PluginArray]",
+        random.choice(["_reactListeningcfilawjnerp", "_reactListening9ne2dfo1i47", "_reactListening410nzwhan2a"]),
+        random.choice(["alert", "ontransitionend", "onprogress"])
+    ]
+
+def get_proof_challenge(proof_token: list, difficulty: str) -> tuple[ProofTemplate, bytes]:
+    """
+    Build the solver template and target for ``json.dumps(proof_token)`` with the nonce at index 3.
+
+    ``hash.hex()[:n] <= difficulty`` is compared on the raw digest instead.
+    An odd length difficulty is padded with "f", which accepts the same hashes.
+    """
+    template = ProofTemplate([
+        (json.dumps(proof_token[:3])[:-1] + ", ").encode(),
+        (", " + json.dumps(proof_token[4:])[1:]).encode()
+    ], [0])
+    difficulty = difficulty.lower()
+    if len(difficulty) % 2:
+        difficulty += "f"
+    return template, bytes.fromhex(difficulty)
+
+def get_proof_fallback(seed: str) -> str:
+    fallback_base = base64.b64encode(f'"{seed}"'.encode()).decode()
+    return "gAAAAABwQ8Lk5FbGpA2NcR9dShT6gYjU7VxZ4D" + fallback_base
+
 def generate_proof_token(required: bool, seed: str = "", difficulty: str = "", user_agent: str = None, proof_token: str = None):
     if not required:
         return
 
     if proof_token is None:
-        screen = random.choice([3008, 4010, 6000]) * random.choice([1, 2, 4])
-        # Get current UTC time
-        now_utc = datetime.now(timezone.utc)
-        parse_time = now_utc.strftime('%a, %d %b %Y %H:%M:%S GMT')
-        proof_token = [
-            screen, parse_time,
-            None, 0, user_agent,
-            "https://tcr9i.chat.openai.com/v2/35536E1E-65B4-4D96-9D97-6ADB7EFF8147/api.js",
-            "dpl=1440a687921de39ff5ee56b92807faaadce73f13","en","en-US",
-            None,
-            "plugins−[object PluginArray]",
-            random.choice(["_reactListeningcfilawjnerp", "_reactListening9ne2dfo1i47", "_reactListening410nzwhan2a"]),
-            random.choice(["alert", "ontransitionend", "onprogress"])
-        ]
-
-    diff_len = len(difficulty)
-    for i in range(100000):
-        proof_token[3] = i
-        json_data = json.dumps(proof_token)
-        base = base64.b64encode(json_data.encode()).decode()
-        hash_value = hashlib.sha3_512((seed + base).encode()).digest()
-
-        if hash_value.hex()[:diff_len] <= difficulty:
-            return "gAAAAAB" + base
+        proof_token = get_proof_config(user_agent)
 
-    fallback_base = base64.b64encode(f'"{seed}"'.encode()).decode()
-    return "gAAAAABwQ8Lk5FbGpA2NcR9dShT6gYjU7VxZ4D" + fallback_base
+    template, target = get_proof_challenge(proof_token, difficulty)
+    result = solve_range(seed, template, target, len(target), 0, MAX_ATTEMPTS)
+    if result is not None:
+        proof_token[3] = result[0]
+        return "gAAAAAB" + result[1]
+
+    return get_proof_fallback(seed)
+
+async def generate_proof_token_async(required: bool, seed: str = "", difficulty: str = "", user_agent: str = None, proof_token: str = None):
+    if not required:
+        return
+
+    if proof_token is None:
+        proof_token = get_proof_config(user_agent)
+
+    template, target = get_proof_challenge(proof_token, difficulty)
+    result = await solve_async(seed, template, target, len(target), MAX_ATTEMPTS)
+    if result is not None:
+        proof_token[3] = result[0]
+        return "gAAAAAB" + result[1]
+
+    return get_proof_fallback(seed)
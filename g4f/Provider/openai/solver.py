@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import os
+import base64
+import asyncio
+import hashlib
+import binascii
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Optional
+
+from ... import debug
+
+DEFAULT_CHUNK_SIZE = 20000
+
+_executor: Optional[Executor] = None
+
+class ProofTemplate:
+    """
+    Pre-encoded form of a proof-of-work payload.
+
+    The payload is ``parts[0] + str(i >> shifts[0]) + parts[1] + ... + parts[-1]``
+    for the nonce ``i``. The base64 of the 3-byte aligned head of ``parts[0]``
+    and of the aligned tail of ``parts[-1]`` never change, so they are encoded
+    once and only the bytes around the nonce are encoded per attempt.
+
+    Attributes:
+        prefix (bytes): Base64 of the aligned head of the first part.
+        payload (bytes): Format string for the raw bytes around the nonce slots.
+        shifts (list[int]): Right shift applied to the nonce for each slot.
+        suffix_heads (list[bytes]): Raw bytes of the last part needed to
+            complete a 3-byte group, indexed by the payload length mod 3.
+        suffix_tails (list[bytes]): Base64 of the rest of the last part, same index.
+    """
+
+    def __init__(self, parts: list[bytes], shifts: list[int]) -> None:
+        if len(parts) != len(shifts) + 1:
+            raise ValueError("Expected one more part than nonce slots")
+        first, last = parts[0], parts[-1]
+        aligned = len(first) - len(first) % 3
+        self.prefix = base64.b64encode(first[:aligned])
+        self.payload = b"%d".join([part.replace(b"%", b"%%") for part in [first[aligned:], *parts[1:-1], b""]])
+        self.shifts = shifts
+        self.suffix_heads = []
+        self.suffix_tails = []
+        for remainder in range(3):
+            fill = (3 - remainder) % 3
+            self.suffix_heads.append(last[:fill])
+            self.suffix_tails.append(base64.b64encode(last[fill:]))
+
+    def get_args(self, nonce: int) -> tuple[int, ...]:
+        return tuple([nonce >> shift for shift in self.shifts])
+
+    def encode(self, nonce: int) -> bytes:
+        """Return the full base64 payload for a nonce."""
+        data = self.payload % self.get_args(nonce)
+        remainder = len(data) % 3
+        return self.prefix + base64.b64encode(data + self.suffix_heads[remainder]) + self.suffix_tails[remainder]
+
+def solve_range(
+    seed: str,
+    template: ProofTemplate,
+    target: bytes,
+    check_length: int,
+    start: int,
+    stop: int
+) -> Optional[tuple[int, str]]:
+    """
+    Search the nonces in ``range(start, stop)`` for a sha3_512 digest of
+    ``seed + base64(payload)`` whose first ``check_length`` bytes are <= ``target``.
+
+    Returns:
+        Optional[tuple[int, str]]: The nonce and the base64 payload, or None.
+    """
+    state = hashlib.sha3_512(seed.encode() + template.prefix)
+    payload = template.payload
+    suffix_heads = template.suffix_heads
+    suffix_tails = template.suffix_tails
+    b2a_base64 = binascii.b2a_base64
+    # The loop is hot, so the common one and two slot layouts avoid building a tuple
+    slots = len(template.shifts)
+    first = template.shifts[0] if slots else 0
+    second = template.shifts[1] if slots > 1 else 0
+    for nonce in range(start, stop):
+        if slots == 1:
+            data = payload % (nonce >> first)
+        elif slots == 2:
+            data = payload % (nonce >> first, nonce >> second)
+        else:
+            data = payload % template.get_args(nonce)
+        remainder = len(data) % 3
+        middle = b2a_base64(data + suffix_heads[remainder], newline=False)
+        hash_value = state.copy()
+        hash_value.update(middle)
+        hash_value.update(suffix_tails[remainder])
+        if hash_value.digest()[:check_length] <= target:
+            return nonce, template.encode(nonce).decode()
+    return None
+
+def get_executor() -> Executor:
+    """Return the process pool shared by all proof-of-work solvers."""
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=os.cpu_count())
+    return _executor
+
+async def solve_async(
+    seed: str,
+    template: ProofTemplate,
+    target: bytes,
+    check_length: int,
+    max_attempts: int,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    executor: Executor = None
+) -> Optional[tuple[int, str]]:
+    """
+    Solve a challenge in a process pool without blocking the event loop.
+
+    The nonce space is split into chunks of ``chunk_size``. One chunk per
+    worker is in flight at a time and pending chunks are cancelled as soon
+    as a solution is found.
+    """
+    loop = asyncio.get_running_loop()
+    if executor is None:
+        try:
+            executor = get_executor()
+        except (OSError, NotImplementedError) as e:
+            debug.log(f"Proof of work: Process pool unavailable: {e.__class__.__name__}: {e}")
+            return await loop.run_in_executor(
+                None, solve_range, seed, template, target, check_length, 0, max_attempts
+            )
+    workers = getattr(executor, "_max_workers", None) or os.cpu_count() or 1
+    starts = iter(range(0, max_attempts, chunk_size))
+    pending = set()
+    def submit() -> None:
+        start = next(starts, None)
+        if start is not None:
+            pending.add(loop.run_in_executor(
+                executor, solve_range, seed, template, target, check_length,
+                start, min(start + chunk_size, max_attempts)
+            ))
+    for _ in range(workers):
+        submit()
+    try:
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                pending.discard(future)
+                result = future.result()
+                if result is not None:
+                    return result
+                submit()
+    finally:
+        for future in pending:
+            future.cancel()
+    return None
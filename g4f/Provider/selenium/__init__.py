@@ -1,3 +1,12 @@
-from .PerplexityAi import PerplexityAi
-from .Phind import Phind
-from .TalkAi import TalkAi
+from __future__ import annotations
+
+from ...providers.registry import make_lazy
+
+# The module of every provider, imported on first use
+__manifest__: dict[str, str] = {
+    "PerplexityAi": ".PerplexityAi",
+    "Phind":        ".Phind",
+    "TalkAi":       ".TalkAi",
+}
+__all__: list[str] = list(__manifest__)
+__registry__ = make_lazy(__name__, __manifest__)
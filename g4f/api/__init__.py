@@ -2,13 +2,14 @@ from __future__ import annotations
 
 import logging
 import json
+import asyncio
 import uvicorn
 import secrets
 import os
 import shutil
 
 import os.path
-from fastapi import FastAPI, Response, Request, UploadFile, Depends
+from fastapi import FastAPI, Response, Request, UploadFile, Depends, Form
 from fastapi.middleware.wsgi import WSGIMiddleware
 from fastapi.responses import StreamingResponse, RedirectResponse, HTMLResponse, JSONResponse
 from fastapi.exceptions import RequestValidationError
@@ -26,7 +27,7 @@ from fastapi.encoders import jsonable_encoder
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials, HTTPBasic
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.responses import FileResponse
-from typing import Union, Optional, List
+from typing import Union, Optional, List, Dict, Any
 try:
     from typing import Annotated
 except ImportError:
@@ -37,8 +38,17 @@ import g4f
 import g4f.debug
 from g4f.client import AsyncClient, ChatCompletion, ImagesResponse, convert_to_provider
 from g4f.providers.response import BaseConversation
+from g4f.providers.scoreboard import scoreboard
+from g4f.providers.sync_pool import sync_provider_pool
+from g4f.providers.credential_pool import credential_pools
+from g4f.providers.job_poller import job_poller
+from g4f.providers.conversation_store import ConversationStore, conversation_store
 from g4f.client.helper import filter_none
-from g4f.image import is_accepted_format, is_data_uri_an_image, images_dir
+from g4f.client.sse import iter_sse
+from g4f.client.response_cache import get_response_cache
+from g4f.client.batch import provider_limiter
+from g4f.image import is_data_uri_an_image
+from g4f.image_store import image_store, parse_range, read_range, IMAGE_MAX_AGE
 from g4f.errors import ProviderNotFoundError, ModelNotFoundError, MissingAuthError, NoValidHarFileError
 from g4f.cookies import read_cookie_files, get_cookies_dir
 from g4f.Provider import ProviderType, ProviderUtils, __providers__
@@ -47,8 +57,10 @@ from .stubs import (
     ChatCompletionsConfig, ImageGenerationConfig,
     ProviderResponseModel, ModelResponseModel,
     ErrorResponseModel, ProviderResponseDetailModel,
-    FileResponseModel
+    FileResponseModel, ProviderHealthModel,
+    BatchCreateConfig, FileObjectModel, BatchResponseModel
 )
+from .batches import BatchManager, ENDPOINTS
 
 logger = logging.getLogger(__name__)
 
@@ -74,6 +86,9 @@ def create_app():
  
     if AppConfig.gui:
         gui_app = WSGIMiddleware(get_gui_app())
+        # Serve the backend api of the gui on this event loop, before falling back to flask
+        from g4f.gui.server.async_backend import AsyncBackend_Api
+        AsyncBackend_Api(app).register_routes()
         app.mount("/", gui_app)
 
     # Read cookie files if not ignored
@@ -130,9 +145,15 @@ class AppConfig:
 class Api:
     def __init__(self, app: FastAPI) -> None:
         self.app = app
-        self.client = AsyncClient()
+        self.client = AsyncClient(response_cache=get_response_cache())
         self.get_g4f_api_key = APIKeyHeader(name="g4f-api-key")
-        self.conversations: dict[str, dict[str, BaseConversation]] = {}
+        self.conversations: ConversationStore = conversation_store
+        self.batches = BatchManager(self.client, defaults=filter_none(
+            model=AppConfig.model,
+            provider=AppConfig.provider,
+            proxy=AppConfig.proxy,
+            ignored=AppConfig.ignored_providers
+        ))
 
     security = HTTPBearer(auto_error=False)
     basic_security = HTTPBasic()
@@ -261,9 +282,7 @@ class Api:
                 conversation = return_conversation = None
                 if config.conversation_id is not None and config.provider is not None:
                     return_conversation = True
-                    if config.conversation_id in self.conversations:
-                        if config.provider in self.conversations[config.conversation_id]:
-                            conversation = self.conversations[config.conversation_id][config.provider]
+                    conversation = self.conversations.get(config.provider, config.conversation_id)
 
                 if config.image is not None:
                     try:
@@ -301,14 +320,12 @@ class Api:
 
                 async def streaming():
                     try:
-                        async for chunk in response:
+                        async for chunk in iter_sse(response):
                             if isinstance(chunk, BaseConversation):
                                 if config.conversation_id is not None and config.provider is not None:
-                                    if config.conversation_id not in self.conversations:
-                                        self.conversations[config.conversation_id] = {}
-                                    self.conversations[config.conversation_id][config.provider] = chunk
+                                    self.conversations.set(config.provider, config.conversation_id, chunk)
                             else:
-                                yield f"data: {chunk.json()}\n\n"
+                                yield chunk
                     except GeneratorExit:
                         pass
                     except Exception as e:
@@ -390,6 +407,8 @@ class Api:
             provider: ProviderType = ProviderUtils.convert[provider]
             def safe_get_models(provider: ProviderType) -> list[str]:
                 try:
+                    if hasattr(provider, "get_cached_models"):
+                        return provider.get_cached_models()
                     return provider.get_models() if hasattr(provider, "get_models") else []
                 except:
                     return []
@@ -405,6 +424,130 @@ class Api:
                 'params': [*provider.get_parameters()] if hasattr(provider, "get_parameters") else []
             }
 
+        @self.app.get("/v1/scoreboard", responses={
+            HTTP_200_OK: {"model": Dict[str, Dict[str, ProviderHealthModel]]},
+        })
+        async def get_scoreboard():
+            return scoreboard.to_dict()
+
+        @self.app.get("/v1/sync_pool", responses={
+            HTTP_200_OK: {"model": Dict[str, Dict[str, int]]},
+        })
+        async def get_sync_pool():
+            return sync_provider_pool.get_metrics()
+
+        @self.app.get("/v1/credentials", responses={
+            HTTP_200_OK: {"model": Dict[str, Dict[str, Dict[str, Any]]]},
+        })
+        async def get_credentials():
+            return {name: pool.get_metrics() for name, pool in credential_pools.items() if pool}
+
+        @self.app.get("/v1/job_poller", responses={
+            HTTP_200_OK: {"model": Dict[str, Dict[str, Optional[float]]]},
+        })
+        async def get_job_poller():
+            return job_poller.get_metrics()
+
+        @self.app.get("/v1/conversations/metrics", responses={
+            HTTP_200_OK: {"model": Dict[str, Optional[float]]},
+        })
+        async def get_conversations_metrics():
+            return self.conversations.get_metrics()
+
+        @self.app.get("/v1/response_cache", responses={
+            HTTP_200_OK: {"model": Dict[str, Optional[float]]},
+        })
+        async def get_response_cache_metrics():
+            if self.client.response_cache is None:
+                return {}
+            return self.client.response_cache.get_metrics()
+
+        @self.app.get("/v1/batch_limiter", responses={
+            HTTP_200_OK: {"model": Dict[str, Dict[str, int]]},
+        })
+        async def get_batch_limiter():
+            return provider_limiter.get_metrics()
+
+        # Batches that were running before a restart continue
+        self.app.router.on_startup.append(self.batches.resume)
+
+        @self.app.post("/v1/files", responses={
+            HTTP_200_OK: {"model": FileObjectModel},
+        })
+        def upload_file(file: UploadFile, purpose: str = Form("batch")):
+            try:
+                return self.batches.store.create_file(os.path.basename(file.filename), purpose, file.file)
+            finally:
+                file.file.close()
+
+        @self.app.get("/v1/files/{file_id}", responses={
+            HTTP_200_OK: {"model": FileObjectModel},
+            HTTP_404_NOT_FOUND: {"model": ErrorResponseModel},
+        })
+        async def get_file(file_id: str):
+            file = self.batches.store.get_file(file_id)
+            if file is None:
+                return ErrorResponse.from_message("The file does not exist.", HTTP_404_NOT_FOUND)
+            return file
+
+        @self.app.get("/v1/files/{file_id}/content", responses={
+            HTTP_200_OK: {"content": {"application/x-ndjson": {}}},
+            HTTP_404_NOT_FOUND: {"model": ErrorResponseModel},
+        })
+        async def get_file_content(file_id: str):
+            if self.batches.store.get_file(file_id) is None:
+                return ErrorResponse.from_message("The file does not exist.", HTTP_404_NOT_FOUND)
+            return FileResponse(self.batches.store.get_path(file_id, "jsonl"), media_type="application/x-ndjson")
+
+        @self.app.post("/v1/batches", responses={
+            HTTP_200_OK: {"model": BatchResponseModel},
+            HTTP_404_NOT_FOUND: {"model": ErrorResponseModel},
+            HTTP_422_UNPROCESSABLE_ENTITY: {"model": ErrorResponseModel},
+        })
+        async def create_batch(config: BatchCreateConfig):
+            if config.endpoint not in ENDPOINTS:
+                return ErrorResponse.from_message(f"Unsupported endpoint: {config.endpoint}", HTTP_422_UNPROCESSABLE_ENTITY)
+            if self.batches.store.get_file(config.input_file_id) is None:
+                return ErrorResponse.from_message("The input file does not exist.", HTTP_404_NOT_FOUND)
+            batch = self.batches.store.create_batch(config.input_file_id, config.endpoint, config.completion_window, config.metadata)
+            self.batches.start(batch["id"])
+            return batch
+
+        @self.app.get("/v1/batches", responses={
+            HTTP_200_OK: {"model": Dict[str, Union[str, bool, List[BatchResponseModel]]]},
+        })
+        async def list_batches():
+            return {"object": "list", "data": self.batches.store.list_batches(), "has_more": False}
+
+        @self.app.get("/v1/batches/{batch_id}", responses={
+            HTTP_200_OK: {"model": BatchResponseModel},
+            HTTP_404_NOT_FOUND: {"model": ErrorResponseModel},
+        })
+        async def get_batch(batch_id: str):
+            batch = self.batches.store.get_batch(batch_id)
+            if batch is None:
+                return ErrorResponse.from_message("The batch does not exist.", HTTP_404_NOT_FOUND)
+            return batch
+
+        @self.app.post("/v1/batches/{batch_id}/cancel", responses={
+            HTTP_200_OK: {"model": BatchResponseModel},
+            HTTP_404_NOT_FOUND: {"model": ErrorResponseModel},
+        })
+        async def cancel_batch(batch_id: str):
+            batch = await self.batches.cancel(batch_id)
+            if batch is None:
+                return ErrorResponse.from_message("The batch does not exist.", HTTP_404_NOT_FOUND)
+            return batch
+
+        @self.app.get("/v1/batches/{batch_id}/results", responses={
+            HTTP_200_OK: {"content": {"application/x-ndjson": {}}},
+            HTTP_404_NOT_FOUND: {"model": ErrorResponseModel},
+        })
+        async def stream_batch_results(batch_id: str):
+            if self.batches.store.get_batch(batch_id) is None:
+                return ErrorResponse.from_message("The batch does not exist.", HTTP_404_NOT_FOUND)
+            return StreamingResponse(self.batches.iter_results(batch_id), media_type="application/x-ndjson")
+
         @self.app.post("/v1/upload_cookies", responses={
             HTTP_200_OK: {"model": List[FileResponseModel]},
         })
@@ -445,16 +588,35 @@ class Api:
             HTTP_200_OK: {"content": {"image/*": {}}},
             HTTP_404_NOT_FOUND: {}
         })
-        async def get_image(filename):
-            target = os.path.join(images_dir, filename)
-
-            if not os.path.isfile(target):
+        async def get_image(filename, request: Request):
+            # The index is read and updated with SQLite, not on the event loop
+            entry = await asyncio.get_running_loop().run_in_executor(None, image_store.get, filename)
+            if entry is None:
                 return Response(status_code=404)
-
-            with open(target, "rb") as f:
-                content_type = is_accepted_format(f.read(12))
-
-            return FileResponse(target, media_type=content_type)
+            headers = {
+                "ETag": entry.etag,
+                "Cache-Control": f"public, max-age={IMAGE_MAX_AGE}, immutable",
+                "Accept-Ranges": "bytes",
+            }
+            if entry.etag in request.headers.get("if-none-match", ""):
+                return Response(status_code=304, headers=headers)
+            range_header = request.headers.get("range")
+            if range_header is not None:
+                try:
+                    byte_range = parse_range(range_header, entry.size)
+                except ValueError:
+                    return Response(status_code=416, headers={"Content-Range": f"bytes */{entry.size}"})
+                if byte_range is not None:
+                    start, end = byte_range
+                    headers["Content-Range"] = f"bytes {start}-{end}/{entry.size}"
+                    return StreamingResponse(
+                        read_range(entry.path, start, end),
+                        status_code=206,
+                        headers=headers,
+                        media_type=entry.mime_type
+                    )
+            # Served with sendfile by servers that support it
+            return FileResponse(entry.path, media_type=entry.mime_type, headers=headers)
 
 def format_exception(e: Union[Exception, str], config: Union[ChatCompletionsConfig, ImageGenerationConfig] = None, image: bool = False) -> str:
     last_provider = {} if not image else g4f.get_last_provider(True)
@@ -0,0 +1,350 @@
+from __future__ import annotations
+
+import os
+import re
+import json
+import time
+import uuid
+import shutil
+import asyncio
+import itertools
+from typing import AsyncIterator, BinaryIO, Iterator, Optional
+
+from pydantic import ValidationError
+
+from ..client import AsyncClient
+from ..client.sse import dumps
+from ..client.batch import MAX_CONCURRENCY
+from ..providers.asyncio import safe_aclose
+from ..cookies import get_cache_dir
+from .. import debug
+from .stubs import ChatCompletionsConfig
+
+# Directory of the uploaded files and batches, by default in the user cache
+BATCHES_DIR = os.environ.get("G4F_BATCHES_DIR")
+ENDPOINTS = ("/v1/chat/completions",)
+ID_PATTERN = re.compile(r"^(file-|batch_)[0-9a-f]{32}$")
+# Seconds between writes of the counts of a running batch
+SAVE_INTERVAL = 1
+FINAL_STATUS = ("completed", "failed", "cancelled")
+
+def get_batches_dir() -> str:
+    if BATCHES_DIR:
+        return BATCHES_DIR
+    return os.path.join(get_cache_dir(), "batches")
+
+def new_id(prefix: str) -> str:
+    return f"{prefix}{uuid.uuid4().hex}"
+
+def write_json(path: str, data: dict) -> None:
+    temp = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(temp, "w") as file:
+        json.dump(data, file)
+    os.replace(temp, path)
+
+def read_custom_ids(path: str) -> set[str]:
+    """The custom ids of the results in a file, to resume a batch after them."""
+    custom_ids = set()
+    if not os.path.exists(path):
+        return custom_ids
+    with open(path) as file:
+        for line in file:
+            try:
+                custom_ids.add(json.loads(line)["custom_id"])
+            except (ValueError, KeyError, TypeError):
+                # A line that was cut off by a crash
+                continue
+    return custom_ids
+
+def count_lines(path: str) -> int:
+    with open(path) as file:
+        return sum(1 for line in file if line.strip())
+
+def format_result(custom_id: str, response: Optional[dict] = None, error: Optional[Exception] = None) -> str:
+    return dumps({
+        "id": new_id("batch_req_"),
+        "custom_id": custom_id,
+        "response": None if response is None else {
+            "status_code": 200,
+            "request_id": response.get("id"),
+            "body": response,
+        },
+        "error": None if error is None else {
+            "code": error.__class__.__name__,
+            "message": str(error),
+        },
+    }) + "\n"
+
+class BatchStore:
+    """
+    Uploaded files and batch jobs in a directory.
+
+    A file is stored as ``<id>.jsonl`` with its metadata in ``<id>.json``,
+    a batch as ``<id>.json``. Metadata is replaced atomically, the results
+    of a batch are appended to its output and error files as they finish.
+    """
+
+    def __init__(self, root: Optional[str] = None) -> None:
+        self.root = get_batches_dir() if root is None else root
+
+    def get_path(self, object_id: str, extension: str = "json") -> str:
+        if not ID_PATTERN.match(object_id):
+            raise ValueError(f"Invalid id: {object_id}")
+        return os.path.join(self.root, f"{object_id}.{extension}")
+
+    def get(self, object_id: str) -> Optional[dict]:
+        try:
+            with open(self.get_path(object_id)) as file:
+                return json.load(file)
+        except (ValueError, OSError):
+            return None
+
+    def save(self, data: dict) -> None:
+        os.makedirs(self.root, exist_ok=True)
+        write_json(self.get_path(data["id"]), data)
+
+    def create_file(self, filename: str, purpose: str, source: Optional[BinaryIO] = None) -> dict:
+        """Store an uploaded file, or create an empty one for results."""
+        os.makedirs(self.root, exist_ok=True)
+        file_id = new_id("file-")
+        path = self.get_path(file_id, "jsonl")
+        with open(path, "wb") as file:
+            if source is not None:
+                shutil.copyfileobj(source, file)
+        data = {
+            "id": file_id,
+            "object": "file",
+            "bytes": os.path.getsize(path),
+            "created_at": int(time.time()),
+            "filename": filename,
+            "purpose": purpose,
+        }
+        self.save(data)
+        return data
+
+    def get_file(self, file_id: str) -> Optional[dict]:
+        data = self.get(file_id)
+        if data is None or data.get("object") != "file":
+            return None
+        data["bytes"] = os.path.getsize(self.get_path(file_id, "jsonl"))
+        return data
+
+    def create_batch(self, input_file_id: str, endpoint: str, completion_window: str = "24h", metadata: Optional[dict] = None) -> dict:
+        data = {
+            "id": new_id("batch_"),
+            "object": "batch",
+            "endpoint": endpoint,
+            "errors": None,
+            "input_file_id": input_file_id,
+            "completion_window": completion_window,
+            "status": "validating",
+            "output_file_id": None,
+            "error_file_id": None,
+            "created_at": int(time.time()),
+            "in_progress_at": None,
+            "expires_at": None,
+            "finalizing_at": None,
+            "completed_at": None,
+            "failed_at": None,
+            "expired_at": None,
+            "cancelling_at": None,
+            "cancelled_at": None,
+            "request_counts": {"total": 0, "completed": 0, "failed": 0},
+            "metadata": metadata,
+        }
+        self.save(data)
+        return data
+
+    def get_batch(self, batch_id: str) -> Optional[dict]:
+        data = self.get(batch_id)
+        if data is None or data.get("object") != "batch":
+            return None
+        return data
+
+    def list_batches(self) -> list[dict]:
+        """All batches, the newest first."""
+        if not os.path.isdir(self.root):
+            return []
+        batches = [
+            self.get_batch(filename[:-5]) for filename in os.listdir(self.root)
+            if filename.startswith("batch_") and filename.endswith(".json")
+        ]
+        return sorted([batch for batch in batches if batch is not None], key=lambda batch: batch["created_at"], reverse=True)
+
+class BatchManager:
+    """
+    Runs the batches of a store with the completions of a client.
+
+    The requests of the input file are read line by line and passed to
+    ``create_many``, so a batch of any size only holds the running requests
+    in memory. A batch that was interrupted by a restart is resumed by
+    ``resume`` with the requests that have no result yet.
+    """
+
+    def __init__(
+        self,
+        client: AsyncClient,
+        store: Optional[BatchStore] = None,
+        defaults: Optional[dict] = None,
+        max_concurrency: int = MAX_CONCURRENCY
+    ) -> None:
+        self.client = client
+        self.store = BatchStore() if store is None else store
+        self.defaults = {} if defaults is None else defaults
+        self.max_concurrency = max_concurrency
+        self.tasks: dict[str, asyncio.Task] = {}
+        self.updates: dict[str, asyncio.Condition] = {}
+        self.versions: dict[str, int] = {}
+
+    def start(self, batch_id: str) -> None:
+        if batch_id not in self.tasks:
+            self.tasks[batch_id] = asyncio.get_running_loop().create_task(self.run(batch_id))
+            self.tasks[batch_id].add_done_callback(lambda task: self.tasks.pop(batch_id, None))
+
+    async def resume(self) -> None:
+        """Start the batches that were running when the server stopped."""
+        for batch in await asyncio.get_running_loop().run_in_executor(None, self.store.list_batches):
+            if batch["status"] == "cancelling":
+                batch["status"] = "cancelled"
+                batch["cancelled_at"] = int(time.time())
+                self.store.save(batch)
+            elif batch["status"] not in FINAL_STATUS:
+                debug.log(f"Resume batch: {batch['id']}")
+                self.start(batch["id"])
+
+    async def cancel(self, batch_id: str) -> Optional[dict]:
+        batch = self.store.get_batch(batch_id)
+        if batch is None or batch["status"] in FINAL_STATUS:
+            return batch
+        task = self.tasks.get(batch_id)
+        if task is None:
+            batch["status"] = "cancelled"
+            batch["cancelled_at"] = int(time.time())
+            self.store.save(batch)
+            return batch
+        batch["status"] = "cancelling"
+        batch["cancelling_at"] = int(time.time())
+        self.store.save(batch)
+        task.cancel()
+        return batch
+
+    async def run(self, batch_id: str) -> None:
+        loop = asyncio.get_running_loop()
+        batch = self.store.get_batch(batch_id)
+        try:
+            if batch["output_file_id"] is None:
+                batch["output_file_id"] = self.store.create_file(f"{batch_id}_output.jsonl", "batch_output")["id"]
+                batch["error_file_id"] = self.store.create_file(f"{batch_id}_error.jsonl", "batch_output")["id"]
+            input_path = self.store.get_path(batch["input_file_id"], "jsonl")
+            output_path = self.store.get_path(batch["output_file_id"], "jsonl")
+            error_path = self.store.get_path(batch["error_file_id"], "jsonl")
+            batch["request_counts"]["total"] = await loop.run_in_executor(None, count_lines, input_path)
+            completed = await loop.run_in_executor(None, read_custom_ids, output_path)
+            failed = await loop.run_in_executor(None, read_custom_ids, error_path)
+            batch["request_counts"]["completed"] = len(completed)
+            batch["request_counts"]["failed"] = len(failed)
+            batch["status"] = "in_progress"
+            batch["in_progress_at"] = batch["in_progress_at"] or int(time.time())
+            self.store.save(batch)
+            with open(output_path, "a") as output, open(error_path, "a") as errors:
+                await self.run_requests(batch, input_path, completed | failed, output, errors)
+            batch["status"] = "completed"
+            batch["completed_at"] = int(time.time())
+        except asyncio.CancelledError:
+            batch["status"] = "cancelled"
+            batch["cancelled_at"] = int(time.time())
+            raise
+        except Exception as e:
+            debug.log(f"Batch {batch_id} failed: {e.__class__.__name__}: {e}")
+            batch["status"] = "failed"
+            batch["failed_at"] = int(time.time())
+            batch["errors"] = {"object": "list", "data": [{"code": e.__class__.__name__, "message": str(e)}]}
+        finally:
+            self.store.save(batch)
+            await self.notify(batch_id)
+            # Readers see the final status and stop
+            self.updates.pop(batch_id, None)
+            self.versions.pop(batch_id, None)
+
+    async def run_requests(self, batch: dict, input_path: str, done: set[str], output, errors) -> None:
+        custom_ids: dict[int, str] = {}
+        index = itertools.count()
+        counts = batch["request_counts"]
+
+        def write(file, line: str, count: str) -> None:
+            file.write(line)
+            file.flush()
+            counts[count] += 1
+
+        def iter_requests() -> Iterator[dict]:
+            with open(input_path) as file:
+                for line in file:
+                    if not line.strip():
+                        continue
+                    try:
+                        request = json.loads(line)
+                        custom_id = str(request["custom_id"])
+                    except (ValueError, KeyError, TypeError) as e:
+                        write(errors, format_result(None, error=ValueError(f"Invalid request: {e}")), "failed")
+                        continue
+                    if custom_id in done:
+                        continue
+                    try:
+                        if request.get("url", batch["endpoint"]) != batch["endpoint"]:
+                            raise ValueError(f"The url of a request must be {batch['endpoint']}")
+                        config = ChatCompletionsConfig(**request.get("body", {}))
+                    except (ValueError, TypeError, ValidationError) as e:
+                        write(errors, format_result(custom_id, error=e), "failed")
+                        continue
+                    custom_ids[next(index)] = custom_id
+                    yield {
+                        **self.defaults,
+                        **config.model_dump(exclude_none=True, exclude={"stream", "conversation_id"}),
+                    }
+
+        last_save = time.monotonic()
+        results = self.client.chat.completions.create_many(iter_requests(), max_concurrency=self.max_concurrency)
+        try:
+            async for result in results:
+                custom_id = custom_ids.pop(result.index)
+                if result.error is None:
+                    write(output, format_result(custom_id, result.response.model_dump()), "completed")
+                else:
+                    write(errors, format_result(custom_id, error=result.error), "failed")
+                await self.notify(batch["id"])
+                if time.monotonic() - last_save > SAVE_INTERVAL:
+                    self.store.save(batch)
+                    last_save = time.monotonic()
+        finally:
+            await safe_aclose(results)
+
+    async def notify(self, batch_id: str) -> None:
+        condition = self.updates.get(batch_id)
+        if condition is not None:
+            async with condition:
+                self.versions[batch_id] = self.versions.get(batch_id, 0) + 1
+                condition.notify_all()
+
+    async def iter_results(self, batch_id: str) -> AsyncIterator[str]:
+        """Yield the result lines of a batch as they are written, until the batch is done."""
+        if batch_id not in self.updates:
+            self.updates[batch_id] = asyncio.Condition()
+        condition = self.updates[batch_id]
+        offsets: dict[str, int] = {}
+        while True:
+            # Results written while lines are yielded change the version
+            version = self.versions.get(batch_id)
+            batch = self.store.get_batch(batch_id)
+            finished = batch["status"] in FINAL_STATUS or batch_id not in self.tasks
+            for file_id in (batch["output_file_id"], batch["error_file_id"]):
+                if file_id is None:
+                    continue
+                with open(self.store.get_path(file_id, "jsonl")) as file:
+                    file.seek(offsets.get(file_id, 0))
+                    for line in iter(file.readline, ""):
+                        yield line
+                    offsets[file_id] = file.tell()
+            if finished:
+                return
+            async with condition:
+                await condition.wait_for(lambda: self.versions.get(batch_id) != version)
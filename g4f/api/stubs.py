@@ -60,4 +60,50 @@ class ErrorResponseMessageModel(BaseModel):
     message: str
 
 class FileResponseModel(BaseModel):
-    filename: str
\ No newline at end of file
+    filename: str
+
+class BatchCreateConfig(BaseModel):
+    input_file_id: str
+    endpoint: str = "/v1/chat/completions"
+    completion_window: str = "24h"
+    metadata: Optional[dict[str, str]] = None
+
+class FileObjectModel(BaseModel):
+    id: str
+    object: str = "file"
+    bytes: int
+    created_at: int
+    filename: str
+    purpose: str
+
+class BatchRequestCountsModel(BaseModel):
+    total: int
+    completed: int
+    failed: int
+
+class BatchResponseModel(BaseModel):
+    id: str
+    object: str = "batch"
+    endpoint: str
+    errors: Optional[dict]
+    input_file_id: str
+    completion_window: str
+    status: str
+    output_file_id: Optional[str]
+    error_file_id: Optional[str]
+    created_at: int
+    in_progress_at: Optional[int]
+    completed_at: Optional[int]
+    failed_at: Optional[int]
+    cancelling_at: Optional[int]
+    cancelled_at: Optional[int]
+    request_counts: BatchRequestCountsModel
+    metadata: Optional[dict[str, str]]
+
+class ProviderHealthModel(BaseModel):
+    requests: int
+    success_rate: Optional[float]
+    ttft: Optional[float]
+    expected_latency: Optional[float]
+    errors: dict[str, int]
+    state: str
@@ -7,6 +7,26 @@ from g4f import Provider
 from g4f.gui.run import gui_parser, run_gui_args
 import g4f.cookies
 
+class ProviderChoices:
+    """
+    The names of the working providers, as choices of an argument.
+
+    Checking a name imports only that provider,
+    the list of all of them is only needed for the help of an error.
+    """
+
+    def __init__(self, image: bool = False) -> None:
+        self.image = image
+
+    def is_choice(self, provider) -> bool:
+        return provider.working and (not self.image or hasattr(provider, "image_models"))
+
+    def __contains__(self, name: str) -> bool:
+        return name in Provider.__map__ and self.is_choice(Provider.__map__[name])
+
+    def __iter__(self):
+        return iter([provider.__name__ for provider in Provider.__providers__ if self.is_choice(provider)])
+
 def get_api_parser():
     api_parser = ArgumentParser(description="Run the API and GUI")
     api_parser.add_argument("--bind", default=None, help="The bind string. (Default: 0.0.0.0:1337)")
@@ -14,16 +34,16 @@ def get_api_parser():
     api_parser.add_argument("--debug", "-d", action="store_true", help="Enable verbose logging.")
     api_parser.add_argument("--gui", "-g", default=None, action="store_true", help="Add gui to the api.")
     api_parser.add_argument("--model", default=None, help="Default model for chat completion. (incompatible with --reload and --workers)")
-    api_parser.add_argument("--provider", choices=[provider.__name__ for provider in Provider.__providers__ if provider.working],
+    api_parser.add_argument("--provider", choices=ProviderChoices(), metavar="PROVIDER",
                             default=None, help="Default provider for chat completion. (incompatible with --reload and --workers)")
-    api_parser.add_argument("--image-provider", choices=[provider.__name__ for provider in Provider.__providers__ if provider.working and hasattr(provider, "image_models")],
+    api_parser.add_argument("--image-provider", choices=ProviderChoices(image=True), metavar="PROVIDER",
                             default=None, help="Default provider for image generation. (incompatible with --reload and --workers)"),
     api_parser.add_argument("--proxy", default=None, help="Default used proxy. (incompatible with --reload and --workers)")
     api_parser.add_argument("--workers", type=int, default=None, help="Number of workers.")
     api_parser.add_argument("--disable-colors", action="store_true", help="Don't use colors.")
     api_parser.add_argument("--ignore-cookie-files", action="store_true", help="Don't read .har and cookie files. (incompatible with --reload and --workers)")
     api_parser.add_argument("--g4f-api-key", type=str, default=None, help="Sets an authentication key for your API. (incompatible with --reload and --workers)")
-    api_parser.add_argument("--ignored-providers", nargs="+", choices=[provider.__name__ for provider in Provider.__providers__ if provider.working],
+    api_parser.add_argument("--ignored-providers", nargs="+", choices=ProviderChoices(), metavar="PROVIDER",
                             default=[], help="List of providers to ignore when processing request. (incompatible with --reload and --workers)")
     api_parser.add_argument("--cookie-browsers", nargs="+", choices=[browser.__name__ for browser in g4f.cookies.browsers],
                             default=[], help="List of browsers to access or retrieve cookies from. (incompatible with --reload and --workers)")
@@ -5,22 +5,27 @@ import time
 import random
 import string
 import asyncio
-import base64
-from typing import Union, AsyncIterator, Iterator, Coroutine, Optional
+from functools import partial
+from typing import Union, AsyncIterator, Iterator, Iterable, Coroutine, Optional
 
-from ..image import ImageResponse, copy_images, images_dir
+from ..image import ImageResponse, copy_images
+from ..image_pipeline import read_image_base64
 from ..typing import Messages, ImageType
 from ..providers.types import ProviderType
-from ..providers.response import ResponseType, FinishReason, BaseConversation, SynthesizeData
+from ..providers.response import ResponseType, FinishReason, BaseConversation, SynthesizeData, Rewrite
 from ..errors import NoImageResponseError
+from ..tokenizer import TokenCounter, get_usage, get_encoding_async
 from ..providers.retry_provider import IterListProvider
 from ..providers.asyncio import to_sync_generator, async_generator_to_list
+from ..providers.sync_pool import iter_sync_provider
+from ..providers.context import RequestContext, get_request_context, iter_with_context, async_iter_with_context
 from ..Provider.needs_auth import BingCreateImages, OpenaiAccount
 from .stubs import ChatCompletion, ChatCompletionChunk, Image, ImagesResponse
 from .image_models import ImageModels
 from .types import IterResponse, ImageProvider, Client as BaseClient
 from .service import get_model_and_provider, get_last_provider, convert_to_provider
-from .helper import find_stop, filter_json, filter_none, safe_aclose, to_async_iterator
+from .helper import StopMatcher, apply_rewrite, filter_json, filter_none, safe_aclose, to_async_iterator
+from .batch import BatchRunner, BatchResult, ProviderLimiter, provider_limiter, MAX_CONCURRENCY
 from .. import debug
 
 ChatCompletionResponseType = Iterator[Union[ChatCompletion, ChatCompletionChunk, BaseConversation]]
@@ -41,12 +46,16 @@ def iter_response(
     stream: bool,
     response_format: Optional[dict] = None,
     max_tokens: Optional[int] = None,
-    stop: Optional[list[str]] = None
+    stop: Optional[list[str]] = None,
+    messages: Optional[Messages] = None,
+    model: Optional[str] = None
 ) -> ChatCompletionResponseType:
-    content = ""
+    content = []
     finish_reason = None
     completion_id = ''.join(random.choices(string.ascii_letters + string.digits, k=28))
-    idx = 0
+    stop_matcher = StopMatcher(stop) if stop else None
+    token_counter = TokenCounter(model)
+    max_tokens = max_tokens if max_tokens is not None and max_tokens > 0 else None
 
     if hasattr(response, '__aiter__'):
         response = to_sync_generator(response)
@@ -61,42 +70,57 @@ def iter_response(
         elif isinstance(chunk, SynthesizeData) or not chunk:
             continue
 
-        chunk = str(chunk)
-        content += chunk
+        if isinstance(chunk, Rewrite):
+            # A stream can't take back sent chunks, it gets the new text appended
+            chunk = apply_rewrite(content, chunk, stop_matcher)
+        else:
+            chunk = str(chunk)
 
-        if max_tokens is not None and idx + 1 >= max_tokens:
-            finish_reason = "length"
+        if stop_matcher is not None:
+            chunk, found = stop_matcher.feed(chunk)
+            if found:
+                finish_reason = "stop"
 
-        first, content, chunk = find_stop(stop, content, chunk if stream else None)
+        if chunk:
+            chunk, reached = token_counter.feed(chunk, max_tokens)
+            if reached:
+                finish_reason = "length"
 
-        if first != -1:
-            finish_reason = "stop"
+        content.append(chunk)
 
-        if stream:
+        if stream and chunk:
             yield ChatCompletionChunk.model_construct(chunk, None, completion_id, int(time.time()))
 
         if finish_reason is not None:
             break
 
-        idx += 1
+    if stop_matcher is not None and finish_reason is None:
+        chunk, reached = token_counter.feed(stop_matcher.flush(), max_tokens)
+        content.append(chunk)
+        if reached:
+            finish_reason = "length"
+        if stream and chunk:
+            yield ChatCompletionChunk.model_construct(chunk, None, completion_id, int(time.time()))
 
     finish_reason = "stop" if finish_reason is None else finish_reason
+    usage = get_usage(messages, token_counter.count, model)
 
     if stream:
-        yield ChatCompletionChunk.model_construct(None, finish_reason, completion_id, int(time.time()))
+        yield ChatCompletionChunk.model_construct(None, finish_reason, completion_id, int(time.time()), usage)
     else:
+        content = "".join(content)
         if response_format is not None and "type" in response_format:
             if response_format["type"] == "json_object":
                 content = filter_json(content)
-        yield ChatCompletion.model_construct(content, finish_reason, completion_id, int(time.time()))
+        yield ChatCompletion.model_construct(content, finish_reason, completion_id, int(time.time()), usage)
 
 # Synchronous iter_append_model_and_provider function
-def iter_append_model_and_provider(response: ChatCompletionResponseType) -> ChatCompletionResponseType:
+def iter_append_model_and_provider(response: ChatCompletionResponseType, context: RequestContext = None) -> ChatCompletionResponseType:
     last_provider = None
 
     for chunk in response:
         if isinstance(chunk, (ChatCompletion, ChatCompletionChunk)):
-            last_provider = get_last_provider(True) if last_provider is None else last_provider
+            last_provider = get_last_provider(True, context) if last_provider is None else last_provider
             chunk.model = last_provider.get("model")
             chunk.provider = last_provider.get("name")
             yield chunk
@@ -106,12 +130,16 @@ async def async_iter_response(
     stream: bool,
     response_format: Optional[dict] = None,
     max_tokens: Optional[int] = None,
-    stop: Optional[list[str]] = None
+    stop: Optional[list[str]] = None,
+    messages: Optional[Messages] = None,
+    model: Optional[str] = None
 ) -> AsyncChatCompletionResponseType:
-    content = ""
+    content = []
     finish_reason = None
     completion_id = ''.join(random.choices(string.ascii_letters + string.digits, k=28))
-    idx = 0
+    stop_matcher = StopMatcher(stop) if stop else None
+    token_counter = TokenCounter(model, await get_encoding_async(model))
+    max_tokens = max_tokens if max_tokens is not None and max_tokens > 0 else None
 
     try:
         async for chunk in response:
@@ -124,50 +152,87 @@ async def async_iter_response(
             elif isinstance(chunk, SynthesizeData) or not chunk:
                 continue
 
-            chunk = str(chunk)
-            content += chunk
-            idx += 1
+            if isinstance(chunk, Rewrite):
+                # A stream can't take back sent chunks, it gets the new text appended
+                chunk = apply_rewrite(content, chunk, stop_matcher)
+            else:
+                chunk = str(chunk)
 
-            if max_tokens is not None and idx >= max_tokens:
-                finish_reason = "length"
+            if stop_matcher is not None:
+                chunk, found = stop_matcher.feed(chunk)
+                if found:
+                    finish_reason = "stop"
 
-            first, content, chunk = find_stop(stop, content, chunk if stream else None)
+            if chunk:
+                chunk, reached = token_counter.feed(chunk, max_tokens)
+                if reached:
+                    finish_reason = "length"
 
-            if first != -1:
-                finish_reason = "stop"
+            content.append(chunk)
 
-            if stream:
+            if stream and chunk:
                 yield ChatCompletionChunk.model_construct(chunk, None, completion_id, int(time.time()))
 
             if finish_reason is not None:
                 break
 
+        if stop_matcher is not None and finish_reason is None:
+            chunk, reached = token_counter.feed(stop_matcher.flush(), max_tokens)
+            content.append(chunk)
+            if reached:
+                finish_reason = "length"
+            if stream and chunk:
+                yield ChatCompletionChunk.model_construct(chunk, None, completion_id, int(time.time()))
+
         finish_reason = "stop" if finish_reason is None else finish_reason
+        usage = get_usage(messages, token_counter.count, model)
 
         if stream:
-            yield ChatCompletionChunk.model_construct(None, finish_reason, completion_id, int(time.time()))
+            yield ChatCompletionChunk.model_construct(None, finish_reason, completion_id, int(time.time()), usage)
         else:
+            content = "".join(content)
             if response_format is not None and "type" in response_format:
                 if response_format["type"] == "json_object":
                     content = filter_json(content)
-            yield ChatCompletion.model_construct(content, finish_reason, completion_id, int(time.time()))
+            yield ChatCompletion.model_construct(content, finish_reason, completion_id, int(time.time()), usage)
     finally:
         await safe_aclose(response)
 
 async def async_iter_append_model_and_provider(
-        response: AsyncChatCompletionResponseType
+        response: AsyncChatCompletionResponseType,
+        context: RequestContext = None
     ) -> AsyncChatCompletionResponseType:
     last_provider = None
     try:
         async for chunk in response:
             if isinstance(chunk, (ChatCompletion, ChatCompletionChunk)):
-                last_provider = get_last_provider(True) if last_provider is None else last_provider
+                last_provider = get_last_provider(True, context) if last_provider is None else last_provider
                 chunk.model = last_provider.get("model")
                 chunk.provider = last_provider.get("name")
             yield chunk
     finally:
         await safe_aclose(response)
 
+def get_cache_key(
+    client: BaseClient,
+    model: str,
+    messages: Messages,
+    provider: Optional[ProviderType],
+    image: Optional[ImageType],
+    response_format: Optional[dict],
+    max_tokens: Optional[int],
+    stop: Optional[list[str]],
+    api_key: Optional[str],
+    kwargs: dict
+) -> Optional[str]:
+    """Return the key of a request in the response cache of the client, None if it isn't cached."""
+    if client.response_cache is None:
+        return None
+    return client.response_cache.get_key(
+        model, messages, provider,
+        image=image, response_format=response_format, max_tokens=max_tokens, stop=stop, api_key=api_key, **kwargs
+    )
+
 class Client(BaseClient):
     def __init__(
         self,
@@ -202,6 +267,12 @@ class Completions:
         ignore_stream: Optional[bool] = False,
         **kwargs
     ) -> IterResponse:
+        stop = [stop] if isinstance(stop, str) else stop
+        api_key = self.client.api_key if api_key is None else api_key
+        cache_key = get_cache_key(
+            self.client, model, messages, self.provider if provider is None else provider,
+            image, response_format, max_tokens, stop, api_key, kwargs
+        )
         model, provider = get_model_and_provider(
             model,
             self.provider if provider is None else provider,
@@ -210,39 +281,63 @@ class Completions:
             ignore_working,
             ignore_stream,
         )
-        stop = [stop] if isinstance(stop, str) else stop
+        context = get_request_context()
         if image is not None:
             kwargs["images"] = [(image, image_name)]
         if ignore_stream:
             kwargs["ignore_stream"] = True
-        response = provider.create_completion(
-            model,
-            messages,
-            stream=stream,
-            **filter_none(
-                proxy=self.client.proxy if proxy is None else proxy,
-                max_tokens=max_tokens,
-                stop=stop,
-                api_key=self.client.api_key if api_key is None else api_key
-            ),
-            **kwargs
-        )
-        if asyncio.iscoroutinefunction(provider.create_completion):
-            # Run the asynchronous function in an event loop
-            response = asyncio.run(response)
-        if stream and hasattr(response, '__aiter__'):
-            # It's an async generator, wrap it into a sync iterator
-            response = to_sync_generator(response)
-        elif hasattr(response, '__aiter__'):
-            # If response is an async generator, collect it into a list
-            response = asyncio.run(async_generator_to_list(response))
-        response = iter_response(response, stream, response_format, max_tokens, stop)
-        response = iter_append_model_and_provider(response)
+
+        def create_response() -> IterResponse:
+            response = provider.create_completion(
+                model,
+                messages,
+                stream=stream,
+                **filter_none(
+                    proxy=self.client.proxy if proxy is None else proxy,
+                    max_tokens=max_tokens,
+                    stop=stop,
+                    api_key=api_key
+                ),
+                **kwargs
+            )
+            if asyncio.iscoroutinefunction(provider.create_completion):
+                # Run the asynchronous function in an event loop
+                response = asyncio.run(response)
+            if stream and hasattr(response, '__aiter__'):
+                # It's an async generator, wrap it into a sync iterator
+                response = to_sync_generator(response)
+            elif hasattr(response, '__aiter__'):
+                # If response is an async generator, collect it into a list
+                response = asyncio.run(async_generator_to_list(response))
+            response = iter_response(response, stream, response_format, max_tokens, stop, messages, model)
+            return iter_append_model_and_provider(response, context)
+
+        if cache_key is None:
+            response = create_response()
+        else:
+            response = self.client.response_cache.iter(cache_key, create_response, stream, response_format)
+        response = iter_with_context(response, context)
         if stream:
             return response
         else:
             return next(response)
 
+    def create_many(
+        self,
+        requests: Iterable[Union[Messages, dict]],
+        model: str = "",
+        provider: Optional[ProviderType] = None,
+        max_concurrency: int = MAX_CONCURRENCY,
+        limiter: ProviderLimiter = provider_limiter,
+        **kwargs
+    ) -> Iterator[BatchResult]:
+        """
+        Create the completions of many requests in an event loop, see ``AsyncCompletions.create_many``.
+        """
+        return to_sync_generator(AsyncCompletions(self.client, self.provider).create_many(
+            requests, model, provider, max_concurrency, limiter, **kwargs
+        ))
+
 class Chat:
     completions: Completions
 
@@ -429,9 +524,8 @@ class Images:
             images = await copy_images(response.get_list(), response.get("cookies"), proxy)
             if response_format == "b64_json":
                 async def process_image_item(image_file: str) -> Image:
-                    with open(os.path.join(images_dir, os.path.basename(image_file)), "rb") as file:
-                        image_data = base64.b64encode(file.read()).decode()
-                        return Image.model_construct(b64_json=image_data, revised_prompt=response.alt)
+                    image_data = await read_image_base64(image_file)
+                    return Image.model_construct(b64_json=image_data, revised_prompt=response.alt)
                 images = await asyncio.gather(*[process_image_item(image) for image in images])
             else:
                 images = [Image.model_construct(url=f"/images/{os.path.basename(image)}", revised_prompt=response.alt) for image in images]
@@ -483,6 +577,12 @@ class AsyncCompletions:
         ignore_stream: Optional[bool] = False,
         **kwargs
     ) -> Union[Coroutine[ChatCompletion], AsyncIterator[ChatCompletionChunk, BaseConversation]]:
+        stop = [stop] if isinstance(stop, str) else stop
+        api_key = self.client.api_key if api_key is None else api_key
+        cache_key = get_cache_key(
+            self.client, model, messages, self.provider if provider is None else provider,
+            image, response_format, max_tokens, stop, api_key, kwargs
+        )
         model, provider = get_model_and_provider(
             model,
             self.provider if provider is None else provider,
@@ -491,34 +591,74 @@ class AsyncCompletions:
             ignore_working,
             ignore_stream,
         )
-        stop = [stop] if isinstance(stop, str) else stop
+        context = get_request_context()
         if image is not None:
             kwargs["images"] = [(image, image_name)]
         if ignore_stream:
             kwargs["ignore_stream"] = True
-        if hasattr(provider, "create_async_generator"):
-            create_handler = provider.create_async_generator
-        else:
-            create_handler = provider.create_completion
-        response = create_handler(
-            model,
-            messages,
-            stream=stream,
-            **filter_none(
-                proxy=self.client.proxy if proxy is None else proxy,
-                max_tokens=max_tokens,
-                stop=stop,
-                api_key=self.client.api_key if api_key is None else api_key
-            ),
-            **kwargs
-        )
 
-        if not hasattr(response, "__aiter__"):
-            response = to_async_iterator(response)
-        response = async_iter_response(response, stream, response_format, max_tokens, stop)
-        response = async_iter_append_model_and_provider(response)
+        def create_response() -> AsyncIterator:
+            if hasattr(provider, "create_async_generator"):
+                create_handler = provider.create_async_generator
+            else:
+                # Blocking providers run in their thread pool
+                create_handler = partial(iter_sync_provider, provider)
+            response = create_handler(
+                model,
+                messages,
+                stream=stream,
+                **filter_none(
+                    proxy=self.client.proxy if proxy is None else proxy,
+                    max_tokens=max_tokens,
+                    stop=stop,
+                    api_key=api_key
+                ),
+                **kwargs
+            )
+            if not hasattr(response, "__aiter__"):
+                response = to_async_iterator(response)
+            response = async_iter_response(response, stream, response_format, max_tokens, stop, messages, model)
+            return async_iter_append_model_and_provider(response, context)
+
+        if cache_key is None:
+            response = create_response()
+        else:
+            response = self.client.response_cache.async_iter(cache_key, create_response, stream, response_format)
+        response = async_iter_with_context(response, context)
         return response if stream else anext(response)
 
+    def create_many(
+        self,
+        requests: Iterable[Union[Messages, dict]],
+        model: str = "",
+        provider: Optional[ProviderType] = None,
+        max_concurrency: int = MAX_CONCURRENCY,
+        limiter: ProviderLimiter = provider_limiter,
+        **kwargs
+    ) -> AsyncIterator[BatchResult]:
+        """
+        Create the completions of many requests, yield each result when it is finished.
+
+        Args:
+            requests (Iterable): The messages of every request, or dicts with arguments
+                of ``create`` that override the shared arguments. Read lazily.
+            model (str): The model of all requests.
+            provider (ProviderType): The provider of all requests, by default the providers of the model.
+            max_concurrency (int): Requests that run at the same time.
+            limiter (ProviderLimiter): Caps the requests per provider.
+            **kwargs: Arguments of ``create`` shared by all requests.
+
+        Returns:
+            AsyncIterator[BatchResult]: The results in the order they finish. Failed
+            requests are yielded with their error and don't stop the batch.
+        """
+        defaults = {"model": model, "provider": self.provider if provider is None else provider, **kwargs}
+        requests = (
+            {**defaults, **(request if isinstance(request, dict) else {"messages": request})}
+            for request in requests
+        )
+        return BatchRunner(self, max_concurrency, limiter).run(requests)
+
 class AsyncImages(Images):
     def __init__(self, client: AsyncClient, provider: Optional[ProviderType] = None):
         self.client: AsyncClient = client
@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import os
+import asyncio
+import weakref
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Iterable, Optional, Union
+
+from ..typing import Messages
+from ..providers.types import BaseRetryProvider, ProviderType
+from ..providers.retry_provider import RetryProvider, get_async_generator
+from ..providers.scoreboard import Scoreboard, scoreboard, get_name
+from .stubs import ChatCompletion
+from .service import get_model_and_provider
+
+# Requests of a batch that run at the same time
+MAX_CONCURRENCY = int(os.environ.get("G4F_BATCH_CONCURRENCY", 16))
+# Requests that run at the same time on one provider, over all batches
+PROVIDER_CONCURRENCY = int(os.environ.get("G4F_BATCH_PROVIDER_CONCURRENCY", 4))
+# Attempts of a request on a single provider
+MAX_RETRIES = 3
+
+class BatchResult:
+    """
+    The outcome of one request of a batch.
+
+    Attributes:
+        index (int): The position of the request in the batch.
+        request (dict): The arguments of the request.
+        response (ChatCompletion): The completion, None if the request failed.
+        error (Exception): The error of a failed request.
+    """
+
+    def __init__(self, index: int, request: dict, response: Optional[ChatCompletion] = None, error: Optional[Exception] = None) -> None:
+        self.index = index
+        self.request = request
+        self.response = response
+        self.error = error
+
+class ProviderLimiter:
+    """Caps the requests that run at the same time on each provider."""
+
+    def __init__(self, max_per_provider: int = PROVIDER_CONCURRENCY) -> None:
+        self.max_per_provider = max_per_provider
+        self.semaphores: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, asyncio.Semaphore]] = weakref.WeakKeyDictionary()
+        self.active: dict[str, int] = {}
+        self.waiting: dict[str, int] = {}
+
+    def get_semaphore(self, name: str) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if loop not in self.semaphores:
+            self.semaphores[loop] = {}
+        semaphores = self.semaphores[loop]
+        if name not in semaphores:
+            semaphores[name] = asyncio.Semaphore(self.max_per_provider)
+        return semaphores[name]
+
+    def get_load(self, provider: ProviderType) -> int:
+        """The requests that run on or wait for a provider."""
+        name = get_name(provider)
+        return self.active.get(name, 0) + self.waiting.get(name, 0)
+
+    @asynccontextmanager
+    async def acquire(self, provider: ProviderType):
+        name = get_name(provider)
+        self.waiting[name] = self.waiting.get(name, 0) + 1
+        try:
+            await self.get_semaphore(name).acquire()
+        finally:
+            self.waiting[name] -= 1
+        self.active[name] = self.active.get(name, 0) + 1
+        try:
+            yield
+        finally:
+            self.active[name] -= 1
+            self.get_semaphore(name).release()
+
+    def get_metrics(self) -> dict[str, dict[str, int]]:
+        return {
+            name: {"active": self.active.get(name, 0), "waiting": self.waiting.get(name, 0)}
+            for name in set(self.active) | set(self.waiting)
+        }
+
+class LimitedProvider:
+    """A provider that waits for a free slot of the limiter before every request."""
+
+    def __init__(self, provider: ProviderType, limiter: ProviderLimiter) -> None:
+        self.provider = provider
+        self.limiter = limiter
+        self.__name__ = get_name(provider)
+
+    def __getattr__(self, name: str):
+        return getattr(self.provider, name)
+
+    async def create_async(self, model: str, messages: Messages, **kwargs) -> str:
+        async with self.limiter.acquire(self.provider):
+            return await self.provider.create_async(model, messages, **kwargs)
+
+    async def create_async_generator(self, model: str, messages: Messages, stream: bool = True, **kwargs):
+        async with self.limiter.acquire(self.provider):
+            async for chunk in get_async_generator(self.provider, model, messages, stream, **kwargs):
+                yield chunk
+
+provider_limiter = ProviderLimiter()
+
+class BatchRunner:
+    """
+    Runs the completions of a batch with bounded concurrency.
+
+    At most ``max_concurrency`` requests run at the same time, the next
+    request is only read when one finishes, so the batch can be a lazy
+    iterable of any size. Every request is spread over the providers of
+    its model: the providers with the fewest running requests are tried
+    first, and the ``limiter`` caps the requests per provider. A failed
+    request is retried with the next provider by a ``RetryProvider``.
+    """
+
+    def __init__(
+        self,
+        completions,
+        max_concurrency: int = MAX_CONCURRENCY,
+        limiter: ProviderLimiter = provider_limiter,
+        max_retries: int = MAX_RETRIES,
+        scoreboard: Scoreboard = scoreboard
+    ) -> None:
+        self.completions = completions
+        self.max_concurrency = max_concurrency
+        self.limiter = limiter
+        self.max_retries = max_retries
+        self.scoreboard = scoreboard
+        self.providers: dict[tuple, list[ProviderType]] = {}
+
+    def get_providers(self, model: str, provider: Union[ProviderType, str, None], ignore_working: bool = False) -> list[ProviderType]:
+        """The providers a request can use, resolved once per model and provider."""
+        key = (model, provider if isinstance(provider, str) or provider is None else get_name(provider), ignore_working)
+        if key not in self.providers:
+            _, resolved = get_model_and_provider(model, provider, False, ignore_working, logging=False)
+            self.providers[key] = list(resolved.providers) if isinstance(resolved, BaseRetryProvider) else [resolved]
+        return self.providers[key]
+
+    def get_provider(self, model: str, provider: Union[ProviderType, str, None], ignore_working: bool = False) -> RetryProvider:
+        providers = self.scoreboard.sort(self.get_providers(model, provider, ignore_working), model)
+        # A stable sort keeps the scoreboard order for providers with the same load
+        providers.sort(key=self.limiter.get_load)
+        return RetryProvider(
+            [LimitedProvider(provider, self.limiter) for provider in providers],
+            shuffle=False,
+            single_provider_retry=len(providers) == 1,
+            max_retries=self.max_retries
+        )
+
+    async def create(self, index: int, request: dict) -> BatchResult:
+        kwargs = {**request, "stream": False}
+        try:
+            kwargs["provider"] = self.get_provider(kwargs.get("model"), kwargs.get("provider"), kwargs.get("ignore_working", False))
+            response = await self.completions.create(**kwargs)
+        except Exception as e:
+            return BatchResult(index, request, error=e)
+        return BatchResult(index, request, response)
+
+    async def run(self, requests: Iterable[dict]) -> AsyncIterator[BatchResult]:
+        """Yield the result of every request as soon as it is finished."""
+        requests = enumerate(requests)
+        running: set[asyncio.Task] = set()
+        try:
+            while True:
+                while len(running) < self.max_concurrency:
+                    item = next(requests, None)
+                    if item is None:
+                        break
+                    running.add(asyncio.ensure_future(self.create(*item)))
+                if not running:
+                    return
+                done, running = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+        finally:
+            for task in running:
+                task.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
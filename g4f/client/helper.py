@@ -1,9 +1,11 @@
 from __future__ import annotations
 
 import re
-import logging
 
-from typing import AsyncIterator, Iterator, AsyncGenerator, Optional
+from typing import Optional
+
+from ..providers.asyncio import safe_aclose, to_async_iterator
+from ..providers.response import Rewrite
 
 def filter_json(text: str) -> str:
     """
@@ -20,22 +22,98 @@ def filter_json(text: str) -> str:
         return match.group("code")
     return text
 
-def find_stop(stop: Optional[list[str]], content: str, chunk: str = None):
-    first = -1
-    word = None
-    if stop is not None:
-        for word in list(stop):
-            first = content.find(word)
-            if first != -1:
-                content = content[:first]
-                break
-        if chunk is not None and first != -1:
-            first = chunk.find(word)
-            if first != -1:
-                chunk = chunk[:first]
-            else:
-                first = 0
-    return first, content, chunk
+class StopMatcher:
+    """
+    Incremental matcher for stop words in a streamed response.
+
+    The stop words are compiled into an Aho-Corasick automaton, so every
+    character is looked at once, however many words there are. The state
+    is kept between chunks to find words that span chunks. Text that could
+    still be the start of a stop word is held back until the next chunk.
+    """
+
+    def __init__(self, words: list[str]) -> None:
+        words = [word for word in words if word]
+        self.goto: list[dict[str, int]] = [{}]
+        self.depth: list[int] = [0]
+        # Length of the longest stop word that ends in each state
+        self.match: list[int] = [0]
+        for word in words:
+            state = 0
+            for char in word:
+                if char not in self.goto[state]:
+                    self.goto.append({})
+                    self.depth.append(self.depth[state] + 1)
+                    self.match.append(0)
+                    self.goto[state][char] = len(self.goto) - 1
+                state = self.goto[state][char]
+            self.match[state] = len(word)
+        self.fail: list[int] = [0] * len(self.goto)
+        queue = list(self.goto[0].values())
+        for state in queue:
+            for char, next_state in self.goto[state].items():
+                fail = self.fail[state]
+                while fail and char not in self.goto[fail]:
+                    fail = self.fail[fail]
+                self.fail[next_state] = self.goto[fail].get(char, 0)
+                if not self.match[next_state]:
+                    self.match[next_state] = self.match[self.fail[next_state]]
+                queue.append(next_state)
+        # Outside of a partial match, jump to the next char that can start a stop word
+        first_chars = "".join(re.escape(char) for char in self.goto[0])
+        self.first = re.compile(f"[{first_chars}]") if first_chars else None
+        self.state = 0
+        self.held = ""
+
+    def feed(self, chunk: str) -> tuple[str, bool]:
+        """
+        Add a chunk of the response.
+
+        Returns:
+            tuple[str, bool]: The text that is safe to output and whether a stop word was found.
+        """
+        text = self.held + chunk
+        offset = len(self.held)
+        goto, fail, match = self.goto, self.fail, self.match
+        state = self.state
+        index = 0
+        length = len(chunk)
+        while index < length:
+            if not state:
+                found = self.first.search(chunk, index) if self.first is not None else None
+                if found is None:
+                    break
+                index = found.start()
+            char = chunk[index]
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if match[state]:
+                self.state = 0
+                self.held = ""
+                return text[:offset + index + 1 - match[state]], True
+            index += 1
+        self.state = state
+        keep = self.depth[state]
+        self.held = text[len(text) - keep:] if keep else ""
+        return text[:len(text) - keep], False
+
+    def flush(self) -> str:
+        """Return the held back text at the end of the response."""
+        held, self.held, self.state = self.held, "", 0
+        return held
+
+def apply_rewrite(content: list[str], rewrite: Rewrite, stop_matcher: Optional[StopMatcher] = None) -> str:
+    """
+    Cut the collected ``content`` of a response at the offset of a rewrite.
+
+    The text held back by the stop matcher comes after the content,
+    its part before the offset is kept. Returns the text to add.
+    """
+    text = "".join(content)
+    held = stop_matcher.flush() if stop_matcher is not None else ""
+    content[:] = [text[:rewrite.offset]]
+    return held[:max(rewrite.offset - len(text), 0)] + rewrite.text
 
 def filter_none(**kwargs) -> dict:
     return {
@@ -43,15 +121,3 @@ def filter_none(**kwargs) -> dict:
         for key, value in kwargs.items()
         if value is not None
     }
-
-async def safe_aclose(generator: AsyncGenerator) -> None:
-    try:
-        if generator and hasattr(generator, 'aclose'):
-            await generator.aclose()
-    except Exception as e:
-        logging.warning(f"Error while closing generator: {e}")
-
-# Helper function to convert a synchronous iterator to an async iterator
-async def to_async_iterator(iterator: Iterator) -> AsyncIterator:
-    for item in iterator:
-        yield item
\ No newline at end of file
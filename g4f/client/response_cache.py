@@ -0,0 +1,471 @@
+from __future__ import annotations
+
+import os
+import json
+import time
+import random
+import string
+import sqlite3
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Iterator, AsyncIterator, Optional, Union
+
+from .stubs import ChatCompletion, ChatCompletionChunk
+from .helper import filter_json, safe_aclose
+from ..tokenizer import split_text
+from ..typing import Messages
+from .. import debug
+
+# "memory" or the path of an SQLite file, the API caches nothing without it
+CACHE = os.environ.get("G4F_RESPONSE_CACHE")
+MAX_ENTRIES = int(os.environ.get("G4F_RESPONSE_CACHE_MAX", 1000))
+TTL = float(os.environ.get("G4F_RESPONSE_CACHE_TTL", 3600))
+# Seconds a request waits for the same request that is running already
+FLIGHT_TIMEOUT = 300
+# Arguments that don't change the response
+IGNORED_ARGS = {"proxy", "timeout", "stream", "ignored", "ignore_working", "ignore_stream", "response_cache"}
+
+class CachedResponse:
+    """The text and metadata of a completed response."""
+
+    def __init__(
+        self,
+        content: str,
+        finish_reason: str,
+        usage: Optional[dict] = None,
+        model: Optional[str] = None,
+        provider: Optional[str] = None
+    ) -> None:
+        self.content = content
+        self.finish_reason = finish_reason
+        self.usage = usage
+        self.model = model
+        self.provider = provider
+
+    def to_dict(self) -> dict:
+        return {
+            "content": self.content,
+            "finish_reason": self.finish_reason,
+            "usage": self.usage,
+            "model": self.model,
+            "provider": self.provider,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> CachedResponse:
+        return cls(**data)
+
+class MemoryBackend:
+    """Cached responses in an LRU dict."""
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, ttl: float = TTL) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries: OrderedDict[str, tuple[float, CachedResponse]] = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if time.time() - entry[0] > self.ttl:
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, response: CachedResponse) -> None:
+        with self.lock:
+            self.entries[key] = (time.time(), response)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+class SQLiteBackend:
+    """Cached responses in an SQLite file, shared by processes and kept on restarts."""
+
+    def __init__(self, path: str, max_entries: int = MAX_ENTRIES, ttl: float = TTL) -> None:
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.connection: Optional[sqlite3.Connection] = None
+        self.lock = threading.Lock()
+
+    def connect(self) -> sqlite3.Connection:
+        if self.connection is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self.connection = sqlite3.connect(self.path, check_same_thread=False)
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, data TEXT, created REAL, accessed REAL)"
+            )
+            self.connection.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+            self.connection.commit()
+        return self.connection
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        with self.lock:
+            connection = self.connect()
+            now = time.time()
+            row = connection.execute(
+                "SELECT data FROM responses WHERE key = ? AND created >= ?", (key, now - self.ttl)
+            ).fetchone()
+            if row is None:
+                return None
+            connection.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            connection.commit()
+            return CachedResponse.from_dict(json.loads(row[0]))
+
+    def set(self, key: str, response: CachedResponse) -> None:
+        with self.lock:
+            connection = self.connect()
+            now = time.time()
+            connection.execute(
+                "REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                (key, json.dumps(response.to_dict()), now, now)
+            )
+            connection.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+            connection.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM responses ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+            connection.commit()
+
+    def __len__(self) -> int:
+        with self.lock:
+            return self.connect().execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def close(self) -> None:
+        with self.lock:
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
+
+class Flight:
+    """A response that is being created, other requests for it wait for the result."""
+
+    def __init__(self, owner: Optional[tuple] = None) -> None:
+        self.event = threading.Event()
+        self.result: Optional[CachedResponse] = None
+        self.waiters: list[tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+        self.lock = threading.Lock()
+        self.owner = get_owner() if owner is None else owner
+
+    def is_owner(self) -> bool:
+        """True in the thread and task that creates the response, it would wait for itself."""
+        return self.owner == get_owner()
+
+    def finish(self, result: Optional[CachedResponse]) -> None:
+        with self.lock:
+            self.result = result
+            self.event.set()
+            waiters, self.waiters = self.waiters, []
+        for loop, future in waiters:
+            try:
+                loop.call_soon_threadsafe(set_future_result, future, result)
+            except RuntimeError:
+                # The event loop is closed
+                pass
+
+    def wait(self, timeout: float) -> Optional[CachedResponse]:
+        self.event.wait(timeout)
+        return self.result
+
+    async def wait_async(self, timeout: float) -> Optional[CachedResponse]:
+        loop = asyncio.get_running_loop()
+        with self.lock:
+            if self.event.is_set():
+                return self.result
+            future = loop.create_future()
+            self.waiters.append((loop, future))
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            return None
+
+def get_owner() -> tuple:
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        task = None
+    return threading.get_ident(), task
+
+def set_future_result(future: asyncio.Future, result) -> None:
+    if not future.done():
+        future.set_result(result)
+
+def get_name(value) -> Optional[str]:
+    return getattr(value, "__name__", None) or (None if value is None else str(value))
+
+class ResponseCache:
+    """
+    Caches the responses of deterministic completions.
+
+    Requests with the same model, messages and arguments and a temperature
+    of 0 or unset get the same response. The first request for a key calls
+    the provider, requests for the same key that arrive meanwhile wait for
+    its response instead of calling the provider again. A stream is replayed
+    in word chunks, so stream consumers behave the same on a hit.
+    """
+
+    def __init__(self, backend: Union[MemoryBackend, SQLiteBackend] = None, flight_timeout: float = FLIGHT_TIMEOUT) -> None:
+        self.backend = MemoryBackend() if backend is None else backend
+        self.flight_timeout = flight_timeout
+        self.flights: dict[str, Flight] = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.stored = 0
+
+    @staticmethod
+    def get_key(model: str, messages: Messages, provider=None, **kwargs) -> Optional[str]:
+        """
+        Return the key of a request, None if its response can't be cached.
+
+        Requests with a temperature above 0, images or a conversation are not cached.
+        """
+        if kwargs.get("temperature") or kwargs.get("image") is not None or kwargs.get("images") or kwargs.get("conversation") is not None or kwargs.get("return_conversation"):
+            return None
+        arguments = {key: value for key, value in kwargs.items() if key not in IGNORED_ARGS and value is not None}
+        try:
+            data = json.dumps(
+                {"provider": get_name(provider), "model": model, "messages": messages, "arguments": arguments},
+                sort_keys=True,
+                separators=(",", ":"),
+                ensure_ascii=False
+            )
+        except (TypeError, ValueError):
+            return None
+        return hashlib.sha256(data.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        try:
+            return self.backend.get(key)
+        except sqlite3.Error as e:
+            debug.log(f"Response cache: {e.__class__.__name__}: {e}")
+            return None
+
+    def set(self, key: str, response: CachedResponse) -> None:
+        try:
+            self.backend.set(key, response)
+            self.stored += 1
+        except sqlite3.Error as e:
+            debug.log(f"Response cache: {e.__class__.__name__}: {e}")
+
+    async def run_backend(self, func: Callable, *args):
+        """Call a method that uses the backend, in a thread if the backend reads files."""
+        if isinstance(self.backend, MemoryBackend):
+            return func(*args)
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    def join(self, key: str, owner: Optional[tuple] = None) -> tuple[Optional[CachedResponse], Optional[Flight], bool]:
+        """
+        Return the cached response of a key, or the flight that creates it
+        and True if the caller has to create the response.
+        """
+        with self.lock:
+            response = self.get(key)
+            if response is not None:
+                self.hits += 1
+                return response, None, False
+            flight = self.flights.get(key)
+            if flight is not None:
+                self.coalesced += 1
+                return None, flight, False
+            self.misses += 1
+            flight = self.flights[key] = Flight(owner)
+            return None, flight, True
+
+    def lookup(self, key: str) -> tuple[Optional[CachedResponse], Optional[Flight]]:
+        """
+        Return the cached response of a key, wait for it if it is being created.
+
+        Returns:
+            tuple: The response, or None and the flight the caller finishes
+            with ``record``. Both are None if waiting for the response failed,
+            then the caller creates it without the cache.
+        """
+        response, flight, created = self.join(key)
+        if response is not None or created:
+            return response, flight
+        if flight.is_owner():
+            return None, None
+        return self.check_flight(key, flight, flight.wait(self.flight_timeout)), None
+
+    async def async_lookup(self, key: str) -> tuple[Optional[CachedResponse], Optional[Flight]]:
+        # The flight belongs to this task, not to the thread that runs join
+        response, flight, created = await self.run_backend(self.join, key, get_owner())
+        if response is not None or created:
+            return response, flight
+        if flight.is_owner():
+            return None, None
+        return self.check_flight(key, flight, await flight.wait_async(self.flight_timeout)), None
+
+    def check_flight(self, key: str, flight: Flight, response: Optional[CachedResponse]) -> Optional[CachedResponse]:
+        # A flight without result after the timeout is dropped, so the next request creates the response again
+        if response is None and not flight.event.is_set():
+            with self.lock:
+                if self.flights.get(key) is flight:
+                    del self.flights[key]
+        return response
+
+    def iter(
+        self,
+        key: str,
+        create_response: Callable[[], Iterator],
+        stream: bool,
+        response_format: Optional[dict] = None
+    ) -> Iterator:
+        """Yield the cached response of a key, or create it and store it."""
+        response, flight = self.lookup(key)
+        if response is not None:
+            yield from iter_cached_response(response, stream, response_format)
+            return
+        try:
+            response = create_response()
+        except BaseException:
+            if flight is not None:
+                self.finish(key, flight, None)
+            raise
+        if flight is not None:
+            response = self.record(key, flight, response)
+        try:
+            yield from response
+        finally:
+            if hasattr(response, "close"):
+                response.close()
+
+    async def async_iter(
+        self,
+        key: str,
+        create_response: Callable[[], AsyncIterator],
+        stream: bool,
+        response_format: Optional[dict] = None
+    ) -> AsyncIterator:
+        response, flight = await self.async_lookup(key)
+        if response is not None:
+            for chunk in iter_cached_response(response, stream, response_format):
+                yield chunk
+            return
+        try:
+            response = create_response()
+        except BaseException:
+            if flight is not None:
+                self.finish(key, flight, None)
+            raise
+        if flight is not None:
+            response = self.async_record(key, flight, response)
+        try:
+            async for chunk in response:
+                yield chunk
+        finally:
+            await safe_aclose(response)
+
+    def finish(self, key: str, flight: Flight, response: Optional[CachedResponse]) -> None:
+        if response is not None:
+            self.set(key, response)
+        with self.lock:
+            if self.flights.get(key) is flight:
+                del self.flights[key]
+        flight.finish(response)
+
+    def record(self, key: str, flight: Flight, response: Iterator) -> Iterator:
+        """Pass the response through and store it when it is complete."""
+        recorder = Recorder()
+        try:
+            for chunk in response:
+                # A completion is taken with next(), finish before it is yielded
+                if recorder.add(chunk):
+                    self.finish(key, flight, recorder.get_result())
+                yield chunk
+        finally:
+            if not flight.event.is_set():
+                self.finish(key, flight, None)
+
+    async def async_record(self, key: str, flight: Flight, response: AsyncIterator) -> AsyncIterator:
+        recorder = Recorder()
+        try:
+            async for chunk in response:
+                if recorder.add(chunk):
+                    await self.run_backend(self.finish, key, flight, recorder.get_result())
+                yield chunk
+        finally:
+            if not flight.event.is_set():
+                self.finish(key, flight, None)
+
+    def get_metrics(self) -> dict:
+        requests = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self.backend),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "stored": self.stored,
+            "hit_rate": (self.hits + self.coalesced) / requests if requests else None,
+        }
+
+class Recorder:
+    """Collects the text of a response from its completion or chunks."""
+
+    def __init__(self) -> None:
+        self.content: list[str] = []
+        self.result: Optional[CachedResponse] = None
+
+    def add(self, chunk) -> bool:
+        """Add a chunk, return True if the response is complete with it."""
+        if isinstance(chunk, ChatCompletion):
+            choice = chunk.choices[0]
+            self.result = CachedResponse(choice.message.content, choice.finish_reason, chunk.usage, chunk.model, chunk.provider)
+            return True
+        elif isinstance(chunk, ChatCompletionChunk):
+            choice = chunk.choices[0]
+            if choice.delta.content:
+                self.content.append(choice.delta.content)
+            if choice.finish_reason is not None:
+                self.result = CachedResponse("".join(self.content), choice.finish_reason, chunk.usage, chunk.model, chunk.provider)
+                return True
+        return False
+
+    def get_result(self) -> Optional[CachedResponse]:
+        """The response, None if it was not complete."""
+        return self.result
+
+def iter_cached_response(
+    response: CachedResponse,
+    stream: bool,
+    response_format: Optional[dict] = None
+) -> Iterator[Union[ChatCompletion, ChatCompletionChunk]]:
+    """Yield a cached response like ``iter_response`` yields a new one."""
+    completion_id = ''.join(random.choices(string.ascii_letters + string.digits, k=28))
+    created = int(time.time())
+    if stream:
+        for content in split_text(response.content) if response.content else []:
+            chunk = ChatCompletionChunk.model_construct(content, None, completion_id, created)
+            chunk.model = response.model
+            chunk.provider = response.provider
+            yield chunk
+        chunk = ChatCompletionChunk.model_construct(None, response.finish_reason, completion_id, created, response.usage)
+    else:
+        content = response.content
+        if response_format is not None and response_format.get("type") == "json_object":
+            content = filter_json(content)
+        chunk = ChatCompletion.model_construct(content, response.finish_reason, completion_id, created, response.usage)
+    chunk.model = response.model
+    chunk.provider = response.provider
+    yield chunk
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Return the cache configured with G4F_RESPONSE_CACHE, None if it is not set."""
+    if not CACHE:
+        return None
+    if CACHE == "memory":
+        return ResponseCache(MemoryBackend())
+    return ResponseCache(SQLiteBackend(CACHE))
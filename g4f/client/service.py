@@ -8,6 +8,7 @@ from ..models import Model, ModelUtils, default
 from ..Provider import ProviderUtils
 from ..providers.types import BaseRetryProvider, ProviderType
 from ..providers.retry_provider import IterListProvider
+from ..providers.context import RequestContext, get_request_context, new_request_context
 
 def convert_to_provider(provider: str) -> ProviderType:
     if " " in provider:
@@ -96,30 +97,32 @@ def get_model_and_provider(model    : Union[Model, str],
         else:
             debug.log(f'Using {provider_name} provider')
 
-    debug.last_provider = provider
-    debug.last_model = model
+    new_request_context(provider, model)
 
     return model, provider
 
-def get_last_provider(as_dict: bool = False) -> Union[ProviderType, dict[str, str], None]:
+def get_last_provider(as_dict: bool = False, context: RequestContext = None) -> Union[ProviderType, dict[str, str], None]:
     """
-    Retrieves the last used provider.
+    Retrieves the last used provider of the current request.
 
     Args:
         as_dict (bool, optional): If True, returns the provider information as a dictionary.
+        context (RequestContext, optional): The request to look up. Defaults to the current request.
 
     Returns:
         Union[ProviderType, dict[str, str]]: The last used provider, either as an object or a dictionary.
     """
-    last = debug.last_provider
+    if context is None:
+        context = get_request_context()
+    last = context.provider
     if isinstance(last, BaseRetryProvider):
-        last = last.last_provider
+        last = context.last_provider
     if as_dict:
         if last:
             return {
                 "name": last.__name__ if hasattr(last, "__name__") else type(last).__name__,
                 "url": last.url,
-                "model": debug.last_model,
+                "model": context.model,
                 "label": getattr(last, "label", None) if hasattr(last, "label") else None
             }
         else:
@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import os
+import json
+import time
+import asyncio
+from typing import AsyncIterator, Optional, Union
+
+try:
+    import orjson
+    has_orjson = True
+except ImportError:
+    has_orjson = False
+
+from .stubs import ChatCompletionChunk
+from ..providers.asyncio import safe_aclose
+
+# Seconds small deltas are collected into one event, 0 sends every delta at once
+FLUSH_INTERVAL = float(os.environ.get("G4F_SSE_FLUSH_INTERVAL", 0.02))
+# Chars of content that are sent at once, regardless of the interval
+MAX_BUFFER = 4096
+# Chunks read ahead of the encoder while coalescing
+QUEUE_SIZE = 64
+
+def dumps(data) -> str:
+    """Compact json like ``json.dumps``, with orjson if it is installed."""
+    if has_orjson:
+        return orjson.dumps(data).decode()
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+class ChunkEncoder:
+    """
+    Renders the ``ChatCompletionChunk`` of one stream as server-sent events.
+
+    The fields that don't change in a stream (id, object, created, model and
+    provider) are rendered once from the first chunk, only the delta content
+    and the finish reason are encoded per event. The output is the same as
+    ``f"data: {chunk.json()}\\n\\n"``.
+
+    With a ``flush_interval``, deltas that arrive within the interval after
+    the last event are buffered with ``add`` and sent together by ``flush``.
+    """
+
+    def __init__(self, flush_interval: float = FLUSH_INTERVAL, max_buffer: int = MAX_BUFFER) -> None:
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.prefix: Optional[str] = None
+        self.buffer: list[str] = []
+        self.buffer_size = 0
+        self.last_flush = 0.0
+
+    def render_prefix(self, chunk: ChatCompletionChunk) -> str:
+        return "data: {" + ",".join([
+            f'"id":{dumps(chunk.id)}',
+            f'"object":{dumps(chunk.object)}',
+            f'"created":{dumps(chunk.created)}',
+            f'"model":{dumps(chunk.model)}',
+            f'"provider":{dumps(chunk.provider)}',
+        ]) + ',"choices":[{"index":0,"delta":{"role":"assistant","content":'
+
+    def encode(self, chunk: ChatCompletionChunk) -> str:
+        """Render one chunk as it is."""
+        if self.prefix is None:
+            self.prefix = self.render_prefix(chunk)
+        choice = chunk.choices[0]
+        return self.render(choice.delta.content, choice.finish_reason, chunk.usage)
+
+    def render(self, content: Optional[str], finish_reason: Optional[str] = None, usage: Optional[dict] = None) -> str:
+        return f'{self.prefix}{dumps(content)}}},"finish_reason":{dumps(finish_reason)}}}],"usage":{dumps(usage)}}}\n\n'
+
+    def add(self, chunk: ChatCompletionChunk) -> str:
+        """
+        Buffer a chunk and return the events that are due, an empty string if none are.
+        """
+        if self.prefix is None:
+            self.prefix = self.render_prefix(chunk)
+        choice = chunk.choices[0]
+        if choice.finish_reason is not None or choice.delta.content is None:
+            return self.flush() + self.render(choice.delta.content, choice.finish_reason, chunk.usage)
+        self.buffer.append(choice.delta.content)
+        self.buffer_size += len(choice.delta.content)
+        if self.buffer_size >= self.max_buffer or self.time_left() <= 0:
+            return self.flush()
+        return ""
+
+    def time_left(self) -> float:
+        return self.last_flush + self.flush_interval - time.monotonic()
+
+    def flush(self) -> str:
+        """Return the buffered content as one event."""
+        self.last_flush = time.monotonic()
+        if not self.buffer:
+            return ""
+        content = "".join(self.buffer)
+        self.buffer = []
+        self.buffer_size = 0
+        return self.render(content)
+
+async def iter_sse(
+    response: AsyncIterator,
+    flush_interval: float = FLUSH_INTERVAL
+) -> AsyncIterator[Union[str, object]]:
+    """
+    Encode the chunks of a completion stream as server-sent events.
+
+    Buffered deltas are sent once the interval is over, even if the provider
+    doesn't send a new chunk. Items that are not chunks, like conversations,
+    are passed through as they are.
+    """
+    encoder = ChunkEncoder(flush_interval)
+    iterator = response.__aiter__()
+    if flush_interval <= 0:
+        try:
+            async for chunk in iterator:
+                yield encoder.encode(chunk) if isinstance(chunk, ChatCompletionChunk) else chunk
+        finally:
+            await safe_aclose(iterator)
+        return
+    # A task reads the response, so a pause of the provider can be waited for with a timeout
+    queue: asyncio.Queue = asyncio.Queue(QUEUE_SIZE)
+    async def read():
+        try:
+            async for chunk in iterator:
+                await queue.put((chunk, None))
+            await queue.put((None, StopAsyncIteration()))
+        except Exception as e:
+            await queue.put((None, e))
+    reader = asyncio.ensure_future(read())
+    try:
+        while True:
+            try:
+                chunk, error = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                if encoder.buffer:
+                    try:
+                        chunk, error = await asyncio.wait_for(queue.get(), max(encoder.time_left(), 0))
+                    except asyncio.TimeoutError:
+                        yield encoder.flush()
+                        continue
+                else:
+                    chunk, error = await queue.get()
+            if error is not None:
+                events = encoder.flush()
+                if events:
+                    yield events
+                if isinstance(error, StopAsyncIteration):
+                    break
+                raise error
+            if isinstance(chunk, ChatCompletionChunk):
+                events = encoder.add(chunk)
+                if events:
+                    yield events
+            else:
+                yield chunk
+    finally:
+        reader.cancel()
+        try:
+            await reader
+        except (asyncio.CancelledError, Exception):
+            pass
+        await safe_aclose(iterator)
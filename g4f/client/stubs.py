@@ -33,6 +33,7 @@ class ChatCompletionChunk(BaseModel):
     model: str
     provider: Optional[str]
     choices: List[ChatCompletionDeltaChoice]
+    usage: Optional[Dict[str, int]] = None
 
     @classmethod
     def model_construct(
@@ -40,7 +41,8 @@ class ChatCompletionChunk(BaseModel):
         content: str,
         finish_reason: str,
         completion_id: str = None,
-        created: int = None
+        created: int = None,
+        usage: Optional[Dict[str, int]] = None
     ):
         return super().model_construct(
             id=f"chatcmpl-{completion_id}" if completion_id else None,
@@ -51,7 +53,8 @@ class ChatCompletionChunk(BaseModel):
             choices=[ChatCompletionDeltaChoice.model_construct(
                 ChatCompletionDelta.model_construct(content),
                 finish_reason
-            )]
+            )],
+            usage=usage
         )
 
 class ChatCompletionMessage(BaseModel):
@@ -79,9 +82,9 @@ class ChatCompletion(BaseModel):
     provider: Optional[str]
     choices: List[ChatCompletionChoice]
     usage: Dict[str, int] = Field(examples=[{
-        "prompt_tokens": 0, #prompt_tokens,
-        "completion_tokens": 0, #completion_tokens,
-        "total_tokens": 0, #prompt_tokens + completion_tokens,
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+        "total_tokens": 0,
     }])
 
     @classmethod
@@ -90,7 +93,8 @@ class ChatCompletion(BaseModel):
         content: str,
         finish_reason: str,
         completion_id: str = None,
-        created: int = None
+        created: int = None,
+        usage: Optional[Dict[str, int]] = None
     ):
         return super().model_construct(
             id=f"chatcmpl-{completion_id}" if completion_id else None,
@@ -103,10 +107,10 @@ class ChatCompletion(BaseModel):
                 finish_reason
             )],
             usage={
-                "prompt_tokens": 0, #prompt_tokens,
-                "completion_tokens": 0, #completion_tokens,
-                "total_tokens": 0, #prompt_tokens + completion_tokens,
-            }
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+                "total_tokens": 0,
+            } if usage is None else usage
         )
 
 class ChatCompletionDelta(BaseModel):
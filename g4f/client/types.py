@@ -4,7 +4,8 @@ import os
 
 from .stubs import ChatCompletion, ChatCompletionChunk
 from ..providers.types import BaseProvider
-from typing import Union, Iterator, AsyncIterator
+from .response_cache import ResponseCache
+from typing import Union, Iterator, AsyncIterator, Optional
 
 ImageProvider = Union[BaseProvider, object]
 Proxies = Union[dict, str]
@@ -16,11 +17,13 @@ class Client():
         self,
         api_key: str = None,
         proxies: Proxies = None,
+        response_cache: Optional[ResponseCache] = None,
         **kwargs
     ) -> None:
         self.api_key: str = api_key
         self.proxies= proxies 
         self.proxy: str = self.get_proxy()
+        self.response_cache: Optional[ResponseCache] = response_cache
 
     def get_proxy(self) -> Union[str, None]:
         if isinstance(self.proxies, str):
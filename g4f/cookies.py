@@ -5,7 +5,7 @@ import time
 import json
 
 try:
-    from platformdirs import user_config_dir
+    from platformdirs import user_config_dir, user_cache_dir
     has_platformdirs = True
 except ImportError:
     has_platformdirs = False
@@ -127,7 +127,14 @@ def set_cookies_dir(dir: str) -> None:
 def get_cookies_dir() -> str:
     return CookiesConfig.cookies_dir
 
+def get_cache_dir() -> str:
+    """Return the directory for the caches of g4f, in the user cache if platformdirs is installed."""
+    if has_platformdirs:
+        return user_cache_dir("g4f")
+    return os.path.join(os.path.expanduser("~"), ".cache", "g4f")
+
 def read_cookie_files(dirPath: str = None):
+    from .har_index import har_index
     dirPath = CookiesConfig.cookies_dir if dirPath is None else dirPath
     if not os.access(dirPath, os.R_OK):
         debug.log(f"Read cookies: {dirPath} dir is not readable")
@@ -142,53 +149,31 @@ def read_cookie_files(dirPath: str = None):
             if d in host:
                 return d
 
-    harFiles = []
-    cookieFiles = []
-    for root, _, files in os.walk(dirPath):
-        for file in files:
-            if file.endswith(".har"):
-                harFiles.append(os.path.join(root, file))
-            elif file.endswith(".json"):
-                cookieFiles.append(os.path.join(root, file))
-
+    # Pick up uploaded files right away, only changed files are parsed again
+    har_index.scan(dirPath, force=True)
     CookiesConfig.cookies = {}
-    for path in harFiles:
-        with open(path, 'rb') as file:
-            try:
-                harFile = json.load(file)
-            except json.JSONDecodeError:
-                # Error: not a HAR file!
-                continue
-            debug.log(f"Read .har file: {path}")
-            new_cookies = {}
-            for v in harFile['log']['entries']:
-                domain = get_domain(v)
-                if domain is None:
-                    continue
-                v_cookies = {}
-                for c in v['request']['cookies']:
-                    v_cookies[c['name']] = c['value']
-                if len(v_cookies) > 0:
-                    CookiesConfig.cookies[domain] = v_cookies
-                    new_cookies[domain] = len(v_cookies)
-            for domain, new_values in new_cookies.items():
-                debug.log(f"Cookies added: {new_values} from {domain}")
-    for path in cookieFiles:
-        with open(path, 'rb') as file:
-            try:
-                cookieFile = json.load(file)
-            except json.JSONDecodeError:
-                # Error: not a json file!
-                continue
-            if not isinstance(cookieFile, list):
+    for indexed in har_index.get_har_files(dirPath):
+        debug.log(f"Read .har file: {indexed['path']}")
+        new_cookies = {}
+        for v in indexed["data"]:
+            domain = get_domain(v)
+            if domain is None:
                 continue
-            debug.log(f"Read cookie file: {path}")
-            new_cookies = {}
-            for c in cookieFile:
-                if isinstance(c, dict) and "domain" in c:
-                    if c["domain"] not in new_cookies:
-                        new_cookies[c["domain"]] = {}
-                    new_cookies[c["domain"]][c["name"]] = c["value"]
-            for domain, new_values in new_cookies.items():
-                debug.log(f"Cookies added: {len(new_values)} from {domain}")
-                CookiesConfig.cookies[domain] = new_values
\ No newline at end of file
+            v_cookies = {}
+            for c in v['request']['cookies']:
+                v_cookies[c['name']] = c['value']
+            if len(v_cookies) > 0:
+                CookiesConfig.cookies[domain] = v_cookies
+                new_cookies[domain] = len(v_cookies)
+        for domain, new_values in new_cookies.items():
+            debug.log(f"Cookies added: {new_values} from {domain}")
+    for indexed in har_index.get_cookie_files(dirPath):
+        debug.log(f"Read cookie file: {indexed['path']}")
+        new_cookies = {}
+        for c in indexed["data"]:
+            if c["domain"] not in new_cookies:
+                new_cookies[c["domain"]] = {}
+            new_cookies[c["domain"]][c["name"]] = c["value"]
+        for domain, new_values in new_cookies.items():
+            debug.log(f"Cookies added: {len(new_values)} from {domain}")
+            CookiesConfig.cookies[domain] = new_values
@@ -517,6 +517,10 @@ async function add_message_chunk(message, message_id) {
         message_storage[message_id] += message.content;
         update_message(content_map, message_id);
         content_map.inner.style.height = "";
+    } else if (message.type == "rewrite") {
+        message_storage[message_id] = message_storage[message_id].substring(0, message.rewrite.offset) + message.rewrite.text;
+        update_message(content_map, message_id);
+        content_map.inner.style.height = "";
     } else if (message.type == "log") {
         let p = document.createElement("p");
         p.innerText = message.log;
@@ -2,24 +2,27 @@ from __future__ import annotations
 
 import logging
 import os
-import asyncio
-from typing import Iterator
-from flask import send_from_directory
+from typing import Iterator, AsyncIterator
+from flask import send_file, abort
 from inspect import signature
 
 from g4f import version, models
-from g4f import ChatCompletion, get_model_and_provider
+from g4f import get_model_and_provider
 from g4f.errors import VersionNotFoundError
-from g4f.image import ImagePreview, ImageResponse, copy_images, ensure_images_dir, images_dir
+from g4f.image import ImagePreview, ImageResponse, copy_images
+from g4f.image_store import image_store, IMAGE_MAX_AGE
 from g4f.Provider import ProviderType, __providers__, __map__
 from g4f.providers.base_provider import ProviderModelMixin
 from g4f.providers.retry_provider import IterListProvider
-from g4f.providers.response import BaseConversation, FinishReason, SynthesizeData
+from g4f.providers.response import BaseConversation, FinishReason, SynthesizeData, Rewrite
+from g4f.providers.context import RequestContext, get_request_context, async_iter_with_context
+from g4f.providers.asyncio import to_sync_generator
+from g4f.providers.sync_pool import iter_sync_provider
+from g4f.providers.conversation_store import conversation_store
 from g4f.client.service import convert_to_provider
 from g4f import debug
 
 logger = logging.getLogger(__name__)
-conversations: dict[dict[str, BaseConversation]] = {}
 
 class Api:
     @staticmethod
@@ -41,9 +44,9 @@ class Api:
             provider: ProviderType = __map__[provider]
             if issubclass(provider, ProviderModelMixin):
                 if api_key is not None and "api_key" in signature(provider.get_models).parameters:
-                    models = provider.get_models(api_key=api_key)
+                    models = provider.get_cached_models(api_key=api_key)
                 else:
-                    models = provider.get_models()
+                    models = provider.get_cached_models()
                 return [
                     {
                         "model": model,
@@ -79,16 +82,35 @@ class Api:
         }
 
     def serve_images(self, name):
-        ensure_images_dir()
-        return send_from_directory(os.path.abspath(images_dir), name)
+        entry = image_store.get(name)
+        if entry is None:
+            abort(404)
+        # Range and If-None-Match requests are answered by werkzeug
+        return send_file(
+            entry.path,
+            mimetype=entry.mime_type,
+            etag=entry.etag.strip('"'),
+            conditional=True,
+            max_age=IMAGE_MAX_AGE
+        )
 
     def _prepare_conversation_kwargs(self, json_data: dict, kwargs: dict):
-        model = json_data.get('model') or models.default
+        if self._use_web_search(json_data, kwargs):
+            from .internet import get_search_message
+            messages = json_data['messages']
+            messages[-1]["content"] = get_search_message(messages[-1]["content"])
+        return self._build_conversation_kwargs(json_data, kwargs)
+
+    async def _prepare_conversation_kwargs_async(self, json_data: dict, kwargs: dict):
+        if self._use_web_search(json_data, kwargs):
+            from .internet import get_search_message_async
+            messages = json_data['messages']
+            messages[-1]["content"] = await get_search_message_async(messages[-1]["content"])
+        return self._build_conversation_kwargs(json_data, kwargs)
+
+    def _use_web_search(self, json_data: dict, kwargs: dict) -> bool:
+        """Return True if the search results have to be added to the prompt."""
         provider = json_data.get('provider')
-        messages = json_data['messages']
-        api_key = json_data.get("api_key")
-        if api_key is not None:
-            kwargs["api_key"] = api_key
         do_web_search = json_data.get('web_search')
         if do_web_search and provider:
             provider_handler = convert_to_provider(provider)
@@ -96,16 +118,23 @@ class Api:
                 if "web_search" in provider_handler.get_parameters():
                     kwargs['web_search'] = True
                     do_web_search = False
-        if do_web_search:
-            from .internet import get_search_message
-            messages[-1]["content"] = get_search_message(messages[-1]["content"])
+        return bool(do_web_search)
+
+    def _build_conversation_kwargs(self, json_data: dict, kwargs: dict):
+        model = json_data.get('model') or models.default
+        provider = json_data.get('provider')
+        messages = json_data['messages']
+        api_key = json_data.get("api_key")
+        if api_key is not None:
+            kwargs["api_key"] = api_key
         if json_data.get("auto_continue"):
             kwargs['auto_continue'] = True
 
         conversation_id = json_data.get("conversation_id")
         if conversation_id and provider:
-            if provider in conversations and conversation_id in conversations[provider]:
-                kwargs["conversation"] = conversations[provider][conversation_id]
+            conversation = conversation_store.get(provider, conversation_id)
+            if conversation is not None:
+                kwargs["conversation"] = conversation
 
         if json_data.get("ignored"):
             kwargs["ignored"] = json_data["ignored"]
@@ -121,31 +150,41 @@ class Api:
         }
 
     def _create_response_stream(self, kwargs: dict, conversation_id: str, provider: str, download_images: bool = True) -> Iterator:
+        return to_sync_generator(self._create_response_stream_async(kwargs, conversation_id, provider, download_images))
+
+    async def _create_response_stream_async(self, kwargs: dict, conversation_id: str, provider: str, download_images: bool = True) -> AsyncIterator:
         def decorated_log(text: str):
             debug.logs.append(text)
             if debug.logging:
                 debug.log_handler(text)
         debug.log = decorated_log
         proxy = os.environ.get("G4F_PROXY")
-        provider = kwargs.get("provider")
+        kwargs = kwargs.copy()
+        provider = kwargs.pop("provider", None)
         model, provider_handler = get_model_and_provider(
-            kwargs.get("model"), provider,
+            kwargs.pop("model", None), provider,
             stream=True,
             ignore_stream=True,
             logging=False
         )
+        # Steps may run in different tasks, so the context of the request is passed along
+        context = get_request_context()
+        messages = kwargs.pop("messages")
+        if proxy and "proxy" not in kwargs:
+            kwargs["proxy"] = proxy
         first = True
         try:
-            result = ChatCompletion.create(**{**kwargs, "model": model, "provider": provider_handler})
-            for chunk in result:
+            if hasattr(provider_handler, "create_async_generator"):
+                result = provider_handler.create_async_generator(model, messages, **kwargs)
+            else:
+                result = iter_sync_provider(provider_handler, model, messages, **kwargs)
+            async for chunk in async_iter_with_context(result, context):
                 if first:
                     first = False
-                    yield self.handle_provider(provider_handler, model)
+                    yield self.handle_provider(provider_handler, model, context)
                 if isinstance(chunk, BaseConversation):
                     if provider is not None:
-                        if provider not in conversations:
-                            conversations[provider] = {}
-                        conversations[provider][conversation_id] = chunk
+                        conversation_store.set(provider, conversation_id, chunk)
                         yield self._format_json("conversation", conversation_id)
                 elif isinstance(chunk, Exception):
                     logger.exception(chunk)
@@ -155,11 +194,13 @@ class Api:
                 elif isinstance(chunk, ImageResponse):
                     images = chunk
                     if download_images:
-                        images = asyncio.run(copy_images(chunk.get_list(), chunk.get("cookies"), proxy))
+                        images = await copy_images(chunk.get_list(), chunk.get("cookies"), proxy)
                         images = ImageResponse(images, chunk.alt)
                     yield self._format_json("content", str(images))
                 elif isinstance(chunk, SynthesizeData):
                     yield self._format_json("synthesize", chunk.to_json())
+                elif isinstance(chunk, Rewrite):
+                    yield self._format_json("rewrite", {"offset": chunk.offset, "text": chunk.text})
                 elif not isinstance(chunk, FinishReason):
                     yield self._format_json("content", str(chunk))
                 if debug.logs:
@@ -170,7 +211,7 @@ class Api:
             logger.exception(e)
             yield self._format_json('error', get_error_message(e))
         if first:
-            yield self.handle_provider(provider_handler, model)
+            yield self.handle_provider(provider_handler, model, context)
 
     def _format_json(self, response_type: str, content):
         return {
@@ -178,11 +219,13 @@ class Api:
             response_type: content
         }
 
-    def handle_provider(self, provider_handler, model):
-        if isinstance(provider_handler, IterListProvider) and provider_handler.last_provider is not None:
-            provider_handler = provider_handler.last_provider
-        if not model and hasattr(provider_handler, "last_model") and provider_handler.last_model is not None:
-            model = provider_handler.last_model
+    def handle_provider(self, provider_handler, model, context: RequestContext = None):
+        if context is None:
+            context = get_request_context()
+        if isinstance(provider_handler, IterListProvider) and context.last_provider is not None:
+            provider_handler = context.last_provider
+        if not model and context.model is not None:
+            model = context.model
         return self._format_json("provider", {**provider_handler.get_dict(), "model": model})
 
 def get_error_message(exception: Exception) -> str:
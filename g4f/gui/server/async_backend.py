@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import os
+import json
+import asyncio
+from fastapi import FastAPI, Request, UploadFile
+from fastapi.responses import StreamingResponse, PlainTextResponse
+from starlette.concurrency import run_in_threadpool
+from werkzeug.utils import secure_filename
+
+from g4f.image import is_allowed_extension, to_image
+from g4f.client.service import convert_to_provider
+from g4f.client.sse import dumps
+from g4f.errors import ProviderNotFoundError
+from g4f.cookies import get_cookies_dir
+from .api import Api
+
+class AsyncBackend_Api(Api):
+    """
+    Serves the ``/backend-api/v2/*`` routes of the GUI from a FastAPI app.
+
+    Conversations are streamed from the async generators of the providers
+    on the event loop of the server, instead of a new event loop and a
+    worker thread per request as in the Flask backend.
+
+    Attributes:
+        app (FastAPI): The FastAPI application the routes are added to.
+    """
+
+    def __init__(self, app: FastAPI) -> None:
+        self.app: FastAPI = app
+
+    def register_routes(self) -> None:
+        """Add the routes, they must be registered before the Flask app is mounted."""
+        @self.app.get("/backend-api/v2/models")
+        def models():
+            return self.get_models()
+
+        @self.app.get("/backend-api/v2/models/{provider}")
+        def provider_models(provider: str, request: Request):
+            models = self.get_provider_models(provider, request.headers.get("x_api_key"))
+            if models is None:
+                return PlainTextResponse("Provider not found", 404)
+            return models
+
+        @self.app.get("/backend-api/v2/providers")
+        def providers():
+            return self.get_providers()
+
+        @self.app.get("/backend-api/v2/version")
+        def version():
+            return self.get_version()
+
+        @self.app.post("/backend-api/v2/conversation")
+        async def conversation(request: Request):
+            return await self.handle_conversation(request)
+
+        @self.app.get("/backend-api/v2/synthesize/{provider}")
+        async def synthesize(provider: str, request: Request):
+            return await self.handle_synthesize(provider, request)
+
+        @self.app.post("/backend-api/v2/upload_cookies")
+        async def upload_cookies(file: UploadFile = None):
+            return await self.upload_cookies(file)
+
+    async def upload_cookies(self, file: UploadFile = None):
+        if file is None or file.filename == '':
+            return PlainTextResponse('No selected file', 400)
+        if file.filename.endswith(".json") or file.filename.endswith(".har"):
+            filename = secure_filename(file.filename)
+            content = await file.read()
+            def save():
+                with open(os.path.join(get_cookies_dir(), filename), "wb") as target:
+                    target.write(content)
+            await run_in_threadpool(save)
+            return PlainTextResponse("File saved", 200)
+        return PlainTextResponse('Not supported file', 400)
+
+    async def handle_conversation(self, request: Request) -> StreamingResponse:
+        """
+        Handles conversation requests and streams responses back.
+
+        Returns:
+            StreamingResponse: The stream of json lines for the GUI.
+        """
+        kwargs = {}
+        if request.headers.get("content-type", "").startswith("multipart/form-data"):
+            form = await request.form()
+            images = []
+            for file in form.getlist('files[]'):
+                if file.filename and is_allowed_extension(file.filename):
+                    images.append((to_image(await file.read(), file.filename.endswith('.svg')), file.filename))
+            if images:
+                kwargs['images'] = images
+            json_data = json.loads(form['json'])
+        else:
+            json_data = await request.json()
+
+        kwargs = await self._prepare_conversation_kwargs_async(json_data, kwargs)
+
+        return StreamingResponse(
+            self._create_response_stream_async(
+                kwargs,
+                json_data.get("conversation_id"),
+                json_data.get("provider"),
+                json_data.get("download_images", True),
+            ),
+            media_type='text/event-stream'
+        )
+
+    async def handle_synthesize(self, provider: str, request: Request):
+        try:
+            provider_handler = convert_to_provider(provider)
+        except ProviderNotFoundError:
+            return PlainTextResponse("Provider not found", 404)
+        if not hasattr(provider_handler, "synthesize"):
+            return PlainTextResponse("Provider doesn't support synthesize", 500)
+        response_data = provider_handler.synthesize({**request.query_params})
+        if asyncio.iscoroutine(response_data):
+            response_data = [await response_data]
+        content_type = getattr(provider_handler, "synthesize_content_type", "application/octet-stream")
+        return StreamingResponse(response_data, media_type=content_type, headers={"Cache-Control": "max-age=604800"})
+
+    def _format_json(self, response_type: str, content) -> str:
+        return dumps(super()._format_json(response_type, content)) + "\n"
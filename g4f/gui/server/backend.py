@@ -9,6 +9,7 @@ from werkzeug.utils import secure_filename
 
 from g4f.image import is_allowed_extension, to_image
 from g4f.client.service import convert_to_provider
+from g4f.client.sse import dumps
 from g4f.providers.asyncio import to_sync_generator
 from g4f.errors import ProviderNotFoundError
 from g4f.cookies import get_cookies_dir
@@ -177,4 +178,4 @@ class Backend_Api(Api):
         Returns:
             str: A JSON formatted string.
         """
-        return json.dumps(super()._format_json(response_type, content)) + "\n"
\ No newline at end of file
+        return dumps(super()._format_json(response_type, content)) + "\n"
\ No newline at end of file
@@ -141,8 +141,11 @@ async def search(query: str, n_results: int = 5, max_words: int = 2500, add_text
         return SearchResults(formatted_results, used_words)
 
 def get_search_message(prompt, n_results: int = 5, max_words: int = 2500) -> str:
+    return asyncio.run(get_search_message_async(prompt, n_results, max_words))
+
+async def get_search_message_async(prompt, n_results: int = 5, max_words: int = 2500) -> str:
     try:
-        search_results = asyncio.run(search(prompt, n_results, max_words))
+        search_results = await search(prompt, n_results, max_words)
         message = f"""
 {search_results}
 
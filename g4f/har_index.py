@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import os
+import re
+import json
+import time
+from typing import Iterator, Optional
+
+from .cookies import get_cache_dir
+from . import debug
+
+# Response bodies are dropped from the index, except for these tokens
+TOKEN_PATTERNS = [re.compile(r'"accessToken":"(.*?)"')]
+SCAN_INTERVAL = 2
+
+def get_cache_file() -> str:
+    return os.path.join(get_cache_dir(), "har_index.json")
+
+def compact_entry(entry: dict) -> dict:
+    """
+    Reduce a HAR entry to the parts providers read: the request url, headers,
+    cookies and form params, and token matches from the response body.
+    The result keeps the HAR layout, so it can be read like a full entry.
+    """
+    request = entry["request"]
+    compact = {
+        "request": {
+            "url": request["url"],
+            "headers": [{"name": h["name"], "value": h["value"]} for h in request.get("headers", [])],
+            "cookies": [{"name": c["name"], "value": c["value"]} for c in request.get("cookies", [])],
+        },
+        "response": {"content": {}},
+    }
+    params = request.get("postData", {}).get("params")
+    if params:
+        compact["request"]["postData"] = {"params": params}
+    text = entry.get("response", {}).get("content", {}).get("text")
+    if text:
+        matches = [match.group(0) for pattern in TOKEN_PATTERNS for match in pattern.finditer(text)]
+        if matches:
+            compact["response"]["content"]["text"] = "\n".join(matches)
+    return compact
+
+def read_har_file(path: str) -> Optional[list[dict]]:
+    with open(path, "rb") as file:
+        try:
+            har_file = json.load(file)
+        except json.JSONDecodeError:
+            # Error: not a HAR file!
+            return None
+    try:
+        return [compact_entry(entry) for entry in har_file["log"]["entries"]]
+    except (KeyError, TypeError):
+        return None
+
+def read_cookie_file(path: str) -> Optional[list[dict]]:
+    with open(path, "rb") as file:
+        try:
+            cookie_file = json.load(file)
+        except json.JSONDecodeError:
+            # Error: not a json file!
+            return None
+    if not isinstance(cookie_file, list):
+        return None
+    return [
+        {"domain": c["domain"], "name": c["name"], "value": c["value"]}
+        for c in cookie_file
+        if isinstance(c, dict) and "domain" in c
+    ]
+
+class HarIndex:
+    """
+    Index of the .har and cookie .json files in the cookies dir.
+
+    Each file is parsed once and only its compact form is kept, in memory and
+    in ``cache_file`` keyed by path, mtime and size. The directory is rescanned
+    at most every ``scan_interval`` seconds and only changed files are parsed again.
+    """
+
+    def __init__(self, cache_file: Optional[str] = None, scan_interval: float = SCAN_INTERVAL) -> None:
+        self.cache_file = cache_file
+        self.scan_interval = scan_interval
+        self.files: dict[str, dict] = {}
+        self.scanned: dict[str, float] = {}
+        self.loaded = False
+
+    def load(self) -> None:
+        if self.loaded:
+            return
+        self.loaded = True
+        if self.cache_file is None or not os.path.isfile(self.cache_file):
+            return
+        try:
+            with open(self.cache_file, "r") as file:
+                files = json.load(file)
+            self.files.update({path: indexed for path, indexed in files.items() if os.path.isfile(path)})
+        except (OSError, ValueError) as e:
+            debug.log(f"Read .har index failed: {e.__class__.__name__}: {e}")
+
+    def save(self) -> None:
+        if self.cache_file is None:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.cache_file), mode=0o700, exist_ok=True)
+            temp_file = f"{self.cache_file}.{os.getpid()}.tmp"
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+            # The index has the cookies and tokens of the .har files, only the user may read it
+            with os.fdopen(os.open(temp_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600), "w") as file:
+                json.dump(self.files, file)
+            os.replace(temp_file, self.cache_file)
+        except OSError as e:
+            debug.log(f"Write .har index failed: {e.__class__.__name__}: {e}")
+
+    def scan(self, dir_path: str, force: bool = False) -> list[dict]:
+        """
+        Update the index for ``dir_path`` and return its files ordered by mtime.
+        """
+        self.load()
+        dir_path = os.path.abspath(dir_path)
+        if force or time.monotonic() - self.scanned.get(dir_path, -self.scan_interval) >= self.scan_interval:
+            self.scanned[dir_path] = time.monotonic()
+            if self.update(dir_path):
+                self.save()
+        prefix = os.path.join(dir_path, "")
+        files = [indexed for path, indexed in self.files.items() if path.startswith(prefix)]
+        files.sort(key=lambda indexed: indexed["mtime"])
+        return files
+
+    def update(self, dir_path: str) -> bool:
+        found = set()
+        changed = False
+        for path, stat in iter_files(dir_path):
+            if path.endswith(".har"):
+                kind = "har"
+            elif path.endswith(".json"):
+                kind = "cookies"
+            else:
+                continue
+            found.add(path)
+            indexed = self.files.get(path)
+            if indexed is not None and indexed["mtime"] == stat.st_mtime_ns and indexed["size"] == stat.st_size:
+                continue
+            try:
+                data = read_har_file(path) if kind == "har" else read_cookie_file(path)
+            except OSError as e:
+                debug.log(f"Read {path} failed: {e.__class__.__name__}: {e}")
+                continue
+            debug.log(f"Index {kind} file: {path}")
+            self.files[path] = {"path": path, "kind": kind, "mtime": stat.st_mtime_ns, "size": stat.st_size, "data": data}
+            changed = True
+        prefix = os.path.join(dir_path, "")
+        for path in [path for path in self.files if path.startswith(prefix) and path not in found]:
+            del self.files[path]
+            changed = True
+        return changed
+
+    def get_har_files(self, dir_path: str) -> list[dict]:
+        """Return the indexed .har files that could be parsed, oldest first."""
+        return [indexed for indexed in self.scan(dir_path) if indexed["kind"] == "har" and indexed["data"] is not None]
+
+    def iter_har_entries(self, dir_path: str) -> Iterator[dict]:
+        """Yield the compact entries of all .har files, oldest file first."""
+        for indexed in self.get_har_files(dir_path):
+            yield from indexed["data"]
+
+    def get_cookie_files(self, dir_path: str) -> list[dict]:
+        """Return the indexed cookie .json files that could be parsed, oldest first."""
+        return [indexed for indexed in self.scan(dir_path) if indexed["kind"] == "cookies" and indexed["data"] is not None]
+
+def iter_files(dir_path: str) -> Iterator[tuple[str, os.stat_result]]:
+    try:
+        entries = list(os.scandir(dir_path))
+    except OSError:
+        return
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            yield from iter_files(entry.path)
+        elif entry.is_file():
+            yield entry.path, entry.stat()
+
+har_index = HarIndex(get_cache_file())
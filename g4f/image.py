@@ -2,12 +2,8 @@ from __future__ import annotations
 
 import os
 import re
-import time
-import uuid
 from io import BytesIO
 import base64
-import asyncio
-from aiohttp import ClientSession, ClientError
 try:
     from PIL.Image import open as open_image, new as new_image
     from PIL.Image import FLIP_LEFT_RIGHT, ROTATE_180, ROTATE_270, ROTATE_90
@@ -18,8 +14,6 @@ except ImportError:
 from .typing import ImageType, Union, Image, Optional, Cookies
 from .errors import MissingRequirementsError
 from .providers.response import ResponseType
-from .requests.aiohttp import get_connector
-from . import debug
 
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp', 'svg'}
 
@@ -283,36 +277,11 @@ def ensure_images_dir():
 async def copy_images(
     images: list[str],
     cookies: Optional[Cookies] = None,
-    proxy: Optional[str] = None
+    proxy: Optional[str] = None,
+    max_size: Optional[tuple[int, int]] = None
 ) -> list[str]:
-    ensure_images_dir()
-    async with ClientSession(
-        connector=get_connector(proxy=proxy),
-        cookies=cookies
-    ) as session:
-        async def copy_image(image: str) -> str:
-            target = os.path.join(images_dir, f"{int(time.time())}_{str(uuid.uuid4())}")
-            if image.startswith("data:"):
-                with open(target, "wb") as f:
-                    f.write(extract_data_uri(image))
-            else:
-                try:
-                    async with session.get(image) as response:
-                        response.raise_for_status()
-                        with open(target, "wb") as f:
-                            async for chunk in response.content.iter_chunked(4096):
-                                f.write(chunk)
-                except ClientError as e:
-                    debug.log(f"copy_images failed: {e.__class__.__name__}: {e}")
-                    return image
-            with open(target, "rb") as f:
-                extension = is_accepted_format(f.read(12)).split("/")[-1]
-                extension = "jpg" if extension == "jpeg" else extension
-            new_target = f"{target}.{extension}"
-            os.rename(target, new_target)
-            return f"/images/{os.path.basename(new_target)}"
-
-        return await asyncio.gather(*[copy_image(image) for image in images])
+    from .image_pipeline import image_pipeline
+    return await image_pipeline.copy_images(images, cookies, proxy, max_size)
 
 class ImageResponse(ResponseType):
     def __init__(
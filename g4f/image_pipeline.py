@@ -0,0 +1,302 @@
+from __future__ import annotations
+
+import os
+import json
+import uuid
+import base64
+import asyncio
+import hashlib
+import threading
+import weakref
+from urllib.parse import urlparse
+from concurrent.futures import ProcessPoolExecutor, Executor
+from typing import Callable, Optional
+
+from aiohttp import ClientSession, ClientError
+
+from .typing import Cookies
+from .cookies import get_cache_dir
+from .requests.aiohttp import get_connector
+from .image_store import ImageStore, image_store
+from . import image as image_module
+from . import debug
+
+# Downloads that run at the same time for one host
+HOST_LIMIT = int(os.environ.get("G4F_IMAGE_HOST_LIMIT", 4))
+# Processes for the PIL work, 0 runs it in a thread
+PROCESS_WORKERS = int(os.environ.get("G4F_IMAGE_PROCESSES", 2))
+# Upstream urls remembered in the on-disk cache
+MAX_URLS = int(os.environ.get("G4F_IMAGE_MAX_URLS", 10000))
+CHUNK_SIZE = 64 * 1024
+# Bytes is_accepted_format needs to detect every format
+SNIFF_SIZE = 12
+
+def get_cache_file() -> str:
+    return os.path.join(get_cache_dir(), "image_urls.json")
+
+def get_extension(data: bytes) -> str:
+    """Return the file extension of an image from its first bytes."""
+    extension = image_module.is_accepted_format(data[:SNIFF_SIZE]).split("/")[-1]
+    return "jpg" if extension == "jpeg" else extension
+
+def resize_image_file(path: str, max_size: tuple[int, int]) -> str:
+    """
+    Write a copy of an image that fits into ``max_size``, next to the image.
+
+    Runs in a worker process. The name of the copy is derived from the name
+    of the image and the size, so it is only created once.
+    """
+    root, extension = os.path.splitext(path)
+    target = f"{root}_{max_size[0]}x{max_size[1]}{extension}"
+    if os.path.exists(target):
+        return target
+    with open(path, "rb") as file:
+        image = image_module.to_image(file)
+    image_format = image.format
+    image = image_module.process_image(image, *max_size)
+    temp = f"{target}.{uuid.uuid4().hex}.part"
+    image.save(temp, format=image_format)
+    os.replace(temp, target)
+    return target
+
+class UrlCache:
+    """
+    Maps upstream image urls to the files they were saved as.
+
+    The map is kept in a json file in the user cache dir, not in the images
+    dir, because the urls can contain tokens. An entry counts only as long
+    as its file exists.
+    """
+
+    def __init__(self, cache_file: Optional[str] = None, max_urls: int = MAX_URLS, store: ImageStore = image_store) -> None:
+        self.cache_file = get_cache_file() if cache_file is None else cache_file
+        self.store = store
+        self.max_urls = max_urls
+        self.urls: Optional[dict[str, str]] = None
+        self.lock = threading.Lock()
+
+    def load(self) -> dict[str, str]:
+        if self.urls is None:
+            with self.lock:
+                if self.urls is None:
+                    try:
+                        with open(self.cache_file, "r") as file:
+                            self.urls = json.load(file)
+                    except (OSError, ValueError):
+                        self.urls = {}
+        return self.urls
+
+    def get(self, url: str) -> Optional[str]:
+        filename = self.load().get(url)
+        if filename is not None and self.store.exists(filename):
+            return filename
+        return None
+
+    def set(self, url: str, filename: str) -> None:
+        urls = self.load()
+        with self.lock:
+            urls.pop(url, None)
+            urls[url] = filename
+            while len(urls) > self.max_urls:
+                del urls[next(iter(urls))]
+
+    def save(self) -> None:
+        """Write the map atomically, called in a thread."""
+        with self.lock:
+            if self.urls is None:
+                return
+            data = json.dumps(self.urls)
+        try:
+            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+            temp = f"{self.cache_file}.{uuid.uuid4().hex}.tmp"
+            with open(temp, "w") as file:
+                file.write(data)
+            os.replace(temp, self.cache_file)
+        except OSError as e:
+            debug.log(f"Save image url cache failed: {e.__class__.__name__}: {e}")
+
+class LoopState:
+    """The semaphores and running downloads of one event loop."""
+
+    def __init__(self) -> None:
+        self.hosts: dict[str, asyncio.Semaphore] = {}
+        self.downloads: dict[str, asyncio.Future] = {}
+
+class ImagePipeline:
+    """
+    Saves generated images to the images dir.
+
+    Downloads are streamed to a temporary file in a thread, while the format
+    is sniffed from the first bytes and the content is hashed. The file is
+    added to the image store, named by its hash, so the same image is
+    stored once. Every url is downloaded once: concurrent requests wait for
+    the same download, later ones are answered from the url cache. The
+    downloads of one host are limited by a semaphore. The PIL work runs in
+    a process pool.
+    """
+
+    def __init__(
+        self,
+        host_limit: int = HOST_LIMIT,
+        processes: int = PROCESS_WORKERS,
+        cache_file: Optional[str] = None,
+        store: ImageStore = image_store
+    ) -> None:
+        self.host_limit = host_limit
+        self.processes = processes
+        self.store = store
+        self.url_cache = UrlCache(cache_file, store=store)
+        self.states: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, LoopState] = weakref.WeakKeyDictionary()
+        self.executor: Optional[Executor] = None
+        self.lock = threading.Lock()
+
+    def get_state(self) -> LoopState:
+        loop = asyncio.get_running_loop()
+        state = self.states.get(loop)
+        if state is None:
+            state = self.states[loop] = LoopState()
+        return state
+
+    def get_semaphore(self, url: str) -> asyncio.Semaphore:
+        hosts = self.get_state().hosts
+        host = urlparse(url).netloc
+        if host not in hosts:
+            hosts[host] = asyncio.Semaphore(self.host_limit)
+        return hosts[host]
+
+    async def run_in_process(self, func: Callable, *args):
+        """Run a picklable function in the process pool, in a thread if there is none."""
+        loop = asyncio.get_running_loop()
+        if self.processes > 0 and self.executor is None:
+            with self.lock:
+                if self.executor is None:
+                    try:
+                        self.executor = ProcessPoolExecutor(self.processes)
+                    except (OSError, NotImplementedError) as e:
+                        debug.log(f"Start image process pool failed: {e.__class__.__name__}: {e}")
+                        self.processes = 0
+        return await loop.run_in_executor(self.executor, func, *args)
+
+    def shutdown(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+            self.executor = None
+
+    async def copy_images(
+        self,
+        images: list[str],
+        cookies: Optional[Cookies] = None,
+        proxy: Optional[str] = None,
+        max_size: Optional[tuple[int, int]] = None
+    ) -> list[str]:
+        """
+        Save images to the images dir.
+
+        Args:
+            images (list[str]): Urls or data uris of the images.
+            cookies (Cookies, optional): Cookies for the downloads.
+            proxy (str, optional): Proxy for the downloads.
+            max_size (tuple[int, int], optional): Save a copy that fits into this size.
+
+        Returns:
+            list[str]: The "/images/" path of every image, or its url if the download failed.
+        """
+        os.makedirs(self.store.get_root(), exist_ok=True)
+        async with ClientSession(
+            connector=get_connector(proxy=proxy),
+            cookies=cookies
+        ) as session:
+            loop = asyncio.get_running_loop()
+
+            async def copy_image(image: str) -> str:
+                if image.startswith("data:"):
+                    filename = await self.save_data_uri(image)
+                else:
+                    try:
+                        filename = await self.fetch(session, image)
+                    except ClientError as e:
+                        debug.log(f"copy_images failed: {e.__class__.__name__}: {e}")
+                        return image
+                if max_size is not None:
+                    target = await self.run_in_process(resize_image_file, self.store.get_path(filename), max_size)
+                    filename = await loop.run_in_executor(None, self.store.register, os.path.basename(target))
+                return f"/images/{filename}"
+            result = await asyncio.gather(*[copy_image(image) for image in images])
+        if any(not image.startswith("data:") for image in images):
+            await asyncio.get_running_loop().run_in_executor(None, self.url_cache.save)
+        return result
+
+    async def fetch(self, session: ClientSession, url: str) -> str:
+        """Return the file of an url, download it if it isn't cached or downloading."""
+        filename = self.url_cache.get(url)
+        if filename is not None:
+            return filename
+        downloads = self.get_state().downloads
+        if url in downloads:
+            return await asyncio.shield(downloads[url])
+        future = asyncio.get_running_loop().create_future()
+        downloads[url] = future
+        try:
+            filename = await self.download(session, url)
+            self.url_cache.set(url, filename)
+            future.set_result(filename)
+            return filename
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Don't warn about an exception nobody waits for
+            future.exception()
+            raise
+        finally:
+            del downloads[url]
+
+    async def download(self, session: ClientSession, url: str) -> str:
+        loop = asyncio.get_running_loop()
+        temp = os.path.join(self.store.get_root(), f".{uuid.uuid4().hex}.part")
+        content_hash = hashlib.sha256()
+        head = b""
+        async with self.get_semaphore(url):
+            async with session.get(url) as response:
+                response.raise_for_status()
+                file = await loop.run_in_executor(None, open, temp, "wb")
+                try:
+                    async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                        if len(head) < SNIFF_SIZE:
+                            head += chunk[:SNIFF_SIZE]
+                        content_hash.update(chunk)
+                        await loop.run_in_executor(None, file.write, chunk)
+                    await loop.run_in_executor(None, file.close)
+                    filename = f"{content_hash.hexdigest()}.{get_extension(head)}"
+                    await loop.run_in_executor(None, self.store.add_file, temp, filename)
+                except BaseException:
+                    file.close()
+                    await loop.run_in_executor(None, remove_file, temp)
+                    raise
+        return filename
+
+    async def save_data_uri(self, data_uri: str) -> str:
+        return await asyncio.get_running_loop().run_in_executor(None, self.save_data, data_uri)
+
+    def save_data(self, data_uri: str) -> str:
+        data = base64.b64decode(data_uri.split(",")[-1])
+        return self.store.add_bytes(data, get_extension(data))
+
+def remove_file(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+async def read_image_base64(filename: str, store: ImageStore = image_store) -> str:
+    """Read a stored image as base64 in a thread."""
+    def read() -> str:
+        entry = store.get(os.path.basename(filename))
+        if entry is None:
+            raise FileNotFoundError(f"Image not found: {filename}")
+        with open(entry.path, "rb") as file:
+            return base64.b64encode(file.read()).decode()
+    return await asyncio.get_running_loop().run_in_executor(None, read)
+
+image_pipeline = ImagePipeline()
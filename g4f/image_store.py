@@ -0,0 +1,295 @@
+from __future__ import annotations
+
+import os
+import re
+import time
+import uuid
+import sqlite3
+import hashlib
+import threading
+from typing import Iterator, Optional
+
+from . import image as image_module
+from . import debug
+
+# Size of all images, the least recently used are deleted above it
+MAX_BYTES = int(os.environ.get("G4F_IMAGES_MAX_MB", 1024)) * 1024 * 1024
+# Seconds after the last access an image is deleted, 0 keeps them
+MAX_AGE = float(os.environ.get("G4F_IMAGES_MAX_AGE", 30 * 24 * 3600))
+# Seconds clients may cache an image, the content of a name never changes
+IMAGE_MAX_AGE = 365 * 24 * 3600
+# The last access is written at most once per interval
+ACCESS_INTERVAL = 60
+INDEX_FILE = "index.db"
+CHUNK_SIZE = 64 * 1024
+
+MIME_TYPES = {
+    "png": "image/png",
+    "jpg": "image/jpeg",
+    "jpeg": "image/jpeg",
+    "gif": "image/gif",
+    "webp": "image/webp",
+    "svg": "image/svg+xml",
+}
+# Names of stored images: the sha256 of the content and an optional size of a resized copy
+HASH_NAME_PATTERN = re.compile(r"^([0-9a-f]{64})(?:_\d+x\d+)?\.(\w+)$")
+# Names of images saved before the store, in the images dir itself
+LEGACY_NAME_PATTERN = re.compile(r"^\d+_[0-9a-f-]{36}\.(\w+)$")
+
+class ImageEntry:
+    """
+    Metadata of a stored image.
+
+    Attributes:
+        name (str): The name in the "/images/" url.
+        path (str): The path of the file.
+        mime_type (str): The content type, from the format sniffed when the image was stored.
+        size (int): The size of the file in bytes.
+        last_access (float): The time the image was last served or stored.
+    """
+
+    def __init__(self, name: str, path: str, mime_type: str, size: int, last_access: float) -> None:
+        self.name = name
+        self.path = path
+        self.mime_type = mime_type
+        self.size = size
+        self.last_access = last_access
+
+    @property
+    def etag(self) -> str:
+        # The content of a name never changes, so the name is a strong etag
+        return f'"{os.path.splitext(self.name)[0]}"'
+
+def get_shard(name: str) -> str:
+    return name[:2]
+
+def get_mime_type(name: str) -> Optional[str]:
+    return MIME_TYPES.get(os.path.splitext(name)[1][1:].lower())
+
+def parse_range(header: str, size: int) -> Optional[tuple[int, int]]:
+    """
+    Parse a "Range" header with a single byte range.
+
+    Returns:
+        Optional[tuple[int, int]]: The first and last byte, None for headers
+        that are answered with the whole file, like multiple ranges.
+
+    Raises:
+        ValueError: If the range can't be satisfied.
+    """
+    match = re.fullmatch(r"\s*bytes=(\d*)-(\d*)\s*", header)
+    if match is None:
+        return None
+    start, end = match.groups()
+    if not start:
+        if not end:
+            return None
+        # The last bytes of the file
+        start, end = max(size - int(end), 0), size - 1
+    else:
+        start, end = int(start), min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        raise ValueError(f"Range not satisfiable: {header}")
+    return start, end
+
+def read_range(path: str, start: int, end: int) -> Iterator[bytes]:
+    """Read the bytes from ``start`` to ``end`` of a file in chunks."""
+    with open(path, "rb") as file:
+        file.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = file.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+class ImageStore:
+    """
+    Content-addressed store of the generated images.
+
+    Images are named by the sha256 of their content, so every image is
+    stored once, and are kept in directories by the first two chars of the
+    name. An SQLite index in the images dir holds the mime type, size and
+    last access of every file, so serving an image doesn't read the file.
+    Images that were not accessed for ``max_age`` seconds are deleted, and
+    the least recently used ones while the store is larger than ``max_bytes``.
+    Images saved before the store are indexed and evicted in the same way.
+    """
+
+    def __init__(self, root: Optional[str] = None, max_bytes: int = MAX_BYTES, max_age: float = MAX_AGE) -> None:
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.connection: Optional[sqlite3.Connection] = None
+        self.connected_root: Optional[str] = None
+        self.size = 0
+        self.evicted = 0
+        self.lock = threading.RLock()
+
+    def get_root(self) -> str:
+        return image_module.images_dir if self.root is None else self.root
+
+    def connect(self) -> sqlite3.Connection:
+        root = self.get_root()
+        if self.connection is not None and self.connected_root != root:
+            self.close()
+        if self.connection is None:
+            os.makedirs(root, exist_ok=True)
+            self.connection = sqlite3.connect(os.path.join(root, INDEX_FILE), check_same_thread=False)
+            self.connected_root = root
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS images "
+                "(name TEXT PRIMARY KEY, path TEXT, mime_type TEXT, size INTEGER, last_access REAL)"
+            )
+            self.connection.execute("CREATE INDEX IF NOT EXISTS images_last_access ON images (last_access)")
+            if self.connection.execute("SELECT COUNT(*) FROM images").fetchone()[0] == 0:
+                self.scan(root)
+            self.size = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM images").fetchone()[0]
+            self.connection.commit()
+        return self.connection
+
+    def scan(self, root: str) -> None:
+        """Index the images found in the dir, for a new or lost index."""
+        now = time.time()
+        rows = []
+        for name in os.listdir(root):
+            path = os.path.join(root, name)
+            if os.path.isdir(path) and len(name) == 2:
+                rows += [
+                    (filename, os.path.join(name, filename), get_mime_type(filename), os.path.getsize(os.path.join(path, filename)), now)
+                    for filename in os.listdir(path) if HASH_NAME_PATTERN.match(filename) and get_mime_type(filename)
+                ]
+            elif LEGACY_NAME_PATTERN.match(name) and get_mime_type(name):
+                rows.append((name, name, get_mime_type(name), os.path.getsize(path), now))
+        self.connection.executemany("REPLACE INTO images VALUES (?, ?, ?, ?, ?)", rows)
+
+    def get_path(self, name: str) -> str:
+        """Return the path of a new image."""
+        return os.path.join(self.get_root(), get_shard(name), name)
+
+    def get(self, name: str) -> Optional[ImageEntry]:
+        """Return the entry of an image and record the access, None if it is not stored."""
+        if get_mime_type(name) is None:
+            return None
+        with self.lock:
+            connection = self.connect()
+            row = connection.execute(
+                "SELECT path, mime_type, size, last_access FROM images WHERE name = ?", (name,)
+            ).fetchone()
+            if row is None:
+                return None
+            path = os.path.join(self.get_root(), row[0])
+            if not os.path.isfile(path):
+                self.remove(name, row[2])
+                connection.commit()
+                return None
+            now = time.time()
+            if now - row[3] > ACCESS_INTERVAL:
+                connection.execute("UPDATE images SET last_access = ? WHERE name = ?", (now, name))
+                connection.commit()
+            return ImageEntry(name, path, row[1], row[2], now)
+
+    def exists(self, name: str) -> bool:
+        with self.lock:
+            row = self.connect().execute("SELECT path FROM images WHERE name = ?", (name,)).fetchone()
+            return row is not None and os.path.isfile(os.path.join(self.get_root(), row[0]))
+
+    def add_file(self, temp: str, name: str) -> str:
+        """Move a file to the store, drop it if the image is stored already."""
+        path = self.get_path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if os.path.exists(path):
+            os.remove(temp)
+        else:
+            os.replace(temp, path)
+        return self.register(name)
+
+    def add_bytes(self, data: bytes, extension: str) -> str:
+        """Store the content of an image, named by its hash."""
+        name = f"{hashlib.sha256(data).hexdigest()}.{extension}"
+        if not self.exists(name):
+            temp = os.path.join(self.get_root(), f".{uuid.uuid4().hex}.part")
+            with open(temp, "wb") as file:
+                file.write(data)
+            self.add_file(temp, name)
+        else:
+            self.register(name)
+        return name
+
+    def register(self, name: str) -> str:
+        """Index a file that was written to its path in the store."""
+        size = os.path.getsize(self.get_path(name))
+        with self.lock:
+            connection = self.connect()
+            row = connection.execute("SELECT size FROM images WHERE name = ?", (name,)).fetchone()
+            if row is not None:
+                self.size -= row[0]
+            connection.execute(
+                "REPLACE INTO images VALUES (?, ?, ?, ?, ?)",
+                (name, os.path.join(get_shard(name), name), get_mime_type(name), size, time.time())
+            )
+            self.size += size
+            self.evict(keep=name)
+            connection.commit()
+        return name
+
+    def remove(self, name: str, size: int) -> None:
+        self.connection.execute("DELETE FROM images WHERE name = ?", (name,))
+        self.size -= size
+
+    def evict(self, keep: Optional[str] = None) -> None:
+        """
+        Delete the expired images, then the least recently used while the store is too large.
+
+        Args:
+            keep (str, optional): An image that is not deleted, like the one that was just added.
+        """
+        with self.lock:
+            connection = self.connect()
+            rows = []
+            if self.max_age:
+                rows += connection.execute(
+                    "SELECT name, path, size FROM images WHERE last_access < ?", (time.time() - self.max_age,)
+                ).fetchall()
+            size = self.size - sum(row[2] for row in rows)
+            if size > self.max_bytes:
+                for row in connection.execute(
+                    "SELECT name, path, size FROM images WHERE last_access >= ? ORDER BY last_access",
+                    (time.time() - self.max_age if self.max_age else 0,)
+                ):
+                    if size <= self.max_bytes:
+                        break
+                    if row[0] == keep:
+                        continue
+                    rows.append(row)
+                    size -= row[2]
+            for name, path, size in rows:
+                try:
+                    os.remove(os.path.join(self.get_root(), path))
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    debug.log(f"Evict image {name} failed: {e.__class__.__name__}: {e}")
+                    continue
+                self.remove(name, size)
+                self.evicted += 1
+            connection.commit()
+
+    def get_metrics(self) -> dict:
+        with self.lock:
+            return {
+                "images": self.connect().execute("SELECT COUNT(*) FROM images").fetchone()[0],
+                "bytes": self.size,
+                "max_bytes": self.max_bytes,
+                "evicted": self.evicted,
+            }
+
+    def close(self) -> None:
+        with self.lock:
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
+                self.connected_root = None
+
+image_store = ImageStore()
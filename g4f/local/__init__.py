@@ -37,7 +37,7 @@ class Completions():
             ),
             **kwargs
         )
-        response = iter_response(response, stream, response_format, max_tokens, stop)
+        response = iter_response(response, stream, response_format, max_tokens, stop, messages, model)
         return response if stream else next(response)
 
 class Chat():
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator
+
+from .. import debug
+
+# Budget for loaded models in GB, compared to the "ram" field of models.json
+MAX_RAM = float(os.environ.get("G4F_LOCAL_MAX_RAM", 16))
+# Instances per model, more than one lets completions of one model run at once
+WORKERS = int(os.environ.get("G4F_LOCAL_WORKERS", 1))
+
+class CacheEntry:
+    def __init__(self, ram: float) -> None:
+        self.ram = ram
+        self.idle: list = []
+        self.busy: int = 0
+
+    @property
+    def size(self) -> int:
+        return len(self.idle) + self.busy
+
+class ModelCache:
+    """
+    Keeps loaded local models in memory between completions.
+
+    Each model key holds up to ``workers`` instances. A completion leases an
+    idle instance or loads a new one; while all instances are busy it waits.
+    The sum of the ``ram`` of all instances is kept below ``max_ram`` by
+    unloading the least recently used idle instances. A single model that
+    needs more than ``max_ram`` is still loaded once nothing else is.
+    """
+
+    def __init__(self, max_ram: float = MAX_RAM, workers: int = WORKERS) -> None:
+        self.max_ram = max_ram
+        self.workers = workers
+        self.entries: OrderedDict[Any, CacheEntry] = OrderedDict()
+        self.condition = threading.Condition()
+
+    @property
+    def used_ram(self) -> float:
+        return sum(entry.ram * entry.size for entry in self.entries.values())
+
+    def evict(self, ram: float) -> bool:
+        """Unload idle instances until ``ram`` fits. Returns False if it does not fit yet."""
+        while self.used_ram and self.used_ram + ram > self.max_ram:
+            for key, entry in self.entries.items():
+                if entry.idle:
+                    model = entry.idle.pop(0)
+                    debug.log(f"Unload local model: {key}")
+                    if hasattr(model, "close"):
+                        model.close()
+                    break
+            else:
+                return False
+        for key in [key for key, entry in self.entries.items() if not entry.size]:
+            del self.entries[key]
+        return True
+
+    @contextmanager
+    def lease(self, key: Any, ram: float, load: Callable[[], Any]) -> Iterator[Any]:
+        """
+        Lease an instance of the model ``key``, calling ``load`` if a new one is needed.
+        """
+        with self.condition:
+            while True:
+                entry = self.entries.get(key)
+                if entry is not None and entry.idle:
+                    self.entries.move_to_end(key)
+                    model = entry.idle.pop()
+                    entry.busy += 1
+                    break
+                if entry is None or entry.size < self.workers:
+                    if self.evict(ram):
+                        if key not in self.entries:
+                            self.entries[key] = CacheEntry(ram)
+                        self.entries.move_to_end(key)
+                        entry = self.entries[key]
+                        entry.busy += 1
+                        model = None
+                        break
+                self.condition.wait()
+        if model is None:
+            try:
+                debug.log(f"Load local model: {key}")
+                model = load()
+            except:
+                with self.condition:
+                    entry.busy -= 1
+                    self.evict(0)
+                    self.condition.notify_all()
+                raise
+        try:
+            yield model
+        finally:
+            with self.condition:
+                entry.busy -= 1
+                entry.idle.append(model)
+                self.condition.notify_all()
+
+    def clear(self) -> None:
+        with self.condition:
+            for entry in self.entries.values():
+                for model in entry.idle:
+                    if hasattr(model, "close"):
+                        model.close()
+                entry.idle.clear()
+            self.evict(0)
+
+model_cache = ModelCache()
@@ -4,34 +4,25 @@ import os
 
 from gpt4all import GPT4All
 from .models import get_models
+from .cache import model_cache
 from ..typing import Messages
 
 MODEL_LIST: dict[str, dict] = None
+N_THREADS = int(os.environ["G4F_LOCAL_THREADS"]) if os.environ.get("G4F_LOCAL_THREADS") else None
 
 def find_model_dir(model_file: str) -> str:
     local_dir = os.path.dirname(os.path.abspath(__file__))
     project_dir = os.path.dirname(os.path.dirname(local_dir))
-
     new_model_dir = os.path.join(project_dir, "models")
-    new_model_file = os.path.join(new_model_dir, model_file)
-    if os.path.isfile(new_model_file):
-        return new_model_dir
-
-    old_model_dir = os.path.join(local_dir, "models")
-    old_model_file = os.path.join(old_model_dir, model_file)
-    if os.path.isfile(old_model_file):
-        return old_model_dir
-
-    working_dir = "./"
-    for root, dirs, files in os.walk(working_dir):
-        if model_file in files:
-            return root
-
+    # Only look in the known model dirs, walking the working dir can take minutes
+    for model_dir in [new_model_dir, os.path.join(local_dir, "models"), os.path.abspath("models"), os.path.abspath(".")]:
+        if os.path.isfile(os.path.join(model_dir, model_file)):
+            return model_dir
     return new_model_dir
 
 class LocalProvider:
     @staticmethod
-    def create_completion(model: str, messages: Messages, stream: bool = False, **kwargs):
+    def create_completion(model: str, messages: Messages, stream: bool = False, n_threads: int = N_THREADS, **kwargs):
         global MODEL_LIST
         if MODEL_LIST is None:
             MODEL_LIST = get_models()
@@ -49,11 +40,13 @@ class LocalProvider:
             else:
                 raise ValueError(f'Model "{model_file}" not found.')
 
-        model = GPT4All(model_name=model_file,
-                        #n_threads=8,
-                        verbose=False,
-                        allow_download=False,
-                        model_path=model_dir)
+        def load_model() -> GPT4All:
+            # The llama.cpp backend memory-maps the weights, so reloads share the page cache
+            return GPT4All(model_name=model_file,
+                           n_threads=n_threads,
+                           verbose=False,
+                           allow_download=False,
+                           model_path=model_dir)
 
         system_message = "\n".join(message["content"] for message in messages if message["role"] == "system")
         if system_message:
@@ -69,9 +62,11 @@ class LocalProvider:
         def should_not_stop(token_id: int, token: str):
             return "USER" not in token
 
-        with model.chat_session(system_message, prompt_template):
-            if stream:
-                for token in model.generate(conversation, streaming=True, callback=should_not_stop):
-                    yield token
-            else:
-                yield model.generate(conversation, callback=should_not_stop)
\ No newline at end of file
+        key = (model_file, n_threads)
+        with model_cache.lease(key, float(model.get("ram") or 0), load_model) as instance:
+            with instance.chat_session(system_message, prompt_template):
+                if stream:
+                    for token in instance.generate(conversation, streaming=True, callback=should_not_stop):
+                        yield token
+                else:
+                    yield instance.generate(conversation, callback=should_not_stop)
\ No newline at end of file
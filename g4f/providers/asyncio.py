@@ -1,8 +1,9 @@
 from __future__ import annotations
 
 import asyncio
+import logging
 from asyncio import AbstractEventLoop, runners
-from typing import Optional, Callable, AsyncGenerator, Generator
+from typing import Optional, Callable, AsyncGenerator, Generator, AsyncIterator, Iterator
 
 from ..errors import NestAsyncioError
 
@@ -40,6 +41,18 @@ async def await_callback(callback: Callable):
 async def async_generator_to_list(generator: AsyncGenerator) -> list:
     return [item async for item in generator]
 
+async def safe_aclose(generator: AsyncGenerator) -> None:
+    try:
+        if generator and hasattr(generator, 'aclose'):
+            await generator.aclose()
+    except Exception as e:
+        logging.warning(f"Error while closing generator: {e}")
+
+# Helper function to convert a synchronous iterator to an async iterator
+async def to_async_iterator(iterator: Iterator) -> AsyncIterator:
+    for item in iterator:
+        yield item
+
 def to_sync_generator(generator: AsyncGenerator) -> Generator:
     loop = get_running_loop(check_nested=False)
     new_loop = False
@@ -6,14 +6,16 @@ import asyncio
 from asyncio import AbstractEventLoop
 from concurrent.futures import ThreadPoolExecutor
 from abc import abstractmethod
+from functools import partial
 from inspect import signature, Parameter
 
 from ..typing import CreateResult, AsyncResult, Messages
 from .types import BaseProvider
 from .asyncio import get_running_loop, to_sync_generator
+from .context import get_request_context
+from .model_registry import model_registry
 from .response import FinishReason, BaseConversation, SynthesizeData
 from ..errors import ModelNotSupportedError
-from .. import debug
 
 # Set Windows event loop policy for better compatibility with asyncio and curl_cffi
 if sys.platform == 'win32':
@@ -240,7 +242,6 @@ class ProviderModelMixin:
     models: list[str] = []
     model_aliases: dict[str, str] = {}
     image_models: list = None
-    last_model: str = None
 
     @classmethod
     def get_models(cls, **kwargs) -> list[str]:
@@ -248,6 +249,37 @@ class ProviderModelMixin:
             return [cls.default_model]
         return cls.models
 
+    @classmethod
+    async def fetch_models(cls, **kwargs) -> list[str]:
+        """
+        Download the models of the provider, used by the model registry.
+
+        Providers that discover their models over the network override this.
+        The default runs ``get_models`` in a thread.
+        """
+        return await asyncio.get_running_loop().run_in_executor(None, partial(cls.get_models, **kwargs))
+
+    @classmethod
+    def has_model_discovery(cls) -> bool:
+        return (
+            cls.fetch_models.__func__ is not ProviderModelMixin.fetch_models.__func__
+            or cls.get_models.__func__ is not ProviderModelMixin.get_models.__func__
+        )
+
+    @classmethod
+    def get_cached_models(cls, **kwargs) -> list[str]:
+        """Return the models from the registry without blocking, a refresh runs in the background."""
+        if not cls.has_model_discovery():
+            return cls.get_models()
+        return model_registry.get_models_nowait(cls, **kwargs)
+
+    @classmethod
+    async def get_models_async(cls, **kwargs) -> list[str]:
+        """Return the models from the registry, waiting for the first download without blocking the loop."""
+        if not cls.has_model_discovery():
+            return cls.get_models()
+        return await model_registry.get_models(cls, **kwargs)
+
     @classmethod
     def get_model(cls, model: str, **kwargs) -> str:
         if not model and cls.default_model is not None:
@@ -255,8 +287,7 @@ class ProviderModelMixin:
         elif model in cls.model_aliases:
             model = cls.model_aliases[model]
         else:
-            if model not in cls.get_models(**kwargs) and cls.models:
+            if model not in cls.get_cached_models(**kwargs) and cls.models:
                 raise ModelNotSupportedError(f"Model is not supported: {model} in: {cls.__name__}")
-        cls.last_model = model
-        debug.last_model = model
+        get_request_context().model = model
         return model
\ No newline at end of file
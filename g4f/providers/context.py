@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+from contextvars import ContextVar
+from typing import Optional, Iterator, AsyncIterator
+
+from .asyncio import safe_aclose
+
+class RequestContext:
+    """
+    Provider and model state of a single completion request.
+
+    The context object is set once per request and then only mutated,
+    so tasks and threads that copy the context of the request share it.
+    Responses are iterated with ``iter_with_context`` so that streams
+    which are consumed interleaved in one task keep their own context.
+
+    Attributes:
+        provider (ProviderType): The provider selected for the request, may be a retry provider.
+        model (str): The model used, updated when a provider resolves its own model name.
+        last_provider (ProviderType): The provider a retry provider is currently using.
+    """
+
+    def __init__(self, provider=None, model: Optional[str] = None) -> None:
+        self.provider = provider
+        self.model = model
+        self.last_provider = None
+
+request_context: ContextVar[Optional[RequestContext]] = ContextVar("request_context", default=None)
+
+def get_request_context() -> RequestContext:
+    """Return the context of the current request, creating one if there is none."""
+    context = request_context.get()
+    if context is None:
+        context = new_request_context()
+    return context
+
+def new_request_context(provider=None, model: Optional[str] = None) -> RequestContext:
+    """Start a new request context in the current execution context."""
+    context = RequestContext(provider, model)
+    request_context.set(context)
+    return context
+
+def iter_with_context(iterator: Iterator, context: RequestContext) -> Iterator:
+    """Run every step of an iterator in the given request context."""
+    iterator = iter(iterator)
+    try:
+        while True:
+            token = request_context.set(context)
+            try:
+                chunk = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                request_context.reset(token)
+            yield chunk
+    finally:
+        if hasattr(iterator, "close"):
+            iterator.close()
+
+async def async_iter_with_context(iterator: AsyncIterator, context: RequestContext) -> AsyncIterator:
+    """Run every step of an async iterator in the given request context."""
+    iterator = iterator.__aiter__()
+    try:
+        while True:
+            token = request_context.set(context)
+            try:
+                chunk = await iterator.__anext__()
+            except StopAsyncIteration:
+                return
+            finally:
+                request_context.reset(token)
+            yield chunk
+    finally:
+        await safe_aclose(iterator)
@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import os
+import time
+import pickle
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Optional, Hashable
+
+from .response import BaseConversation
+from .. import debug
+
+MAX_ENTRIES = int(os.environ.get("G4F_CONVERSATION_MAX", 1000))
+MAX_BYTES = int(float(os.environ.get("G4F_CONVERSATION_MAX_MB", 64)) * 1024 * 1024)
+TTL = float(os.environ.get("G4F_CONVERSATION_TTL", 3600))
+# Path of a SQLite file that keeps evicted conversations, disabled if not set
+SPILL_FILE = os.environ.get("G4F_CONVERSATION_SPILL")
+SPILL_TTL = float(os.environ.get("G4F_CONVERSATION_SPILL_TTL", 7 * 24 * 3600))
+
+class StoreEntry:
+    def __init__(self, conversation: BaseConversation, size: int) -> None:
+        self.conversation = conversation
+        self.size = size
+        self.accessed = time.monotonic()
+
+class SpillStore:
+    """
+    SQLite table of pickled conversations, used as the second tier of the store.
+    """
+
+    def __init__(self, path: str, ttl: float = SPILL_TTL) -> None:
+        self.path = path
+        self.ttl = ttl
+        self.connection: Optional[sqlite3.Connection] = None
+
+    def connect(self) -> sqlite3.Connection:
+        if self.connection is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self.connection = sqlite3.connect(self.path, check_same_thread=False)
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS conversations (key TEXT PRIMARY KEY, data BLOB, updated REAL)"
+            )
+            self.connection.execute("DELETE FROM conversations WHERE updated < ?", (time.time() - self.ttl,))
+            self.connection.commit()
+        return self.connection
+
+    def put(self, key: str, data: bytes) -> None:
+        connection = self.connect()
+        connection.execute("REPLACE INTO conversations VALUES (?, ?, ?)", (key, data, time.time()))
+        connection.commit()
+
+    def pop(self, key: str) -> Optional[bytes]:
+        connection = self.connect()
+        row = connection.execute(
+            "SELECT data FROM conversations WHERE key = ? AND updated >= ?", (key, time.time() - self.ttl)
+        ).fetchone()
+        connection.execute("DELETE FROM conversations WHERE key = ?", (key,))
+        connection.commit()
+        return None if row is None else row[0]
+
+    def delete(self, key: str) -> None:
+        connection = self.connect()
+        connection.execute("DELETE FROM conversations WHERE key = ?", (key,))
+        connection.commit()
+
+    def count(self) -> int:
+        return self.connect().execute("SELECT COUNT(*) FROM conversations").fetchone()[0]
+
+    def close(self) -> None:
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+def get_size(conversation: BaseConversation) -> Optional[int]:
+    """Estimate the memory of a conversation by its pickled size, None if it can't be pickled."""
+    try:
+        return len(pickle.dumps(conversation))
+    except Exception:
+        return None
+
+class ConversationStore:
+    """
+    Conversations of the providers, by provider name and conversation id.
+
+    Entries are evicted in least recently used order when there are more than
+    ``max_entries`` or their estimated size exceeds ``max_bytes``, and expire
+    ``ttl`` seconds after their last use. With a ``spill_file`` evicted entries
+    are written to SQLite and restored on their next use. Conversations that
+    can't be pickled are counted with a size of 0 and are dropped on eviction.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = MAX_ENTRIES,
+        max_bytes: int = MAX_BYTES,
+        ttl: float = TTL,
+        spill_file: Optional[str] = SPILL_FILE,
+    ) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.spill = None if spill_file is None else SpillStore(spill_file)
+        self.entries: OrderedDict[tuple, StoreEntry] = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.restored = 0
+        self.evicted = 0
+        self.expired = 0
+        self.lock = threading.RLock()
+
+    @staticmethod
+    def get_key(provider: str, conversation_id: Hashable) -> tuple:
+        return (getattr(provider, "__name__", provider), conversation_id)
+
+    def get(self, provider: str, conversation_id: Hashable) -> Optional[BaseConversation]:
+        key = self.get_key(provider, conversation_id)
+        with self.lock:
+            self.expire()
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                entry.accessed = time.monotonic()
+                self.hits += 1
+                return entry.conversation
+            conversation = self.restore(key)
+            if conversation is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.restored += 1
+            self.add(key, conversation)
+            self.evict()
+            return conversation
+
+    def set(self, provider: str, conversation_id: Hashable, conversation: BaseConversation) -> None:
+        key = self.get_key(provider, conversation_id)
+        with self.lock:
+            self.add(key, conversation)
+            self.expire()
+            self.evict()
+
+    def delete(self, provider: str, conversation_id: Hashable) -> None:
+        key = self.get_key(provider, conversation_id)
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is not None:
+                self.size -= entry.size
+            if self.spill is not None:
+                self.spill.delete(repr(key))
+
+    def add(self, key: tuple, conversation: BaseConversation) -> None:
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry.size
+        entry = StoreEntry(conversation, get_size(conversation) or 0)
+        self.entries[key] = entry
+        self.size += entry.size
+
+    def expire(self) -> None:
+        """Drop the entries that were not used within the ttl."""
+        deadline = time.monotonic() - self.ttl
+        while self.entries:
+            key, entry = next(iter(self.entries.items()))
+            if entry.accessed >= deadline:
+                break
+            self.remove(key)
+            self.expired += 1
+
+    def evict(self) -> None:
+        """Evict the least recently used entries until the limits are met."""
+        while len(self.entries) > self.max_entries or (self.size > self.max_bytes and len(self.entries) > 1):
+            key, entry = next(iter(self.entries.items()))
+            self.remove(key)
+            self.evicted += 1
+            if self.spill is not None:
+                try:
+                    self.spill.put(repr(key), pickle.dumps(entry.conversation))
+                except Exception as e:
+                    debug.log(f"Spill conversation failed: {e.__class__.__name__}: {e}")
+
+    def remove(self, key: tuple) -> None:
+        entry = self.entries.pop(key)
+        self.size -= entry.size
+
+    def restore(self, key: tuple) -> Optional[BaseConversation]:
+        if self.spill is None:
+            return None
+        try:
+            data = self.spill.pop(repr(key))
+            return None if data is None else pickle.loads(data)
+        except Exception as e:
+            debug.log(f"Restore conversation failed: {e.__class__.__name__}: {e}")
+            return None
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def get_metrics(self) -> dict:
+        with self.lock:
+            requests = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "bytes": self.size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / requests if requests else None,
+                "restored": self.restored,
+                "evicted": self.evicted,
+                "expired": self.expired,
+                "spilled": None if self.spill is None else self.spill.count(),
+            }
+
+conversation_store = ConversationStore()
@@ -0,0 +1,306 @@
+from __future__ import annotations
+
+import os
+import json
+import time
+import base64
+import asyncio
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Awaitable, Callable, Iterator, Optional
+
+from ..errors import MissingAuthError, RateLimitError
+from .types import ProviderType
+from .job_poller import is_rate_limit
+from .. import debug
+
+# "least_loaded" picks the account with the fewest running requests, "lru" the least recently used
+SELECTION = os.environ.get("G4F_CREDENTIAL_SELECTION", "least_loaded")
+# Seconds an account rests after a rate limit, doubled for every further limit
+COOLDOWN = float(os.environ.get("G4F_CREDENTIAL_COOLDOWN", 60))
+MAX_COOLDOWN = 3600
+# Seconds before the token of an account expires that it is refreshed
+REFRESH_BEFORE = 600
+# Seconds between two reads of the accounts from the .har and cookie files
+RELOAD_INTERVAL = 10
+
+def get_jwt_expires(token: Optional[str]) -> Optional[float]:
+    """Return the expiry time of a JWT, None if the token has none."""
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(payload))["exp"])
+    except (AttributeError, IndexError, ValueError, KeyError, TypeError):
+        return None
+
+def is_auth_error(error: Exception) -> bool:
+    return isinstance(error, MissingAuthError) or getattr(error, "status", None) in (401, 403)
+
+class Credential:
+    """
+    One account of a provider.
+
+    The auth state of a provider is kept in class attributes, like ``_cookies``.
+    Every account gets its own subclass of the provider with these attributes,
+    so the code of the provider runs unchanged for each account.
+
+    Attributes:
+        name (str): Where the account was loaded from, like the path of a .har file.
+        attributes (dict): The class attributes with the auth state of the account.
+        expires (float): When the token of the account expires, None if it doesn't.
+            An account with an expiry of 0 is refreshed before it is used.
+        version: Changes when the source of the account changes, like its mtime.
+        active (int): Requests that use the account now.
+        requests (int): Requests in total.
+        rate_limits (int): Requests that were rate limited.
+        last_used (float): When the account was last leased.
+        cooldown_until (float): The account is not used until then.
+        cooldown (float): Seconds of the next cooldown.
+        invalid (bool): The auth was rejected, the account waits for a refresh.
+        refreshing (bool): A refresh of the account is running.
+    """
+
+    def __init__(self, name: str, attributes: dict, expires: Optional[float] = None, version=None) -> None:
+        self.name = name
+        self.attributes = attributes
+        self.expires = expires
+        self.version = version
+        self.providers: dict[ProviderType, ProviderType] = {}
+        self.active = 0
+        self.requests = 0
+        self.rate_limits = 0
+        self.last_used = 0.0
+        self.cooldown_until = 0.0
+        self.cooldown = COOLDOWN
+        self.invalid = False
+        self.refreshing = False
+
+    def get_provider(self, provider: ProviderType) -> ProviderType:
+        """Return the subclass of ``provider`` that uses this account."""
+        if provider not in self.providers:
+            self.providers[provider] = type(provider.__name__, (provider,), {
+                **self.attributes,
+                "__module__": provider.__module__,
+                "account": self,
+            })
+        return self.providers[provider]
+
+    def update(self, attributes: dict, expires: Optional[float] = None) -> None:
+        """Set new auth state, for example after a refresh."""
+        self.attributes.update(attributes)
+        for provider in self.providers.values():
+            for key, value in attributes.items():
+                setattr(provider, key, value)
+        self.expires = expires
+        self.invalid = False
+
+    def is_cooling(self, now: float) -> bool:
+        return now < self.cooldown_until
+
+    def needs_refresh(self, now: float, refresh_before: float = REFRESH_BEFORE) -> bool:
+        return self.invalid or self.expires is not None and self.expires - now < refresh_before
+
+    def to_dict(self) -> dict:
+        now = time.time()
+        return {
+            "active": self.active,
+            "requests": self.requests,
+            "rate_limits": self.rate_limits,
+            "cooldown": max(self.cooldown_until - now, 0),
+            "expires_in": None if self.expires is None else self.expires - now,
+            "invalid": self.invalid,
+            "refreshing": self.refreshing,
+        }
+
+class CredentialPool:
+    """
+    The accounts of an auth-bound provider.
+
+    Every request leases one account: the one with the fewest running
+    requests, or the least recently used one. A rate limited account rests
+    for a cooldown, the other accounts take its requests meanwhile. Tokens
+    that expire soon, or were rejected, are refreshed in the background with
+    ``refresh``, so a request doesn't wait for a login as long as another
+    account is ready. The accounts are loaded with ``load`` and reloaded when
+    their source changes.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        load: Callable[[], list[Credential]],
+        refresh: Optional[Callable[[Credential], Awaitable[tuple[dict, Optional[float]]]]] = None,
+        selection: str = SELECTION,
+        cooldown: float = COOLDOWN,
+        refresh_before: float = REFRESH_BEFORE,
+        reload_interval: float = RELOAD_INTERVAL
+    ) -> None:
+        self.name = name
+        self.load = load
+        self.refresh = refresh
+        self.selection = selection
+        self.cooldown = cooldown
+        self.refresh_before = refresh_before
+        self.reload_interval = reload_interval
+        self.credentials: dict[str, Credential] = {}
+        self.last_reload: Optional[float] = None
+        self.refreshes: set[asyncio.Task] = set()
+        self.lock = threading.Lock()
+        credential_pools[name] = self
+
+    def reload(self, force: bool = False) -> None:
+        """Read the accounts again, keeping the state of unchanged ones."""
+        now = time.monotonic()
+        if not force and self.last_reload is not None and now - self.last_reload < self.reload_interval:
+            return
+        self.last_reload = now
+        try:
+            loaded = self.load()
+        except Exception as e:
+            debug.log(f"{self.name}: Load accounts failed: {e.__class__.__name__}: {e}")
+            return
+        with self.lock:
+            credentials = {}
+            for credential in loaded:
+                current = self.credentials.get(credential.name)
+                if current is not None and current.version == credential.version:
+                    credentials[credential.name] = current
+                else:
+                    credential.cooldown = self.cooldown
+                    credentials[credential.name] = credential
+            if credentials.keys() != self.credentials.keys():
+                debug.log(f"{self.name}: {len(credentials)} accounts")
+            self.credentials = credentials
+
+    def __len__(self) -> int:
+        return len(self.credentials)
+
+    def select(self, name: Optional[str] = None) -> Credential:
+        """
+        Pick the account for a request.
+
+        Args:
+            name (str): The account that has to be used, like the one of a conversation.
+
+        Raises:
+            RateLimitError: If all accounts are on cooldown.
+            MissingAuthError: If all accounts were rejected.
+        """
+        now = time.time()
+        if name is not None:
+            credential = self.credentials.get(name)
+            if credential is None:
+                raise MissingAuthError(f"{self.name}: The account of the conversation is gone")
+            if credential.is_cooling(now):
+                raise RateLimitError(f"{self.name}: The account of the conversation is rate limited")
+            return credential
+        credentials = list(self.credentials.values())
+        available = [credential for credential in credentials if not credential.is_cooling(now) and not credential.invalid]
+        if not available:
+            if any(credential.is_cooling(now) for credential in credentials):
+                wait = min(credential.cooldown_until for credential in credentials if credential.is_cooling(now)) - now
+                raise RateLimitError(f"{self.name}: All accounts are rate limited, retry in {wait:.0f}s")
+            raise MissingAuthError(f"{self.name}: No valid account")
+        # Accounts that wait for a refresh are only used if no other one is ready
+        ready = [credential for credential in available if not credential.needs_refresh(now, self.refresh_before)]
+        if ready:
+            available = ready
+        if self.selection == "lru":
+            return min(available, key=lambda credential: credential.last_used)
+        return min(available, key=lambda credential: (credential.active, credential.last_used))
+
+    def acquire(self, name: Optional[str] = None) -> Credential:
+        with self.lock:
+            credential = self.select(name)
+            credential.active += 1
+            credential.requests += 1
+            credential.last_used = time.time()
+        self.schedule_refreshes()
+        return credential
+
+    def release(self, credential: Credential, error: Optional[Exception] = None) -> None:
+        with self.lock:
+            credential.active -= 1
+            if error is None:
+                credential.cooldown = self.cooldown
+            elif is_rate_limit(error):
+                credential.rate_limits += 1
+                credential.cooldown_until = time.time() + credential.cooldown
+                debug.log(f"{self.name}: Account {os.path.basename(credential.name)} rests for {credential.cooldown:.0f}s")
+                credential.cooldown = min(credential.cooldown * 2, MAX_COOLDOWN)
+            elif is_auth_error(error):
+                credential.invalid = True
+        if error is not None:
+            self.schedule_refreshes()
+
+    @asynccontextmanager
+    async def lease(self, provider: ProviderType, name: Optional[str] = None) -> AsyncIterator[ProviderType]:
+        """Use an account for a request, yields the provider class of the account."""
+        credential = self.acquire(name)
+        error = None
+        try:
+            yield credential.get_provider(provider)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            # Also when the response is closed early
+            self.release(credential, error)
+
+    @contextmanager
+    def lease_sync(self, provider: ProviderType, name: Optional[str] = None) -> Iterator[ProviderType]:
+        credential = self.acquire(name)
+        error = None
+        try:
+            yield credential.get_provider(provider)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self.release(credential, error)
+
+    def schedule_refreshes(self) -> None:
+        """Start a refresh for every account that needs one and has none running."""
+        if self.refresh is None:
+            return
+        now = time.time()
+        with self.lock:
+            due = [
+                credential for credential in self.credentials.values()
+                if not credential.refreshing and not credential.is_cooling(now)
+                and credential.needs_refresh(now, self.refresh_before)
+            ]
+            for credential in due:
+                credential.refreshing = True
+        for credential in due:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                loop = None
+            if loop is not None:
+                task = loop.create_task(self.run_refresh(credential))
+                self.refreshes.add(task)
+                task.add_done_callback(self.refreshes.discard)
+            else:
+                # Sync providers have no event loop, the refresh gets its own
+                threading.Thread(target=asyncio.run, args=(self.run_refresh(credential),), daemon=True).start()
+
+    async def run_refresh(self, credential: Credential) -> None:
+        try:
+            attributes, expires = await self.refresh(credential)
+            credential.update(attributes, expires)
+            debug.log(f"{self.name}: Refreshed account {os.path.basename(credential.name)}")
+        except Exception as e:
+            debug.log(f"{self.name}: Refresh of {os.path.basename(credential.name)} failed: {e.__class__.__name__}: {e}")
+            with self.lock:
+                credential.invalid = True
+                # Try again after a cooldown, not on every request
+                credential.cooldown_until = time.time() + credential.cooldown
+                credential.cooldown = min(credential.cooldown * 2, MAX_COOLDOWN)
+        finally:
+            credential.refreshing = False
+
+    def get_metrics(self) -> dict[str, dict]:
+        return {os.path.basename(name): credential.to_dict() for name, credential in self.credentials.items()}
+
+credential_pools: dict[str, CredentialPool] = {}
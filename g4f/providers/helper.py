@@ -2,8 +2,14 @@ from __future__ import annotations
 
 import random
 import string
+import threading
+from collections import OrderedDict
+
+from typing import Union
 
 from ..typing import Messages, Cookies
+from ..tokenizer import count_tokens, get_encoding_name
+from .response import Rewrite
 from .. import debug
 
 def format_prompt(messages: Messages, add_special_tokens=False) -> str:
@@ -25,20 +31,153 @@ def format_prompt(messages: Messages, add_special_tokens=False) -> str:
     ])
     return f"{formatted}\nAssistant:"
 
-def format_prompt_max_length(messages: Messages, max_lenght: int) -> str:
-    prompt = format_prompt(messages)
-    start = len(prompt)
-    if start > max_lenght:
-        if len(messages) > 6:
-            prompt = format_prompt(messages[:3] + messages[-3:])
-        if len(prompt) > max_lenght:
-            if len(messages) > 2:
-                prompt = format_prompt([m for m in messages if m["role"] == "system"] + messages[-1:])
-            if len(prompt) > max_lenght:
-                prompt = messages[-1]["content"]
-        debug.log(f"Messages trimmed from: {start} to: {len(prompt)}")
+class Fragment:
+    """A message formatted for ``format_prompt``, with its sizes."""
+    __slots__ = ("text", "tokens")
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+        self.tokens: dict[str, int] = {}
+
+    def count_tokens(self, model: str = None) -> int:
+        name = get_encoding_name(model)
+        if name not in self.tokens:
+            self.tokens[name] = count_tokens(self.text, model)
+        return self.tokens[name]
+
+class FragmentCache:
+    """
+    Formatted messages by role and content, in least recently used order.
+
+    The history of a conversation is sent again with every turn, so the
+    fragments and token counts of the previous turns are reused.
+    """
+
+    def __init__(self, max_size: int = 4096) -> None:
+        self.max_size = max_size
+        self.fragments: OrderedDict[tuple, Fragment] = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, message: dict) -> Fragment:
+        content = message["content"]
+        key = (message["role"], content if isinstance(content, str) else repr(content))
+        with self.lock:
+            fragment = self.fragments.get(key)
+            if fragment is not None:
+                self.fragments.move_to_end(key)
+                return fragment
+            fragment = Fragment(f'{message["role"].capitalize()}: {content}')
+            self.fragments[key] = fragment
+            if len(self.fragments) > self.max_size:
+                self.fragments.popitem(last=False)
+            return fragment
+
+fragment_cache = FragmentCache()
+
+# The end of the prompt, the size of a message includes the newline after it
+PROMPT_SUFFIX_LENGTH = len("Assistant:")
+PROMPT_SUFFIX_TOKENS = 3
+
+def trim_messages(messages: Messages, max_length: int = None, max_tokens: int = None, model: str = None) -> Messages:
+    """
+    Keep the longest suffix of the messages that fits in the budgets, and the
+    system messages before it. If nothing fits, only the last message is kept.
+
+    Args:
+        messages (Messages): The messages of the chat.
+        max_length (int, optional): The max chars of the prompt of ``format_prompt``.
+        max_tokens (int, optional): The max tokens of the prompt.
+        model (str, optional): The model, to select the tokenizer.
+
+    Returns:
+        Messages: The messages that fit.
+    """
+    budgets = []
+    if max_length is not None:
+        budgets.append((max_length - PROMPT_SUFFIX_LENGTH, lambda fragment: len(fragment.text) + 1))
+    if max_tokens is not None:
+        budgets.append((max_tokens - PROMPT_SUFFIX_TOKENS, lambda fragment: fragment.count_tokens(model)))
+    if not budgets or len(messages) <= 1:
+        return messages
+    fragments = [fragment_cache.get(message) for message in messages]
+    is_system = [message["role"] == "system" for message in messages]
+    start = 0
+    for budget, get_size in budgets:
+        # prefix[i] is the size of the first i messages, system[i] of the system messages in them
+        prefix = [0]
+        system = [0]
+        for fragment, pinned in zip(fragments, is_system):
+            size = get_size(fragment)
+            prefix.append(prefix[-1] + size)
+            system.append(system[-1] + (size if pinned else 0))
+        # The size with the messages from "index" on is not increasing with the index
+        low, high = start, len(messages) - 1
+        while low < high:
+            index = (low + high) // 2
+            if system[index] + prefix[-1] - prefix[index] <= budget:
+                high = index
+            else:
+                low = index + 1
+        start = low
+        if system[start] + prefix[-1] - prefix[start] > budget:
+            return messages[-1:]
+    return [message for message, pinned in zip(messages[:start], is_system) if pinned] + messages[start:]
+
+def format_prompt_max_length(messages: Messages, max_lenght: int = None, max_tokens: int = None, model: str = None) -> str:
+    """
+    Format the messages with ``format_prompt``, dropping the oldest messages
+    that don't fit. Falls back to the content of the last message.
+    """
+    trimmed = trim_messages(messages, max_lenght, max_tokens, model)
+    prompt = format_prompt(trimmed)
+    if len(trimmed) < len(messages):
+        debug.log(f"Messages trimmed from: {len(messages)} to: {len(trimmed)} messages")
     return prompt
 
+def get_common_prefix(a: str, b: str) -> int:
+    """Return the length of the common prefix of two strings."""
+    low, high = 0, min(len(a), len(b))
+    # Binary search with slice compares, they run in C
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[:middle] == b[:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+class SnapshotDelta:
+    """
+    Turns the cumulative snapshots of a streamed text into the new text of each one.
+
+    Some providers send the whole text so far with every update. Comparing
+    every snapshot with the sent text is quadratic in the length of the
+    answer, so only the last ``anchor`` chars before the sent offset are
+    compared. An update costs the size of its new text.
+    A snapshot that doesn't continue the sent text is a rewrite: the common
+    prefix is searched once and a ``Rewrite`` from there is returned.
+    A shorter snapshot is always compared in full. A snapshot that isn't
+    shorter and only changes text more than ``anchor`` chars before the
+    sent offset isn't detected, only its new end is returned.
+    """
+
+    def __init__(self, anchor: int = 64) -> None:
+        self.anchor = anchor
+        self.offset = 0
+        self.snapshot = ""
+
+    def feed(self, snapshot: str) -> Union[str, Rewrite]:
+        """Return the new text of ``snapshot``, a ``Rewrite`` if it changed the sent text."""
+        offset = self.offset
+        start = max(offset - self.anchor, 0)
+        last = self.snapshot
+        self.snapshot = snapshot
+        self.offset = len(snapshot)
+        if len(snapshot) >= offset and snapshot[start:offset] == last[start:offset]:
+            return snapshot[offset:]
+        offset = get_common_prefix(last, snapshot)
+        return Rewrite(offset, snapshot[offset:])
+
 def get_random_string(length: int = 10) -> str:
     """
     Generate a random string of specified length, containing lowercase letters and digits.
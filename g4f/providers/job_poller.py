@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+import os
+import time
+import heapq
+import random
+import asyncio
+import itertools
+import weakref
+from collections import deque
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from ..errors import RateLimitError
+from .. import debug
+
+T = TypeVar("T")
+
+# Status checks that run at the same time for one upstream
+MAX_CONCURRENT = int(os.environ.get("G4F_POLL_CONCURRENCY", 4))
+# Random part of every delay, as a fraction of the delay
+JITTER = 0.2
+# Factor for the delays of an upstream after a rate limit, and its maximum
+SLOWDOWN = 2
+MAX_SLOWDOWN = 8
+# Completed jobs kept for the latency metrics
+LATENCY_WINDOW = 100
+
+def is_rate_limit(error: Exception) -> bool:
+    # aiohttp's ClientResponseError has the status code
+    return isinstance(error, RateLimitError) or getattr(error, "status", None) == 429
+
+class PollerStats:
+    """
+    Metrics of the jobs of one upstream.
+
+    Attributes:
+        queued (int): Jobs that wait for their next status check.
+        polling (int): Status checks that are running.
+        polls (int): Status checks in total.
+        completed (int): Jobs that returned a result.
+        failed (int): Jobs that raised an error.
+        timeouts (int): Jobs that did not finish in time.
+        slowdown (float): Factor for the delays after rate limits, 1 without.
+        latencies (deque[float]): Seconds from submit to result of the last jobs.
+    """
+
+    def __init__(self) -> None:
+        self.queued = 0
+        self.polling = 0
+        self.polls = 0
+        self.completed = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.slowdown: float = 1
+        self.latencies: deque[float] = deque(maxlen=LATENCY_WINDOW)
+
+    def to_dict(self) -> dict:
+        latencies = sorted(self.latencies)
+        return {
+            "queued": self.queued,
+            "polling": self.polling,
+            "polls": self.polls,
+            "completed": self.completed,
+            "failed": self.failed,
+            "timeouts": self.timeouts,
+            "slowdown": self.slowdown,
+            "latency_avg": sum(latencies) / len(latencies) if latencies else None,
+            "latency_p50": latencies[len(latencies) // 2] if latencies else None,
+            "latency_max": latencies[-1] if latencies else None,
+        }
+
+class Job:
+    """A job that is checked until ``check`` returns a result."""
+
+    def __init__(
+        self,
+        check: Callable[[], Awaitable],
+        future: asyncio.Future,
+        deadline: float,
+        delay: float,
+        max_delay: float,
+        backoff: float
+    ) -> None:
+        self.check = check
+        self.future = future
+        self.started = time.monotonic()
+        self.deadline = deadline
+        self.delay = delay
+        self.max_delay = max_delay
+        self.backoff = backoff
+
+class Upstream:
+    """The scheduled jobs of one upstream in one event loop."""
+
+    def __init__(self) -> None:
+        self.jobs: list[tuple[float, int, Job]] = []
+        self.wakeup = asyncio.Event()
+        self.runner: Optional[asyncio.Task] = None
+        self.semaphore: Optional[asyncio.Semaphore] = None
+        self.polls: set[asyncio.Task] = set()
+
+class JobPoller:
+    """
+    Polls the status of long-running jobs, like image generations.
+
+    Jobs are grouped by upstream. One task per upstream sleeps until the
+    next job is due, then checks all due jobs together, with at most
+    ``max_concurrent`` requests at the same time. A job that is still
+    pending waits longer each time, by ``backoff`` up to ``max_delay``,
+    with random jitter, so the checks of many jobs spread out. A rate limit
+    slows down all jobs of the upstream until a check succeeds again.
+    The request that waits for a job is woken up when it is done.
+    """
+
+    def __init__(self, max_concurrent: int = MAX_CONCURRENT, jitter: float = JITTER) -> None:
+        self.max_concurrent = max_concurrent
+        self.jitter = jitter
+        self.states: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, Upstream]] = weakref.WeakKeyDictionary()
+        self.stats: dict[str, PollerStats] = {}
+        self.counter = itertools.count()
+
+    def get_upstream(self, name: str) -> Upstream:
+        loop = asyncio.get_running_loop()
+        if loop not in self.states:
+            self.states[loop] = {}
+        upstreams = self.states[loop]
+        if name not in upstreams:
+            upstreams[name] = Upstream()
+            upstreams[name].semaphore = asyncio.Semaphore(self.max_concurrent)
+        if name not in self.stats:
+            self.stats[name] = PollerStats()
+        return upstreams[name]
+
+    def get_delay(self, delay: float, stats: PollerStats) -> float:
+        delay *= stats.slowdown
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    async def wait(
+        self,
+        upstream: str,
+        check: Callable[[], Awaitable[Optional[T]]],
+        timeout: float = 300,
+        delay: float = 1,
+        max_delay: float = 10,
+        backoff: float = 1.5
+    ) -> T:
+        """
+        Wait for the result of a job.
+
+        Args:
+            upstream (str): The name of the service, usually its host.
+            check (Callable): Checks the status once. Returns the result, or None
+                while the job is pending. Its errors are raised here.
+            timeout (float): Seconds until a ``TimeoutError`` is raised.
+            delay (float): Seconds until the first check.
+            max_delay (float): Longest delay between two checks.
+            backoff (float): Factor of the delay after every pending check.
+        """
+        state = self.get_upstream(upstream)
+        stats = self.stats[upstream]
+        loop = asyncio.get_running_loop()
+        now = time.monotonic()
+        job = Job(check, loop.create_future(), now + timeout, delay, max_delay, backoff)
+        self.schedule(upstream, state, stats, job, now + self.get_delay(delay, stats))
+        return await job.future
+
+    def schedule(self, name: str, state: Upstream, stats: PollerStats, job: Job, due: float) -> None:
+        heapq.heappush(state.jobs, (min(due, job.deadline), next(self.counter), job))
+        stats.queued += 1
+        if state.runner is None or state.runner.done():
+            state.runner = asyncio.get_running_loop().create_task(self.run(name, state, stats))
+        # Wake up the runner if this job is due before the one it waits for
+        elif state.jobs[0][2] is job:
+            state.wakeup.set()
+
+    async def run(self, name: str, state: Upstream, stats: PollerStats) -> None:
+        while state.jobs:
+            due = state.jobs[0][0]
+            timeout = due - time.monotonic()
+            if timeout > 0:
+                state.wakeup.clear()
+                try:
+                    await asyncio.wait_for(state.wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            now = time.monotonic()
+            batch = []
+            while state.jobs and state.jobs[0][0] <= now:
+                batch.append(heapq.heappop(state.jobs)[2])
+                stats.queued -= 1
+            for job in batch:
+                # A slow check doesn't delay the jobs that are due next
+                task = asyncio.get_running_loop().create_task(self.poll(name, state, stats, job))
+                state.polls.add(task)
+                task.add_done_callback(state.polls.discard)
+
+    async def poll(self, name: str, state: Upstream, stats: PollerStats, job: Job) -> None:
+        # The waiting request was cancelled
+        if job.future.done():
+            return
+        if time.monotonic() >= job.deadline:
+            stats.timeouts += 1
+            job.future.set_exception(TimeoutError(f"Timeout waiting for a job of {name}"))
+            return
+        async with state.semaphore:
+            stats.polling += 1
+            stats.polls += 1
+            try:
+                result = await job.check()
+            except Exception as e:
+                if is_rate_limit(e):
+                    # The job still runs, only the status check was rejected
+                    stats.slowdown = min(stats.slowdown * SLOWDOWN, MAX_SLOWDOWN)
+                    debug.log(f"Job poller: Slow down {name} to {stats.slowdown}x")
+                    self.schedule(name, state, stats, job, time.monotonic() + self.get_delay(job.delay, stats))
+                else:
+                    stats.failed += 1
+                    if not job.future.done():
+                        job.future.set_exception(e)
+                return
+            finally:
+                stats.polling -= 1
+        stats.slowdown = max(stats.slowdown / SLOWDOWN, 1)
+        if job.future.done():
+            return
+        if result is not None:
+            stats.completed += 1
+            stats.latencies.append(time.monotonic() - job.started)
+            job.future.set_result(result)
+            return
+        job.delay = min(job.delay * job.backoff, job.max_delay)
+        self.schedule(name, state, stats, job, time.monotonic() + self.get_delay(job.delay, stats))
+
+    def get_metrics(self) -> dict[str, dict]:
+        return {name: stats.to_dict() for name, stats in self.stats.items()}
+
+job_poller = JobPoller()
@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import os
+import json
+import time
+import asyncio
+import hashlib
+import threading
+from concurrent.futures import Future
+from typing import Optional
+
+from .types import ProviderType
+from ..cookies import get_cache_dir
+from .. import debug
+
+MODELS_TTL = 3600
+RETRY_DELAY = 60
+
+def get_cache_file() -> str:
+    return os.path.join(get_cache_dir(), "models.json")
+
+class ModelRegistry:
+    """
+    Cache of the model lists that providers discover over the network.
+
+    Model lists are downloaded by ``fetch_models`` of a provider on a
+    background event loop, so callers never wait on the network unless
+    they ask for it. Entries expire after ``ttl`` seconds; expired entries
+    are still returned while a refresh runs in the background. Concurrent
+    refreshes of the same provider share one request and lists fetched
+    without arguments are persisted to ``cache_file``.
+    """
+
+    def __init__(self, ttl: float = MODELS_TTL, cache_file: Optional[str] = None) -> None:
+        self.ttl = ttl
+        self.cache_file = cache_file
+        self.entries: dict[str, dict] = {}
+        self.pending: dict[str, Future] = {}
+        self.failures: dict[str, float] = {}
+        self.lock = threading.Lock()
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.loaded = False
+
+    def get_key(self, provider: ProviderType, kwargs: dict) -> str:
+        if not kwargs:
+            return provider.__name__
+        # Lists for an api_key are cached, but never under the key itself
+        data = json.dumps(kwargs, sort_keys=True, default=str)
+        return f"{provider.__name__}:{hashlib.sha256(data.encode()).hexdigest()[:16]}"
+
+    def get_loop(self) -> asyncio.AbstractEventLoop:
+        with self.lock:
+            if self.loop is None:
+                self.loop = asyncio.new_event_loop()
+                threading.Thread(target=self.loop.run_forever, name="g4f-models", daemon=True).start()
+            return self.loop
+
+    def load(self) -> None:
+        if self.loaded:
+            return
+        self.loaded = True
+        if self.cache_file is None or not os.path.isfile(self.cache_file):
+            return
+        try:
+            with open(self.cache_file, "r") as file:
+                self.entries.update(json.load(file))
+        except (OSError, ValueError) as e:
+            debug.log(f"Read models cache failed: {e.__class__.__name__}: {e}")
+
+    def save(self) -> None:
+        if self.cache_file is None:
+            return
+        data = {key: entry for key, entry in self.entries.items() if ":" not in key}
+        try:
+            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+            temp_file = f"{self.cache_file}.{os.getpid()}.tmp"
+            with open(temp_file, "w") as file:
+                json.dump(data, file)
+            os.replace(temp_file, self.cache_file)
+        except OSError as e:
+            debug.log(f"Write models cache failed: {e.__class__.__name__}: {e}")
+
+    def get(self, provider: ProviderType, **kwargs) -> Optional[dict]:
+        """Return the cached entry of a provider, even if it is expired."""
+        self.load()
+        entry = self.entries.get(self.get_key(provider, kwargs))
+        if entry is not None and not kwargs:
+            self.apply(provider, entry)
+        return entry
+
+    def apply(self, provider: ProviderType, entry: dict) -> None:
+        if provider.models is not entry["models"]:
+            provider.models = entry["models"]
+        if entry.get("image_models"):
+            provider.image_models = entry["image_models"]
+
+    def is_expired(self, entry: dict) -> bool:
+        return time.time() - entry["timestamp"] > self.ttl
+
+    def refresh(self, provider: ProviderType, **kwargs) -> Future:
+        """Start a refresh unless one is running for the same provider and arguments."""
+        key = self.get_key(provider, kwargs)
+        loop = self.get_loop()
+        with self.lock:
+            if key in self.pending:
+                return self.pending[key]
+            future = asyncio.run_coroutine_threadsafe(self.fetch(provider, key, kwargs), loop)
+            self.pending[key] = future
+        future.add_done_callback(lambda _: self.pending.pop(key, None))
+        return future
+
+    async def fetch(self, provider: ProviderType, key: str, kwargs: dict) -> Optional[list[str]]:
+        try:
+            models = await provider.fetch_models(**kwargs)
+        except Exception as e:
+            self.failures[key] = time.time()
+            debug.log(f"{provider.__name__}: Fetch models failed: {e.__class__.__name__}: {e}")
+            return None
+        self.failures.pop(key, None)
+        entry = {
+            "timestamp": time.time(),
+            "models": list(models),
+            "image_models": list(provider.image_models) if provider.image_models else None,
+        }
+        self.entries[key] = entry
+        if not kwargs:
+            self.apply(provider, entry)
+            self.save()
+        return entry["models"]
+
+    def should_refresh(self, provider: ProviderType, entry: Optional[dict], kwargs: dict) -> bool:
+        if entry is not None and not self.is_expired(entry):
+            return False
+        failed_at = self.failures.get(self.get_key(provider, kwargs))
+        return failed_at is None or time.time() - failed_at > RETRY_DELAY
+
+    def get_models_nowait(self, provider: ProviderType, **kwargs) -> list[str]:
+        """
+        Return the cached models without waiting on the network.
+
+        Starts a background refresh if the entry is missing or expired.
+        Until the first download completes, the ``models`` attribute of the provider is returned.
+        """
+        entry = self.get(provider, **kwargs)
+        if self.should_refresh(provider, entry, kwargs):
+            self.refresh(provider, **kwargs)
+        if entry is not None:
+            return entry["models"]
+        return get_static_models(provider)
+
+    async def get_models(self, provider: ProviderType, **kwargs) -> list[str]:
+        """
+        Return the models of a provider, waiting for the download only if nothing is cached.
+        """
+        entry = self.get(provider, **kwargs)
+        if entry is None:
+            if self.should_refresh(provider, entry, kwargs):
+                models = await asyncio.wrap_future(self.refresh(provider, **kwargs))
+                if models is not None:
+                    return models
+            return get_static_models(provider)
+        if self.should_refresh(provider, entry, kwargs):
+            self.refresh(provider, **kwargs)
+        return entry["models"]
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.failures.clear()
+
+def get_static_models(provider: ProviderType) -> list[str]:
+    return provider.models
+
+model_registry = ModelRegistry(cache_file=get_cache_file())
@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import sys
+import importlib
+from types import ModuleType
+from typing import Iterator, Optional
+from collections.abc import MutableMapping, Sequence
+
+from .types import ProviderType
+
+class ProviderRegistry(MutableMapping):
+    """
+    A mapping of provider names to provider classes, built from a static manifest.
+
+    The manifest maps every name to the module that defines the provider,
+    relative to ``package``. A module is imported when its provider is
+    first looked up, checking for a name or iterating over the names
+    doesn't import anything. Providers can be added at runtime.
+
+    Attributes:
+        package (str): The package the modules of the manifest are relative to.
+        manifest (dict[str, str]): The module of every provider that isn't loaded yet.
+        providers (dict[str, ProviderType]): The providers that are loaded.
+    """
+
+    def __init__(self, package: str, manifest: dict[str, str], providers: Optional[dict[str, ProviderType]] = None) -> None:
+        self.package = package
+        self.manifest = manifest
+        self.providers: dict[str, ProviderType] = {} if providers is None else dict(providers)
+        self.names: dict[str, None] = dict.fromkeys(sorted({*self.manifest, *self.providers}))
+
+    def load(self, name: str) -> ProviderType:
+        """Import the module of a provider and return the provider."""
+        module = importlib.import_module(self.manifest[name], self.package)
+        provider = getattr(module, name)
+        self.providers[name] = provider
+        return provider
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self.providers
+
+    def __getitem__(self, name: str) -> ProviderType:
+        provider = self.providers.get(name)
+        if provider is not None:
+            return provider
+        if name not in self.manifest:
+            raise KeyError(name)
+        return self.load(name)
+
+    def __setitem__(self, name: str, provider: ProviderType) -> None:
+        self.providers[name] = provider
+        self.names[name] = None
+
+    def __delitem__(self, name: str) -> None:
+        del self.names[name]
+        self.providers.pop(name, None)
+        self.manifest.pop(name, None)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self.names
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self.names))
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __repr__(self) -> str:
+        return f"ProviderRegistry({self.package!r}, {len(self.providers)}/{len(self.names)} loaded)"
+
+class ProviderList(Sequence):
+    """The providers of a registry as a list, in the order of their names. Iterating imports all of them."""
+
+    def __init__(self, registry: ProviderRegistry) -> None:
+        self.registry = registry
+
+    def __getitem__(self, index):
+        names = list(self.registry)[index]
+        if isinstance(index, slice):
+            return [self.registry[name] for name in names]
+        return self.registry[names]
+
+    def __iter__(self) -> Iterator[ProviderType]:
+        for name in self.registry:
+            yield self.registry[name]
+
+    def __contains__(self, provider: object) -> bool:
+        name = getattr(provider, "__name__", None)
+        return name in self.registry and self.registry[name] is provider
+
+    def __len__(self) -> int:
+        return len(self.registry)
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+class LazyPackage(ModuleType):
+    """
+    The module type of a provider package with a ``__registry__``.
+
+    Looking up a provider that isn't loaded yet imports its module.
+    The import system binds a submodule to the attribute of its package
+    with the same name, like ``g4f.Provider.Copilot``. These are replaced
+    with the provider class, like the ``from .Copilot import Copilot``
+    of an eager package did.
+    """
+
+    def __getattr__(self, name: str):
+        registry: Optional[ProviderRegistry] = self.__dict__.get("__registry__")
+        if registry is None or name not in registry:
+            raise AttributeError(f"module {self.__name__!r} has no attribute {name!r}")
+        provider = registry[name]
+        self.__dict__[name] = provider
+        return provider
+
+    def __setattr__(self, name: str, value) -> None:
+        registry: Optional[ProviderRegistry] = self.__dict__.get("__registry__")
+        if isinstance(value, ModuleType) and registry is not None and registry.manifest.get(name) == f".{name}":
+            value = getattr(value, name)
+        super().__setattr__(name, value)
+
+    def __dir__(self) -> list[str]:
+        registry: Optional[ProviderRegistry] = self.__dict__.get("__registry__")
+        return sorted({*self.__dict__, *(registry or ())})
+
+def make_lazy(module_name: str, manifest: dict[str, str], providers: Optional[dict[str, ProviderType]] = None) -> ProviderRegistry:
+    """
+    Turn a package into a ``LazyPackage`` that loads the providers of a manifest.
+
+    Args:
+        module_name (str): The ``__name__`` of the package.
+        manifest (dict[str, str]): The module of every provider, relative to the package.
+        providers (dict[str, ProviderType], optional): Providers that are already loaded.
+
+    Returns:
+        ProviderRegistry: The registry of the package, also set as its ``__registry__``.
+    """
+    module = sys.modules[module_name]
+    registry = ProviderRegistry(module_name, manifest, providers)
+    module.__registry__ = registry
+    module.__class__ = LazyPackage
+    return registry
@@ -21,6 +21,18 @@ class Sources(ResponseType):
     def __str__(self) -> str:
         return "\n\n" + ("\n".join([f"{idx+1}. [{link['title']}]({link['url']})" for idx, link in enumerate(self.list)]))
 
+class Rewrite(ResponseType):
+    """
+    The text of a response was changed from ``offset`` on, ``text`` is the new text from there.
+    Consumers that can't change sent text get the new text appended.
+    """
+    def __init__(self, offset: int, text: str) -> None:
+        self.offset = offset
+        self.text = text
+
+    def __str__(self) -> str:
+        return self.text
+
 class BaseConversation(ResponseType):
     def __str__(self) -> str:
         return ""
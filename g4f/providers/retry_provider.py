@@ -1,10 +1,13 @@
 from __future__ import annotations
 
+import time
 import asyncio
-import random
 
 from ..typing import Type, List, CreateResult, Messages, AsyncResult
 from .types import BaseProvider, BaseRetryProvider, ProviderType
+from .scoreboard import Scoreboard, scoreboard
+from .asyncio import safe_aclose, to_sync_generator
+from .sync_pool import iter_sync_provider
 from .. import debug
 from ..errors import RetryProviderError, RetryNoProviderError
 
@@ -14,20 +17,20 @@ class IterListProvider(BaseRetryProvider):
     def __init__(
         self,
         providers: List[Type[BaseProvider]],
-        shuffle: bool = True
+        shuffle: bool = True,
+        scoreboard: Scoreboard = scoreboard
     ) -> None:
         """
         Initialize the BaseRetryProvider.
         Args:
             providers (List[Type[BaseProvider]]): List of providers to use.
-            shuffle (bool): Whether to shuffle the providers list.
-            single_provider_retry (bool): Whether to retry a single provider if it fails.
-            max_retries (int): Maximum number of retries for a single provider.
+            shuffle (bool): Whether to order the providers by expected latency instead of the list order.
+            scoreboard (Scoreboard): Health statistics used to order and skip providers.
         """
         self.providers = providers
         self.shuffle = shuffle
+        self.scoreboard = scoreboard
         self.working = True
-        self.last_provider: Type[BaseProvider] = None
 
     def create_completion(
         self,
@@ -52,17 +55,22 @@ class IterListProvider(BaseRetryProvider):
         exceptions = {}
         started: bool = False
 
-        for provider in self.get_providers(stream and not ignore_stream, ignored):
+        for provider in self.get_providers(stream and not ignore_stream, ignored, model):
             self.last_provider = provider
             debug.log(f"Using {provider.__name__} provider")
+            start = time.monotonic()
             try:
                 for chunk in provider.create_completion(model, messages, stream, **kwargs):
                     if chunk:
+                        if not started:
+                            self.scoreboard.add_success(provider, model, time.monotonic() - start)
                         yield chunk
                         started = True
                 if started:
                     return
+                self.scoreboard.add_failure(provider, model)
             except Exception as e:
+                self.scoreboard.add_failure(provider, model, e)
                 exceptions[provider.__name__] = e
                 debug.log(f"{provider.__name__}: {e.__class__.__name__}: {e}")
                 if started:
@@ -89,17 +97,21 @@ class IterListProvider(BaseRetryProvider):
         """
         exceptions = {}
 
-        for provider in self.get_providers(False, ignored):
+        for provider in self.get_providers(False, ignored, model):
             self.last_provider = provider
             debug.log(f"Using {provider.__name__} provider")
+            start = time.monotonic()
             try:
                 chunk = await asyncio.wait_for(
                     provider.create_async(model, messages, **kwargs),
                     timeout=kwargs.get("timeout", DEFAULT_TIMEOUT),
                 )
                 if chunk:
+                    self.scoreboard.add_success(provider, model, time.monotonic() - start)
                     return chunk
+                self.scoreboard.add_failure(provider, model)
             except Exception as e:
+                self.scoreboard.add_failure(provider, model, e)
                 exceptions[provider.__name__] = e
                 debug.log(f"{provider.__name__}: {e.__class__.__name__}: {e}")
 
@@ -117,9 +129,10 @@ class IterListProvider(BaseRetryProvider):
         exceptions = {}
         started: bool = False
 
-        for provider in self.get_providers(stream and not ignore_stream, ignored):
+        for provider in self.get_providers(stream and not ignore_stream, ignored, model):
             self.last_provider = provider
             debug.log(f"Using {provider.__name__} provider")
+            start = time.monotonic()
             try:
                 if not stream:
                     chunk = await asyncio.wait_for(
@@ -127,20 +140,27 @@ class IterListProvider(BaseRetryProvider):
                         timeout=kwargs.get("timeout", DEFAULT_TIMEOUT),
                     )
                     if chunk:
+                        self.scoreboard.add_success(provider, model, time.monotonic() - start)
                         yield chunk
                         started = True
                 elif hasattr(provider, "create_async_generator"):
                     async for chunk in provider.create_async_generator(model, messages, stream=stream, **kwargs):
                         if chunk:
+                            if not started:
+                                self.scoreboard.add_success(provider, model, time.monotonic() - start)
                             yield chunk
                             started = True
                 else:
-                    for token in provider.create_completion(model, messages, stream, **kwargs):
+                    async for token in iter_sync_provider(provider, model, messages, stream, **kwargs):
+                        if not started:
+                            self.scoreboard.add_success(provider, model, time.monotonic() - start)
                         yield token
                         started = True
                 if started:
                     return
+                self.scoreboard.add_failure(provider, model)
             except Exception as e:
+                self.scoreboard.add_failure(provider, model, e)
                 exceptions[provider.__name__] = e
                 debug.log(f"{provider.__name__}: {e.__class__.__name__}: {e}")
                 if started:
@@ -148,11 +168,9 @@ class IterListProvider(BaseRetryProvider):
 
         raise_exceptions(exceptions)
 
-    def get_providers(self, stream: bool, ignored: list[str]) -> list[ProviderType]:
+    def get_providers(self, stream: bool, ignored: list[str], model: str = None) -> list[ProviderType]:
         providers = [p for p in self.providers if (p.supports_stream or not stream) and p.__name__ not in ignored]
-        if self.shuffle:
-            random.shuffle(providers)
-        return providers
+        return self.scoreboard.sort(providers, model, self.shuffle)
 
 class RetryProvider(IterListProvider):
     def __init__(
@@ -283,7 +301,7 @@ class RetryProvider(IterListProvider):
                                 yield chunk
                                 started = True
                     else:
-                        for token in provider.create_completion(model, messages, stream, **kwargs):
+                        async for token in iter_sync_provider(provider, model, messages, stream, **kwargs):
                             yield token
                             started = True
                     if started:
@@ -297,6 +315,146 @@ class RetryProvider(IterListProvider):
             async for chunk in super().create_async_generator(model, messages, stream, **kwargs):
                 yield chunk
 
+class RaceProvider(IterListProvider):
+    def __init__(
+        self,
+        providers: List[Type[BaseProvider]],
+        shuffle: bool = True,
+        max_concurrency: int = 2,
+        hedge_delay: float = None,
+        scoreboard: Scoreboard = scoreboard
+    ) -> None:
+        """
+        Initialize the RaceProvider.
+        Args:
+            providers (List[Type[BaseProvider]]): List of providers to use.
+            shuffle (bool): Whether to order the providers by expected latency instead of the list order.
+            max_concurrency (int): Maximum number of providers racing at the same time.
+            hedge_delay (float): Seconds to wait for a first token before starting the next provider.
+                If None, the top providers are all started at once.
+            scoreboard (Scoreboard): Health statistics used to order and skip providers.
+        """
+        super().__init__(providers, shuffle, scoreboard)
+        self.max_concurrency = max_concurrency
+        self.hedge_delay = hedge_delay
+
+    def create_completion(
+        self,
+        model: str,
+        messages: Messages,
+        stream: bool = False,
+        **kwargs
+    ) -> CreateResult:
+        return to_sync_generator(self.create_async_generator(model, messages, stream=stream, **kwargs))
+
+    async def create_async(
+        self,
+        model: str,
+        messages: Messages,
+        **kwargs
+    ) -> str:
+        return "".join([
+            str(chunk) async for chunk in self.create_async_generator(model, messages, stream=False, **kwargs)
+        ])
+
+    async def create_async_generator(
+        self,
+        model: str,
+        messages: Messages,
+        stream: bool = True,
+        ignore_stream: bool = False,
+        ignored: list[str] = [],
+        **kwargs
+    ) -> AsyncResult:
+        """
+        Start providers concurrently and stream from the first one that
+        yields a non-empty chunk. The other providers are cancelled.
+        """
+        exceptions = {}
+        candidates = iter(self.get_providers(stream and not ignore_stream, ignored, model))
+        running: dict[asyncio.Task, tuple[ProviderType, AsyncResult, float]] = {}
+
+        def start_next() -> bool:
+            provider = next(candidates, None)
+            if provider is None:
+                return False
+            debug.log(f"Using {provider.__name__} provider")
+            generator = get_async_generator(provider, model, messages, stream, **kwargs)
+            running[asyncio.ensure_future(generator.__anext__())] = (provider, generator, time.monotonic())
+            return True
+
+        async def cancel(tasks: list[asyncio.Task]) -> None:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await asyncio.gather(*[safe_aclose(running.pop(task)[1]) for task in tasks])
+
+        winner = None
+        try:
+            for _ in range(self.max_concurrency if self.hedge_delay is None else 1):
+                start_next()
+            while running and winner is None:
+                done, _ = await asyncio.wait(
+                    running,
+                    timeout=self.hedge_delay,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    # No token within the hedge delay, start a backup
+                    if len(running) < self.max_concurrency:
+                        start_next()
+                    continue
+                for task in done:
+                    provider, generator, start = running.pop(task)
+                    try:
+                        chunk = task.result()
+                    except StopAsyncIteration:
+                        self.scoreboard.add_failure(provider, model)
+                        if winner is None:
+                            start_next()
+                        continue
+                    except Exception as e:
+                        exceptions[provider.__name__] = e
+                        self.scoreboard.add_failure(provider, model, e)
+                        debug.log(f"{provider.__name__}: {e.__class__.__name__}: {e}")
+                        if winner is None:
+                            start_next()
+                        continue
+                    if not chunk or winner is not None:
+                        running[asyncio.ensure_future(generator.__anext__())] = (provider, generator, start)
+                        continue
+                    winner = (provider, generator, chunk)
+                    self.scoreboard.add_success(provider, model, time.monotonic() - start)
+        finally:
+            await cancel(list(running))
+
+        if winner is None:
+            raise_exceptions(exceptions)
+        provider, generator, chunk = winner
+        self.last_provider = provider
+        try:
+            yield chunk
+            async for chunk in generator:
+                if chunk:
+                    yield chunk
+        except Exception as e:
+            self.scoreboard.add_failure(provider, model, e)
+            raise e
+        finally:
+            await safe_aclose(generator)
+
+def get_async_generator(provider: ProviderType, model: str, messages: Messages, stream: bool, **kwargs) -> AsyncResult:
+    if not stream:
+        async def create_async() -> AsyncResult:
+            yield await asyncio.wait_for(
+                provider.create_async(model, messages, **kwargs),
+                timeout=kwargs.get("timeout", DEFAULT_TIMEOUT),
+            )
+        return create_async()
+    elif hasattr(provider, "create_async_generator"):
+        return provider.create_async_generator(model, messages, stream=stream, **kwargs)
+    return iter_sync_provider(provider, model, messages, stream, **kwargs)
+
 def raise_exceptions(exceptions: dict) -> None:
     """
     Raise a combined exception if any occurred during retries.
@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import time
+import random
+from collections import deque
+from typing import Optional
+
+from .types import ProviderType
+from .. import debug
+
+WINDOW_SIZE = 20
+FAILURE_THRESHOLD = 3
+COOLDOWN = 30
+MAX_COOLDOWN = 600
+TTFT_SMOOTHING = 0.3
+
+class ProviderStats:
+    """
+    Rolling health statistics of one provider and model.
+
+    Attributes:
+        outcomes (deque[bool]): The last ``WINDOW_SIZE`` results, True on success.
+        ttft (float): Exponential moving average of the time to first token in seconds.
+        errors (dict[str, int]): Count of failures by exception class name.
+        consecutive_failures (int): Failures since the last success.
+        opened_at (float): When the circuit was opened, None while it is closed.
+        cooldown (float): Seconds until an open circuit lets a probe through.
+    """
+
+    def __init__(self) -> None:
+        self.outcomes: deque[bool] = deque(maxlen=WINDOW_SIZE)
+        self.ttft: Optional[float] = None
+        self.errors: dict[str, int] = {}
+        self.consecutive_failures: int = 0
+        self.opened_at: Optional[float] = None
+        self.cooldown: float = COOLDOWN
+
+    @property
+    def success_rate(self) -> Optional[float]:
+        if not self.outcomes:
+            return None
+        return sum(self.outcomes) / len(self.outcomes)
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.cooldown:
+            return "open"
+        return "half-open"
+
+    def expected_latency(self) -> float:
+        """
+        Estimate the seconds until a usable first token.
+
+        A failed attempt is assumed to cost as much as a successful one,
+        so the time to first token is divided by the success rate.
+        Providers without any data return 0 to make sure they get tried.
+        """
+        success_rate = self.success_rate
+        if success_rate is None:
+            return 0
+        if not success_rate:
+            return float("inf")
+        return (self.ttft or 0) / success_rate
+
+    def add_success(self, ttft: float) -> None:
+        self.outcomes.append(True)
+        self.ttft = ttft if self.ttft is None else TTFT_SMOOTHING * ttft + (1 - TTFT_SMOOTHING) * self.ttft
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.cooldown = COOLDOWN
+
+    def add_failure(self, error_class: str) -> None:
+        self.outcomes.append(False)
+        self.errors[error_class] = self.errors.get(error_class, 0) + 1
+        self.consecutive_failures += 1
+        if self.opened_at is not None:
+            # The half-open probe failed, back off before the next one
+            self.cooldown = min(self.cooldown * 2, MAX_COOLDOWN)
+            self.opened_at = time.monotonic()
+        elif self.consecutive_failures >= FAILURE_THRESHOLD:
+            self.opened_at = time.monotonic()
+
+    def to_dict(self) -> dict:
+        expected_latency = self.expected_latency()
+        return {
+            "requests": len(self.outcomes),
+            "success_rate": self.success_rate,
+            "ttft": self.ttft,
+            "expected_latency": None if not self.outcomes or expected_latency == float("inf") else expected_latency,
+            "errors": self.errors,
+            "state": self.state,
+        }
+
+class Scoreboard:
+    """
+    Health of providers per model, shared by all retry providers.
+
+    Used by ``IterListProvider`` to order its candidates by expected latency
+    and to skip providers with an open circuit. After the cooldown a single
+    request is let through as a probe, which closes the circuit on success.
+    """
+
+    def __init__(self) -> None:
+        self.stats: dict[tuple[str, str], ProviderStats] = {}
+        self.probes: dict[tuple[str, str], float] = {}
+
+    def get(self, provider: ProviderType, model: str) -> ProviderStats:
+        key = (get_name(provider), model or "")
+        if key not in self.stats:
+            self.stats[key] = ProviderStats()
+        return self.stats[key]
+
+    def add_success(self, provider: ProviderType, model: str, ttft: float) -> None:
+        self.probes.pop((get_name(provider), model or ""), None)
+        self.get(provider, model).add_success(ttft)
+
+    def add_failure(self, provider: ProviderType, model: str, exception: Optional[Exception] = None) -> None:
+        self.probes.pop((get_name(provider), model or ""), None)
+        stats = self.get(provider, model)
+        stats.add_failure("NoResponse" if exception is None else type(exception).__name__)
+        if stats.state == "open":
+            debug.log(f"Circuit open for {get_name(provider)}: {stats.consecutive_failures} failures")
+
+    def expected_latency(self, provider: ProviderType, model: str) -> float:
+        stats = self.stats.get((get_name(provider), model or ""))
+        return 0 if stats is None else stats.expected_latency()
+
+    def is_available(self, provider: ProviderType, model: str) -> bool:
+        key = (get_name(provider), model or "")
+        stats = self.stats.get(key)
+        if stats is None:
+            return True
+        state = stats.state
+        if state == "closed":
+            return True
+        # Let one probe through per cooldown, even if it is never used
+        if state == "half-open" and (key not in self.probes or time.monotonic() - self.probes[key] >= stats.cooldown):
+            self.probes[key] = time.monotonic()
+            return True
+        return False
+
+    def sort(self, providers: list[ProviderType], model: str, shuffle: bool = True) -> list[ProviderType]:
+        """
+        Drop providers with an open circuit and, if ``shuffle`` is set,
+        order the rest by expected latency. Ties are broken randomly.
+        All providers are returned if every circuit is open.
+        """
+        available = [provider for provider in providers if self.is_available(provider, model)]
+        if not available:
+            available = list(providers)
+        if shuffle:
+            random.shuffle(available)
+            available.sort(key=lambda provider: self.expected_latency(provider, model))
+        return available
+
+    def to_dict(self) -> dict[str, dict[str, dict]]:
+        result = {}
+        for (provider, model), stats in self.stats.items():
+            result.setdefault(provider, {})[model] = stats.to_dict()
+        return result
+
+    def reset(self) -> None:
+        self.stats.clear()
+        self.probes.clear()
+
+def get_name(provider: ProviderType) -> str:
+    return provider.__name__ if hasattr(provider, "__name__") else type(provider).__name__
+
+scoreboard = Scoreboard()
@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import os
+import asyncio
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, AsyncIterator, Iterator
+
+from ..typing import Messages
+from .types import ProviderType
+
+# Threads per provider, a provider can set its own with the "sync_workers" attribute
+WORKERS = int(os.environ.get("G4F_SYNC_WORKERS", 4))
+# Chunks a stream buffers before its worker thread blocks
+QUEUE_SIZE = int(os.environ.get("G4F_SYNC_QUEUE_SIZE", 32))
+
+class PoolStats:
+    """
+    Metrics of the thread pool of one provider.
+
+    Attributes:
+        workers (int): The size of the pool.
+        active (int): Streams that are running in a thread.
+        pending (int): Streams that wait for a free thread.
+        queued (int): Chunks produced but not yet consumed, over all streams.
+        max_queued (int): The highest value of ``queued`` seen.
+        streams (int): Streams started in total.
+    """
+
+    def __init__(self, workers: int) -> None:
+        self.workers = workers
+        self.active = 0
+        self.pending = 0
+        self.queued = 0
+        self.max_queued = 0
+        self.streams = 0
+
+    def to_dict(self) -> dict:
+        return {
+            "workers": self.workers,
+            "active": self.active,
+            "pending": self.pending,
+            "queued": self.queued,
+            "max_queued": self.max_queued,
+            "streams": self.streams,
+        }
+
+class SyncProviderPool:
+    """
+    Runs the blocking ``create_completion`` of sync providers in threads.
+
+    Every provider gets its own bounded thread pool, so a slow provider can
+    only use up its own threads. The chunks are passed to the event loop
+    through a bounded queue: when the consumer falls behind, the worker
+    thread waits instead of buffering the whole response. When the consumer
+    stops early, the generator of the provider is closed in its thread.
+    """
+
+    def __init__(self, workers: int = WORKERS, queue_size: int = QUEUE_SIZE) -> None:
+        self.workers = workers
+        self.queue_size = queue_size
+        self.executors: dict[str, ThreadPoolExecutor] = {}
+        self.stats: dict[str, PoolStats] = {}
+        self.sizes: dict[str, int] = {}
+        self.lock = threading.Lock()
+
+    def get_workers(self, provider: ProviderType) -> int:
+        name = provider.__name__
+        if name in self.sizes:
+            return self.sizes[name]
+        return getattr(provider, "sync_workers", None) or self.workers
+
+    def set_workers(self, provider: ProviderType | str, workers: int) -> None:
+        """Set the pool size of a provider, takes effect when its pool is created."""
+        self.sizes[provider if isinstance(provider, str) else provider.__name__] = workers
+
+    def get_executor(self, provider: ProviderType) -> ThreadPoolExecutor:
+        name = provider.__name__
+        with self.lock:
+            if name not in self.executors:
+                workers = self.get_workers(provider)
+                self.executors[name] = ThreadPoolExecutor(workers, thread_name_prefix=f"g4f-{name}")
+                self.stats[name] = PoolStats(workers)
+            return self.executors[name]
+
+    async def iter(self, provider: ProviderType, create_func: Callable[..., Iterator], *args, **kwargs) -> AsyncIterator:
+        """
+        Call ``create_func`` in the pool of ``provider`` and yield its chunks.
+
+        The function runs in a copy of the current context, so the request
+        context stays available in the provider.
+        """
+        loop = asyncio.get_running_loop()
+        executor = self.get_executor(provider)
+        stats = self.stats[provider.__name__]
+        queue: asyncio.Queue = asyncio.Queue(self.queue_size)
+        stopped = False
+
+        async def put(kind: str, value=None) -> bool:
+            if stopped:
+                return False
+            await queue.put((kind, value))
+            if stopped:
+                return False
+            stats.queued += 1
+            stats.max_queued = max(stats.max_queued, stats.queued)
+            return True
+
+        def send(kind: str, value=None) -> bool:
+            return asyncio.run_coroutine_threadsafe(put(kind, value), loop).result()
+
+        def notify(callback: Callable) -> None:
+            try:
+                loop.call_soon_threadsafe(callback)
+            except RuntimeError:
+                # The event loop is closed
+                pass
+
+        def worker() -> None:
+            notify(start)
+            response = None
+            try:
+                response = create_func(*args, **kwargs)
+                if not hasattr(response, "__iter__") or isinstance(response, (str, bytes)):
+                    response = [response]
+                for chunk in response:
+                    if not send("chunk", chunk):
+                        break
+                else:
+                    send("done")
+            except BaseException as e:
+                try:
+                    send("error", e)
+                except Exception:
+                    pass
+            finally:
+                if hasattr(response, "close"):
+                    response.close()
+                notify(finish)
+
+        def start() -> None:
+            stats.pending -= 1
+            stats.active += 1
+
+        def finish() -> None:
+            stats.active -= 1
+
+        stats.streams += 1
+        stats.pending += 1
+        executor.submit(contextvars.copy_context().run, worker)
+        try:
+            while True:
+                kind, value = await queue.get()
+                stats.queued -= 1
+                if kind == "done":
+                    return
+                if kind == "error":
+                    raise value
+                yield value
+        finally:
+            stopped = True
+            # Unblock a worker that waits for space in the queue
+            while not queue.empty():
+                queue.get_nowait()
+                stats.queued -= 1
+
+    def get_metrics(self) -> dict[str, dict]:
+        return {name: stats.to_dict() for name, stats in self.stats.items()}
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self.lock:
+            executors = list(self.executors.values())
+            self.executors.clear()
+        for executor in executors:
+            executor.shutdown(wait=wait)
+
+sync_provider_pool = SyncProviderPool()
+
+def iter_sync_provider(provider: ProviderType, model: str, messages: Messages, stream: bool, **kwargs) -> AsyncIterator:
+    """Run ``provider.create_completion`` off the event loop and iterate its chunks."""
+    return sync_provider_pool.iter(provider, provider.create_completion, model, messages, stream, **kwargs)
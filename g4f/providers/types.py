@@ -3,6 +3,7 @@ from __future__ import annotations
 from abc import ABC, abstractmethod
 from typing import Union, Dict, Type
 from ..typing import Messages, CreateResult
+from .context import get_request_context
 
 class BaseProvider(ABC):
     """
@@ -16,6 +17,11 @@ class BaseProvider(ABC):
         supports_message_history (bool): Indicates if the provider supports message history.
         supports_system_message (bool): Indicates if the provider supports system messages.
         params (str): List parameters for the provider.
+        sync_workers (int): Threads for the sync ``create_completion`` in async code, None for the default.
+        max_prompt_length (int): Max chars of a prompt built from the messages, None for no limit.
+        max_prompt_tokens (int): Max tokens of a prompt built from the messages, None for no limit.
+        credential_pool (CredentialPool): The accounts of an auth-bound provider, None for a single account.
+        account (Credential): The account of a provider class made by the credential pool, None otherwise.
     """
 
     url: str = None
@@ -24,6 +30,11 @@ class BaseProvider(ABC):
     supports_stream: bool = False
     supports_message_history: bool = False
     supports_system_message: bool = False
+    sync_workers: int = None
+    max_prompt_length: int = None
+    max_prompt_tokens: int = None
+    credential_pool: CredentialPool = None
+    account: Credential = None
     params: str
 
     @classmethod
@@ -88,12 +99,19 @@ class BaseRetryProvider(BaseProvider):
         providers (List[Type[BaseProvider]]): List of providers to use for retries.
         shuffle (bool): Whether to shuffle the providers list.
         exceptions (Dict[str, Exception]): Dictionary of exceptions encountered.
-        last_provider (Type[BaseProvider]): The last provider used.
+        last_provider (Type[BaseProvider]): The last provider used in the current request.
     """
 
     __name__: str = "RetryProvider"
     supports_stream: bool = True
-    last_provider: Type[BaseProvider] = None
+
+    @property
+    def last_provider(self) -> Type[BaseProvider]:
+        return get_request_context().last_provider
+
+    @last_provider.setter
+    def last_provider(self, provider: Type[BaseProvider]) -> None:
+        get_request_context().last_provider = provider
 
 ProviderType = Union[Type[BaseProvider], BaseRetryProvider]
 
@@ -32,6 +32,7 @@ except ImportError:
 
 from .. import debug
 from .raise_for_status import raise_for_status
+from .sse import iter_sse, iter_sse_json, iter_ndjson
 from ..webdriver import WebDriver, WebDriverSession
 from ..webdriver import bypass_cloudflare, get_driver_cookies
 from ..errors import MissingRequirementsError
@@ -188,4 +189,5 @@ async def get_nodriver(proxy: str = None, user_data_dir = "nodriver", **kwargs)-
         user_data_dir=user_data_dir,
         browser_args=None if proxy is None else [f"--proxy-server={proxy}"],
         **kwargs
-    )
\ No newline at end of file
+    )
+from .session_pool import get_session, session_pool
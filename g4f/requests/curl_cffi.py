@@ -73,7 +73,7 @@ class StreamSession(AsyncSession):
     def request(
         self, method: str, url: str, **kwargs
     ) -> StreamResponse:
-        if isinstance(kwargs.get("data"), CurlMime):
+        if has_curl_mime and isinstance(kwargs.get("data"), CurlMime):
             kwargs["multipart"] = kwargs.pop("data")
         """Create and return a StreamResponse object for the given HTTP request."""
         return StreamResponse(super().request(method, url, stream=True, **kwargs))
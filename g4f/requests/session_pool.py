@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import time
+import asyncio
+from urllib.parse import urlparse
+from functools import partialmethod
+from weakref import WeakKeyDictionary
+from typing import Optional, Union
+
+from . import StreamSession, StreamResponse, has_curl_cffi
+from ..typing import Cookies
+from .. import debug
+
+if not has_curl_cffi:
+    from aiohttp import ClientTimeout, DummyCookieJar
+
+MAX_PER_HOST = 16
+IDLE_TIMEOUT = 90
+
+class PooledSession:
+    """
+    Per-request view of a shared StreamSession.
+
+    Headers, cookies and the timeout of the lease are sent with every
+    request instead of being stored on the shared session.
+    """
+
+    def __init__(self, session: StreamSession, headers: dict = None, cookies: Cookies = None, timeout=None) -> None:
+        self.session = session
+        self.headers = headers or {}
+        self.cookies = cookies or {}
+        self.timeout = timeout
+
+    def _merge(self, kwargs: dict) -> dict:
+        kwargs["headers"] = {**self.headers, **(kwargs.get("headers") or {})}
+        cookies = {**self.cookies, **(kwargs.get("cookies") or {})}
+        kwargs["cookies"] = cookies if cookies else None
+        if self.timeout is not None and kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        return kwargs
+
+    def request(self, method: str, url: str, **kwargs) -> StreamResponse:
+        return self.session.request(method, url, **self._merge(kwargs))
+
+    def ws_connect(self, url: str, **kwargs):
+        kwargs = self._merge(kwargs)
+        kwargs.pop("timeout", None)
+        return self.session.ws_connect(url, **kwargs)
+
+    head = partialmethod(request, "HEAD")
+    get = partialmethod(request, "GET")
+    post = partialmethod(request, "POST")
+    put = partialmethod(request, "PUT")
+    patch = partialmethod(request, "PATCH")
+    delete = partialmethod(request, "DELETE")
+    options = partialmethod(request, "OPTIONS")
+
+class PoolEntry:
+    def __init__(self, session: StreamSession) -> None:
+        self.session = session
+        self.leases: int = 0
+        self.last_used: float = time.monotonic()
+
+class LoopPool:
+    """Sessions and host limits of one event loop."""
+
+    def __init__(self) -> None:
+        self.entries: dict[tuple, PoolEntry] = {}
+        self.semaphores: dict[str, asyncio.Semaphore] = {}
+
+class SessionPool:
+    """
+    Process-wide pool of keep-alive sessions.
+
+    Sessions are shared per event loop, impersonation profile, proxy and
+    host, so requests to the same upstream reuse open connections (and
+    HTTP/2 with curl_cffi). Concurrent leases per host are bounded and
+    sessions without a lease are closed after ``idle_timeout`` seconds.
+    """
+
+    def __init__(self, max_per_host: int = MAX_PER_HOST, idle_timeout: float = IDLE_TIMEOUT) -> None:
+        self.max_per_host = max_per_host
+        self.idle_timeout = idle_timeout
+        # Sessions are bound to their loop, they go away with it
+        self.loops: WeakKeyDictionary[asyncio.AbstractEventLoop, LoopPool] = WeakKeyDictionary()
+
+    def get_loop_pool(self) -> LoopPool:
+        loop = asyncio.get_running_loop()
+        if loop not in self.loops:
+            self.loops[loop] = LoopPool()
+        return self.loops[loop]
+
+    def create_session(self, impersonate: Optional[str], proxy: Optional[str]) -> StreamSession:
+        if has_curl_cffi:
+            # Cookies of one request must never be sent with another
+            return StreamSession(impersonate=impersonate, proxy=proxy, discard_cookies=True, max_clients=self.max_per_host)
+        return StreamSession(impersonate=impersonate, proxy=proxy, cookie_jar=DummyCookieJar())
+
+    async def evict_idle(self) -> None:
+        """Close the sessions of the running loop that had no lease for ``idle_timeout`` seconds."""
+        pool = self.get_loop_pool()
+        now = time.monotonic()
+        for key, entry in list(pool.entries.items()):
+            if not entry.leases and now - entry.last_used > self.idle_timeout:
+                del pool.entries[key]
+                debug.log(f"Close idle session: {key[-1]}")
+                await entry.session.close()
+
+    async def close(self) -> None:
+        """Close all sessions of the running loop."""
+        pool = self.get_loop_pool()
+        entries = list(pool.entries.values())
+        pool.entries.clear()
+        for entry in entries:
+            await entry.session.close()
+
+    def session(
+        self,
+        url: str,
+        headers: dict = None,
+        cookies: Cookies = None,
+        proxy: str = None,
+        proxies: dict = None,
+        timeout: Union[int, tuple] = None,
+        impersonate: str = None
+    ) -> SessionLease:
+        if proxy is None and proxies:
+            proxy = proxies.get("all", proxies.get("https"))
+        return SessionLease(self, urlparse(url).netloc, headers, cookies, proxy, timeout, impersonate)
+
+class SessionLease:
+    """Async context manager that holds a host slot and a shared session."""
+
+    def __init__(self, pool: SessionPool, host: str, headers: dict, cookies: Cookies, proxy: str, timeout, impersonate: str) -> None:
+        self.pool = pool
+        self.host = host
+        self.headers = headers
+        self.cookies = cookies
+        self.proxy = proxy
+        self.timeout = get_timeout(timeout)
+        self.impersonate = impersonate
+        self.entry: PoolEntry = None
+        self.semaphore: asyncio.Semaphore = None
+
+    async def __aenter__(self) -> PooledSession:
+        await self.pool.evict_idle()
+        pool = self.pool.get_loop_pool()
+        if self.host not in pool.semaphores:
+            pool.semaphores[self.host] = asyncio.Semaphore(self.pool.max_per_host)
+        self.semaphore = pool.semaphores[self.host]
+        await self.semaphore.acquire()
+        key = (self.impersonate, self.proxy, self.host)
+        if key not in pool.entries:
+            pool.entries[key] = PoolEntry(self.pool.create_session(self.impersonate, self.proxy))
+        self.entry = pool.entries[key]
+        self.entry.leases += 1
+        return PooledSession(self.entry.session, self.headers, self.cookies, self.timeout)
+
+    async def __aexit__(self, *args) -> None:
+        self.entry.leases -= 1
+        self.entry.last_used = time.monotonic()
+        self.semaphore.release()
+
+def get_timeout(timeout: Union[int, tuple, None]):
+    if timeout is None or has_curl_cffi:
+        return timeout
+    connect = None
+    if isinstance(timeout, tuple):
+        connect, timeout = timeout
+    return ClientTimeout(timeout, connect)
+
+session_pool = SessionPool()
+
+def get_session(url: str, **kwargs) -> SessionLease:
+    """
+    Lease a shared session for requests to the host of ``url``.
+
+    Accepts the ``headers``, ``cookies``, ``proxy``, ``proxies``, ``timeout`` and
+    ``impersonate`` arguments of ``StreamSession``. Other session arguments are
+    not supported, a provider that needs them creates its own ``StreamSession``:
+
+        async with get_session(cls.url, headers=headers, proxy=proxy, impersonate="chrome") as session:
+            async with session.post(...) as response:
+                ...
+    """
+    return session_pool.session(url, **kwargs)
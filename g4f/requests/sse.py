@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import json
+from typing import Any, AsyncIterator, Optional, Union
+
+try:
+    import orjson
+    has_orjson = True
+except ImportError:
+    has_orjson = False
+
+DONE = b"[DONE]"
+
+def loads(data: Union[bytes, str]) -> Any:
+    """Decode json with orjson if it is installed."""
+    if has_orjson:
+        return orjson.loads(data)
+    return json.loads(data)
+
+class ServerSentEvent:
+    """
+    One event of a ``text/event-stream`` response.
+
+    Attributes:
+        data (bytes): The data lines of the event, joined with newlines.
+        event (str): The type of the event, "message" if it has none.
+        id (str): The last event id of the stream, None if there was none.
+        retry (int): The reconnection time of the stream, None if there was none.
+    """
+    __slots__ = ("data", "event", "id", "retry")
+
+    def __init__(self, data: bytes, event: str = "message", id: Optional[str] = None, retry: Optional[int] = None) -> None:
+        self.data = data
+        self.event = event
+        self.id = id
+        self.retry = retry
+
+    @property
+    def text(self) -> str:
+        return self.data.decode()
+
+    def json(self) -> Any:
+        return loads(self.data)
+
+    def __repr__(self) -> str:
+        return f"ServerSentEvent(event={self.event!r}, data={self.data!r})"
+
+class LineSplitter:
+    """
+    Splits byte chunks into lines, ending with "\\n" or "\\r\\n".
+
+    A chunk is split once, only the unfinished line at its end is kept.
+    The pieces of a line that spans several chunks are collected in a list
+    and joined once, when its end arrives.
+    """
+
+    def __init__(self) -> None:
+        self.pending: list[bytes] = []
+
+    def feed(self, chunk: bytes) -> list[bytes]:
+        lines = chunk.split(b"\n")
+        last = lines.pop()
+        if self.pending and lines:
+            self.pending.append(lines[0])
+            lines[0] = b"".join(self.pending)
+            self.pending = []
+        if last:
+            self.pending.append(last)
+        if b"\r" in chunk or lines and lines[0].endswith(b"\r"):
+            lines = [line[:-1] if line.endswith(b"\r") else line for line in lines]
+        return lines
+
+    def flush(self) -> list[bytes]:
+        """Return the last line if the stream doesn't end with a newline."""
+        if not self.pending:
+            return []
+        line = b"".join(self.pending)
+        self.pending = []
+        return [line[:-1] if line.endswith(b"\r") else line]
+
+class SSEParser:
+    """
+    Incremental parser of server-sent events.
+
+    Feed it the raw chunks of a response, it returns the events that are
+    complete. The data lines of an event are joined with newlines, comments
+    are skipped. An event that isn't closed by an empty line at the end of
+    the stream is returned by ``flush``.
+    """
+
+    def __init__(self) -> None:
+        self.lines = LineSplitter()
+        self.data: list[bytes] = []
+        self.event: Optional[str] = None
+        self.id: Optional[str] = None
+        self.retry: Optional[int] = None
+
+    def feed(self, chunk: bytes) -> list[ServerSentEvent]:
+        return self.parse(self.lines.feed(chunk))
+
+    def flush(self) -> list[ServerSentEvent]:
+        events = self.parse(self.lines.flush())
+        if self.data:
+            events.append(self.dispatch())
+        return events
+
+    def parse(self, lines: list[bytes]) -> list[ServerSentEvent]:
+        events = []
+        data = self.data
+        for line in lines:
+            if not line:
+                if data:
+                    events.append(self.dispatch())
+                    data = self.data
+                else:
+                    self.event = None
+            elif line[:6] == b"data: ":
+                data.append(line[6:])
+            elif line[:5] == b"data:":
+                data.append(line[5:])
+            else:
+                field, _, value = line.partition(b":")
+                if value[:1] == b" ":
+                    value = value[1:]
+                if field == b"event":
+                    self.event = value.decode()
+                elif field == b"id":
+                    self.id = value.decode()
+                elif field == b"retry" and value.isdigit():
+                    self.retry = int(value)
+        return events
+
+    def dispatch(self) -> ServerSentEvent:
+        data = self.data[0] if len(self.data) == 1 else b"\n".join(self.data)
+        event = ServerSentEvent(data, self.event or "message", self.id, self.retry)
+        self.data = []
+        self.event = None
+        return event
+
+def iter_chunks(response) -> AsyncIterator[bytes]:
+    """The raw chunks of a ``StreamResponse``, an aiohttp response or an async iterable of bytes."""
+    if hasattr(response, "iter_content"):
+        return response.iter_content()
+    if hasattr(response, "content") and hasattr(response.content, "iter_any"):
+        return response.content.iter_any()
+    return response
+
+async def iter_sse(response) -> AsyncIterator[ServerSentEvent]:
+    """Yield the server-sent events of a response."""
+    parser = SSEParser()
+    async for chunk in iter_chunks(response):
+        for event in parser.feed(chunk):
+            yield event
+    for event in parser.flush():
+        yield event
+
+async def iter_sse_json(response, done: Optional[bytes] = DONE) -> AsyncIterator[Any]:
+    """Yield the decoded json data of the events of a response, until the ``done`` data."""
+    # Parsed here and not with iter_sse, one generator less per event
+    parser = SSEParser()
+    decode = orjson.loads if has_orjson else json.loads
+    async for chunk in iter_chunks(response):
+        for event in parser.feed(chunk):
+            if event.data == done:
+                return
+            yield decode(event.data)
+    for event in parser.flush():
+        if event.data == done:
+            return
+        yield decode(event.data)
+
+async def iter_ndjson(response) -> AsyncIterator[Any]:
+    """Yield the decoded json of every line of a newline delimited json response."""
+    lines = LineSplitter()
+    decode = orjson.loads if has_orjson else json.loads
+    async for chunk in iter_chunks(response):
+        for line in lines.feed(chunk):
+            if line.strip():
+                yield decode(line)
+    for line in lines.flush():
+        if line.strip():
+            yield decode(line)
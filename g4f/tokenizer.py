@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import re
+import math
+import asyncio
+import threading
+from typing import Optional, Protocol
+
+try:
+    import tiktoken
+    has_tiktoken = True
+except ImportError:
+    has_tiktoken = False
+
+from .typing import Messages
+from . import debug
+
+# Chars per token of the approximation without tiktoken
+CHARS_PER_TOKEN = 4
+# Tokens of the chat format per message and for the reply, as counted by OpenAI
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_REPLY = 3
+
+DEFAULT_ENCODING = "cl100k_base"
+ENCODING_PREFIXES = {
+    "gpt-4o": "o200k_base",
+    "o1": "o200k_base",
+    "o3": "o200k_base",
+    "chatgpt-4o": "o200k_base",
+}
+
+# A space after a non-space char always starts a new pre-token of the
+# cl100k and o200k encodings, so the text before it can be encoded alone.
+SPLIT_PATTERN = re.compile(r"(?<=\S)[ \t](?=[^ \t]*$)")
+WORD_PATTERN = re.compile(r"(?<=\S)(?=[ \t])")
+# Chars of a text without spaces that wait for the next chunk
+MAX_PENDING = 64
+
+class Encoding(Protocol):
+    def encode(self, text: str) -> list[int]: ...
+    def decode(self, tokens: list[int]) -> str: ...
+
+encodings: dict[str, Optional[Encoding]] = {}
+lock = threading.Lock()
+
+def get_encoding_name(model: Optional[str]) -> str:
+    """Return the tiktoken encoding of a model family, the default for unknown models."""
+    model = (model or "").lower()
+    for prefix, name in ENCODING_PREFIXES.items():
+        if model.startswith(prefix):
+            return name
+    return DEFAULT_ENCODING
+
+def get_encoding(model: Optional[str] = None) -> Optional[Encoding]:
+    """
+    Load the tiktoken encoding for a model, once per encoding.
+
+    Returns None if tiktoken is not installed or the encoding can't be loaded,
+    for example because its file can't be downloaded.
+    """
+    if not has_tiktoken:
+        return None
+    name = get_encoding_name(model)
+    if name not in encodings:
+        with lock:
+            if name not in encodings:
+                try:
+                    encodings[name] = tiktoken.get_encoding(name)
+                except Exception as e:
+                    debug.log(f"Load tiktoken encoding {name} failed: {e.__class__.__name__}: {e}")
+                    encodings[name] = None
+    return encodings[name]
+
+async def get_encoding_async(model: Optional[str] = None) -> Optional[Encoding]:
+    """Like ``get_encoding``, the first load, which may download the encoding, runs in an executor."""
+    name = get_encoding_name(model)
+    if not has_tiktoken or name in encodings:
+        return encodings.get(name)
+    return await asyncio.get_running_loop().run_in_executor(None, get_encoding, model)
+
+def approximate_tokens(text: str) -> int:
+    """Approximate the tokens of a text, every word has at least one token."""
+    return sum(math.ceil(len(part) / CHARS_PER_TOKEN) for part in split_text(text)) if text else 0
+
+def split_text(text: str) -> list[str]:
+    return WORD_PATTERN.split(text)
+
+def count_tokens(text: str, model: Optional[str] = None, encoding: Optional[Encoding] = None) -> int:
+    """Count the tokens of a text, approximated if there is no encoding."""
+    if not text:
+        return 0
+    if encoding is None:
+        encoding = get_encoding(model)
+    if encoding is None:
+        return approximate_tokens(text)
+    return len(encoding.encode(text))
+
+def get_text(content) -> str:
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return "" if content is None else str(content)
+
+def count_message_tokens(messages: Messages, model: Optional[str] = None) -> int:
+    """Count the prompt tokens of chat messages, including the tokens of the chat format."""
+    encoding = get_encoding(model)
+    tokens = TOKENS_PER_REPLY
+    for message in messages:
+        tokens += TOKENS_PER_MESSAGE
+        tokens += count_tokens(message.get("role", ""), encoding=encoding)
+        tokens += count_tokens(get_text(message.get("content")), encoding=encoding)
+        if "name" in message:
+            tokens += count_tokens(message["name"], encoding=encoding) + 1
+    return tokens
+
+class TokenCounter:
+    """
+    Counts the tokens of a streamed text without encoding it again.
+
+    The text up to the last word boundary is encoded once and added to
+    ``completed``, only the last word stays ``pending`` and is encoded
+    again with the next chunk. Without tiktoken every word is approximated.
+    """
+
+    def __init__(self, model: Optional[str] = None, encoding: Optional[Encoding] = None) -> None:
+        self.encoding = get_encoding(model) if encoding is None else encoding
+        self.completed = 0
+        self.pending = ""
+        self.pending_tokens = 0
+
+    @property
+    def count(self) -> int:
+        return self.completed + self.pending_tokens
+
+    def count_tokens(self, text: str) -> int:
+        return count_tokens(text, encoding=self.encoding) if self.encoding is not None else approximate_tokens(text)
+
+    def feed(self, chunk: str, max_tokens: Optional[int] = None) -> tuple[str, bool]:
+        """
+        Count a chunk and cut it at ``max_tokens``.
+
+        Returns:
+            tuple[str, bool]: The chunk, shortened if the limit is reached,
+            and True if the limit is reached.
+        """
+        text = self.pending + chunk
+        match = SPLIT_PATTERN.search(text)
+        if match is not None:
+            split = match.start()
+        else:
+            # Text without spaces is split anyway, at the cost of a token at the boundary
+            split = max(len(text) - MAX_PENDING, 0)
+        completed_tokens = self.count_tokens(text[:split])
+        pending_tokens = self.count_tokens(text[split:])
+        # Trailing whitespace doesn't reach the limit, it is likely part of the next token
+        if max_tokens is not None and self.completed + completed_tokens + self.count_tokens(text[split:].rstrip()) >= max_tokens:
+            allowed = max_tokens - self.completed
+            if completed_tokens + pending_tokens <= allowed:
+                kept = chunk
+            else:
+                kept = self.cut(text, allowed)[len(self.pending):]
+            self.completed = max_tokens
+            self.pending = ""
+            self.pending_tokens = 0
+            return kept, True
+        self.completed += completed_tokens
+        self.pending = text[split:]
+        self.pending_tokens = pending_tokens
+        return chunk, False
+
+    def cut(self, text: str, tokens: int) -> str:
+        """Return the start of ``text`` with at most ``tokens`` tokens."""
+        if tokens <= 0:
+            return ""
+        if self.encoding is not None:
+            # Drop a char that was split inside its utf-8 bytes
+            return self.encoding.decode(self.encoding.encode(text)[:tokens]).rstrip("\ufffd")
+        result = []
+        for part in split_text(text):
+            size = approximate_tokens(part)
+            if size > tokens:
+                result.append(part[:tokens * CHARS_PER_TOKEN])
+                break
+            result.append(part)
+            tokens -= size
+        return "".join(result)
+
+def get_usage(messages: Optional[Messages], completion_tokens: int, model: Optional[str] = None) -> dict[str, int]:
+    """Return the usage of a completion in the format of the OpenAI API."""
+    prompt_tokens = count_message_tokens(messages, model) if messages else 0
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
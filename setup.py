@@ -36,6 +36,7 @@ EXTRA_REQUIRE = {
         "uvicorn",                 # api
         "nodriver",
         "python-multipart",
+        "tiktoken",                # token usage
     ],
     'slim': [
         "curl_cffi>=0.6.2",